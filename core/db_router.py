@@ -0,0 +1,142 @@
+"""
+Primary/replica database routing.
+
+Writes always go to ``default``. Reads go to one of ``DATABASE_REPLICAS`` only
+inside a request that ``ReplicaRoutingMiddleware`` marked as read-only (GET,
+HEAD and OPTIONS), and only until something in that request writes. A client
+that wrote keeps reading from the primary for ``DATABASE_REPLICA_PIN_SECONDS``
+through a cookie, so it sees its own writes despite replication lag.
+
+Code outside a request (management commands, the consultation intake worker,
+Celery tasks) reads from the primary unless it opts in with ``use_replica()``.
+"""
+
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Apps whose rows are read back immediately after being written by another request
+PRIMARY_ONLY_APPS = {'sessions'}
+
+# Replica alias reads of the current request go to; one per request so reads are consistent
+_replica = ContextVar('replica', default=None)
+_wrote = ContextVar('wrote', default=False)
+
+
+def get_replicas():
+    return list(getattr(settings, 'DATABASE_REPLICAS', []))
+
+
+def _choose_replica():
+    replicas = get_replicas()
+    return random.choice(replicas) if replicas else None
+
+
+def note_write():
+    """Record a write made on behalf of the current request by another thread."""
+    _wrote.set(True)
+
+
+@contextmanager
+def use_replica(enabled: bool = True):
+    """Route reads in this block to a replica (or force the primary with ``enabled=False``)."""
+    reads_token = _replica.set(_choose_replica() if enabled else None)
+    wrote_token = _wrote.set(False)
+    try:
+        yield
+    finally:
+        _replica.reset(reads_token)
+        _wrote.reset(wrote_token)
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replica = _replica.get()
+        if replica is None or _wrote.get():
+            return DEFAULT_DB_ALIAS
+        if model._meta.app_label in PRIMARY_ONLY_APPS:
+            return DEFAULT_DB_ALIAS
+        # Reads inside a transaction must see the transaction's own writes
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return replica
+
+    def db_for_write(self, model, **hints):
+        _wrote.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Every alias holds the same data, so objects may be related across them
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Send reads of safe requests to the replicas and pin writers to the primary.
+
+    Views that must always see the latest rows (work queues, admin actions
+    that read straight after a redirect) can set ``use_primary = True`` on the
+    view function or class. Not used when no replicas are configured.
+    """
+
+    SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not get_replicas():
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.cookie_name = getattr(settings, 'DATABASE_REPLICA_PIN_COOKIE', 'gbsi_db_primary')
+        self.pin_seconds = getattr(settings, 'DATABASE_REPLICA_PIN_SECONDS', 5)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        tokens = self._start(request)
+        try:
+            response = self.get_response(request)
+            wrote = _wrote.get()
+        finally:
+            self._finish(tokens)
+        return self._pin(response, wrote)
+
+    async def __acall__(self, request):
+        # The async ORM runs queries in sync_to_async, which carries these context variables along
+        tokens = self._start(request)
+        try:
+            response = await self.get_response(request)
+            wrote = _wrote.get()
+        finally:
+            self._finish(tokens)
+        return self._pin(response, wrote)
+
+    def _start(self, request):
+        replica_reads = request.method in self.SAFE_METHODS and self.cookie_name not in request.COOKIES
+        return _replica.set(_choose_replica() if replica_reads else None), _wrote.set(False)
+
+    def _finish(self, tokens):
+        _replica.reset(tokens[0])
+        _wrote.reset(tokens[1])
+
+    def _pin(self, response, wrote):
+        if wrote:
+            response.set_cookie(
+                self.cookie_name, '1', max_age=self.pin_seconds, httponly=True, samesite='Lax',
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+        if getattr(view_func, 'use_primary', False) or getattr(view_class, 'use_primary', False):
+            _replica.set(None)
@@ -0,0 +1,112 @@
+"""
+Management command to summarize captured request profiles.
+
+Usage:
+    python manage.py profile_summary --list
+    python manage.py profile_summary buildingsystemvendor-list
+    python manage.py profile_summary modelvendor-list --sort tottime --limit 40 --min-ms 200
+"""
+
+import io
+import pstats
+import re
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+from core.profiling import CPROFILE, EXTENSIONS, STACK, get_profiling_root, route_directory
+
+_ELAPSED_RE = re.compile(r'-(\d+)ms\.')
+
+
+def _elapsed_ms(path) -> int:
+    match = _ELAPSED_RE.search(path.name)
+    return int(match.group(1)) if match else 0
+
+
+class Command(BaseCommand):
+    help = 'Summarize the hottest functions across the profiles captured for one route'
+
+    def add_arguments(self, parser):
+        parser.add_argument('route', nargs='?', help='URL name of the view, e.g. buildingsystemvendor-list')
+        parser.add_argument('--list', action='store_true', help='List routes with captured profiles')
+        parser.add_argument('--limit', type=int, default=25, help='Number of functions to show')
+        parser.add_argument(
+            '--sort',
+            choices=['cumulative', 'tottime', 'ncalls'],
+            default='cumulative',
+            help='Sort order for cProfile captures',
+        )
+        parser.add_argument('--min-ms', type=int, default=0, help='Only include requests at least this slow')
+
+    def handle(self, *args, **options):
+        root = get_profiling_root()
+        if options['list'] or not options['route']:
+            self._list(root)
+            return
+
+        directory = route_directory(options['route'])
+        if not directory.is_dir():
+            raise CommandError(f'No profiles captured for {options["route"]} in {root}')
+
+        files = [path for path in directory.iterdir() if _elapsed_ms(path) >= options['min_ms']]
+        prof_files = sorted(path for path in files if path.suffix == EXTENSIONS[CPROFILE])
+        stack_files = sorted(path for path in files if path.suffix == EXTENSIONS[STACK])
+        if not prof_files and not stack_files:
+            raise CommandError(f'No matching profiles in {directory}')
+
+        timings = sorted(_elapsed_ms(path) for path in files)
+        self.stdout.write(
+            f'{options["route"]}: {len(files)} capture(s), '
+            f'median {timings[len(timings) // 2]}ms, slowest {timings[-1]}ms\n'
+        )
+        if prof_files:
+            self._summarize_cprofile(prof_files, options['sort'], options['limit'])
+        if stack_files:
+            self._summarize_stacks(stack_files, options['limit'])
+
+    def _list(self, root):
+        routes = sorted(path for path in root.iterdir() if path.is_dir()) if root.is_dir() else []
+        if not routes:
+            self.stdout.write(self.style.WARNING(f'⚠ No profiles captured yet in {root}'))
+            return
+        for directory in routes:
+            counts = Counter(path.suffix for path in directory.iterdir())
+            self.stdout.write(
+                f'  {directory.name:<50} {counts[EXTENSIONS[CPROFILE]]:>4} cprofile  '
+                f'{counts[EXTENSIONS[STACK]]:>4} stack'
+            )
+
+    def _summarize_cprofile(self, files, sort, limit):
+        output = io.StringIO()
+        stats = pstats.Stats(*(str(path) for path in files), stream=output)
+        stats.strip_dirs().sort_stats(sort).print_stats(limit)
+        self.stdout.write(self.style.SUCCESS(f'cProfile, {len(files)} request(s), sorted by {sort}:'))
+        self.stdout.write(output.getvalue())
+
+    def _summarize_stacks(self, files, limit):
+        inclusive = Counter()
+        own = Counter()
+        total = 0
+        for path in files:
+            with open(path) as fh:
+                for line in fh:
+                    stack, _, count = line.rstrip('\n').rpartition(' ')
+                    if not stack:
+                        continue
+                    count = int(count)
+                    frames = stack.split(';')
+                    total += count
+                    own[frames[-1]] += count
+                    for frame in set(frames):
+                        inclusive[frame] += count
+
+        if not total:
+            self.stdout.write(self.style.WARNING(
+                f'⚠ {len(files)} stack capture(s) but no samples: the requests finished within one sampling interval'
+            ))
+            return
+        self.stdout.write(self.style.SUCCESS(f'Stack samples, {len(files)} request(s), {total} samples:'))
+        self.stdout.write(f'  {"self":>7} {"total":>7}  function')
+        for frame, count in own.most_common(limit):
+            self.stdout.write(f'  {count / total:>7.1%} {inclusive[frame] / total:>7.1%}  {frame}')
+        self.stdout.write('')
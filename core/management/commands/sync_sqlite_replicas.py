@@ -0,0 +1,50 @@
+"""
+Management command to copy the primary SQLite database to its replica files.
+
+For exercising read/write routing locally without a real replication setup.
+
+Usage:
+    GBSI_DATABASE_REPLICA_URLS=sqlite:///db-replica.sqlite3 python manage.py sync_sqlite_replicas
+"""
+
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+
+def _path(name) -> str:
+    name = str(name)
+    if name.startswith('file:'):
+        name = name[len('file:'):].split('?', 1)[0]
+    return name
+
+
+class Command(BaseCommand):
+    help = 'Copy the primary SQLite database over each SQLite replica in DATABASE_REPLICAS'
+
+    def handle(self, *args, **options):
+        primary = settings.DATABASES[DEFAULT_DB_ALIAS]
+        if primary['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError('The primary database is not SQLite')
+        replicas = getattr(settings, 'DATABASE_REPLICAS', [])
+        if not replicas:
+            raise CommandError('No replicas configured; set GBSI_DATABASE_REPLICA_URLS')
+
+        source = sqlite3.connect(_path(primary['NAME']))
+        try:
+            for alias in replicas:
+                replica = settings.DATABASES[alias]
+                if replica['ENGINE'] != 'django.db.backends.sqlite3':
+                    self.stdout.write(self.style.WARNING(f'⚠ Skipping {alias}: not SQLite'))
+                    continue
+                # The backup API copies a consistent snapshot even while the primary is in use
+                target = sqlite3.connect(_path(replica['NAME']))
+                try:
+                    source.backup(target)
+                finally:
+                    target.close()
+                self.stdout.write(self.style.SUCCESS(f'✓ {alias} <- {_path(primary["NAME"])}'))
+        finally:
+            source.close()
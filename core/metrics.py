@@ -0,0 +1,356 @@
+"""
+Process-local metrics with Prometheus text exposition.
+
+Metrics are plain in-memory counters, gauges and histograms updated under a
+per-metric lock, so recording a sample costs a dict lookup and an addition.
+
+When ``METRICS_DIR`` is set, each process periodically writes its samples to
+``METRICS_DIR/metrics-<pid>-<token>.json`` and the ``/metrics`` view merges
+every process's file, so a multi-worker deployment reports one set of totals
+without a push gateway or any other network service. Counters and histograms
+of workers that have exited are folded into an archive file so totals never go
+backwards; their gauges are dropped.
+"""
+
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_ARCHIVE_NAME = 'metrics-archive.json'
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def _key(self, labels: Dict[str, object]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f'{self.name} expects labels {self.labelnames}, got {tuple(labels)}')
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> List:
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+    def describe(self) -> Dict:
+        return {'type': self.kind, 'help': self.documentation, 'labelnames': list(self.labelnames)}
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS, registry=None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            # [count per bucket..., sum, count]; buckets are stored non-cumulative
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def describe(self) -> Dict:
+        description = super().describe()
+        description['buckets'] = list(self.buckets)
+        return description
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._token = uuid.uuid4().hex[:8]
+        self._last_flush = 0.0
+        self._flush_lock = threading.Lock()
+
+    def register(self, metric: _Metric):
+        if metric.name in self._metrics:
+            raise ValueError(f'Metric {metric.name} is already registered')
+        self._metrics[metric.name] = metric
+
+    def snapshot(self) -> Dict:
+        """This process's samples as a JSON-serializable dict."""
+        return {
+            name: dict(metric.describe(), samples=metric.samples())
+            for name, metric in self._metrics.items()
+        }
+
+    # Multi-process aggregation
+
+    def _directory(self) -> Optional[Path]:
+        directory = getattr(settings, 'METRICS_DIR', None)
+        return Path(directory) if directory else None
+
+    def _filename(self) -> str:
+        return f'metrics-{os.getpid()}-{self._token}.json'
+
+    def flush(self, force: bool = False):
+        """Write this process's samples for other workers' /metrics scrapes, at most once per interval."""
+        directory = self._directory()
+        if directory is None:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_flush < getattr(settings, 'METRICS_FLUSH_INTERVAL', 5):
+            return
+        if not self._flush_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_flush = now
+            directory.mkdir(parents=True, exist_ok=True)
+            _atomic_write_json(directory / self._filename(), self.snapshot())
+        finally:
+            self._flush_lock.release()
+
+    def collect(self) -> Dict:
+        """Samples merged across every process sharing ``METRICS_DIR`` (or just this one)."""
+        directory = self._directory()
+        if directory is None:
+            return self.snapshot()
+
+        with _directory_lock(directory):
+            archive = _read_json(directory / _ARCHIVE_NAME) or {}
+            snapshots = [self.snapshot()]
+            archive_changed = False
+            for path in directory.glob('metrics-*-*.json'):
+                snapshot = _read_json(path)
+                if snapshot is None:
+                    continue
+                if path.name == self._filename():
+                    continue
+                if _pid_alive(_pid_from_filename(path.name)):
+                    snapshots.append(snapshot)
+                    continue
+                # Fold counters and histograms of exited workers into the archive
+                archive = merge_snapshots([archive, _without_gauges(snapshot)])
+                archive_changed = True
+                path.unlink()
+            if archive_changed:
+                _atomic_write_json(directory / _ARCHIVE_NAME, archive)
+        # This process's metadata first, so renamed help text wins over old files
+        return merge_snapshots(snapshots + [archive])
+
+
+def _atomic_write_json(path: Path, data: Dict):
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'w') as fh:
+            json.dump(data, fh)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def _read_json(path: Path) -> Optional[Dict]:
+    try:
+        with open(path) as fh:
+            return json.load(fh)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+@contextmanager
+def _directory_lock(directory: Path):
+    with open(directory / '.lock', 'a') as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _pid_from_filename(filename: str) -> int:
+    try:
+        return int(filename.split('-')[1])
+    except (IndexError, ValueError):
+        return -1
+
+
+def _pid_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    if pid <= 0 or os.name != 'posix':
+        return pid > 0
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _without_gauges(snapshot: Dict) -> Dict:
+    return {name: data for name, data in snapshot.items() if data['type'] != 'gauge'}
+
+
+def merge_snapshots(snapshots: Iterable[Dict]) -> Dict:
+    """Sum samples with the same name and labels across snapshots."""
+    merged: Dict[str, Dict] = {}
+    for snapshot in snapshots:
+        for name, data in snapshot.items():
+            target = merged.setdefault(name, dict(data, samples={}))
+            for labels, value in data['samples']:
+                key = tuple(labels)
+                current = target['samples'].get(key)
+                if current is None:
+                    target['samples'][key] = list(value) if isinstance(value, list) else value
+                elif isinstance(value, list):
+                    target['samples'][key] = [a + b for a, b in zip(current, value)]
+                else:
+                    target['samples'][key] = current + value
+    for data in merged.values():
+        data['samples'] = [[list(key), value] for key, value in sorted(data['samples'].items())]
+    return merged
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value: float) -> str:
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def render(snapshot: Dict) -> str:
+    """Prometheus text exposition format (version 0.0.4)."""
+    lines = []
+    for name in sorted(snapshot):
+        data = snapshot[name]
+        lines.append(f'# HELP {name} {data["help"]}')
+        lines.append(f'# TYPE {name} {data["type"]}')
+        names = data['labelnames']
+        for labels, value in data['samples']:
+            if data['type'] != 'histogram':
+                lines.append(f'{name}{_labels(names, labels)} {_number(value)}')
+                continue
+            cumulative = 0
+            for bound, count in zip(data['buckets'], value):
+                cumulative += count
+                lines.append(f'{name}_bucket{_labels(names, labels, ("le", _number(float(bound))))} {cumulative}')
+            lines.append(f'{name}_bucket{_labels(names, labels, ("le", "+Inf"))} {value[-1]}')
+            lines.append(f'{name}_sum{_labels(names, labels)} {_number(value[-2])}')
+            lines.append(f'{name}_count{_labels(names, labels)} {value[-1]}')
+    return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+# Samples recorded since the last periodic flush would otherwise be lost when a worker exits
+atexit.register(REGISTRY.flush, force=True)
+
+
+# Metrics recorded by the application
+
+REQUEST_LATENCY = Histogram(
+    'gbsi_http_request_duration_seconds', 'Request latency by route', ['route', 'method'],
+)
+REQUESTS = Counter(
+    'gbsi_http_requests_total', 'Requests by route and status code', ['route', 'method', 'status'],
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    'gbsi_http_requests_in_flight', 'Requests currently being handled',
+)
+REQUEST_DB_TIME = Histogram(
+    'gbsi_http_request_db_seconds', 'Time spent in SQL per request by route', ['route'],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+CACHE_REQUESTS = Counter(
+    'gbsi_cache_requests_total', 'Cache lookups by cache use and result (hit/miss)', ['cache', 'result'],
+)
+AI_REQUEST_LATENCY = Histogram(
+    'gbsi_ai_request_duration_seconds', 'Latency of AI model suggestion calls', ['operation'],
+    buckets=(0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0),
+)
+AI_REQUEST_ERRORS = Counter(
+    'gbsi_ai_request_errors_total', 'Failed AI model suggestion calls', ['operation'],
+)
+AFFILIATE_CLICKS = Counter(
+    'gbsi_affiliate_clicks_total', 'Tracked affiliate clicks by vendor category', ['category'],
+)
+AFFILIATE_CLICKS_DROPPED = Counter(
+    'gbsi_affiliate_clicks_dropped_total', 'Affiliate clicks not stored, by reason (bot/duplicate/rate_limited)', ['reason'],
+)
+CONSULTATIONS = Counter(
+    'gbsi_consultation_requests_total', 'Consultation submissions by outcome', ['result'],
+)
+
+
+def record_cache(cache_name: str, hit: bool):
+    CACHE_REQUESTS.inc(cache=cache_name, result='hit' if hit else 'miss')
@@ -0,0 +1,191 @@
+"""
+Request instrumentation middleware.
+"""
+
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from . import metrics
+
+logger = logging.getLogger('gbsi.sql')
+
+_WHITESPACE_RE = re.compile(r'\s+')
+_IN_LIST_RE = re.compile(r'\bIN \((?:%s, )*%s\)', re.IGNORECASE)
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+
+
+def fingerprint(sql: str) -> str:
+    """
+    Reduce a statement to its shape.
+
+    Parameters are already ``%s`` placeholders; literals inlined by raw SQL
+    and variable-length ``IN`` lists are collapsed too, so the same ORM call
+    for different rows always produces the same fingerprint.
+    """
+    sql = _WHITESPACE_RE.sub(' ', sql).strip()
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    return _IN_LIST_RE.sub('IN (...)', sql)
+
+
+class QueryRecorder:
+    """``execute_wrapper`` that counts and times every statement."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    def repeated(self, threshold: int):
+        """Statement shapes executed more than ``threshold`` times, most frequent first."""
+        return [(sql, count) for sql, count in self.fingerprints.most_common() if count > threshold]
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Record query count, total SQL time and repeated statements per request.
+
+    Enabled with ``SQL_INSTRUMENTATION = True``. Adds ``X-Query-Count`` and a
+    ``Server-Timing`` ``db`` entry to every response, logs a structured summary
+    to the ``gbsi.sql`` logger, and warns when one statement shape runs more
+    than ``SQL_REPEATED_QUERY_THRESHOLD`` times in a request (the usual sign of
+    an N+1). Queries run while a streaming response is consumed are not
+    counted.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'SQL_INSTRUMENTATION', False):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.threshold = getattr(settings, 'SQL_REPEATED_QUERY_THRESHOLD', 5)
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        total_ms = (time.perf_counter() - started) * 1000
+        db_ms = recorder.duration * 1000
+
+        response['X-Query-Count'] = str(recorder.count)
+        timing = f'db;dur={db_ms:.2f};desc="{recorder.count} queries"'
+        if response.has_header('Server-Timing'):
+            timing = f"{response['Server-Timing']}, {timing}"
+        response['Server-Timing'] = timing
+
+        repeated = recorder.repeated(self.threshold)
+        stats = {
+            'method': request.method,
+            'path': request.path,
+            'view': getattr(request.resolver_match, 'view_name', None),
+            'status': response.status_code,
+            'query_count': recorder.count,
+            'db_time_ms': round(db_ms, 2),
+            'total_time_ms': round(total_ms, 2),
+            'repeated_queries': [{'sql': sql, 'count': count} for sql, count in repeated],
+        }
+        logger.info(
+            '%s %s status=%s queries=%d db_ms=%.2f total_ms=%.2f',
+            request.method, request.path, response.status_code, recorder.count, db_ms, total_ms,
+            extra={'sql_stats': stats},
+        )
+        for sql, count in repeated:
+            logger.warning(
+                'Repeated query on %s %s: %d executions of %s',
+                request.method, request.path, count, sql,
+                extra={'sql_stats': stats},
+            )
+        return response
+
+
+class _QueryTimer:
+    """``execute_wrapper`` that only sums SQL time, for the always-on metrics middleware."""
+
+    def __init__(self):
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+
+
+class MetricsMiddleware:
+    """
+    Record request latency, status codes, in-flight requests and SQL time per route.
+
+    Routes are labelled with the resolved URL name (``buildingsystemvendor-list``,
+    ``buildingsystemvendor-track-click``...) rather than the path, so the number
+    of series stays bounded. Disabled with ``METRICS_ENABLED = False``.
+
+    Works in both sync and async stacks. Async requests do not report SQL
+    time: their queries run on executor threads this middleware cannot hook.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICS_ENABLED', True):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timer = _QueryTimer()
+        metrics.REQUESTS_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timer))
+                response = self.get_response(request)
+        finally:
+            metrics.REQUESTS_IN_FLIGHT.dec()
+        self._record(request, response, time.perf_counter() - started)
+        metrics.REQUEST_DB_TIME.observe(timer.duration, route=self._route(request))
+        return response
+
+    async def __acall__(self, request):
+        metrics.REQUESTS_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.REQUESTS_IN_FLIGHT.dec()
+        self._record(request, response, time.perf_counter() - started)
+        return response
+
+    def _route(self, request):
+        return getattr(request.resolver_match, 'view_name', None) or 'unmatched'
+
+    def _record(self, request, response, elapsed):
+        route = self._route(request)
+        metrics.REQUEST_LATENCY.observe(elapsed, route=route, method=request.method)
+        metrics.REQUESTS.inc(route=route, method=request.method, status=response.status_code)
+        metrics.REGISTRY.flush()
@@ -0,0 +1,210 @@
+"""
+In-place request profiling.
+
+A request is profiled when a staff user sends ``X-Profile: 1`` (or adds
+``?profile=1``), or when it is picked by ``PROFILING_SAMPLE_RATE`` automatic
+sampling. Two capture modes are available:
+
+``cprofile``
+    Deterministic profile of the request thread, written as a ``.prof`` file
+    readable by ``pstats``/snakeviz. Only one runs at a time per process
+    (on Python 3.12+ cProfile takes the process-wide ``sys.monitoring``
+    profiler slot); a request asking for one while another is running is
+    captured in ``stack`` mode instead.
+``stack``
+    A background thread samples the request thread's stack every
+    ``PROFILING_STACK_INTERVAL`` seconds and writes collapsed stacks
+    (``frame;frame;frame count``), the input format of flamegraph tools.
+    Much cheaper than cProfile, so this is the mode used for automatic
+    sampling.
+
+Files go to ``PROFILING_DIR/<url name>/`` and only the newest
+``PROFILING_MAX_FILES`` per route are kept. Summarize them with
+``python manage.py profile_summary <url name>``.
+"""
+
+import cProfile
+import itertools
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Optional
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+CPROFILE = 'cprofile'
+STACK = 'stack'
+MODES = (CPROFILE, STACK)
+EXTENSIONS = {CPROFILE: '.prof', STACK: '.collapsed'}
+
+_UNSAFE_CHARS_RE = re.compile(r'[^A-Za-z0-9_.-]+')
+_sequence = itertools.count()
+# Held while a cProfile capture runs
+_cprofile_lock = threading.Lock()
+
+
+def get_profiling_root() -> Path:
+    return Path(getattr(settings, 'PROFILING_DIR', settings.BASE_DIR / 'profiles'))
+
+
+def route_directory(route: str) -> Path:
+    """``admin:vendors_vendor_changelist`` -> ``PROFILING_DIR/admin_vendors_vendor_changelist``"""
+    return get_profiling_root() / (_UNSAFE_CHARS_RE.sub('_', route).strip('_') or 'unmatched')
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f'{os.path.basename(code.co_filename)}:{code.co_name}:{code.co_firstlineno}'
+
+
+class StackSampler:
+    """Collect collapsed stacks of one thread from a background thread."""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def dump(self, path: Path):
+        with open(path, 'w') as fh:
+            for stack, count in self.stacks.most_common():
+                fh.write(f'{stack} {count}\n')
+
+
+def _rotate(directory: Path, keep: int):
+    files = sorted(
+        (path for path in directory.iterdir() if path.suffix in EXTENSIONS.values()),
+        key=lambda path: path.stat().st_mtime,
+    )
+    for path in files[:max(0, len(files) - keep)]:
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class ProfilingMiddleware:
+    """
+    Profile selected requests and write the result per route.
+
+    Must come after ``AuthenticationMiddleware``: the header and query flag are
+    only honoured for staff users. Staff-triggered responses get an
+    ``X-Profile-File`` header naming the capture.
+
+    Async requests are passed through unprofiled: they share the event loop
+    thread, so its profile would mix every request in flight.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+        self.sample_rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 0)
+        self.max_files = getattr(settings, 'PROFILING_MAX_FILES', 50)
+        self.interval = getattr(settings, 'PROFILING_STACK_INTERVAL', 0.005)
+
+    def _requested_mode(self, request) -> Optional[str]:
+        flag = request.headers.get('X-Profile') or request.GET.get('profile')
+        if not flag:
+            return None
+        user = getattr(request, 'user', None)
+        if not (user and user.is_staff):
+            return None
+        return flag if flag in MODES else CPROFILE
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.get_response(request)
+        mode = self._requested_mode(request)
+        requested = mode is not None
+        if mode is None and self.sample_rate and random.randrange(self.sample_rate) == 0:
+            mode = STACK
+        if mode is None:
+            return self.get_response(request)
+
+        started = time.perf_counter()
+        profiler = self._start_cprofile() if mode == CPROFILE else None
+        if profiler is not None:
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+                _cprofile_lock.release()
+        else:
+            mode = STACK
+            profiler = StackSampler(threading.get_ident(), self.interval)
+            profiler.start()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.stop()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        route = getattr(request.resolver_match, 'view_name', None) or 'unmatched'
+        try:
+            path = self._write(profiler, mode, route, elapsed_ms)
+        except OSError:
+            logger.exception('Could not write %s profile for %s', mode, route)
+            return response
+
+        logger.info('Profiled %s %s (%s, %.1fms) -> %s', request.method, request.path, mode, elapsed_ms, path)
+        if requested:
+            response['X-Profile-File'] = str(path.relative_to(get_profiling_root()))
+        return response
+
+    def _start_cprofile(self) -> Optional[cProfile.Profile]:
+        """An enabled profiler, or None while another capture holds the profiler."""
+        if not _cprofile_lock.acquire(blocking=False):
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Something outside this middleware (a debugger, coverage) is profiling
+            _cprofile_lock.release()
+            return None
+        return profiler
+
+    def _write(self, profiler, mode: str, route: str, elapsed_ms: float) -> Path:
+        directory = route_directory(route)
+        directory.mkdir(parents=True, exist_ok=True)
+        # Elapsed time in the name lets profile_summary pick out the slow captures
+        stamp = time.strftime('%Y%m%dT%H%M%S')
+        path = directory / f'{stamp}-{os.getpid()}-{next(_sequence)}-{int(elapsed_ms)}ms{EXTENSIONS[mode]}'
+        if mode == CPROFILE:
+            profiler.dump_stats(str(path))
+        else:
+            profiler.dump(path)
+        _rotate(directory, self.max_files)
+        return path
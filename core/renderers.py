@@ -0,0 +1,60 @@
+"""
+Faster API renderers.
+
+``ORJSONRenderer`` produces the same documents as DRF's ``JSONRenderer`` with
+orjson doing the encoding; values orjson does not know natively (and
+datetimes, so they keep DRF's ``Z`` suffix) go through DRF's encoder.
+``MessagePackRenderer`` answers clients that send
+``Accept: application/msgpack`` or ``?format=msgpack`` with the same data as
+MessagePack, which is smaller and cheaper to decode than JSON.
+
+Both libraries are optional: without orjson the JSON renderer is DRF's, and
+the MessagePack renderer is only enabled when msgpack is installed.
+"""
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, JSON falls back to the stdlib encoder
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional, see REST_FRAMEWORK in settings
+    msgpack = None
+
+_encoder = JSONEncoder()
+
+
+def _default(obj):
+    return _encoder.default(obj)
+
+
+class ORJSONRenderer(JSONRenderer):
+    """``JSONRenderer`` with orjson for compact output; indented output is left to DRF."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        renderer_context = renderer_context or {}
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context):
+            return super().render(data, accepted_media_type, renderer_context)
+        return orjson.dumps(
+            data,
+            default=_default,
+            option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+        )
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_default, use_bin_type=True)
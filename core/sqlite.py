@@ -0,0 +1,194 @@
+"""
+SQLite production mode.
+
+SQLite handles a single writer at a time. With the default rollback journal,
+readers block the writer and a writer that cannot get the lock within five
+seconds fails with "database is locked". In production mode
+(``SQLITE_PRODUCTION_MODE = True``):
+
+* every new connection switches to WAL journaling, so readers never block the
+  writer, and applies ``SQLITE_PRAGMAS`` (synchronous, mmap_size, cache_size,
+  busy_timeout...);
+* writes passed to ``run_write()`` are executed by one writer thread per
+  process instead of the request threads. Request threads no longer compete
+  for the write lock, and the writer commits whatever has queued up in one
+  transaction, with a savepoint per write.
+"""
+
+import logging
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connections, transaction
+from django.db.backends.signals import connection_created
+
+from .db_router import note_write
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    # In WAL mode NORMAL only fsyncs at checkpoints; a power loss can drop the
+    # last commits but never corrupts the database
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    # Negative values are KiB
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+    'foreign_keys': 'ON',
+}
+
+# Writes committed together by the writer thread
+MAX_BATCH = 100
+
+
+def is_enabled(using: str = DEFAULT_DB_ALIAS) -> bool:
+    return (
+        getattr(settings, 'SQLITE_PRODUCTION_MODE', False)
+        and connections[using].vendor == 'sqlite'
+    )
+
+
+def configure_connection(sender, connection, **kwargs):
+    """``connection_created`` receiver applying ``SQLITE_PRAGMAS`` in production mode."""
+    if connection.vendor != 'sqlite' or not getattr(settings, 'SQLITE_PRODUCTION_MODE', False):
+        return
+    name = str(connection.settings_dict['NAME'])
+    if connection.is_in_memory_db() or 'mode=ro' in name:
+        # Neither in-memory nor read-only databases can switch journal mode
+        return
+    pragmas = dict(DEFAULT_PRAGMAS, **getattr(settings, 'SQLITE_PRAGMAS', {}))
+    with connection.cursor() as cursor:
+        for pragma, value in pragmas.items():
+            cursor.execute(f'PRAGMA {pragma} = {value}')
+
+
+connection_created.connect(configure_connection, dispatch_uid='core.sqlite.configure_connection')
+
+
+class WriteQueue:
+    """One thread that performs the writes queued by every request thread."""
+
+    def __init__(self, using: str = DEFAULT_DB_ALIAS, max_batch: int = MAX_BATCH):
+        self.using = using
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='sqlite-writer', daemon=True)
+                self._thread.start()
+
+    def submit(self, func: Callable, *args, **kwargs) -> Future:
+        self._ensure_started()
+        future = Future()
+        self._queue.put((future, func, args, kwargs))
+        return future
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in batch
+            batch = [item for item in batch if item is not None]
+            if batch:
+                self._write_batch(batch)
+            if stop:
+                connections[self.using].close()
+                return
+
+    def _write_batch(self, batch):
+        close_old_connections()
+        outcomes = []
+        try:
+            with transaction.atomic(using=self.using):
+                for future, func, args, kwargs in batch:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    try:
+                        # A failing write only rolls back its own savepoint
+                        with transaction.atomic(using=self.using):
+                            outcomes.append((future, func(*args, **kwargs), None))
+                    except Exception as exc:
+                        outcomes.append((future, None, exc))
+        except Exception as exc:
+            # The commit itself failed, so none of the batch was stored
+            logger.exception('SQLite write batch of %d failed', len(batch))
+            for future, *_ in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        for future, result, exc in outcomes:
+            if exc is not None:
+                future.set_exception(exc)
+            else:
+                future.set_result(result)
+
+    def stop(self, timeout: Optional[float] = None):
+        """Finish the queued writes and stop the writer thread."""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+
+
+_write_queue = None
+_write_queue_lock = threading.Lock()
+
+
+def get_write_queue() -> WriteQueue:
+    global _write_queue
+    if _write_queue is None:
+        with _write_queue_lock:
+            if _write_queue is None:
+                _write_queue = WriteQueue()
+    return _write_queue
+
+
+def reset_write_queue():
+    """Stop the writer thread; the next ``run_write()`` starts a new one."""
+    global _write_queue
+    with _write_queue_lock:
+        if _write_queue is not None:
+            _write_queue.stop()
+            _write_queue = None
+
+
+def run_write(func: Callable, *args, **kwargs):
+    """
+    Call ``func(*args, **kwargs)`` on the writer thread and return its result.
+
+    Runs inline when production mode or ``SQLITE_WRITE_QUEUE`` is off, on other
+    databases, and inside a transaction (the writer would wait for the lock
+    held by this very transaction).
+
+    Raises:
+        Whatever ``func`` raised
+    """
+    if (
+        not getattr(settings, 'SQLITE_WRITE_QUEUE', True)
+        or not is_enabled()
+        or connections[DEFAULT_DB_ALIAS].in_atomic_block
+    ):
+        return func(*args, **kwargs)
+
+    # The write happens on another thread, so tell the router about it here
+    note_write()
+    return get_write_queue().submit(func, *args, **kwargs).result(
+        timeout=getattr(settings, 'SQLITE_WRITE_TIMEOUT', 30)
+    )
@@ -1,3 +1,117 @@
-from django.test import TestCase
+import sqlite3
+import tempfile
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from vendors.models import AffiliateClick, BuildingSystemVendor
+
+from . import profiling
+
+
+@override_settings(METRICS_TOKEN='s3cret', METRICS_ALLOWED_IPS=[], METRICS_PUBLIC=False)
+class MetricsAccessTests(TestCase):
+    def test_anonymous_is_forbidden(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+
+    @override_settings(METRICS_TOKEN='')
+    def test_no_token_does_not_open_it(self):
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer ').status_code, 403)
+
+    def test_bearer_token(self):
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer s3cret')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+
+    def test_staff_session(self):
+        user = get_user_model().objects.create_user('ops', password='password', is_staff=True)
+        self.client.force_login(user)
+        self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+    @override_settings(METRICS_ALLOWED_IPS=['10.0.0.0/8'])
+    def test_allowed_network(self):
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='10.1.2.3').status_code, 200)
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='192.168.1.2').status_code, 403)
+
+    @override_settings(METRICS_PUBLIC=True)
+    def test_public_when_opened(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        self.root = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        self.enterContext(override_settings(PROFILING_DIR=self.root))
+        user = get_user_model().objects.create_user('ops', password='password', is_staff=True)
+        self.client.force_login(user)
+
+    def profile(self):
+        response = self.client.get('/api/vendors/', HTTP_X_PROFILE='1')
+        self.assertEqual(response.status_code, 200)
+        return Path(response['X-Profile-File']).suffix
+
+    def test_cprofile_capture(self):
+        self.assertEqual(self.profile(), '.prof')
+        self.assertFalse(profiling._cprofile_lock.locked())
+
+    def test_concurrent_cprofile_falls_back_to_stack(self):
+        with profiling._cprofile_lock:
+            self.assertEqual(self.profile(), '.collapsed')
+
+    def test_profiler_taken_elsewhere_falls_back_to_stack(self):
+        with mock.patch.object(profiling.cProfile.Profile, 'enable', side_effect=ValueError('in use')):
+            self.assertEqual(self.profile(), '.collapsed')
+        self.assertFalse(profiling._cprofile_lock.locked())
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'], CLICK_FILTER_ENABLED=False)
+class ReplicaRoutingTests(TransactionTestCase):
+    """Routing between the test database and a second SQLite file standing in for a replica."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Added after the test case's database guards, which would refuse queries to it
+        cls.replica_dir = tempfile.TemporaryDirectory()
+        connections.settings['replica1'] = dict(
+            connections.settings['default'], NAME=str(Path(cls.replica_dir.name) / 'replica.sqlite3'),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        connections['replica1'].close()
+        del connections['replica1']
+        del connections.settings['replica1']
+        cls.replica_dir.cleanup()
+        super().tearDownClass()
+
+    def setUp(self):
+        BuildingSystemVendor.objects.bulk_create([BuildingSystemVendor(partner_name='Synced', primary_category='DOMES')])
+        self.vendor = BuildingSystemVendor.objects.get()
+        # "Replicate", then write to the primary only
+        connections['replica1'].close()
+        connections['default'].ensure_connection()
+        target = sqlite3.connect(connections.settings['replica1']['NAME'])
+        connections['default'].connection.backup(target)
+        target.close()
+        BuildingSystemVendor.objects.update(partner_name='Not replicated yet')
+
+    def test_reads_go_to_the_replica(self):
+        response = self.client.get('/api/vendors/')
+        self.assertContains(response, 'Synced')
+        self.assertNotIn('gbsi_db_primary', response.cookies)
+
+    def test_writes_go_to_the_primary_and_pin_the_client(self):
+        response = self.client.post(f'/api/vendors/{self.vendor.pk}/track_click/')
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(AffiliateClick.objects.using('default').filter(pk=response.json()['click_id']).exists())
+        self.assertFalse(AffiliateClick.objects.using('replica1').exists())
+        self.assertIn('gbsi_db_primary', response.cookies)
+
+        self.assertContains(self.client.get('/api/vendors/'), 'Not replicated yet')
+        self.client.cookies.pop('gbsi_db_primary')
+        self.assertContains(self.client.get('/api/vendors/'), 'Synced')
@@ -1,3 +1,39 @@
-from django.shortcuts import render
+import hmac
+import ipaddress
 
-# Create your views here.
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.views.decorators.http import require_GET
+
+from . import metrics
+
+
+def _metrics_allowed(request) -> bool:
+    """Bearer ``METRICS_TOKEN``, a staff session or a ``METRICS_ALLOWED_IPS`` address, unless ``METRICS_PUBLIC``."""
+    if getattr(settings, 'METRICS_PUBLIC', False):
+        return True
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token and hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return True
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_staff:
+        return True
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+    return any(
+        address in ipaddress.ip_network(network, strict=False)
+        for network in getattr(settings, 'METRICS_ALLOWED_IPS', [])
+    )
+
+
+@require_GET
+def metrics_view(request):
+    """Prometheus scrape endpoint, merged across every worker sharing ``METRICS_DIR``."""
+    if not _metrics_allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        metrics.render(metrics.REGISTRY.collect()),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
@@ -16,6 +16,7 @@ const ConsultationModal = ({ isOpen, onClose, vendor = null, model = null }) =>
 
     const handleSubmit = async (e) => {
         e.preventDefault();
+        if (isSubmitting) return;
         setIsSubmitting(true);
         setSubmitError(null);
 
@@ -36,7 +37,11 @@ const ConsultationModal = ({ isOpen, onClose, vendor = null, model = null }) =>
                 onClose();
             }, 2000);
         } catch (error) {
-            setSubmitError('Failed to submit request. Please try again.');
+            if (error.response?.status === 503) {
+                setSubmitError("We're receiving a lot of requests right now. Please try again in a few seconds.");
+            } else {
+                setSubmitError('Failed to submit request. Please try again.');
+            }
             console.error('Consultation submission error:', error);
         } finally {
             setIsSubmitting(false);
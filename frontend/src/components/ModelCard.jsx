@@ -1,6 +1,7 @@
 import React from 'react';
 import { Calendar, ArrowRight } from 'lucide-react';
 import { Link } from 'react-router-dom';
+import ResponsiveImage from './ResponsiveImage';
 
 const ModelCard = ({ model, onSchedule }) => {
     const firstImage = model.images && model.images.length > 0 ? model.images[0] : null;
@@ -10,8 +11,14 @@ const ModelCard = ({ model, onSchedule }) => {
             {/* Image */}
             <Link to={`/models/${model.id}`} className="block">
                 <div className="h-48 bg-gradient-to-br from-emerald-100 to-emerald-50 flex items-center justify-center relative overflow-hidden">
-                    {firstImage ? (
-                        <img src={firstImage} alt={model.model_name} className="w-full h-full object-cover" />
+                    {model.image || firstImage ? (
+                        <ResponsiveImage
+                            image={model.image}
+                            fallbackSrc={firstImage}
+                            alt={model.model_name}
+                            sizes="(min-width: 1024px) 33vw, (min-width: 768px) 50vw, 100vw"
+                            className="w-full h-full object-cover"
+                        />
                     ) : (
                         <span className="text-emerald-400 font-medium text-lg">{model.model_name}</span>
                     )}
@@ -0,0 +1,31 @@
+import React from 'react';
+
+/**
+ * Renders a processed image from the API ({ src, width, height, sources, color })
+ * as a <picture>, so the browser picks the best format and the smallest size
+ * that fills `sizes`. Falls back to a plain <img> for unprocessed image URLs.
+ */
+const ResponsiveImage = ({ image, fallbackSrc, alt, sizes, className, loading = 'lazy' }) => {
+    if (!image) {
+        return fallbackSrc ? <img src={fallbackSrc} alt={alt} className={className} loading={loading} /> : null;
+    }
+
+    return (
+        <picture>
+            {image.sources.map(source => (
+                <source key={source.type} type={source.type} srcSet={source.srcset} sizes={sizes} />
+            ))}
+            <img
+                src={image.src}
+                width={image.width}
+                height={image.height}
+                alt={alt}
+                className={className}
+                loading={loading}
+                style={{ backgroundColor: image.color }}
+            />
+        </picture>
+    );
+};
+
+export default ResponsiveImage;
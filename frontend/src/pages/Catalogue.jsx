@@ -2,8 +2,9 @@ import React, { useState, useEffect } from 'react';
 import VendorCard from '../components/VendorCard';
 import { Search, Filter } from 'lucide-react';
 import { vendorService } from '../services/api';
+import { applyCatalogueChange, subscribeToCatalogue } from '../services/realtime';
 
-// Mock data as fallback
+// Demo data shown when the backend cannot be reached
 const MOCK_VENDORS = [
     {
         id: 1,
@@ -35,28 +36,36 @@ const MOCK_VENDORS = [
 ];
 
 const Catalogue = () => {
-    const [vendors, setVendors] = useState(MOCK_VENDORS);
+    const [vendors, setVendors] = useState([]);
     const [searchTerm, setSearchTerm] = useState("");
     const [selectedCategory, setSelectedCategory] = useState("ALL");
-    const [loading, setLoading] = useState(false);
+    const [loading, setLoading] = useState(true);
     const [error, setError] = useState(null);
 
     useEffect(() => {
         loadVendors();
     }, []);
 
+    // Keep the list current without refetching: apply vendor changes as they are pushed.
+    // The whole list is loaded and filtered here, so follow every category.
+    useEffect(() => {
+        return subscribeToCatalogue({}, (change) => {
+            if (change.type === 'vendor') {
+                setVendors(current => applyCatalogueChange(current, change));
+            }
+        }, loadVendors);
+    }, []);
+
     const loadVendors = async () => {
         try {
             setLoading(true);
             const data = await vendorService.getAllVendors();
-            if (data && data.length > 0) {
-                setVendors(data);
-            }
+            setVendors(data);
             setError(null);
         } catch (err) {
             console.error('Failed to load vendors from API, using mock data:', err);
             setError('Using demo data (backend not connected)');
-            // Keep using mock data
+            setVendors(MOCK_VENDORS);
         } finally {
             setLoading(false);
         }
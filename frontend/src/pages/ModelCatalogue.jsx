@@ -2,6 +2,7 @@ import React, { useState, useEffect } from 'react';
 import ModelCard from '../components/ModelCard';
 import { Search, Filter } from 'lucide-react';
 import { modelService } from '../services/api';
+import { applyCatalogueChange, subscribeToCatalogue } from '../services/realtime';
 
 const ModelCatalogue = ({ onSchedule }) => {
     const [models, setModels] = useState([]);
@@ -14,6 +15,14 @@ const ModelCatalogue = ({ onSchedule }) => {
         loadModels();
     }, []);
 
+    useEffect(() => {
+        return subscribeToCatalogue({}, (change) => {
+            if (change.type === 'model') {
+                setModels(current => applyCatalogueChange(current, change));
+            }
+        }, loadModels);
+    }, []);
+
     const loadModels = async () => {
         try {
             setLoading(true);
@@ -2,14 +2,18 @@ import React, { useState, useEffect } from 'react';
 import { useParams, Link } from 'react-router-dom';
 import { modelService } from '../services/api';
 import { Calendar, ExternalLink } from 'lucide-react';
+import ResponsiveImage from '../components/ResponsiveImage';
+import ModelCard from '../components/ModelCard';
 
 const ModelDetail = ({ onSchedule }) => {
     const { id } = useParams();
     const [model, setModel] = useState(null);
     const [loading, setLoading] = useState(true);
+    const [similar, setSimilar] = useState([]);
 
     useEffect(() => {
         loadModel();
+        loadSimilar();
     }, [id]);
 
     const loadModel = async () => {
@@ -24,6 +28,16 @@ const ModelDetail = ({ onSchedule }) => {
         }
     };
 
+    const loadSimilar = async () => {
+        // Optional section: the page works without it
+        try {
+            setSimilar([]);
+            setSimilar(await modelService.getSimilarModels(id));
+        } catch (error) {
+            console.error('Failed to load similar models:', error);
+        }
+    };
+
     if (loading) {
         return (
             <div className="max-w-7xl mx-auto px-4 sm:px-6 lg:px-8 py-12">
@@ -40,6 +54,11 @@ const ModelDetail = ({ onSchedule }) => {
         );
     }
 
+    // Processed images when available, otherwise the original URLs
+    const gallery = model.gallery && model.gallery.length > 0
+        ? model.gallery.map(image => ({ image }))
+        : (model.images || []).map(url => ({ url }));
+
     return (
         <div className="max-w-7xl mx-auto px-4 sm:px-6 lg:px-8 py-12">
             {/* Breadcrumb */}
@@ -52,20 +71,25 @@ const ModelDetail = ({ onSchedule }) => {
             <div className="grid grid-cols-1 lg:grid-cols-2 gap-8">
                 {/* Images */}
                 <div>
-                    {model.images && model.images.length > 0 ? (
+                    {gallery.length > 0 ? (
                         <div className="space-y-4">
-                            <img
-                                src={model.images[0]}
+                            <ResponsiveImage
+                                image={gallery[0].image}
+                                fallbackSrc={gallery[0].url}
                                 alt={model.model_name}
+                                sizes="(min-width: 1024px) 50vw, 100vw"
                                 className="w-full h-96 object-cover rounded-2xl"
+                                loading="eager"
                             />
-                            {model.images.length > 1 && (
+                            {gallery.length > 1 && (
                                 <div className="grid grid-cols-3 gap-4">
-                                    {model.images.slice(1, 4).map((img, idx) => (
-                                        <img
+                                    {gallery.slice(1, 4).map((img, idx) => (
+                                        <ResponsiveImage
                                             key={idx}
-                                            src={img}
+                                            image={img.image}
+                                            fallbackSrc={img.url}
                                             alt={`${model.model_name} ${idx + 2}`}
+                                            sizes="(min-width: 1024px) 16vw, 33vw"
                                             className="w-full h-24 object-cover rounded-lg"
                                         />
                                     ))}
@@ -145,6 +169,21 @@ const ModelDetail = ({ onSchedule }) => {
                     </div>
                 </div>
             </div>
+
+            {similar.length > 0 && (
+                <section className="mt-16">
+                    <h2 className="text-2xl font-bold text-gray-900 mb-6">Similar Builds</h2>
+                    <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-8">
+                        {similar.slice(0, 6).map(similarModel => (
+                            <ModelCard
+                                key={similarModel.id}
+                                model={similarModel}
+                                onSchedule={onSchedule}
+                            />
+                        ))}
+                    </div>
+                </section>
+            )}
         </div>
     );
 };
@@ -38,6 +38,11 @@ export const modelService = {
         const response = await api.get(`/models/${id}/`);
         return response.data;
     },
+
+    async getSimilarModels(id) {
+        const response = await api.get(`/models/${id}/similar/`);
+        return response.data;
+    },
 };
 
 export const consultationService = {
@@ -0,0 +1,65 @@
+const WS_URL = 'ws://localhost:8000/ws/catalogue/';
+
+const MAX_RETRY_DELAY = 30000;
+
+/**
+ * Follow catalogue changes for a category, a vendor, or everything.
+ *
+ * Calls onChange with each change event ({ type, op, id, data | changes }) and
+ * onResync after a reconnect, when changes may have been missed.
+ * Returns a function that closes the subscription.
+ */
+export function subscribeToCatalogue({ category = null, vendor = null } = {}, onChange, onResync = null) {
+    const params = new URLSearchParams();
+    if (category) params.append('category', category);
+    if (vendor) params.append('vendor', vendor);
+    const url = params.toString() ? `${WS_URL}?${params}` : WS_URL;
+
+    let socket = null;
+    let closed = false;
+    let retryDelay = 1000;
+    let retryTimer = null;
+    let connectedBefore = false;
+
+    const connect = () => {
+        socket = new WebSocket(url);
+        socket.onopen = () => {
+            retryDelay = 1000;
+            if (connectedBefore && onResync) onResync();
+            connectedBefore = true;
+        };
+        socket.onmessage = (message) => {
+            const event = JSON.parse(message.data);
+            if (event.op) onChange(event);
+        };
+        socket.onclose = () => {
+            if (closed) return;
+            retryTimer = setTimeout(connect, retryDelay);
+            retryDelay = Math.min(retryDelay * 2, MAX_RETRY_DELAY);
+        };
+    };
+
+    connect();
+
+    return () => {
+        closed = true;
+        clearTimeout(retryTimer);
+        if (socket) socket.close();
+    };
+}
+
+/**
+ * Apply a change event to a list of objects of the event's type.
+ */
+export function applyCatalogueChange(items, change) {
+    if (change.op === 'delete') {
+        return items.filter(item => item.id !== change.id);
+    }
+    if (change.op === 'create') {
+        const exists = items.some(item => item.id === change.id);
+        return exists
+            ? items.map(item => (item.id === change.id ? change.data : item))
+            : [...items, change.data];
+    }
+    return items.map(item => (item.id === change.id ? { ...item, ...change.changes } : item));
+}
@@ -10,7 +10,10 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
+from importlib.util import find_spec
 from pathlib import Path
+from urllib.parse import unquote, urlparse
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -46,12 +49,18 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Outermost, so queries made by the other middleware are counted too
+    'core.middleware.QueryInstrumentationMiddleware',
+    'core.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.db_router.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # After authentication: on-demand profiling is limited to staff users
+    'core.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -80,12 +89,68 @@ WSGI_APPLICATION = 'gbsi.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+def _database_from_url(url, read_only=False):
+    """``sqlite:///relative.sqlite3``, ``sqlite:////abs/path.sqlite3`` or ``postgres://user:pw@host:5432/name``"""
+    parsed = urlparse(url)
+    if parsed.scheme == 'sqlite':
+        name = str(BASE_DIR / parsed.path[1:]) if not parsed.path.startswith('//') else parsed.path[1:]
+        if read_only:
+            # The sqlite3 backend opens NAME as a URI, so mode=ro makes the connection read-only
+            name = f'file:{name}?mode=ro'
+        return {'ENGINE': 'django.db.backends.sqlite3', 'NAME': name}
+    if parsed.scheme in ('postgres', 'postgresql'):
+        return {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': parsed.path[1:],
+            'USER': unquote(parsed.username or ''),
+            'PASSWORD': unquote(parsed.password or ''),
+            'HOST': parsed.hostname or '',
+            'PORT': str(parsed.port or ''),
+        }
+    raise ValueError(f'Unsupported database URL: {url}')
+
+
+# GBSI_DATABASE_URL replaces the local SQLite file as the primary database.
+# GBSI_DATABASE_REPLICA_URLS is a comma-separated list of read replicas; GET
+# requests read from them (see core.db_router). Connections are closed after
+# each request: the app runs under ASGI, where every sync_to_async thread would
+# keep its own persistent connection per alias. Raise GBSI_CONN_MAX_AGE (seconds,
+# checked before reuse) only for WSGI deployments.
+CONN_MAX_AGE = int(os.environ.get('GBSI_CONN_MAX_AGE', '0'))
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
     }
 }
+if os.environ.get('GBSI_DATABASE_URL'):
+    DATABASES['default'] = _database_from_url(os.environ['GBSI_DATABASE_URL'])
+
+DATABASE_REPLICAS = []
+for _i, _url in enumerate(filter(None, os.environ.get('GBSI_DATABASE_REPLICA_URLS', '').split(',')), 1):
+    DATABASES[f'replica{_i}'] = dict(
+        _database_from_url(_url.strip(), read_only=True),
+        # Tests run against the primary's test database instead of creating one per replica
+        TEST={'MIRROR': 'default'},
+    )
+    DATABASE_REPLICAS.append(f'replica{_i}')
+
+for _database in DATABASES.values():
+    _database.setdefault('CONN_MAX_AGE', CONN_MAX_AGE)
+    _database.setdefault('CONN_HEALTH_CHECKS', True)
+
+# SQLite production mode (core.sqlite): WAL journaling and tuned pragmas on every
+# connection, and click/consultation writes serialized through one writer
+# thread per process. SQLITE_PRAGMAS overrides individual pragmas.
+SQLITE_PRODUCTION_MODE = os.environ.get('GBSI_SQLITE_PRODUCTION', '') == '1'
+SQLITE_PRAGMAS = {}
+SQLITE_WRITE_QUEUE = True
+SQLITE_WRITE_TIMEOUT = 30
+
+DATABASE_ROUTERS = ['core.db_router.PrimaryReplicaRouter']
+# After a write, the client reads from the primary for this many seconds
+DATABASE_REPLICA_PIN_SECONDS = 5
 
 
 # Password validation
@@ -124,6 +189,41 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Uploaded files. 3D model files are stored content-addressed and served by
+# /api/assets/models/<sha256>.glb; set MODEL_ASSET_SENDFILE_HEADER to
+# 'X-Accel-Redirect' (nginx, with an internal location mapping
+# MODEL_ASSET_SENDFILE_PREFIX to MEDIA_ROOT) or 'X-Sendfile' to let the web
+# server send them.
+MEDIA_URL = 'media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+MODEL_ASSET_SENDFILE_HEADER = os.environ.get('GBSI_SENDFILE_HEADER')
+MODEL_ASSET_SENDFILE_PREFIX = '/protected-media/'
+
+# GLB ingest: on upload, metadata is read into ModelVendor.glb_metadata and
+# simplified LOD variants are built with gltfpack (https://meshoptimizer.org/gltf/)
+# in GLB_LOD_WORKERS processes. Without gltfpack only the metadata is recorded.
+# Texture limits need a gltfpack build with BasisU; add '-tc' to
+# GLB_GLTFPACK_ARGS to emit KTX2 textures.
+GLB_INGEST_ON_SAVE = True
+GLB_GLTFPACK = os.environ.get('GBSI_GLTFPACK', 'gltfpack')
+GLB_GLTFPACK_ARGS = []
+GLB_LOD_WORKERS = 2
+GLB_LOD_LEVELS = {
+    'low': {'simplify': 0.1, 'texture_limit': 512},
+    'medium': {'simplify': 0.4, 'texture_limit': 1024},
+}
+
+# Gallery images: ModelVendor.images URLs are downloaded into local storage and
+# every size (max width in px) is rendered in each format Pillow can write, in
+# IMAGE_INGEST_WORKERS processes. The last format is the fallback.
+IMAGE_INGEST_ON_SAVE = True
+IMAGE_INGEST_WORKERS = 2
+IMAGE_DERIVATIVE_SIZES = {'thumbnail': 160, 'card': 480, 'hero': 1600}
+IMAGE_DERIVATIVE_FORMATS = ['avif', 'webp', 'jpeg']
+IMAGE_QUALITY = 75
+IMAGE_MAX_BYTES = 20 * 1024 * 1024
+IMAGE_DOWNLOAD_TIMEOUT = 20
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -135,10 +235,156 @@ AUTH_USER_MODEL = 'core.User'
 CELERY_BROKER_URL = 'redis://localhost:6379/0'
 CELERY_RESULT_BACKEND = 'redis://localhost:6379/0'
 
+# SQL instrumentation: per-request query counts and SQL time as X-Query-Count /
+# Server-Timing headers and 'gbsi.sql' log records. Warns when one statement
+# shape repeats more than SQL_REPEATED_QUERY_THRESHOLD times in a request.
+SQL_INSTRUMENTATION = os.environ.get('GBSI_SQL_INSTRUMENTATION', '') == '1'
+SQL_REPEATED_QUERY_THRESHOLD = 5
+
+# Metrics: Prometheus text format at /metrics. With METRICS_DIR set, every worker
+# writes its samples there at most every METRICS_FLUSH_INTERVAL seconds and
+# /metrics reports the totals across workers. /metrics answers scrapers sending
+# METRICS_TOKEN as a bearer token, staff sessions and clients in
+# METRICS_ALLOWED_IPS (addresses or networks; empty by default, since behind a
+# local reverse proxy every request comes from loopback); everyone else gets a
+# 403. Set METRICS_PUBLIC to open it to anyone.
+METRICS_ENABLED = True
+METRICS_DIR = os.environ.get('GBSI_METRICS_DIR', '')
+METRICS_FLUSH_INTERVAL = 5
+METRICS_TOKEN = os.environ.get('GBSI_METRICS_TOKEN', '')
+METRICS_ALLOWED_IPS = [ip for ip in os.environ.get('GBSI_METRICS_ALLOWED_IPS', '').split(',') if ip]
+METRICS_PUBLIC = os.environ.get('GBSI_METRICS_PUBLIC', '') == '1'
+
+# Profiling: staff can profile a request with an 'X-Profile: 1' header (or
+# 'X-Profile: stack') or ?profile=1. Besides that, 1 in PROFILING_SAMPLE_RATE
+# requests gets a stack-sampled profile (0 disables sampling). Captures are
+# kept under PROFILING_DIR/<url name>/, newest PROFILING_MAX_FILES per route.
+PROFILING_DIR = Path(os.environ.get('GBSI_PROFILING_DIR', BASE_DIR / 'profiles'))
+PROFILING_SAMPLE_RATE = int(os.environ.get('GBSI_PROFILING_SAMPLE_RATE', '0'))
+PROFILING_MAX_FILES = 50
+PROFILING_STACK_INTERVAL = 0.005
+
+# API rendering: JSON is encoded with orjson; clients can ask for MessagePack with
+# 'Accept: application/msgpack' or ?format=msgpack. With API_VALUES_LISTS, vendor
+# and model list responses are built from .values() rows instead of instances.
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.ORJSONRenderer',
+        *(['core.renderers.MessagePackRenderer'] if find_spec('msgpack') else []),
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+}
+API_VALUES_LISTS = True
+
+# Async read endpoints (/api/async/): rendered responses are cached for this many
+# seconds and invalidated when a vendor or model is saved. 0 disables caching.
+ASYNC_API_CACHE_TIMEOUT = 30
+
+# Catalogue snapshots: versioned, precompressed JSON served with immutable caching.
+# Touched slices are rebuilt whenever a vendor or model is saved or deleted.
+CATALOGUE_SNAPSHOT_ROOT = BASE_DIR / 'snapshots'
+CATALOGUE_SNAPSHOTS_ON_SAVE = True
+
+# Catalogue change log behind /api/changes/?since=<token>. Tokens are numbered
+# in commit order; compact_catalogue_changes drops tombstones older than
+# CATALOGUE_CHANGES_TOMBSTONE_DAYS.
+CATALOGUE_CHANGE_LOG = True
+CATALOGUE_CHANGES_PAGE_SIZE = 500
+CATALOGUE_CHANGES_TOMBSTONE_DAYS = 30
+
+# "Similar models" (/api/models/<id>/similar/): the SIMILAR_MODELS_K nearest
+# models by description, specifications, category, price and size, stored in a
+# table and refreshed in the background when models change. build_similar_models
+# recomputes everything, SIMILAR_MODELS_BLOCK_SIZE rows at a time.
+SIMILAR_MODELS_ON_SAVE = True
+SIMILAR_MODELS_K = 8
+SIMILAR_MODELS_BLOCK_SIZE = 512
+
+# Popularity (?ordering=popular on vendors and models): affiliate clicks and
+# consultations, weighted and decayed with a POPULARITY_HALF_LIFE_DAYS half-life.
+# update_popularity adds new events from cron. Ids skipped below events younger
+# than POPULARITY_GAP_SECONDS may belong to writes still committing and are
+# checked again on later runs. Changing the half-life or the weights needs
+# update_popularity --rebuild.
+POPULARITY_HALF_LIFE_DAYS = 14
+POPULARITY_CLICK_WEIGHT = 1.0
+POPULARITY_CONSULTATION_WEIGHT = 5.0
+POPULARITY_BATCH_SIZE = 10000
+POPULARITY_GAP_SECONDS = 300
+
+# Affiliate click filtering (vendors.click_filter), per worker process and in
+# memory: clicks from bot user agents, repeats of a visitor's click on the same
+# vendor within CLICK_DEDUP_WINDOW seconds, and clicks past CLICK_RATE_LIMIT per
+# CLICK_RATE_WINDOW seconds are not stored.
+# BEHIND A REVERSE PROXY, set CLICK_FILTER_FORWARDED_HEADER (e.g.
+# 'HTTP_X_FORWARDED_FOR', if the proxy overwrites it): otherwise every anonymous
+# visitor arrives from the proxy's IP, and those with the same user agent are
+# deduplicated and rate limited as one.
+CLICK_FILTER_ENABLED = True
+CLICK_DEDUP_WINDOW = 30
+CLICK_RATE_LIMIT = 20
+CLICK_RATE_WINDOW = 60
+CLICK_FILTER_MAX_KEYS = 50000
+CLICK_FILTER_FORWARDED_HEADER = None
+
+# Conversion postbacks (POST /api/clicks/conversions/, ingest_conversions) mark
+# this many click ids converted per UPDATE and transaction; keep it under
+# SQLite's 999 bound parameters.
+CLICK_CONVERSION_CHUNK_SIZE = 500
+
+# Click retention: archive_clicks moves clicks older than CLICK_RETENTION_DAYS
+# into monthly clicks-YYYY-MM.jsonl.gz files under CLICK_ARCHIVE_ROOT and daily
+# per-vendor rollups, deleting CLICK_ARCHIVE_BATCH_SIZE clicks per transaction.
+CLICK_RETENTION_DAYS = 365
+CLICK_ARCHIVE_ROOT = BASE_DIR / 'archives' / 'clicks'
+CLICK_ARCHIVE_BATCH_SIZE = 5000
+
+# AI model generation journal (vendors.enrichment, suggest_models --all,
+# seed_database): a failed vendor is retried after ENRICHMENT_BACKOFF_SECONDS,
+# doubling up to ENRICHMENT_BACKOFF_MAX_SECONDS, for ENRICHMENT_MAX_ATTEMPTS
+# attempts. A job RUNNING for ENRICHMENT_STALE_SECONDS is taken to have died.
+ENRICHMENT_MAX_ATTEMPTS = 4
+ENRICHMENT_BACKOFF_SECONDS = 30
+ENRICHMENT_BACKOFF_MAX_SECONDS = 600
+ENRICHMENT_STALE_SECONDS = 900
+ENRICHMENT_DELAY_SECONDS = 2
+
+# The admin checks new vendors for near-duplicates against an in-memory index
+# kept up to date by signals; it is rebuilt after DEDUP_VENDOR_INDEX_MAX_AGE
+# seconds to catch edits and deletions made by other processes.
+DEDUP_VENDOR_INDEX_MAX_AGE = 3600
+
+# Consultation intake: submissions are deduplicated for CONSULTATION_DEDUP_WINDOW
+# seconds and written inline (201 with the new request). With
+# CONSULTATION_INTAKE_ASYNC they are queued in memory for a background worker
+# instead (202 {'status': 'queued'}; 503 once CONSULTATION_INTAKE_QUEUE_SIZE
+# writes are pending): faster under load, but submissions still queued when the
+# process dies are lost. The worker tries each write 1 + CONSULTATION_INTAKE_RETRIES
+# times before logging the lead and dropping it.
+CONSULTATION_INTAKE_ASYNC = False
+CONSULTATION_INTAKE_QUEUE_SIZE = 1000
+CONSULTATION_INTAKE_WORKERS = 1
+CONSULTATION_INTAKE_RETRIES = 3
+CONSULTATION_DEDUP_WINDOW = 600
+
 # Channels Configuration
 ASGI_APPLICATION = 'gbsi.asgi.application'
 
-import os
+# Channel layer for catalogue change events. The in-memory layer only reaches
+# clients connected to the same process; set GBSI_REDIS_URL in production.
+if os.environ.get('GBSI_REDIS_URL'):
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {'hosts': [os.environ['GBSI_REDIS_URL']]},
+        },
+    }
+else:
+    CHANNEL_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+
+# Publish vendor and model changes to WebSocket subscribers (/ws/catalogue/)
+CATALOGUE_REALTIME = True
+
 # GDAL and GEOS library paths - let Django auto-detect
 # GDAL_LIBRARY_PATH = '/usr/local/opt/gdal/lib/libgdal.dylib'
 # GEOS_LIBRARY_PATH = '/usr/local/opt/geos/lib/libgeos_c.dylib'
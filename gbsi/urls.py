@@ -14,10 +14,18 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
+from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include
 
+from core.views import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('vendors.urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]
+
+# Uploaded files and image derivatives; the web server serves MEDIA_ROOT in production
+urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -1,15 +1,58 @@
 # Enhanced admin with AI model suggestion button
 
 from django.contrib import admin
-from django.urls import path
+from django.urls import path, reverse
 from django.shortcuts import render, redirect
 from django.contrib import messages
-from .models import BuildingSystemVendor, AffiliateClick, ModelVendor, ConsultationRequest
+from django.db.models import Count
+from .models import (
+    BuildingSystemVendor, AffiliateClick, ClickArchive, ClickDailyRollup, EnrichmentJob, ModelImage, ModelVendor,
+    ConsultationRequest,
+)
 from .ai_service import ModelSuggestionService
-from django.utils.text import slugify
+from .enrichment import reset_failed
+from .exports import csv_response
+from .ingest import create_suggested_models, find_duplicate_vendor
+from .leads import MAX_CLAIM, claim_leads
+from django.core.exceptions import PermissionDenied
+from django.utils import timezone
 from django.utils.html import format_html
 
 
+class CSVExportMixin:
+    """
+    Streams the changelist as CSV: an "Export CSV" button for the current
+    filters and search, and an action for the selected rows.
+    """
+    # (header, field path or callable) pairs
+    export_columns = ()
+    # Foreign keys the columns follow, joined in the export query
+    export_select_related = ()
+
+    def get_export_queryset(self, queryset):
+        return queryset.select_related(*self.export_select_related)
+
+    def export_response(self, queryset):
+        return csv_response(self.get_export_queryset(queryset), self.export_columns, self.model._meta.model_name)
+
+    @admin.action(description='Export selected rows as CSV', permissions=['view'])
+    def export_csv(self, request, queryset):
+        return self.export_response(queryset)
+
+    def export_view(self, request):
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        # The same filters, search and ordering as the changelist it was opened from
+        changelist = self.get_changelist_instance(request)
+        return self.export_response(changelist.get_queryset(request))
+
+    def get_urls(self):
+        info = self.model._meta.app_label, self.model._meta.model_name
+        return [
+            path('export/', self.admin_site.admin_view(self.export_view), name='%s_%s_export' % info),
+        ] + super().get_urls()
+
+
 @admin.register(BuildingSystemVendor)
 class BuildingSystemVendorAdmin(admin.ModelAdmin):
     list_display = ('partner_name', 'primary_category', 'is_certified', 'consultation_enabled', 'status', 'model_count', 'created_at')
@@ -33,9 +76,25 @@ class BuildingSystemVendorAdmin(admin.ModelAdmin):
         }),
     )
     
+    def save_model(self, request, obj, form, change):
+        if not change:
+            duplicate = find_duplicate_vendor(obj.partner_name, obj.website_url)
+            if duplicate:
+                existing, score = duplicate
+                messages.warning(
+                    request,
+                    f"'{obj.partner_name}' looks like a duplicate of existing vendor "
+                    f"'{existing.partner_name}' (ID {existing.pk}, {score:.0%} similar)"
+                )
+        super().save_model(request, obj, form, change)
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(_model_count=Count('models'))
+    
     def model_count(self, obj):
-        return obj.models.count()
+        return obj._model_count
     model_count.short_description = 'Number of Models'
+    model_count.admin_order_field = '_model_count'
     
     def get_urls(self):
         urls = super().get_urls()
@@ -59,22 +118,10 @@ class BuildingSystemVendorAdmin(admin.ModelAdmin):
                 website_url=vendor.website_url or ""
             )
             
-            created_count = 0
-            for model_data in suggestions:
-                slug = slugify(model_data['model_name'])
-                
-                # Check if model already exists
-                if not ModelVendor.objects.filter(slug=slug).exists():
-                    ModelVendor.objects.create(
-                        vendor=vendor,
-                        model_name=model_data['model_name'],
-                        slug=slug,
-                        description=model_data['description'],
-                        price_range=model_data.get('price_range', ''),
-                        specifications=model_data.get('specifications', {}),
-                        is_featured=False
-                    )
-                    created_count += 1
+            created, skipped = create_suggested_models(vendor, suggestions)
+            created_count = len(created)
+            for model_data, reason in skipped:
+                messages.warning(request, f"Skipped '{model_data['model_name']}': {reason}")
             
             messages.success(request, f'Created {created_count} models for {vendor.partner_name}')
             return redirect('admin:vendors_buildingsystemvendor_change', vendor_id)
@@ -102,12 +149,88 @@ class BuildingSystemVendorAdmin(admin.ModelAdmin):
 
 
 @admin.register(AffiliateClick)
-class AffiliateClickAdmin(admin.ModelAdmin):
+class AffiliateClickAdmin(CSVExportMixin, admin.ModelAdmin):
     list_display = ('vendor', 'user', 'timestamp', 'converted')
     list_filter = ('converted', 'timestamp')
     search_fields = ('vendor__partner_name', 'user__username')
     readonly_fields = ('timestamp',)
     date_hierarchy = 'timestamp'
+    list_select_related = ('vendor', 'user')
+    actions = ['export_csv']
+    export_columns = (
+        ('id', 'id'),
+        ('timestamp', 'timestamp'),
+        ('vendor_id', 'vendor_id'),
+        ('vendor', 'vendor__partner_name'),
+        ('category', 'vendor__primary_category'),
+        ('user_id', 'user_id'),
+        ('username', 'user__username'),
+        ('converted', 'converted'),
+    )
+    export_select_related = ('vendor', 'user')
+
+
+@admin.register(ClickDailyRollup)
+class ClickDailyRollupAdmin(admin.ModelAdmin):
+    """Daily click totals of archived clicks (archive_clicks)."""
+    list_display = ('date', 'vendor', 'clicks', 'conversions')
+    list_filter = ('date',)
+    search_fields = ('vendor__partner_name',)
+    date_hierarchy = 'date'
+    list_select_related = ('vendor',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ClickArchive)
+class ClickArchiveAdmin(admin.ModelAdmin):
+    list_display = ('month', 'clicks', 'path', 'restored_at', 'updated_at')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(EnrichmentJob)
+class EnrichmentJobAdmin(admin.ModelAdmin):
+    """Journal of AI model generation (suggest_models --all, seed_database)."""
+    list_display = ('vendor', 'status', 'attempts', 'models_created', 'next_attempt_at', 'updated_at')
+    list_filter = ('status',)
+    search_fields = ('vendor__partner_name', 'last_error')
+    list_select_related = ('vendor',)
+    readonly_fields = (
+        'vendor', 'status', 'attempts', 'last_error', 'suggestions', 'models_created',
+        'next_attempt_at', 'started_at', 'finished_at', 'updated_at',
+    )
+    actions = ['retry_jobs']
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description='Retry selected failed jobs on the next run')
+    def retry_jobs(self, request, queryset):
+        messages.success(request, f'{reset_failed(queryset)} job(s) will be retried')
+
+
+class ModelImageInline(admin.TabularInline):
+    model = ModelImage
+    extra = 0
+    fields = ('preview', 'position', 'original', 'source_url', 'width', 'height', 'error')
+    readonly_fields = ('preview', 'source_url', 'width', 'height', 'error')
+
+    def preview(self, obj):
+        thumbnail = (obj.derivatives or {}).get('thumbnail')
+        if not thumbnail:
+            return 'Processing…' if obj.original and not obj.error else '-'
+        name = list(thumbnail.values())[-1]['name']
+        return format_html('<img src="{}" style="height:60px;background:{}">', obj.original.storage.url(name), obj.color)
+    preview.short_description = 'Preview'
 
 
 @admin.register(ModelVendor)
@@ -117,6 +240,7 @@ class ModelVendorAdmin(admin.ModelAdmin):
     search_fields = ('model_name', 'description', 'vendor__partner_name')
     readonly_fields = ('created_at', 'updated_at')
     prepopulated_fields = {'slug': ('model_name',)}
+    inlines = [ModelImageInline]
     
     fieldsets = (
         ('Basic Information', {
@@ -136,12 +260,31 @@ class ModelVendorAdmin(admin.ModelAdmin):
 
 
 @admin.register(ConsultationRequest)
-class ConsultationRequestAdmin(admin.ModelAdmin):
-    list_display = ('email', 'vendor', 'model', 'status', 'created_at')
-    list_filter = ('status', 'created_at')
+class ConsultationRequestAdmin(CSVExportMixin, admin.ModelAdmin):
+    list_display = ('email', 'vendor', 'model', 'status', 'assigned_to', 'created_at')
+    list_filter = ('status', 'assigned_to', 'created_at')
     search_fields = ('email', 'phone', 'message', 'vendor__partner_name', 'model__model_name')
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = ('created_at', 'updated_at', 'claimed_at')
     date_hierarchy = 'created_at'
+    list_select_related = ('vendor', 'model__vendor', 'assigned_to')
+    actions = ['release_leads', 'export_csv']
+    export_columns = (
+        ('id', 'id'),
+        ('created_at', 'created_at'),
+        ('status', 'get_status_display'),
+        ('email', 'email'),
+        ('phone', 'phone'),
+        ('vendor_id', 'vendor_id'),
+        ('vendor', 'vendor__partner_name'),
+        ('model_id', 'model_id'),
+        ('model', 'model__model_name'),
+        ('username', 'user__username'),
+        ('assigned_to', 'assigned_to__username'),
+        ('claimed_at', 'claimed_at'),
+        ('updated_at', 'updated_at'),
+        ('message', 'message'),
+    )
+    export_select_related = ('vendor', 'model', 'user', 'assigned_to')
     
     fieldsets = (
         ('Contact Information', {
@@ -151,6 +294,46 @@ class ConsultationRequestAdmin(admin.ModelAdmin):
             'fields': ('vendor', 'model', 'message')
         }),
         ('Status', {
-            'fields': ('status', 'created_at', 'updated_at')
+            'fields': ('status', 'assigned_to', 'claimed_at', 'created_at', 'updated_at')
         }),
     )
+    
+    def get_urls(self):
+        urls = super().get_urls()
+        custom_urls = [
+            path(
+                'claim/',
+                self.admin_site.admin_view(self.claim_leads_view),
+                name='vendors_consultationrequest_claim',
+            ),
+        ]
+        return custom_urls + urls
+    
+    def claim_leads_view(self, request):
+        changelist_url = reverse('admin:vendors_consultationrequest_changelist')
+        if request.method != 'POST' or not self.has_change_permission(request):
+            return redirect(changelist_url)
+        
+        try:
+            count = min(max(int(request.POST.get('count', 10)), 1), MAX_CLAIM)
+        except ValueError:
+            count = 10
+        
+        leads = claim_leads(request.user, count)
+        if leads:
+            messages.success(request, f'Claimed {len(leads)} lead(s)')
+        else:
+            messages.info(request, 'No pending leads to claim')
+        return redirect(f'{changelist_url}?status__exact=CLAIMED&assigned_to__id__exact={request.user.pk}')
+    
+    @admin.action(description='Release selected leads back to the queue')
+    def release_leads(self, request, queryset):
+        released = queryset.filter(status='CLAIMED').update(
+            status='PENDING', assigned_to=None, claimed_at=None, updated_at=timezone.now()
+        )
+        messages.success(request, f'Released {released} lead(s)')
+    
+    def changelist_view(self, request, extra_context=None):
+        extra_context = extra_context or {}
+        extra_context['max_claim'] = MAX_CLAIM
+        return super().changelist_view(request, extra_context)
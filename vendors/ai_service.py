@@ -10,6 +10,12 @@ import os
 from typing import List, Dict
 import json
 
+from core import metrics
+
+
+class SuggestionError(Exception):
+    """Raised instead of returning [] when a caller asks for ``raise_on_error``."""
+
 
 class ModelSuggestionService:
     """Service for generating AI-powered model suggestions for vendors."""
@@ -19,16 +25,20 @@ class ModelSuggestionService:
             api_key=os.environ.get("ANTHROPIC_API_KEY")
         )
     
-    def suggest_models(self, vendor_name: str, website_url: str) -> List[Dict]:
+    def suggest_models(self, vendor_name: str, website_url: str, raise_on_error: bool = False) -> List[Dict]:
         """
         Generate model suggestions for a vendor based on their name and website.
         
         Args:
             vendor_name: Name of the vendor/company
             website_url: URL of the vendor's website
+            raise_on_error: Raise instead of returning [] when the call or its parsing fails
             
         Returns:
             List of suggested models with details
+        
+        Raises:
+            SuggestionError: if ``raise_on_error`` is set and no suggestions could be obtained
         """
         prompt = f"""You are an expert in sustainable and regenerative building technologies. 
         
@@ -53,13 +63,14 @@ Return ONLY a valid JSON array of models, no other text. Format:
 ]"""
 
         try:
-            message = self.client.messages.create(
-                model="claude-3-5-sonnet-20241022",
-                max_tokens=2000,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
-            )
+            with metrics.AI_REQUEST_LATENCY.time(operation="suggest_models"):
+                message = self.client.messages.create(
+                    model="claude-3-5-sonnet-20241022",
+                    max_tokens=2000,
+                    messages=[
+                        {"role": "user", "content": prompt}
+                    ]
+                )
             
             # Extract JSON from response
             response_text = message.content[0].text.strip()
@@ -70,13 +81,19 @@ Return ONLY a valid JSON array of models, no other text. Format:
                 response_text = "\n".join(lines[1:-1])
             
             models = json.loads(response_text)
+            if not isinstance(models, list):
+                raise ValueError(f"Expected a JSON array, got {type(models).__name__}")
             return models
             
         except Exception as e:
+            metrics.AI_REQUEST_ERRORS.inc(operation="suggest_models")
+            if raise_on_error:
+                raise SuggestionError(str(e)) from e
             print(f"Error generating model suggestions: {e}")
             return []
     
-    def suggest_models_from_context(self, vendor_name: str, website_url: str, additional_context: str = "") -> List[Dict]:
+    def suggest_models_from_context(self, vendor_name: str, website_url: str, additional_context: str = "",
+                                    raise_on_error: bool = False) -> List[Dict]:
         """
         Generate model suggestions with additional context.
         
@@ -84,9 +101,13 @@ Return ONLY a valid JSON array of models, no other text. Format:
             vendor_name: Name of the vendor/company
             website_url: URL of the vendor's website
             additional_context: Additional information about the vendor
+            raise_on_error: Raise instead of returning [] when the call or its parsing fails
             
         Returns:
             List of suggested models with details
+        
+        Raises:
+            SuggestionError: if ``raise_on_error`` is set and no suggestions could be obtained
         """
         prompt = f"""You are an expert in sustainable and regenerative building technologies. 
         
@@ -113,13 +134,14 @@ Return ONLY a valid JSON array of models, no other text. Format:
 ]"""
 
         try:
-            message = self.client.messages.create(
-                model="claude-3-5-sonnet-20241022",
-                max_tokens=2000,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
-            )
+            with metrics.AI_REQUEST_LATENCY.time(operation="suggest_models_from_context"):
+                message = self.client.messages.create(
+                    model="claude-3-5-sonnet-20241022",
+                    max_tokens=2000,
+                    messages=[
+                        {"role": "user", "content": prompt}
+                    ]
+                )
             
             response_text = message.content[0].text.strip()
             
@@ -129,8 +151,13 @@ Return ONLY a valid JSON array of models, no other text. Format:
                 response_text = "\n".join(lines[1:-1])
             
             models = json.loads(response_text)
+            if not isinstance(models, list):
+                raise ValueError(f"Expected a JSON array, got {type(models).__name__}")
             return models
             
         except Exception as e:
+            metrics.AI_REQUEST_ERRORS.inc(operation="suggest_models_from_context")
+            if raise_on_error:
+                raise SuggestionError(str(e)) from e
             print(f"Error generating model suggestions: {e}")
             return []
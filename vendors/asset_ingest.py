@@ -0,0 +1,226 @@
+"""
+Ingest stage for uploaded 3D model files.
+
+When a model's ``glb_file`` changes, a background thread reads the file's
+metadata (``vendors.glb``, header and JSON chunk only) into
+``glb_metadata``, then builds the ``GLB_LOD_LEVELS`` variants with gltfpack in
+a process pool and records them in ``glb_lods``. Variants are stored through
+the content-addressed storage and served like the original.
+
+The API picks the smallest variant that still meets the requested detail
+level (``select_variant``); the uploaded file is the ``high`` level.
+"""
+
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.core.files import File
+from django.db import close_old_connections
+
+from . import glb
+from .assets import get_model_asset_storage
+from .models import ModelVendor
+
+logger = logging.getLogger(__name__)
+
+LOW = 'low'
+MEDIUM = 'medium'
+HIGH = 'high'
+# Ascending detail; HIGH is always the uploaded file
+DETAIL_LEVELS = (LOW, MEDIUM, HIGH)
+
+DEFAULT_LOD_LEVELS = {
+    LOW: {'simplify': 0.1, 'texture_limit': 512},
+    MEDIUM: {'simplify': 0.4, 'texture_limit': 1024},
+}
+
+_background = None
+_lod_pool = None
+_lock = threading.Lock()
+
+
+def is_enabled() -> bool:
+    return getattr(settings, 'GLB_INGEST_ON_SAVE', True)
+
+
+def get_lod_levels() -> Dict[str, Dict]:
+    return getattr(settings, 'GLB_LOD_LEVELS', DEFAULT_LOD_LEVELS)
+
+
+def gltfpack_path() -> Optional[str]:
+    return shutil.which(getattr(settings, 'GLB_GLTFPACK', 'gltfpack'))
+
+
+def get_lod_pool(workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """Shared process pool for gltfpack runs, started on first use."""
+    global _lod_pool
+    with _lock:
+        if _lod_pool is None:
+            # Spawned, not forked: the parent is a threaded server process
+            _lod_pool = ProcessPoolExecutor(
+                max_workers=workers or getattr(settings, 'GLB_LOD_WORKERS', 2),
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+    return _lod_pool
+
+
+def _discard_lod_pool(pool: ProcessPoolExecutor):
+    """Drop a pool whose worker died, so the next build starts a fresh one."""
+    global _lod_pool
+    with _lock:
+        if _lod_pool is pool:
+            _lod_pool = None
+    pool.shutdown(wait=False)
+
+
+def needs_ingest(model: ModelVendor) -> bool:
+    return bool(model.glb_file) and (model.glb_metadata or {}).get('source') != model.glb_file.name
+
+
+def extract_metadata(model: ModelVendor) -> Dict:
+    """Metadata of the model's current file, or the parse error."""
+    storage = get_model_asset_storage()
+    name = model.glb_file.name
+    try:
+        metadata = glb.read_glb_metadata(storage.path(name))
+    except (OSError, glb.GLBError) as exc:
+        logger.warning('Could not read GLB metadata of model %s (%s): %s', model.pk, name, exc)
+        metadata = {'error': str(exc)}
+    metadata['source'] = name
+    return metadata
+
+
+def build_lods(model: ModelVendor, pool: Optional[ProcessPoolExecutor] = None) -> Dict[str, Dict]:
+    """
+    Build and store every configured LOD variant of the model's current file.
+
+    Levels that fail are logged and left out.
+    """
+    gltfpack = gltfpack_path()
+    if not gltfpack:
+        logger.info('gltfpack not found, skipping LOD variants for model %s', model.pk)
+        return {}
+
+    storage = get_model_asset_storage()
+    source = storage.path(model.glb_file.name)
+    source_triangles = (model.glb_metadata or {}).get('triangles')
+    extra_args = tuple(getattr(settings, 'GLB_GLTFPACK_ARGS', ()))
+    shared = pool is None
+    pool = pool or get_lod_pool()
+    workdir = tempfile.mkdtemp(prefix='glb-lod-')
+    try:
+        futures = {
+            level: pool.submit(
+                glb.build_lod, gltfpack, source, os.path.join(workdir, f'{level}.glb'),
+                options['simplify'], options.get('texture_limit'), extra_args,
+            )
+            for level, options in get_lod_levels().items()
+        }
+        lods = {}
+        for level, future in futures.items():
+            try:
+                metadata = future.result()
+            except BrokenProcessPool:
+                logger.exception('LOD worker process died building model %s', model.pk)
+                if shared:
+                    _discard_lod_pool(pool)
+                break
+            except Exception as exc:
+                logger.warning('LOD %s of model %s failed: %s', level, model.pk, exc)
+                continue
+            if source_triangles is not None and metadata['triangles'] >= source_triangles:
+                # Nothing left to simplify; the original serves this level
+                continue
+            with open(os.path.join(workdir, f'{level}.glb'), 'rb') as fh:
+                name = storage.save(f'{level}.glb', File(fh))
+            lods[level] = {'name': name, 'bytes': metadata['bytes'], 'triangles': metadata['triangles']}
+        return lods
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _current(pk: int, source: str) -> Optional[ModelVendor]:
+    # The file may have been replaced while we worked on it
+    return ModelVendor.objects.filter(pk=pk, glb_file=source).first()
+
+
+def ingest_model(pk: int, lods: bool = True, pool: Optional[ProcessPoolExecutor] = None) -> Optional[ModelVendor]:
+    """Record metadata and LOD variants for the model's current file."""
+    model = ModelVendor.objects.filter(pk=pk).first()
+    if model is None or not model.glb_file:
+        return None
+    source = model.glb_file.name
+
+    model.glb_metadata = extract_metadata(model)
+    model.glb_lods = {}
+    model.save(update_fields=['glb_metadata', 'glb_lods'])
+    if not lods or 'error' in model.glb_metadata:
+        return model
+
+    variants = build_lods(model, pool)
+    model = _current(pk, source)
+    if model is not None and variants:
+        model.glb_lods = variants
+        model.save(update_fields=['glb_lods'])
+    return model
+
+
+def _ingest_in_background(pk: int):
+    close_old_connections()
+    try:
+        ingest_model(pk)
+    except Exception:
+        logger.exception('GLB ingest of model %s failed', pk)
+    finally:
+        close_old_connections()
+
+
+def schedule_ingest(pk: int):
+    """Ingest the model's file on the background thread."""
+    global _background
+    with _lock:
+        if _background is None:
+            _background = ThreadPoolExecutor(max_workers=1, thread_name_prefix='glb-ingest')
+    _background.submit(_ingest_in_background, pk)
+
+
+def select_variant(model: ModelVendor, detail: str = HIGH) -> Optional[Dict]:
+    """
+    The smallest variant with at least ``detail``: a LOD when one was built
+    for that level or above, otherwise the uploaded file.
+    """
+    if not model.glb_file:
+        return None
+    return variant_for(model.glb_file.name, model.glb_lods, model.glb_metadata, detail)
+
+
+def variant_for(name: str, lods: Optional[Dict], metadata: Optional[Dict], detail: str = HIGH) -> Optional[Dict]:
+    """``select_variant`` from the raw column values, for ``.values()`` rows."""
+    if not name:
+        return None
+    if detail not in DETAIL_LEVELS:
+        detail = HIGH
+    lods = lods or {}
+    metadata = metadata or {}
+    for level in DETAIL_LEVELS[DETAIL_LEVELS.index(detail):]:
+        if level == HIGH:
+            entry = {'name': name, 'bytes': metadata.get('bytes'), 'triangles': metadata.get('triangles')}
+        elif level in lods:
+            entry = lods[level]
+        else:
+            continue
+        return {
+            'detail': level,
+            'url': get_model_asset_storage().url(entry['name']),
+            'bytes': entry.get('bytes'),
+            'triangles': entry.get('triangles'),
+        }
+    return None
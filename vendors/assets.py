@@ -0,0 +1,144 @@
+"""
+Content-addressed storage and delivery of 3D model files and gallery images.
+
+Uploaded GLB files are stored under their SHA-256 digest
+(``models_3d/3f/3f2c...e1.glb``), so identical uploads share one file and a
+file never changes once its URL is published. ``model_asset`` serves them with
+immutable caching and HTTP Range support, letting 3D viewers stream large
+models and resume interrupted downloads. Gallery images and their
+derivatives are named the same way under ``model_images/`` and served from
+``MEDIA_URL``.
+
+Full responses go out as a ``FileResponse``, which WSGI servers with a
+``wsgi.file_wrapper`` (gunicorn, uWSGI) send with ``sendfile()``. Behind nginx
+or Apache, set ``MODEL_ASSET_SENDFILE_HEADER`` to ``X-Accel-Redirect`` or
+``X-Sendfile`` to hand every request, ranges included, to the web server.
+"""
+
+import hashlib
+import os
+import re
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.urls import reverse
+from django.utils.deconstruct import deconstructible
+
+ASSET_DIRECTORY = 'models_3d'
+IMAGE_DIRECTORY = 'model_images'
+GLB_CONTENT_TYPE = 'model/gltf-binary'
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+ASSET_NAME_RE = re.compile(r'^(?P<digest>[0-9a-f]{64})(?P<ext>\.[a-z0-9]{1,8})$')
+_RANGE_RE = re.compile(r'^bytes=(?P<start>\d*)-(?P<end>\d*)$')
+
+CHUNK_SIZE = 64 * 1024
+
+
+def file_digest(content) -> str:
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+def asset_path(asset_name: str, directory: str = ASSET_DIRECTORY) -> str:
+    """``3f2c...e1.glb`` -> ``models_3d/3f/3f2c...e1.glb``"""
+    return f'{directory}/{asset_name[:2]}/{asset_name}'
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File storage that names files after the SHA-256 of their content.
+
+    Saving content that is already stored returns the existing name without
+    writing anything. Files may be shared by several rows, so replacing a
+    model's file leaves the old one in place. Files under ``directory`` other
+    than ``models_3d`` are served from ``MEDIA_URL``.
+    """
+
+    def __init__(self, directory: str = ASSET_DIRECTORY, **kwargs):
+        self.directory = directory
+        super().__init__(**kwargs)
+
+    def save(self, name, content, max_length=None):
+        if content is None:
+            return super().save(name, content, max_length)
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        ext = os.path.splitext(name)[1].lower()
+        name = asset_path(f'{file_digest(content)}{ext}', self.directory)
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length)
+
+    def url(self, name):
+        asset_name = os.path.basename(name or '')
+        if self.directory == ASSET_DIRECTORY and ASSET_NAME_RE.match(asset_name):
+            return reverse('model-asset', args=[asset_name])
+        # Files uploaded before content addressing are served from MEDIA_URL
+        return super().url(name)
+
+
+def get_model_asset_storage():
+    return ContentAddressedStorage()
+
+
+def get_model_image_storage():
+    return ContentAddressedStorage(directory=IMAGE_DIRECTORY)
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    First and last byte of a single ``bytes=`` range, or None to serve the whole file.
+
+    Raises:
+        ValueError: if the range cannot be satisfied
+    """
+    match = _RANGE_RE.match(header.strip())
+    if not match or (not match['start'] and not match['end']):
+        # Multiple or malformed ranges: the whole file is a valid answer
+        return None
+    if not match['start']:
+        # Suffix range: the last N bytes
+        length = int(match['end'])
+        if length == 0:
+            raise ValueError(header)
+        return max(0, size - length), size - 1
+    start = int(match['start'])
+    end = int(match['end']) if match['end'] else size - 1
+    if start >= size or end < start:
+        raise ValueError(header)
+    return start, min(end, size - 1)
+
+
+def iter_range(fh, start: int, length: int):
+    try:
+        fh.seek(start)
+        while length > 0:
+            chunk = fh.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        fh.close()
+
+
+def sendfile_location(storage, name: str) -> Optional[Tuple[str, str]]:
+    """
+    (header, value) handing the file to the web server, or None to serve it from Django.
+
+    ``X-Sendfile`` takes a filesystem path; ``X-Accel-Redirect`` an internal
+    nginx location, ``MODEL_ASSET_SENDFILE_PREFIX`` + the storage name.
+    """
+    header = getattr(settings, 'MODEL_ASSET_SENDFILE_HEADER', None)
+    if not header:
+        return None
+    if header.lower() == 'x-sendfile':
+        return header, storage.path(name)
+    return header, getattr(settings, 'MODEL_ASSET_SENDFILE_PREFIX', '/protected-media/') + name
@@ -0,0 +1,153 @@
+"""
+Async read endpoints for vendors and models.
+
+Plain Django async views using the async ORM and cache, mounted under
+``/api/async/``. Under an ASGI server they run on the event loop instead of
+the thread the synchronous DRF viewsets share, so a single worker can hold
+many concurrent clients. Responses use the same serializers as the viewsets.
+
+Rendered JSON is cached per URL for ``ASYNC_API_CACHE_TIMEOUT`` seconds under
+a catalogue version that vendor and model saves bump (see
+``vendors.signals``). With a per-process cache (the default local-memory
+backend) other workers only see a change once their entry expires.
+"""
+
+import json
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotAllowed, JsonResponse
+from rest_framework.utils.encoders import JSONEncoder
+
+from core import metrics
+from .models import BuildingSystemVendor, ModelVendor
+from .serializers import BuildingSystemVendorSerializer, ModelVendorListSerializer, ModelVendorSerializer
+
+CATALOGUE_VERSION_KEY = 'catalogue-version'
+SEARCH_LIMIT = 50
+MIN_SEARCH_LENGTH = 2
+
+
+class NotFound(Exception):
+    pass
+
+
+def bump_catalogue_version():
+    """Invalidate every cached async response (in this cache)."""
+    try:
+        cache.incr(CATALOGUE_VERSION_KEY)
+    except ValueError:
+        cache.set(CATALOGUE_VERSION_KEY, 1, timeout=None)
+
+
+def _cache_key(request, version) -> str:
+    query = urlencode(sorted(request.GET.items()))
+    return f'async-api:{version}:{request.path}?{query}'
+
+
+def cached_json(view):
+    """Serve GET/HEAD only, render the view's data as JSON and cache the bytes."""
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return HttpResponseNotAllowed(['GET', 'HEAD'])
+
+        timeout = getattr(settings, 'ASYNC_API_CACHE_TIMEOUT', 30)
+        key = None
+        if timeout:
+            key = _cache_key(request, await cache.aget(CATALOGUE_VERSION_KEY, 0))
+            body = await cache.aget(key)
+            metrics.record_cache('async_api', hit=body is not None)
+            if body is not None:
+                return HttpResponse(body, content_type='application/json')
+
+        try:
+            data = await view(request, *args, **kwargs)
+        except NotFound:
+            return JsonResponse({'detail': 'Not found.'}, status=404)
+        body = json.dumps(data, cls=JSONEncoder).encode('utf-8')
+        if key:
+            await cache.aset(key, body, timeout)
+        return HttpResponse(body, content_type='application/json')
+
+    return wrapper
+
+
+def _search_term(request) -> str:
+    return request.GET.get('q', '').strip()
+
+
+def _vendor_queryset(request):
+    queryset = BuildingSystemVendor.objects.order_by('pk')
+    category = request.GET.get('category')
+    if category:
+        queryset = queryset.filter(primary_category=category)
+    term = _search_term(request)
+    if term:
+        queryset = queryset.filter(partner_name__icontains=term)
+    return queryset
+
+
+def _model_queryset(request):
+    queryset = ModelVendor.objects.select_related('vendor').prefetch_related('gallery')
+    vendor_id = request.GET.get('vendor')
+    if vendor_id:
+        queryset = queryset.filter(vendor_id=vendor_id)
+    term = _search_term(request)
+    if term:
+        queryset = queryset.filter(model_name__icontains=term)
+    return queryset
+
+
+@cached_json
+async def vendor_list(request):
+    vendors = [vendor async for vendor in _vendor_queryset(request).aiterator()]
+    return BuildingSystemVendorSerializer(vendors, many=True).data
+
+
+@cached_json
+async def vendor_detail(request, pk):
+    try:
+        vendor = await BuildingSystemVendor.objects.aget(pk=pk)
+    except BuildingSystemVendor.DoesNotExist:
+        raise NotFound()
+    return BuildingSystemVendorSerializer(vendor).data
+
+
+@cached_json
+async def model_list(request):
+    # aiterator() cannot prefetch; async iteration fetches the page in one go
+    models = [model async for model in _model_queryset(request)]
+    return ModelVendorListSerializer(models, many=True).data
+
+
+@cached_json
+async def model_detail(request, pk):
+    try:
+        model = await ModelVendor.objects.select_related('vendor').prefetch_related('gallery').aget(pk=pk)
+    except ModelVendor.DoesNotExist:
+        raise NotFound()
+    return ModelVendorSerializer(model).data
+
+
+@cached_json
+async def search(request):
+    """Vendors and models whose names contain ``?q=``, at most SEARCH_LIMIT of each."""
+    term = _search_term(request)
+    if len(term) < MIN_SEARCH_LENGTH:
+        return {'vendors': [], 'models': []}
+    vendors = [
+        vendor async for vendor in
+        BuildingSystemVendor.objects.filter(partner_name__icontains=term).order_by('partner_name')[:SEARCH_LIMIT].aiterator()
+    ]
+    models = [
+        model async for model in
+        ModelVendor.objects.select_related('vendor').prefetch_related('gallery').filter(model_name__icontains=term)[:SEARCH_LIMIT]
+    ]
+    return {
+        'vendors': BuildingSystemVendorSerializer(vendors, many=True).data,
+        'models': ModelVendorListSerializer(models, many=True).data,
+    }
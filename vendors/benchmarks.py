@@ -0,0 +1,447 @@
+"""
+API latency benchmarks.
+
+Runs the public API endpoints and the admin changelists through Django's test
+``Client`` against a throwaway test database populated at several catalogue
+sizes, and reports latency percentiles, throughput and query counts. Results
+are plain dicts so they can be saved as JSON and compared against a stored
+baseline.
+"""
+
+import asyncio
+import math
+import platform
+import random
+import statistics
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlsplit
+
+import django
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core import renderers
+from core.models import User
+from . import synthetic
+from .models import AffiliateClick, BuildingSystemVendor, ConsultationRequest, ModelVendor
+from .serializers import BuildingSystemVendorSerializer, ModelVendorListSerializer
+
+DEFAULT_SIZES = [10, 100, 1000]
+DEFAULT_TOLERANCE = 0.25
+# Latency differences below this many milliseconds are noise, not regressions
+NOISE_FLOOR_MS = 1.0
+# The click filter drops clicks without a browser user agent as bots
+BROWSER_USER_AGENT = 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0 Safari/537.36'
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def populate_catalogue(vendor_count: int, models_per_vendor: int = 3, clicks_per_vendor: int = 20,
+                       consultations_per_vendor: int = 2, seed: int = 0):
+    """
+    Replace the catalogue with a synthetic one of ``vendor_count`` vendors.
+
+    Returns:
+        ``(vendor_ids, model_ids)``
+    """
+    ConsultationRequest.objects.all().delete()
+    AffiliateClick.objects.all().delete()
+    ModelVendor.objects.all().delete()
+    BuildingSystemVendor.objects.all().delete()
+
+    synthetic.generate_catalogue(
+        vendors=vendor_count,
+        models_per_vendor=models_per_vendor,
+        clicks=vendor_count * clicks_per_vendor,
+        consultations=vendor_count * consultations_per_vendor,
+        seed=seed,
+    )
+    vendor_ids = list(BuildingSystemVendor.objects.order_by('pk').values_list('pk', flat=True))
+    model_ids = list(ModelVendor.objects.order_by('pk').values_list('pk', flat=True))
+    return vendor_ids, model_ids
+
+
+class Scenario:
+    """One benchmarked request. ``make_request`` is called with the client and the iteration number."""
+
+    def __init__(self, name: str, make_request: Callable, expected_status: int = 200, admin: bool = False):
+        self.name = name
+        self.make_request = make_request
+        self.expected_status = expected_status
+        self.admin = admin
+
+
+def default_scenarios(vendor_ids: List[int], model_ids: List[int]) -> List[Scenario]:
+    pick = random.Random(1)
+
+    def consultation(client, i):
+        return client.post('/api/consultations/', {
+            'email': f'benchmark-{i}@example.com',
+            'vendor': pick.choice(vendor_ids),
+            'message': f'Benchmark consultation {i}',
+        }, content_type='application/json')
+
+    return [
+        Scenario('vendor-list', lambda client, i: client.get('/api/vendors/')),
+        Scenario('vendor-detail', lambda client, i: client.get(f'/api/vendors/{pick.choice(vendor_ids)}/')),
+        Scenario('model-list', lambda client, i: client.get('/api/models/')),
+        Scenario('model-detail', lambda client, i: client.get(f'/api/models/{pick.choice(model_ids)}/')),
+        Scenario('track-click', lambda client, i: client.post(f'/api/vendors/{pick.choice(vendor_ids)}/track_click/'),
+                 expected_status=201),
+        Scenario('consultation-create', consultation, expected_status=201),
+        Scenario('admin-vendor-changelist', lambda client, i: client.get('/admin/vendors/buildingsystemvendor/'), admin=True),
+        Scenario('admin-model-changelist', lambda client, i: client.get('/admin/vendors/modelvendor/'), admin=True),
+        Scenario('admin-click-changelist', lambda client, i: client.get('/admin/vendors/affiliateclick/'), admin=True),
+        Scenario('admin-consultation-changelist', lambda client, i: client.get('/admin/vendors/consultationrequest/'), admin=True),
+    ]
+
+
+def run_scenario(scenario: Scenario, client: Client, iterations: int, warmup: int) -> Dict:
+    for i in range(warmup):
+        scenario.make_request(client, -1 - i)
+
+    latencies = []
+    query_counts = []
+    errors = 0
+    started = time.perf_counter()
+    for i in range(iterations):
+        with CaptureQueriesContext(connection) as queries:
+            request_started = time.perf_counter()
+            response = scenario.make_request(client, i)
+            latencies.append((time.perf_counter() - request_started) * 1000)
+        query_counts.append(len(queries))
+        if response.status_code != scenario.expected_status:
+            errors += 1
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'iterations': iterations,
+        'errors': errors,
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p95_ms': round(percentile(latencies, 95), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'mean_ms': round(statistics.fmean(latencies), 3),
+        'throughput_rps': round(iterations / elapsed, 1) if elapsed else 0.0,
+        'queries_per_request': statistics.median(query_counts),
+        'max_queries': max(query_counts),
+    }
+
+
+# Every benchmark click comes from the same visitor, which the click filter
+# would drop as duplicates and rate limit after the first few
+@override_settings(CLICK_FILTER_ENABLED=False)
+def run_benchmarks(sizes: Optional[List[int]] = None, iterations: int = 100, warmup: int = 10,
+                   only: Optional[List[str]] = None, log: Callable[[str], None] = lambda msg: None) -> Dict:
+    """
+    Benchmark every scenario at every catalogue size.
+
+    Must run against a disposable database: the catalogue is replaced for
+    each size.
+    """
+    sizes = sizes or DEFAULT_SIZES
+    admin_user = User.objects.filter(username='benchmark-admin').first()
+    if admin_user is None:
+        admin_user = User.objects.create_superuser('benchmark-admin', 'benchmark@example.com', 'benchmark')
+
+    results = {
+        'created_at': timezone.now().isoformat(),
+        'environment': {
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'machine': platform.machine(),
+        },
+        'settings': {'iterations': iterations, 'warmup': warmup},
+        'sizes': {},
+    }
+
+    for size in sizes:
+        log(f'Populating catalogue with {size} vendors...')
+        vendor_ids, model_ids = populate_catalogue(size)
+        anonymous = Client(HTTP_USER_AGENT=BROWSER_USER_AGENT)
+        staff = Client(HTTP_USER_AGENT=BROWSER_USER_AGENT)
+        staff.force_login(admin_user)
+
+        size_results = {}
+        for scenario in default_scenarios(vendor_ids, model_ids):
+            if only and scenario.name not in only:
+                continue
+            size_results[scenario.name] = run_scenario(
+                scenario, staff if scenario.admin else anonymous, iterations, warmup
+            )
+            stats = size_results[scenario.name]
+            log(f"  {scenario.name:<32} p50 {stats['p50_ms']:>8.2f}ms  p95 {stats['p95_ms']:>8.2f}ms  "
+                f"p99 {stats['p99_ms']:>8.2f}ms  {stats['throughput_rps']:>8.1f} req/s  "
+                f"{stats['queries_per_request']:>5} queries")
+        results['sizes'][str(size)] = size_results
+
+    return results
+
+
+def compare_to_baseline(results: Dict, baseline: Dict, tolerance: float = DEFAULT_TOLERANCE) -> List[str]:
+    """
+    Compare results with a baseline run.
+
+    A scenario regresses when its p95 latency grows by more than ``tolerance``
+    (and by more than the noise floor) or when it issues more queries.
+
+    Returns:
+        Human-readable descriptions of each regression
+    """
+    regressions = []
+    for size, scenarios in results.get('sizes', {}).items():
+        baseline_scenarios = baseline.get('sizes', {}).get(size, {})
+        for name, stats in scenarios.items():
+            before = baseline_scenarios.get(name)
+            if not before:
+                continue
+            if stats['queries_per_request'] > before['queries_per_request']:
+                regressions.append(
+                    f"{name} @ {size} vendors: {stats['queries_per_request']} queries per request "
+                    f"(baseline {before['queries_per_request']})"
+                )
+            limit = before['p95_ms'] * (1 + tolerance)
+            if stats['p95_ms'] > limit and stats['p95_ms'] - before['p95_ms'] > NOISE_FLOOR_MS:
+                regressions.append(
+                    f"{name} @ {size} vendors: p95 {stats['p95_ms']:.2f}ms "
+                    f"(baseline {before['p95_ms']:.2f}ms, +{stats['p95_ms'] / before['p95_ms'] - 1:.0%})"
+                )
+            if stats['errors'] > before.get('errors', 0):
+                regressions.append(f"{name} @ {size} vendors: {stats['errors']} unexpected responses")
+    return regressions
+
+
+# name: (API_VALUES_LISTS, renderer class); the first one is DRF's stock path
+RENDERING_PIPELINES = {
+    'instances+json': (False, JSONRenderer),
+    'values+json': (True, JSONRenderer),
+    'values+orjson': (True, renderers.ORJSONRenderer),
+    'values+msgpack': (True, renderers.MessagePackRenderer),
+}
+
+
+def run_list_rendering(iterations: int = 5, pipelines: Optional[List[str]] = None,
+                       log: Callable[[str], None] = lambda msg: None) -> Dict:
+    """
+    Time the vendor and model list responses of the current catalogue through
+    each serialization/renderer pipeline, without the rest of the request cycle.
+
+    Reports the median time to query and serialize, the median time to
+    render, and the response size.
+    """
+    request = Request(APIRequestFactory().get('/api/models/', HTTP_HOST='localhost'))
+    lists = {
+        'vendor-list': (BuildingSystemVendorSerializer, BuildingSystemVendor.objects.all()),
+        'model-list': (ModelVendorListSerializer, ModelVendor.objects.select_related('vendor').prefetch_related('gallery')),
+    }
+    results = {}
+    for list_name, (serializer_class, queryset) in lists.items():
+        log(f'{list_name} ({queryset.count()} rows)')
+        results[list_name] = {}
+        for name in pipelines or RENDERING_PIPELINES:
+            values_lists, renderer_class = RENDERING_PIPELINES[name]
+            if renderer_class is renderers.MessagePackRenderer and renderers.msgpack is None:
+                continue
+            renderer = renderer_class()
+            serialize_times, render_times = [], []
+            with override_settings(API_VALUES_LISTS=values_lists):
+                for _ in range(iterations):
+                    started = time.perf_counter()
+                    data = serializer_class(queryset.all(), many=True, context={'request': request}).data
+                    serialized = time.perf_counter()
+                    content = renderer.render(data, renderer.media_type, {'request': request})
+                    serialize_times.append((serialized - started) * 1000)
+                    render_times.append((time.perf_counter() - serialized) * 1000)
+            stats = {
+                'serialize_ms': round(statistics.median(serialize_times), 1),
+                'render_ms': round(statistics.median(render_times), 1),
+                'total_ms': round(statistics.median(a + b for a, b in zip(serialize_times, render_times)), 1),
+                'bytes': len(content),
+            }
+            results[list_name][name] = stats
+            log(f"  {name:<16} serialize {stats['serialize_ms']:>8.1f}ms  render {stats['render_ms']:>7.1f}ms  "
+                f"total {stats['total_ms']:>8.1f}ms  {stats['bytes']:>10} bytes")
+    return results
+
+
+# Clicks from one thread come from one visitor; see run_benchmarks
+@override_settings(CLICK_FILTER_ENABLED=False)
+def run_write_concurrency(vendor_ids: List[int], threads: int, requests_per_thread: int, label: str = '') -> Dict:
+    """
+    Hammer the write endpoints from many threads at once.
+
+    Each thread cycles through ``track_click``, a consultation submission and
+    a vendor list read, like visitors browsing and clicking at the same time.
+    Server errors (e.g. "database is locked") are counted, not raised.
+    """
+    barrier = threading.Barrier(threads)
+    latencies = []
+    failures = []
+    lock = threading.Lock()
+
+    def worker(worker_id):
+        client = Client(raise_request_exception=False, HTTP_USER_AGENT=BROWSER_USER_AGENT)
+        pick = random.Random(worker_id)
+        local_latencies = []
+        local_failures = []
+        barrier.wait()
+        try:
+            for i in range(requests_per_thread):
+                kind = i % 3
+                started = time.perf_counter()
+                if kind == 0:
+                    response = client.post(f'/api/vendors/{pick.choice(vendor_ids)}/track_click/')
+                elif kind == 1:
+                    response = client.post('/api/consultations/', {
+                        'email': f'load-{worker_id}-{i}@example.com',
+                        'vendor': pick.choice(vendor_ids),
+                        'message': f'Concurrency benchmark {label} {worker_id}/{i}',
+                    }, content_type='application/json')
+                else:
+                    response = client.get('/api/vendors/')
+                local_latencies.append((time.perf_counter() - started) * 1000)
+                if response.status_code >= 500:
+                    local_failures.append(response.status_code)
+        finally:
+            connection.close()
+        with lock:
+            latencies.extend(local_latencies)
+            failures.extend(local_failures)
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'threads': threads,
+        'requests': len(latencies),
+        'errors': len(failures),
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p95_ms': round(percentile(latencies, 95), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'throughput_rps': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+async def _asgi_get(app, url: str, client_delay: float) -> int:
+    """One GET through an ASGI app in-process; the client takes ``client_delay`` to read each body chunk."""
+    parts = urlsplit(url)
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': parts.path,
+        'raw_path': parts.path.encode(),
+        'query_string': parts.query.encode(),
+        'root_path': '',
+        'headers': [(b'host', b'localhost')],
+        'client': ('127.0.0.1', 50000),
+        'server': ('localhost', 80),
+    }
+    finished = asyncio.Event()
+    request_sent = False
+    status_code = 0
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await finished.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        nonlocal status_code
+        if message['type'] == 'http.response.start':
+            status_code = message['status']
+        elif message['type'] == 'http.response.body':
+            if client_delay:
+                await asyncio.sleep(client_delay)
+            if not message.get('more_body'):
+                finished.set()
+
+    await app(scope, receive, send)
+    return status_code
+
+
+async def _http_get(base_url: str, url: str, client_delay: float) -> int:
+    """One GET over a real socket to a running server, reading the response slowly."""
+    target = urlsplit(base_url)
+    reader, writer = await asyncio.open_connection(target.hostname, target.port or 80)
+    try:
+        writer.write(
+            f'GET {url} HTTP/1.1\r\nHost: {target.hostname}\r\nConnection: close\r\n\r\n'.encode()
+        )
+        await writer.drain()
+        status_line = await reader.readline()
+        while await reader.read(16384):
+            if client_delay:
+                await asyncio.sleep(client_delay)
+        return int(status_line.split()[1]) if status_line else 0
+    finally:
+        writer.close()
+
+
+async def run_load(url: str, concurrency: int, total_requests: int, client_delay: float = 0.0,
+                   app=None, base_url: Optional[str] = None) -> Dict:
+    """
+    Issue ``total_requests`` GETs for ``url`` with ``concurrency`` clients in flight.
+
+    Requests go through ``app`` (an ASGI application) in-process, or to the
+    server at ``base_url``.
+    """
+    latencies = []
+    errors = 0
+    remaining = total_requests
+
+    async def client():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            try:
+                if app is not None:
+                    status_code = await _asgi_get(app, url, client_delay)
+                else:
+                    status_code = await _http_get(base_url, url, client_delay)
+            except OSError:
+                status_code = 0
+            latencies.append((time.perf_counter() - started) * 1000)
+            if status_code != 200:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'errors': errors,
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p95_ms': round(percentile(latencies, 95), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'throughput_rps': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+    }
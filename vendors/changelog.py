@@ -0,0 +1,185 @@
+"""
+Catalogue change log for delta sync.
+
+Every vendor and model save or delete is recorded in ``CatalogueChange`` in
+the same transaction. Each object keeps a single entry, replaced on every
+change. Deleted objects leave a ``delete`` tombstone.
+
+The sync token is the entry's ``seq``. Ids are assigned at insert, so a long
+transaction can commit an entry below ids that clients have already read
+past. ``seq`` is instead assigned after commit by ``sequence_pending``, which
+numbers every committed entry that has none while holding the write lock on
+the ``CatalogueChangeSequence`` row. Numbers are therefore handed out in
+commit order, and a client that has seen token N will never see an entry
+appear below N later. Entries wait, unsequenced and invisible, until the next
+sequencing. That happens right after their own transaction commits, and a
+crash in between is repaired by the next change or
+``compact_catalogue_changes``.
+
+Tombstones older than ``CATALOGUE_CHANGES_TOMBSTONE_DAYS`` are removed by
+``python manage.py compact_catalogue_changes``. A token from before the last
+compaction may have missed a delete, so such clients are told to reset and
+receive the whole catalogue again.
+"""
+
+import logging
+from datetime import timedelta
+from typing import Dict, Iterable, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Max
+from django.utils import timezone
+
+from core.sqlite import run_write
+
+from .models import (
+    BuildingSystemVendor, CatalogueChange, CatalogueChangeCompaction, CatalogueChangeSequence, ModelVendor,
+)
+from .serializers import BuildingSystemVendorSerializer, ModelVendorListSerializer
+
+logger = logging.getLogger(__name__)
+
+MAX_PAGE_SIZE = 1000
+
+_SOURCES = {
+    CatalogueChange.VENDOR: (BuildingSystemVendor.objects.all(), BuildingSystemVendorSerializer),
+    CatalogueChange.MODEL: (ModelVendor.objects.select_related('vendor').prefetch_related('gallery'), ModelVendorListSerializer),
+}
+
+
+class InvalidToken(ValueError):
+    pass
+
+
+def is_enabled() -> bool:
+    return getattr(settings, 'CATALOGUE_CHANGE_LOG', True)
+
+
+def record(object_type: str, object_ids: Iterable[int], op: str = CatalogueChange.UPSERT):
+    """Replace the entries of ``object_ids`` with a new one each."""
+    object_ids = list(object_ids)
+    if not object_ids:
+        return
+    with transaction.atomic():
+        CatalogueChange.objects.filter(object_type=object_type, object_id__in=object_ids).delete()
+        CatalogueChange.objects.bulk_create(
+            [CatalogueChange(object_type=object_type, object_id=pk, op=op) for pk in object_ids]
+        )
+        transaction.on_commit(_sequence_after_commit)
+
+
+def _sequence_pending() -> int:
+    with transaction.atomic():
+        # Writing the counter first takes the lock (a row lock, or SQLite's write
+        # lock) before anything is read, so sequencing runs one at a time and each
+        # run sees every entry committed before it started
+        CatalogueChangeSequence.objects.get_or_create(pk=1)
+        CatalogueChangeSequence.objects.filter(pk=1).update(last=F('last'))
+        last = CatalogueChangeSequence.objects.get(pk=1).last
+        entries = list(CatalogueChange.objects.filter(seq__isnull=True).order_by('id').only('id'))
+        if not entries:
+            return 0
+        for offset, entry in enumerate(entries, 1):
+            entry.seq = last + offset
+        CatalogueChange.objects.bulk_update(entries, ['seq'], batch_size=500)
+        CatalogueChangeSequence.objects.filter(pk=1).update(last=last + len(entries))
+    return len(entries)
+
+
+def sequence_pending() -> int:
+    """
+    Give committed entries without a sequence number the next ones, in id order.
+
+    Returns:
+        Number of entries sequenced
+    """
+    # Every change in a transaction schedules a run; all but the first find nothing
+    if not CatalogueChange.objects.filter(seq__isnull=True).exists():
+        return 0
+    return run_write(_sequence_pending)
+
+
+def _sequence_after_commit():
+    try:
+        sequence_pending()
+    except Exception:
+        # The entries stay unsequenced until the next change or compaction
+        logger.exception('Sequencing catalogue changes failed')
+
+
+def compacted_through() -> int:
+    return CatalogueChangeCompaction.objects.aggregate(through=Max('compacted_through'))['through'] or 0
+
+
+def parse_token(token: Optional[str]) -> int:
+    if token in (None, ''):
+        return 0
+    try:
+        since = int(token)
+    except (TypeError, ValueError):
+        raise InvalidToken(token)
+    if since < 0:
+        raise InvalidToken(token)
+    return since
+
+
+def changes_since(since: int, limit: int) -> Dict:
+    """
+    The objects changed after token ``since``, at most ``limit`` entries.
+
+    Returns the current representation of upserted objects, the ids of
+    deleted ones, the token to resume from and whether more changes follow.
+    ``reset`` means the token predates the last compaction: the client must
+    drop its copy and apply these changes, which then start from zero.
+    """
+    reset = 0 < since < compacted_through()
+    if reset:
+        since = 0
+
+    page = list(CatalogueChange.objects.filter(seq__gt=since).order_by('seq')[:limit + 1])
+    has_more = len(page) > limit
+    page = page[:limit]
+
+    result = {
+        'since': str(since),
+        'next': str(page[-1].seq if page else since),
+        'reset': reset,
+        'has_more': has_more,
+    }
+    for object_type, (queryset, serializer_class) in _SOURCES.items():
+        upserted = [entry.object_id for entry in page if entry.object_type == object_type and entry.op == CatalogueChange.UPSERT]
+        deleted = [entry.object_id for entry in page if entry.object_type == object_type and entry.op == CatalogueChange.DELETE]
+        # Objects deleted since the entry was read get their tombstone in a later page
+        objects = queryset.filter(pk__in=upserted).order_by('pk') if upserted else []
+        result[f'{object_type}s'] = {
+            'updated': serializer_class(objects, many=True).data,
+            'deleted': deleted,
+        }
+    return result
+
+
+def compact(days: Optional[int] = None, dry_run: bool = False) -> Dict:
+    """
+    Remove tombstones older than ``days`` (``CATALOGUE_CHANGES_TOMBSTONE_DAYS``).
+
+    Returns the number of tombstones removed and the new compaction floor.
+    """
+    if days is None:
+        days = getattr(settings, 'CATALOGUE_CHANGES_TOMBSTONE_DAYS', 30)
+    cutoff = timezone.now() - timedelta(days=days)
+    tombstones = CatalogueChange.objects.filter(op=CatalogueChange.DELETE, created_at__lt=cutoff)
+
+    if not dry_run:
+        sequence_pending()
+    tombstones = tombstones.filter(seq__isnull=False)
+    with transaction.atomic():
+        through = tombstones.aggregate(through=Max('seq'))['through']
+        if through is None:
+            return {'removed': 0, 'compacted_through': compacted_through()}
+        count = tombstones.filter(seq__lte=through).count()
+        if not dry_run:
+            tombstones.filter(seq__lte=through).delete()
+            CatalogueChangeCompaction.objects.create(compacted_through=through, tombstones_removed=count)
+    return {'removed': count, 'compacted_through': through}
+
@@ -0,0 +1,383 @@
+"""
+Retention for affiliate clicks.
+
+``archive_clicks`` moves clicks older than ``CLICK_RETENTION_DAYS`` out of the
+database. A batch of ``CLICK_ARCHIVE_BATCH_SIZE`` clicks at a time, in one
+transaction, it:
+
+1. appends them as a gzip member to the month's archive,
+   ``CLICK_ARCHIVE_ROOT/clicks-YYYY-MM.jsonl.gz`` (UTC months, one JSON object
+   per line), and records the file's new size on the month's ``ClickArchive``;
+2. adds them to the per-vendor, per-day ``ClickDailyRollup`` counts;
+3. deletes them with one range DELETE, so no lock is held for long.
+
+If a batch's transaction fails after its lines were written, the clicks stay
+in the table and the recorded size does not move: readers stop at it, and the
+next run cuts the file back to it before appending.
+
+``read_month`` streams an archived month for queries, and ``restore_month``
+puts it back into the table. A restored month is skipped by ``archive_clicks``
+until it is passed in ``months``: the restored clicks are then dropped from
+the archive, by rewriting it into a new file the ``ClickArchive`` row is
+switched to, and archived again in batches as above. Archive runs and
+restores are serialized with a lock file in the archive root.
+
+Archived clicks no longer count in ``update_popularity --rebuild``; with the
+default retention that is hundreds of half-lives ago.
+"""
+
+import gzip
+import io
+import json
+import os
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from functools import reduce
+from itertools import islice
+from operator import or_
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, DateTimeField, F, Q, Value, When
+from django.utils import timezone
+
+from core.models import User
+
+from .models import AffiliateClick, BuildingSystemVendor, ClickArchive, ClickDailyRollup
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+FIELDS = ('id', 'vendor_id', 'user_id', 'timestamp', 'converted')
+
+# Clicks per restore batch; timestamps are reset with one CASE per batch
+# (two parameters per click, under SQLite's 999)
+_RESTORE_CHUNK = 300
+
+
+def get_archive_root() -> Path:
+    return Path(getattr(settings, 'CLICK_ARCHIVE_ROOT', settings.BASE_DIR / 'archives' / 'clicks'))
+
+
+def retention_days() -> int:
+    return getattr(settings, 'CLICK_RETENTION_DAYS', 365)
+
+
+def parse_month(value: str) -> date:
+    """``'2025-03'`` -> ``date(2025, 3, 1)``; raises ValueError."""
+    return datetime.strptime(value, '%Y-%m').date()
+
+
+def month_of(timestamp: datetime) -> date:
+    return timestamp.astimezone(dt_timezone.utc).date().replace(day=1)
+
+
+def archive_path(month: date, root: Optional[Path] = None) -> Path:
+    return (root or get_archive_root()) / f'clicks-{month:%Y-%m}.jsonl.gz'
+
+
+def archived_file(month: date, root: Optional[Path] = None) -> Optional[Path]:
+    """The archive file of ``month``, or None if the month was never archived."""
+    root = root or get_archive_root()
+    archive = ClickArchive.objects.filter(month=month).first()
+    if archive is None or not (root / archive.path).exists():
+        return None
+    return root / archive.path
+
+
+def restored_months() -> List[date]:
+    return list(ClickArchive.objects.filter(restored_at__isnull=False).order_by('month').values_list('month', flat=True))
+
+
+def _in_months(months: Iterable[date]) -> Q:
+    """Clicks whose timestamp falls in one of ``months`` (UTC)."""
+    ranges = []
+    for month in months:
+        start = datetime(month.year, month.month, 1, tzinfo=dt_timezone.utc)
+        end = (start + timedelta(days=32)).replace(day=1)
+        ranges.append(Q(timestamp__gte=start, timestamp__lt=end))
+    return reduce(or_, ranges)
+
+
+def _chunks(rows: Iterable, size: int) -> Iterator[List]:
+    rows = iter(rows)
+    return iter(lambda: list(islice(rows, size)), [])
+
+
+@contextmanager
+def _archive_lock(root: Path):
+    """Serialize archive runs and restores across processes where flock is available."""
+    root.mkdir(parents=True, exist_ok=True)
+    with open(root / '.lock', 'a') as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class _Prefix(io.RawIOBase):
+    """The first ``size`` bytes of ``fh``."""
+
+    def __init__(self, fh, size: int):
+        self.fh, self.left = fh, size
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        read = self.fh.readinto(memoryview(buffer)[:self.left]) if self.left > 0 else 0
+        self.left -= read
+        return read
+
+
+def _archived_rows(path: Path, size: Optional[int]) -> Iterator[Dict]:
+    """
+    Stream the lines committed to an archive file, timestamps left as text.
+    Archives from before sizes were recorded (``size`` None) are read to the
+    end, and may repeat a click whose batch failed.
+    """
+    with open(path, 'rb') as fh:
+        raw = fh if size is None else io.BufferedReader(_Prefix(fh, size))
+        with gzip.open(raw, 'rt', encoding='utf-8') as lines:
+            for line in lines:
+                yield json.loads(line)
+
+
+def _append(path: Path, rows: List[Dict], size: Optional[int]) -> int:
+    """
+    Cut the file back to the ``size`` bytes committed so far, append ``rows``
+    as one gzip member and make sure they reached the disk.
+
+    Returns:
+        The new size of the file
+    """
+    with open(path, 'ab') as fh:
+        if size is not None:
+            fh.truncate(size)
+        with gzip.GzipFile(fileobj=fh, mode='wb') as gz:
+            for row in rows:
+                gz.write(json.dumps({**row, 'timestamp': row['timestamp'].isoformat()}).encode('utf-8') + b'\n')
+        fh.flush()
+        os.fsync(fh.fileno())
+        return os.fstat(fh.fileno()).st_size
+
+
+def _daily_counts(rows: List[Dict]) -> Dict:
+    """``{(date, vendor_id): [clicks, conversions]}``"""
+    counts = defaultdict(lambda: [0, 0])
+    for row in rows:
+        key = (row['timestamp'].astimezone(dt_timezone.utc).date(), row['vendor_id'])
+        counts[key][0] += 1
+        counts[key][1] += row['converted']
+    return counts
+
+
+def _add_to_rollups(counts: Dict, sign: int = 1):
+    days = [day for day, _ in counts]
+    existing = {
+        (rollup.date, rollup.vendor_id): rollup
+        for rollup in ClickDailyRollup.objects.filter(date__range=(min(days), max(days)))
+    }
+    changed, created = [], []
+    for key, (clicks, conversions) in counts.items():
+        rollup = existing.get(key)
+        if rollup is None:
+            created.append(ClickDailyRollup(date=key[0], vendor_id=key[1], clicks=clicks, conversions=conversions))
+        else:
+            rollup.clicks = max(0, rollup.clicks + sign * clicks)
+            rollup.conversions = max(0, rollup.conversions + sign * conversions)
+            changed.append(rollup)
+    ClickDailyRollup.objects.bulk_update(changed, ['clicks', 'conversions'], batch_size=300)
+    if sign > 0:
+        ClickDailyRollup.objects.bulk_create(created, batch_size=300)
+
+
+def _archive_batch(month: date, root: Path, rows: List[Dict]):
+    # A new month starts from an empty file, whatever a failed first batch left
+    archive, _ = ClickArchive.objects.get_or_create(
+        month=month, defaults={'path': str(archive_path(month, root).relative_to(root)), 'size': 0},
+    )
+    size = _append(root / archive.path, rows, archive.size)
+    ClickArchive.objects.filter(pk=archive.pk).update(
+        clicks=F('clicks') + len(rows), size=size, updated_at=timezone.now(),
+    )
+
+
+def _drop_restored(month: date, root: Path):
+    """
+    Rewrite a restored month's archive without the clicks that are back in
+    the table, so archiving them again does not repeat them. The new file is
+    switched to with one UPDATE and the old one removed after the commit.
+    """
+    archive = ClickArchive.objects.filter(month=month).first()
+    old = root / archive.path if archive else None
+    if old is None or not old.exists():
+        return
+    new = old.with_name(f'clicks-{month:%Y-%m}.{timezone.now():%Y%m%d%H%M%S%f}.jsonl.gz')
+    with open(new, 'wb') as fh:
+        with gzip.GzipFile(fileobj=fh, mode='wb') as gz:
+            for chunk in _chunks(_archived_rows(old, archive.size), _RESTORE_CHUNK):
+                present = set(AffiliateClick.objects.filter(
+                    id__in=[row['id'] for row in chunk],
+                ).values_list('id', flat=True))
+                for row in chunk:
+                    if row['id'] not in present:
+                        gz.write(json.dumps(row).encode('utf-8') + b'\n')
+        fh.flush()
+        os.fsync(fh.fileno())
+        size = os.fstat(fh.fileno()).st_size
+    ClickArchive.objects.filter(pk=archive.pk).update(
+        path=str(new.relative_to(root)), size=size, updated_at=timezone.now(),
+    )
+    transaction.on_commit(lambda: old.unlink(missing_ok=True))
+
+
+def _archivable(cutoff: datetime, months: List[date]):
+    """Clicks older than ``cutoff``: in ``months`` if given, else outside restored months."""
+    clicks = AffiliateClick.objects.filter(timestamp__lt=cutoff)
+    if months:
+        return clicks.filter(_in_months(months))
+    restored = restored_months()
+    return clicks.exclude(_in_months(restored)) if restored else clicks
+
+
+def archive_clicks(days: Optional[int] = None, batch_size: Optional[int] = None,
+                   months: Iterable[date] = (), log: Callable[[str], None] = lambda msg: None) -> Dict:
+    """
+    Archive, roll up and delete clicks older than ``days`` (default
+    CLICK_RETENTION_DAYS). With ``months``, only the clicks of those months
+    are archived, restored months included; without, restored months are
+    skipped.
+
+    Returns:
+        ``{'clicks': archived, 'months': {'YYYY-MM': archived}, 'skipped': ['YYYY-MM', ...]}``
+    """
+    days = retention_days() if days is None else days
+    batch_size = batch_size or getattr(settings, 'CLICK_ARCHIVE_BATCH_SIZE', 5000)
+    cutoff = timezone.now() - timedelta(days=days)
+    months = sorted(set(months))
+    root = get_archive_root()
+    archived = {'clicks': 0, 'months': defaultdict(int), 'skipped': []}
+
+    with _archive_lock(root):
+        restored = restored_months()
+        for month in restored:
+            if month in months:
+                _drop_restored(month, root)
+            elif not months:
+                archived['skipped'].append(f'{month:%Y-%m}')
+        clicks = _archivable(cutoff, months)
+        last_id = 0
+        while True:
+            with transaction.atomic():
+                # Ids follow timestamps, so the old clicks are a prefix of the id index
+                rows = list(
+                    clicks.select_for_update().filter(id__gt=last_id).order_by('id').values(*FIELDS)[:batch_size]
+                )
+                if not rows:
+                    break
+                by_month = defaultdict(list)
+                for row in rows:
+                    by_month[month_of(row['timestamp'])].append(row)
+                for month, month_rows in sorted(by_month.items()):
+                    _archive_batch(month, root, month_rows)
+                _add_to_rollups(_daily_counts(rows))
+                # Every archivable click in this id range is in the batch
+                clicks.filter(id__gte=rows[0]['id'], id__lte=rows[-1]['id']).delete()
+            last_id = rows[-1]['id']
+            archived['clicks'] += len(rows)
+            for month, month_rows in by_month.items():
+                archived['months'][f'{month:%Y-%m}'] += len(month_rows)
+            log(f'  archived clicks through #{last_id}')
+        if months:
+            ClickArchive.objects.filter(month__in=months).update(restored_at=None, updated_at=timezone.now())
+    archived['months'] = dict(sorted(archived['months'].items()))
+    return archived
+
+
+def pending_counts(days: Optional[int] = None, months: Iterable[date] = ()) -> Dict[str, int]:
+    """Clicks ``archive_clicks`` would archive now, by month."""
+    days = retention_days() if days is None else days
+    cutoff = timezone.now() - timedelta(days=days)
+    counts = defaultdict(int)
+    for timestamp in _archivable(cutoff, sorted(set(months))).values_list('timestamp', flat=True).iterator():
+        counts[f'{month_of(timestamp):%Y-%m}'] += 1
+    return dict(sorted(counts.items()))
+
+
+def read_month(month: date, vendor_id: Optional[int] = None, converted: Optional[bool] = None,
+               root: Optional[Path] = None) -> Iterator[Dict]:
+    """
+    Archived clicks of ``month`` in the order they were archived, optionally
+    for one vendor or conversion state, streamed from the file. Yields
+    nothing if the month was never archived.
+    """
+    root = root or get_archive_root()
+    archive = ClickArchive.objects.filter(month=month).first()
+    if archive is None or not (root / archive.path).exists():
+        return
+    for row in _archived_rows(root / archive.path, archive.size):
+        if vendor_id is not None and row['vendor_id'] != vendor_id:
+            continue
+        if converted is not None and row['converted'] != converted:
+            continue
+        row['timestamp'] = datetime.fromisoformat(row['timestamp'])
+        yield row
+
+
+def restore_month(month: date, vendor_id: Optional[int] = None) -> Dict[str, int]:
+    """
+    Put archived clicks of ``month`` back into the table and take them out of
+    the rollups. Clicks already in the table are left alone; clicks of
+    vendors that no longer exist cannot be restored. The month is marked
+    restored, so ``archive_clicks`` leaves it alone until it is given the
+    month again.
+
+    Returns:
+        Counts of clicks ``restored``, ``present`` and ``orphaned``
+    """
+    root = get_archive_root()
+    counts = {'restored': 0, 'present': 0, 'orphaned': 0}
+    with _archive_lock(root):
+        ClickArchive.objects.filter(month=month).update(restored_at=timezone.now(), updated_at=timezone.now())
+        for chunk in _chunks(read_month(month, vendor_id=vendor_id, root=root), _RESTORE_CHUNK):
+            with transaction.atomic():
+                ids = [row['id'] for row in chunk]
+                vendors = set(BuildingSystemVendor.objects.filter(
+                    id__in={row['vendor_id'] for row in chunk},
+                ).values_list('id', flat=True))
+                present = set(AffiliateClick.objects.filter(id__in=ids).values_list('id', flat=True))
+                users = set(User.objects.filter(
+                    id__in={row['user_id'] for row in chunk if row['user_id']},
+                ).values_list('id', flat=True))
+                restore = [row for row in chunk if row['id'] not in present and row['vendor_id'] in vendors]
+                counts['present'] += len(present)
+                counts['orphaned'] += len(chunk) - len(present) - len(restore)
+                if not restore:
+                    continue
+                AffiliateClick.objects.bulk_create([
+                    AffiliateClick(
+                        id=row['id'], vendor_id=row['vendor_id'], converted=row['converted'],
+                        user_id=row['user_id'] if row['user_id'] in users else None,
+                    )
+                    for row in restore
+                ])
+                # bulk_create stamped them with auto_now_add; put the original times back
+                AffiliateClick.objects.filter(id__in=[row['id'] for row in restore]).update(timestamp=Case(
+                    *(When(id=row['id'], then=Value(row['timestamp'])) for row in restore),
+                    output_field=DateTimeField(),
+                ))
+                _add_to_rollups(_daily_counts(restore), sign=-1)
+                ClickArchive.objects.filter(month=month).update(
+                    clicks=F('clicks') - len(restore), updated_at=timezone.now(),
+                )
+                counts['restored'] += len(restore)
+    return counts
@@ -0,0 +1,164 @@
+"""
+Affiliate click filtering ahead of the database write.
+
+``track_click`` asks ``get_click_filter().check()`` before it stores a click.
+A click is dropped when:
+
+* the user agent is missing or looks like a crawler, link previewer or HTTP
+  library (``bot``);
+* the same visitor clicked the same vendor within ``CLICK_DEDUP_WINDOW``
+  seconds; the window slides, so a burst of retries counts once
+  (``duplicate``);
+* the visitor made more than ``CLICK_RATE_LIMIT`` clicks, on any vendor, in
+  the last ``CLICK_RATE_WINDOW`` seconds (``rate_limited``).
+
+A visitor is the authenticated user, else the session, else the client IP
+and user agent; only a hash of that is kept. The client IP is ``REMOTE_ADDR``
+unless ``CLICK_FILTER_FORWARDED_HEADER`` names the header a reverse proxy
+puts it in. Behind a proxy without that setting, all anonymous visitors share
+the proxy's IP and are told apart by user agent alone. Both tables are in-process LRUs
+of at most ``CLICK_FILTER_MAX_KEYS`` entries, so memory is bounded and no
+click costs a query. Each worker process filters on its own, which is enough
+to stop double-clicks and retries that reach the same worker.
+"""
+
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Optional
+
+from django.conf import settings
+
+from core import metrics
+
+BOT = 'bot'
+DUPLICATE = 'duplicate'
+RATE_LIMITED = 'rate_limited'
+
+DEFAULT_BOT_USER_AGENT_PATTERN = (
+    r'bot|crawl|spider|slurp|archiver|fetch|scan|monitor|preview|headless|phantom|'
+    r'lighthouse|pingdom|facebookexternalhit|embedly|curl|wget|httpie|python|'
+    r'java/|go-http-client|okhttp|axios|node-fetch|libwww|scrapy|postman'
+)
+
+
+def _digest(*parts) -> bytes:
+    return hashlib.sha256('|'.join(str(part) for part in parts).encode('utf-8')).digest()[:16]
+
+
+class _LRU(OrderedDict):
+    """OrderedDict that forgets its least recently used keys past ``max_keys``."""
+
+    def __init__(self, max_keys: int):
+        super().__init__()
+        self.max_keys = max_keys
+
+    def touch(self, key, value):
+        self[key] = value
+        self.move_to_end(key)
+        while len(self) > self.max_keys:
+            self.popitem(last=False)
+
+
+class ClickFilter:
+    """Bot, duplicate and rate checks on affiliate clicks, in memory."""
+
+    def __init__(self, dedup_window: float = 30, rate_limit: int = 20, rate_window: float = 60,
+                 max_keys: int = 50000, bot_user_agents: str = DEFAULT_BOT_USER_AGENT_PATTERN,
+                 forwarded_header: Optional[str] = None):
+        self.dedup_window = dedup_window
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.forwarded_header = forwarded_header
+        self._bot_re = re.compile(bot_user_agents, re.IGNORECASE) if bot_user_agents else None
+        self._seen = _LRU(max_keys)
+        self._recent = _LRU(max_keys)
+        self._lock = threading.Lock()
+
+    def client_ip(self, request) -> str:
+        if self.forwarded_header:
+            forwarded = request.META.get(self.forwarded_header, '')
+            if forwarded:
+                return forwarded.split(',')[0].strip()
+        return request.META.get('REMOTE_ADDR', '')
+
+    def visitor(self, request, user_agent: str) -> bytes:
+        """Hashed identity of whoever sent ``request``."""
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            return _digest('user', user.pk)
+        session = getattr(request, 'session', None)
+        if session is not None and session.session_key:
+            return _digest('session', session.session_key)
+        return _digest('ip', self.client_ip(request), user_agent)
+
+    def is_bot(self, user_agent: str) -> bool:
+        return not user_agent or bool(self._bot_re and self._bot_re.search(user_agent))
+
+    def check(self, request, vendor_pk, now: Optional[float] = None) -> Optional[str]:
+        """
+        Decide whether to store a click on ``vendor_pk``.
+
+        Returns:
+            None to store it, otherwise why it was dropped (BOT, DUPLICATE or RATE_LIMITED)
+        """
+        user_agent = request.META.get('HTTP_USER_AGENT', '')
+        if self.is_bot(user_agent):
+            return self._drop(BOT)
+
+        now = time.monotonic() if now is None else now
+        visitor = self.visitor(request, user_agent)
+        click = _digest(visitor.hex(), vendor_pk)
+        with self._lock:
+            # Every attempt counts towards the rate, so a client hammering the
+            # endpoint stays limited until it slows down
+            recent = self._recent.get(visitor)
+            if recent is None:
+                recent = deque(maxlen=self.rate_limit + 1)
+            recent.append(now)
+            self._recent.touch(visitor, recent)
+
+            last = self._seen.get(click)
+            self._seen.touch(click, now)
+            if last is not None and now - last < self.dedup_window:
+                reason = DUPLICATE
+            elif len(recent) > self.rate_limit and now - recent[0] < self.rate_window:
+                reason = RATE_LIMITED
+            else:
+                reason = None
+        return self._drop(reason) if reason else None
+
+    def _drop(self, reason: str) -> str:
+        metrics.AFFILIATE_CLICKS_DROPPED.inc(reason=reason)
+        return reason
+
+    def clear(self):
+        with self._lock:
+            self._seen.clear()
+            self._recent.clear()
+
+
+_filter = None
+_filter_lock = threading.Lock()
+
+
+def is_enabled() -> bool:
+    return getattr(settings, 'CLICK_FILTER_ENABLED', True)
+
+
+def get_click_filter() -> ClickFilter:
+    global _filter
+    if _filter is None:
+        with _filter_lock:
+            if _filter is None:
+                _filter = ClickFilter(
+                    dedup_window=getattr(settings, 'CLICK_DEDUP_WINDOW', 30),
+                    rate_limit=getattr(settings, 'CLICK_RATE_LIMIT', 20),
+                    rate_window=getattr(settings, 'CLICK_RATE_WINDOW', 60),
+                    max_keys=getattr(settings, 'CLICK_FILTER_MAX_KEYS', 50000),
+                    bot_user_agents=getattr(settings, 'CLICK_BOT_USER_AGENTS', DEFAULT_BOT_USER_AGENT_PATTERN),
+                    forwarded_header=getattr(settings, 'CLICK_FILTER_FORWARDED_HEADER', None),
+                )
+    return _filter
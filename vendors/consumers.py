@@ -0,0 +1,86 @@
+"""
+WebSocket consumer streaming catalogue changes.
+
+Clients connect to ``/ws/catalogue/`` and choose what to follow, either in the
+query string (``?category=DOMES&vendor=12``, neither meaning everything) or
+with messages::
+
+    {"action": "subscribe", "category": "DOMES"}
+    {"action": "subscribe", "vendor": 12}
+    {"action": "unsubscribe", "vendor": 12}
+
+Events are the compact diffs built in ``vendors.realtime``.
+"""
+
+from collections import deque
+from urllib.parse import parse_qs
+
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from . import realtime
+from .models import BuildingSystemVendor
+
+CATEGORIES = {key for key, _ in BuildingSystemVendor.CATEGORY_CHOICES}
+MAX_SUBSCRIPTIONS = 50
+# An event reaches a client once per matching group; remember enough ids to drop the repeats
+RECENT_EVENTS = 256
+
+
+class CatalogueConsumer(AsyncJsonWebsocketConsumer):
+    async def connect(self):
+        self.groups_joined = set()
+        self.recent_events = deque(maxlen=RECENT_EVENTS)
+        await self.accept()
+
+        query = parse_qs(self.scope.get('query_string', b'').decode())
+        requested = [{'category': value} for value in query.get('category', [])]
+        requested += [{'vendor': value} for value in query.get('vendor', [])]
+        for subscription in requested or [{}]:
+            await self._change_subscription('subscribe', subscription)
+
+    async def disconnect(self, code):
+        for group in self.groups_joined:
+            await self.channel_layer.group_discard(group, self.channel_name)
+        self.groups_joined = set()
+
+    async def receive_json(self, content, **kwargs):
+        action = content.get('action') if isinstance(content, dict) else None
+        if action not in ('subscribe', 'unsubscribe'):
+            await self.send_json({'error': 'Unknown action'})
+            return
+        await self._change_subscription(action, content)
+
+    async def _change_subscription(self, action, content):
+        group = self._group_for(content)
+        if group is None:
+            await self.send_json({'error': 'Subscribe to a known category, a vendor id or everything'})
+            return
+        if action == 'subscribe':
+            if group not in self.groups_joined:
+                if len(self.groups_joined) >= MAX_SUBSCRIPTIONS:
+                    await self.send_json({'error': 'Too many subscriptions'})
+                    return
+                await self.channel_layer.group_add(group, self.channel_name)
+                self.groups_joined.add(group)
+        elif group in self.groups_joined:
+            await self.channel_layer.group_discard(group, self.channel_name)
+            self.groups_joined.discard(group)
+        await self.send_json({'subscribed': sorted(self.groups_joined)})
+
+    def _group_for(self, content):
+        if content.get('category') is not None:
+            category = str(content['category'])
+            return realtime.category_group(category) if category in CATEGORIES else None
+        if content.get('vendor') is not None:
+            try:
+                return realtime.vendor_group(content['vendor'])
+            except (TypeError, ValueError):
+                return None
+        return realtime.ALL_GROUP
+
+    async def catalogue_change(self, event):
+        change = event['change']
+        if change['event'] in self.recent_events:
+            return
+        self.recent_events.append(change['event'])
+        await self.send_json(change)
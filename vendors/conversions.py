@@ -0,0 +1,118 @@
+"""
+Bulk conversion postbacks for affiliate clicks.
+
+Partners report conversions as files of click ids: one id per line, or a CSV
+whose header has a ``click_id`` (or ``id``) column. ``apply_conversions``
+reads the ids as a stream and marks them converted ``CLICK_CONVERSION_CHUNK_SIZE``
+at a time, one transaction per chunk:
+
+    UPDATE vendors_affiliateclick SET converted = 1 WHERE id IN (...) AND NOT converted
+
+Applying a file again changes nothing; ids already converted are reported as
+such, and ids that match no click as unmatched.
+"""
+
+import csv
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+
+from django.conf import settings
+from django.db import transaction
+
+from core.sqlite import run_write
+
+from .models import AffiliateClick
+
+ID_COLUMNS = ('click_id', 'id')
+
+# Largest id a signed 64-bit column holds; bigger values are invalid rows,
+# not a database error
+MAX_ID = 2 ** 63 - 1
+
+
+class ConversionFileError(ValueError):
+    """The file has a header row without a click id column."""
+
+
+def _decoded(lines: Iterable[Union[bytes, str]]) -> Iterator[str]:
+    for line in lines:
+        yield line.decode('utf-8-sig') if isinstance(line, bytes) else line
+
+
+def parse_id(value: str) -> Optional[int]:
+    try:
+        click_id = int(value.strip())
+    except ValueError:
+        return None
+    return click_id if 0 < click_id <= MAX_ID else None
+
+
+def read_click_ids(lines: Iterable[Union[bytes, str]]) -> Iterator[Optional[int]]:
+    """
+    Click ids from the lines of a conversion file, None for each unreadable row.
+
+    Raises:
+        ConversionFileError: if the first row is a header without a click id column
+    """
+    column = 0
+    first = True
+    for row in csv.reader(_decoded(lines)):
+        if not row or not any(cell.strip() for cell in row):
+            continue
+        if first:
+            first = False
+            header = [cell.strip().lower() for cell in row]
+            # A first row starting with a number is data, even an invalid id
+            if not header[0].lstrip('+-').isdigit():
+                column = next((header.index(name) for name in ID_COLUMNS if name in header), None)
+                if column is None:
+                    raise ConversionFileError(f"No {' or '.join(ID_COLUMNS)} column in header {row}")
+                continue
+        yield parse_id(row[column]) if column < len(row) else None
+
+
+def _convert_chunk(ids: List[int]):
+    """``(matched, newly_converted)`` for one chunk of ids."""
+    with transaction.atomic():
+        matched = AffiliateClick.objects.filter(id__in=ids).count()
+        converted = AffiliateClick.objects.filter(id__in=ids, converted=False).update(converted=True)
+    return matched, converted
+
+
+def apply_conversions(click_ids: Iterable[Optional[int]], chunk_size: Optional[int] = None) -> Dict[str, int]:
+    """
+    Mark the clicks in ``click_ids`` converted.
+
+    Returns:
+        Counts of ids ``received``, ``matched`` (``converted`` now plus
+        ``already_converted``), ``unmatched``, ``invalid`` and ``duplicates``
+        (repeats within the file, counted once)
+    """
+    chunk_size = chunk_size or getattr(settings, 'CLICK_CONVERSION_CHUNK_SIZE', 500)
+    counts = dict.fromkeys(
+        ('received', 'matched', 'converted', 'already_converted', 'unmatched', 'invalid', 'duplicates'), 0,
+    )
+    seen = set()
+    chunk = []
+
+    def flush():
+        matched, converted = run_write(_convert_chunk, chunk)
+        counts['matched'] += matched
+        counts['converted'] += converted
+        counts['already_converted'] += matched - converted
+        counts['unmatched'] += len(chunk) - matched
+        chunk.clear()
+
+    for click_id in click_ids:
+        counts['received'] += 1
+        if click_id is None:
+            counts['invalid'] += 1
+        elif click_id in seen:
+            counts['duplicates'] += 1
+        else:
+            seen.add(click_id)
+            chunk.append(click_id)
+            if len(chunk) >= chunk_size:
+                flush()
+    if chunk:
+        flush()
+    return counts
@@ -0,0 +1,325 @@
+"""
+Near-duplicate detection for vendors and models.
+
+Names and website domains are normalized, broken into character trigrams and
+indexed with MinHash locality-sensitive hashing, so checking a new vendor or
+model against the catalogue only compares it with the handful of entries that
+share an LSH bucket instead of every row. Candidates are confirmed with the
+exact trigram Jaccard similarity.
+
+The admin checks new vendors against a vendor index kept in memory for the
+life of the process (``find_vendor_matches``). Signals update it as vendors are
+saved and deleted; vendors added by other processes are picked up by primary
+key before each query, and the whole index is rebuilt after
+``DEDUP_VENDOR_INDEX_MAX_AGE`` seconds to catch their edits and deletions.
+"""
+
+import random
+import re
+import threading
+import time
+import unicodedata
+import zlib
+from collections import defaultdict
+from typing import Dict, Hashable, Iterable, List, Optional, Set, Tuple
+from urllib.parse import urlparse
+
+from django.conf import settings
+
+# Words that say nothing about which company a vendor is
+VENDOR_STOPWORDS = {
+    'the', 'inc', 'incorporated', 'llc', 'ltd', 'limited', 'gmbh', 'ag', 'co',
+    'corp', 'corporation', 'company', 'group', 'international', 'global',
+    'technology', 'technologies', 'tech', 'build', 'building', 'builders',
+}
+
+VENDOR_THRESHOLD = 0.7
+MODEL_THRESHOLD = 0.8
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_NUMBER_RE = re.compile(r'\d+(?:\.\d+)?')
+
+# The process-wide vendor index, when built: (index, built_at, highest pk seen)
+_vendor_index = None
+_vendor_index_lock = threading.Lock()
+
+
+def normalize(text: str) -> str:
+    """Lowercase, strip accents and punctuation, and collapse whitespace."""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    text = re.sub(r'[^a-z0-9]+', ' ', text.lower())
+    return text.strip()
+
+
+def website_stem(url: Optional[str]) -> str:
+    """``https://www.iconbuild.com/about`` -> ``iconbuild``"""
+    if not url:
+        return ''
+    netloc = urlparse(url if '//' in url else f'//{url}').netloc.lower()
+    netloc = netloc.split(':')[0]
+    if netloc.startswith('www.'):
+        netloc = netloc[4:]
+    return normalize(netloc.split('.')[0]).replace(' ', '')
+
+
+def vendor_keys(partner_name: str, website_url: Optional[str] = None) -> List[str]:
+    """
+    Comparison keys for a vendor.
+
+    The full name, the name without generic company words and the website
+    domain are all indexed, so "ICON Build" matches "ICON Technology Inc." by
+    name and "iconbuild.com" by domain.
+    """
+    name = normalize(partner_name)
+    keys = [name.replace(' ', '')]
+    core = ''.join(word for word in name.split() if word not in VENDOR_STOPWORDS)
+    if core:
+        keys.append(core)
+    stem = website_stem(website_url)
+    if stem:
+        keys.append(stem)
+    return [key for key in dict.fromkeys(keys) if key]
+
+
+def model_keys(model_name: str) -> List[str]:
+    key = normalize(model_name).replace(' ', '')
+    return [key] if key else []
+
+
+def shingles(key: str, size: int = 3) -> Set[str]:
+    padded = f'#{key}#'
+    if len(padded) <= size:
+        return {padded}
+    return {padded[i:i + size] for i in range(len(padded) - size + 1)}
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _numbers(keys: Iterable[str]) -> Set[str]:
+    found = set()
+    for key in keys:
+        found.update(_NUMBER_RE.findall(key))
+    return found
+
+
+class DuplicateIndex:
+    """
+    MinHash LSH index over trigram sets.
+
+    Each item is indexed under one or more keys. With the default 16 bands of
+    4 rows, pairs above roughly 0.5 Jaccard similarity almost always share a
+    bucket, and candidates are then checked exactly against ``threshold``.
+    """
+
+    def __init__(self, threshold: float = VENDOR_THRESHOLD, num_perm: int = 64, bands: int = 16,
+                 match_numbers: bool = False, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError('num_perm must be a multiple of bands')
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.match_numbers = match_numbers
+        rng = random.Random(seed)
+        self._perms = [
+            (rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+            for _ in range(num_perm)
+        ]
+        self._buckets: Dict[Tuple, Set[Hashable]] = defaultdict(set)
+        self._items: Dict[Hashable, List[Set[str]]] = {}
+        self._groups: Dict[Hashable, Hashable] = {}
+        self._labels: Dict[Hashable, str] = {}
+        self._numbers: Dict[Hashable, Set[str]] = {}
+        self._keys: Dict[Hashable, List[str]] = {}
+
+    def __len__(self):
+        return len(self._items)
+
+    def _signature(self, shingle_set: Set[str]) -> List[int]:
+        hashes = [zlib.crc32(s.encode('utf-8')) for s in shingle_set]
+        return [min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in self._perms]
+
+    def _band_keys(self, group, shingle_set: Set[str]):
+        signature = self._signature(shingle_set)
+        for band in range(self.bands):
+            start = band * self.rows
+            yield (group, band, tuple(signature[start:start + self.rows]))
+
+    def add(self, item_id: Hashable, keys: Iterable[str], group: Hashable = None, label: str = ''):
+        """Index an item under its keys. ``group`` restricts matches to items in the same group."""
+        keys = [key for key in keys if key]
+        if not keys:
+            return
+        if item_id in self._items:
+            self.remove(item_id)
+        shingle_sets = [shingles(key) for key in keys]
+        self._items[item_id] = shingle_sets
+        self._groups[item_id] = group
+        self._labels[item_id] = label
+        self._numbers[item_id] = _numbers(keys)
+        self._keys[item_id] = keys
+        for shingle_set in shingle_sets:
+            for band_key in self._band_keys(group, shingle_set):
+                self._buckets[band_key].add(item_id)
+
+    def remove(self, item_id: Hashable):
+        shingle_sets = self._items.pop(item_id, None)
+        if shingle_sets is None:
+            return
+        group = self._groups.pop(item_id)
+        self._labels.pop(item_id, None)
+        self._numbers.pop(item_id, None)
+        self._keys.pop(item_id, None)
+        for shingle_set in shingle_sets:
+            for band_key in self._band_keys(group, shingle_set):
+                bucket = self._buckets.get(band_key)
+                if bucket:
+                    bucket.discard(item_id)
+                    if not bucket:
+                        del self._buckets[band_key]
+
+    def label(self, item_id: Hashable) -> str:
+        return self._labels.get(item_id, '')
+
+    def group(self, item_id: Hashable) -> Hashable:
+        return self._groups.get(item_id)
+
+    def query(self, keys: Iterable[str], group: Hashable = None, exclude: Hashable = None) -> List[Tuple[Hashable, float]]:
+        """
+        Find indexed items similar to the given keys.
+
+        Returns:
+            ``(item_id, similarity)`` pairs above the threshold, most similar first
+        """
+        keys = [key for key in keys if key]
+        query_sets = [shingles(key) for key in keys]
+        candidates = set()
+        for shingle_set in query_sets:
+            for band_key in self._band_keys(group, shingle_set):
+                candidates.update(self._buckets.get(band_key, ()))
+        candidates.discard(exclude)
+
+        query_numbers = _numbers(keys) if self.match_numbers else None
+        matches = []
+        for item_id in candidates:
+            item_sets = self._items[item_id]
+            # "24ft Geodesic Dome" and "30ft Geodesic Dome" differ only in a
+            # number but are different products
+            if self.match_numbers and query_numbers != self._numbers[item_id]:
+                continue
+            score = max(jaccard(q, s) for q in query_sets for s in item_sets)
+            if score >= self.threshold:
+                matches.append((item_id, score))
+        matches.sort(key=lambda match: match[1], reverse=True)
+        return matches
+
+
+    def clusters(self) -> List[List[Tuple[Hashable, float]]]:
+        """
+        Group every indexed item with its near-duplicates.
+
+        Returns:
+            Clusters of two or more ``(item_id, best_similarity)`` pairs
+        """
+        parent = {}
+
+        def find(item):
+            parent.setdefault(item, item)
+            while parent[item] != item:
+                parent[item] = parent[parent[item]]
+                item = parent[item]
+            return item
+
+        best = defaultdict(float)
+        for item_id, keys in self._keys.items():
+            for other, score in self.query(keys, group=self._groups[item_id], exclude=item_id):
+                parent[find(item_id)] = find(other)
+                best[item_id] = max(best[item_id], score)
+                best[other] = max(best[other], score)
+
+        clusters = defaultdict(list)
+        for item_id, score in best.items():
+            clusters[find(item_id)].append((item_id, score))
+        return [sorted(members, key=lambda member: -member[1]) for members in clusters.values()]
+
+
+def build_vendor_index(threshold: float = VENDOR_THRESHOLD) -> DuplicateIndex:
+    """Index every vendor in the catalogue by name and website domain."""
+    from .models import BuildingSystemVendor
+
+    index = DuplicateIndex(threshold=threshold)
+    for pk, name, url in BuildingSystemVendor.objects.values_list('pk', 'partner_name', 'website_url').iterator():
+        index.add(pk, vendor_keys(name, url), label=name)
+    return index
+
+
+def build_model_index(threshold: float = MODEL_THRESHOLD, vendor=None) -> DuplicateIndex:
+    """
+    Index models by name, grouped by vendor.
+
+    Different vendors legitimately sell products with similar names ("Studio
+    ADU"), so model matches are only reported within the same vendor.
+    """
+    from .models import ModelVendor
+
+    index = DuplicateIndex(threshold=threshold, match_numbers=True)
+    queryset = ModelVendor.objects.all()
+    if vendor is not None:
+        queryset = queryset.filter(vendor=vendor)
+    for pk, vendor_id, name in queryset.values_list('pk', 'vendor_id', 'model_name').iterator():
+        index.add(pk, model_keys(name), group=vendor_id, label=name)
+    return index
+
+
+def _add_vendors(index: DuplicateIndex, queryset) -> int:
+    highest = 0
+    for pk, name, url in queryset.values_list('pk', 'partner_name', 'website_url').iterator():
+        index.add(pk, vendor_keys(name, url), label=name)
+        highest = max(highest, pk)
+    return highest
+
+
+def find_vendor_matches(partner_name: str, website_url: Optional[str] = None) -> List[Tuple[Hashable, float]]:
+    """
+    Query the process-wide vendor index, building or catching it up first.
+
+    Returns:
+        ``(vendor_id, similarity)`` pairs, most similar first
+    """
+    from .models import BuildingSystemVendor
+
+    global _vendor_index
+    max_age = getattr(settings, 'DEDUP_VENDOR_INDEX_MAX_AGE', 3600)
+    with _vendor_index_lock:
+        if _vendor_index is None or time.monotonic() - _vendor_index[1] > max_age:
+            index = DuplicateIndex(threshold=VENDOR_THRESHOLD)
+            highest = _add_vendors(index, BuildingSystemVendor.objects.all())
+            _vendor_index = (index, time.monotonic(), highest)
+        else:
+            index, built_at, highest = _vendor_index
+            # Vendors created by other processes since the last query
+            added = _add_vendors(index, BuildingSystemVendor.objects.filter(pk__gt=highest))
+            _vendor_index = (index, built_at, max(highest, added))
+        return index.query(vendor_keys(partner_name, website_url))
+
+
+def index_vendor(pk: int, partner_name: str, website_url: Optional[str] = None):
+    """Add or update a vendor in the process-wide index, if it has been built."""
+    global _vendor_index
+    with _vendor_index_lock:
+        if _vendor_index is not None:
+            index, built_at, highest = _vendor_index
+            index.remove(pk)
+            index.add(pk, vendor_keys(partner_name, website_url), label=partner_name)
+            _vendor_index = (index, built_at, max(highest, pk))
+
+
+def unindex_vendor(pk: int):
+    """Drop a deleted vendor from the process-wide index, if it has been built."""
+    with _vendor_index_lock:
+        if _vendor_index is not None:
+            _vendor_index[0].remove(pk)
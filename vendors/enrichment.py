@@ -0,0 +1,191 @@
+"""
+Resumable AI model generation for vendors.
+
+Each vendor to enrich gets an ``EnrichmentJob`` row. Running a job claims it
+(PENDING or FAILED -> RUNNING, a compare-and-set, so concurrent runs never
+take the same vendor), asks the AI service for suggestions, stores them on
+the row and creates the models through ``ingest.create_suggested_models``.
+
+A failed job records its error and may be retried after
+``ENRICHMENT_BACKOFF_SECONDS``, doubling with every attempt up to
+``ENRICHMENT_BACKOFF_MAX_SECONDS``, until ``ENRICHMENT_MAX_ATTEMPTS`` attempts
+have been made. Suggestions already received are reused on retry. A job left
+RUNNING for ``ENRICHMENT_STALE_SECONDS`` belonged to a run that died: it is
+picked up again if it has attempts left, and marked FAILED otherwise. DONE
+jobs are never repeated, so an interrupted batch resumes where it stopped.
+"""
+
+import time
+from datetime import timedelta
+from typing import Callable, Dict, Iterable, Optional
+
+from django.conf import settings
+from django.db.models import F, Min, Q
+from django.utils import timezone
+
+from .ai_service import ModelSuggestionService
+from .dedup import DuplicateIndex
+from .ingest import create_suggested_models
+from .models import BuildingSystemVendor, EnrichmentJob
+
+PENDING = 'PENDING'
+RUNNING = 'RUNNING'
+DONE = 'DONE'
+FAILED = 'FAILED'
+
+
+def max_attempts() -> int:
+    return getattr(settings, 'ENRICHMENT_MAX_ATTEMPTS', 4)
+
+
+def backoff(attempts: int) -> timedelta:
+    """Wait after the ``attempts``-th failed attempt."""
+    base = getattr(settings, 'ENRICHMENT_BACKOFF_SECONDS', 30)
+    cap = getattr(settings, 'ENRICHMENT_BACKOFF_MAX_SECONDS', 600)
+    return timedelta(seconds=min(cap, base * 2 ** max(0, attempts - 1)))
+
+
+def enqueue(vendors: Iterable[BuildingSystemVendor]) -> int:
+    """
+    Add PENDING jobs for vendors that have none.
+
+    Returns:
+        Number of jobs added
+    """
+    vendor_ids = [vendor.pk for vendor in vendors]
+    existing = set(EnrichmentJob.objects.filter(vendor_id__in=vendor_ids).values_list('vendor_id', flat=True))
+    jobs = [EnrichmentJob(vendor_id=pk) for pk in vendor_ids if pk not in existing]
+    EnrichmentJob.objects.bulk_create(jobs, ignore_conflicts=True)
+    return len(jobs)
+
+
+def unjournaled_vendors(vendors):
+    """Vendors with neither a job nor any models, i.e. never enriched."""
+    return vendors.filter(enrichment_job__isnull=True, models__isnull=True).distinct()
+
+
+def _stale(now):
+    """Jobs started before this and still RUNNING belonged to a run that died."""
+    return now - timedelta(seconds=getattr(settings, 'ENRICHMENT_STALE_SECONDS', 900))
+
+
+def _due(now) -> Q:
+    return (
+        Q(status=PENDING)
+        | Q(status=FAILED, attempts__lt=max_attempts(), next_attempt_at__lte=now)
+        | Q(status=RUNNING, attempts__lt=max_attempts(), started_at__lt=_stale(now))
+    )
+
+
+def due_jobs(jobs=None):
+    """Jobs that may run now."""
+    jobs = jobs if jobs is not None else EnrichmentJob.objects.all()
+    return jobs.filter(_due(timezone.now())).select_related('vendor').order_by('vendor_id')
+
+
+def next_retry_at(jobs=None):
+    """When the earliest failed job that still has attempts left becomes due, or None."""
+    jobs = jobs if jobs is not None else EnrichmentJob.objects.all()
+    return jobs.filter(status=FAILED, attempts__lt=max_attempts()).aggregate(at=Min('next_attempt_at'))['at']
+
+
+def fail_abandoned(jobs=None) -> int:
+    """Mark FAILED the stale RUNNING jobs that have no attempts left."""
+    jobs = jobs if jobs is not None else EnrichmentJob.objects.all()
+    now = timezone.now()
+    return jobs.filter(status=RUNNING, attempts__gte=max_attempts(), started_at__lt=_stale(now)).update(
+        status=FAILED, last_error='The run died during the last attempt', finished_at=now, updated_at=now,
+    )
+
+
+def reset_failed(jobs=None) -> int:
+    """Give failed jobs a fresh set of attempts, due now."""
+    jobs = jobs if jobs is not None else EnrichmentJob.objects.all()
+    return jobs.filter(status=FAILED).update(status=PENDING, attempts=0, next_attempt_at=None, updated_at=timezone.now())
+
+
+def _claim(job: EnrichmentJob) -> bool:
+    now = timezone.now()
+    claimed = EnrichmentJob.objects.filter(pk=job.pk, status=job.status, attempts=job.attempts).update(
+        status=RUNNING, attempts=F('attempts') + 1, started_at=now, finished_at=None, updated_at=now,
+    )
+    if claimed:
+        job.status, job.attempts, job.started_at = RUNNING, job.attempts + 1, now
+    return bool(claimed)
+
+
+def run_job(job: EnrichmentJob, service: Optional[ModelSuggestionService] = None,
+            index: Optional[DuplicateIndex] = None) -> Optional[Dict]:
+    """
+    Claim and run one job.
+
+    Returns:
+        ``{'created': [...], 'skipped': [...]}`` when it ran, or None when
+        another run claimed it first; ``job.status`` is DONE or FAILED afterwards
+    """
+    if not _claim(job):
+        return None
+    try:
+        if job.suggestions is None:
+            service = service or ModelSuggestionService()
+            job.suggestions = service.suggest_models(
+                vendor_name=job.vendor.partner_name,
+                website_url=job.vendor.website_url or '',
+                raise_on_error=True,
+            )
+            job.save(update_fields=['suggestions', 'updated_at'])
+        created, skipped = create_suggested_models(job.vendor, job.suggestions, index=index)
+    except Exception as exc:
+        # SuggestionError from the AI call, or a failure creating the models
+        job.status = FAILED
+        job.last_error = str(exc)[:2000] or exc.__class__.__name__
+        job.next_attempt_at = timezone.now() + backoff(job.attempts)
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'last_error', 'next_attempt_at', 'finished_at', 'updated_at'])
+        return {'created': [], 'skipped': []}
+
+    job.status = DONE
+    job.last_error = ''
+    job.models_created = len(created)
+    job.next_attempt_at = None
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'last_error', 'models_created', 'next_attempt_at', 'finished_at', 'updated_at'])
+    return {'created': created, 'skipped': skipped}
+
+
+def run_jobs(jobs=None, wait: bool = True, service: Optional[ModelSuggestionService] = None,
+             index: Optional[DuplicateIndex] = None,
+             report: Callable[[EnrichmentJob, Dict], None] = lambda job, result: None,
+             sleep: Callable[[float], None] = time.sleep) -> Dict[str, int]:
+    """
+    Run every due job among ``jobs`` (default: all), then, with ``wait``,
+    sleep until failed jobs come due again and retry them until they succeed
+    or run out of attempts.
+
+    Returns:
+        Counts of jobs ``done`` and ``failed`` in this run
+    """
+    jobs = jobs if jobs is not None else EnrichmentJob.objects.all()
+    delay = getattr(settings, 'ENRICHMENT_DELAY_SECONDS', 2)
+    counts = {'done': 0, 'failed': 0}
+    called = False
+    while True:
+        fail_abandoned(jobs)
+        batch = list(due_jobs(jobs))
+        for job in batch:
+            needs_call = job.suggestions is None
+            if needs_call and called and delay:
+                # Rate limiting to avoid API throttling
+                sleep(delay)
+            result = run_job(job, service=service, index=index)
+            if result is None:
+                continue
+            called = called or needs_call
+            counts['done' if job.status == DONE else 'failed'] += 1
+            report(job, result)
+        if batch:
+            continue
+        retry_at = next_retry_at(jobs) if wait else None
+        if retry_at is None:
+            return counts
+        sleep(max(0.0, (retry_at - timezone.now()).total_seconds()))
@@ -0,0 +1,77 @@
+"""
+Streaming CSV exports for the admin.
+
+``csv_response`` turns a queryset into a ``StreamingHttpResponse``: rows are
+read with ``iterator()`` a chunk at a time and written through ``csv.writer``
+as they are produced, so the download starts at once and memory stays flat
+however many rows are exported. Querysets should ``select_related()`` every
+foreign key named in the columns, or each row costs extra queries.
+"""
+
+import csv
+from datetime import datetime
+from typing import Callable, Iterator, Sequence, Tuple, Union
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+# Rows fetched per database round trip
+CHUNK_SIZE = 2000
+# Rows written per chunk of the response
+ROWS_PER_CHUNK = 500
+
+# Spreadsheets run cells starting with these as formulas
+_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+Column = Tuple[str, Union[str, Callable]]
+
+
+class Echo:
+    """File-like object whose ``write()`` hands the line back, for ``csv.writer``."""
+
+    def write(self, value):
+        return value
+
+
+def _value(obj, accessor: Union[str, Callable]):
+    """Follow ``vendor__partner_name``-style paths; methods such as ``get_status_display`` are called."""
+    if callable(accessor):
+        return accessor(obj)
+    for attr in accessor.split('__'):
+        if obj is None:
+            return None
+        obj = getattr(obj, attr)
+        if callable(obj):
+            obj = obj()
+    return obj
+
+
+def _cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, str) and value.startswith(_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def csv_rows(queryset, columns: Sequence[Column]) -> Iterator[str]:
+    """CSV text for the header and the rows of ``queryset``, a few hundred rows per chunk."""
+    writer = csv.writer(Echo())
+    yield writer.writerow([header for header, _ in columns])
+    chunk = []
+    for obj in queryset.iterator(chunk_size=CHUNK_SIZE):
+        chunk.append(writer.writerow([_cell(_value(obj, accessor)) for _, accessor in columns]))
+        if len(chunk) >= ROWS_PER_CHUNK:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+
+
+def csv_response(queryset, columns: Sequence[Column], name: str) -> StreamingHttpResponse:
+    """Download of ``queryset`` as ``<name>-<timestamp>.csv``."""
+    response = StreamingHttpResponse(csv_rows(queryset, columns), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{name}-{timezone.now():%Y%m%d-%H%M%S}.csv"'
+    return response
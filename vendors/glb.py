@@ -0,0 +1,205 @@
+"""
+Binary glTF (GLB) inspection and level-of-detail builds.
+
+``read_glb_metadata`` memory-maps a GLB file and only parses its 12-byte
+header and JSON chunk; vertex and index buffers are never read. Texture
+dimensions come from the first bytes of each embedded image, which are the
+only pages of the binary chunk the OS has to load.
+
+``build_lod`` runs gltfpack to write a simplified, texture-limited copy. It
+has no Django dependency so it can run in a spawned worker process.
+"""
+
+import json
+import mmap
+import struct
+import subprocess
+from typing import Dict, List, Optional, Tuple
+
+GLB_MAGIC = 0x46546C67  # b'glTF'
+CHUNK_JSON = 0x4E4F534A
+CHUNK_BIN = 0x004E4942
+
+# Primitive modes (glTF 2.0 spec, 3.7.2.1)
+TRIANGLES = 4
+TRIANGLE_STRIP = 5
+TRIANGLE_FAN = 6
+
+_PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+# JPEG start-of-frame markers carrying the image size (C4, C8 and CC are not frames)
+_JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+class GLBError(ValueError):
+    pass
+
+
+def _read_header(mm) -> Tuple[Dict, Optional[int]]:
+    """Parse the JSON chunk; return it and the offset of the BIN chunk data, if any."""
+    if len(mm) < 20:
+        raise GLBError('File too short for a GLB header')
+    magic, version, length = struct.unpack_from('<III', mm, 0)
+    if magic != GLB_MAGIC:
+        raise GLBError('Not a binary glTF file')
+    if version != 2:
+        raise GLBError(f'Unsupported glTF version {version}')
+    if length > len(mm):
+        raise GLBError('File is truncated')
+
+    json_length, json_type = struct.unpack_from('<II', mm, 12)
+    if json_type != CHUNK_JSON:
+        raise GLBError('First chunk is not JSON')
+    try:
+        document = json.loads(mm[20:20 + json_length])
+    except ValueError as exc:
+        raise GLBError(f'Invalid JSON chunk: {exc}')
+
+    bin_offset = None
+    next_chunk = 20 + json_length
+    if next_chunk + 8 <= length:
+        _, chunk_type = struct.unpack_from('<II', mm, next_chunk)
+        if chunk_type == CHUNK_BIN:
+            bin_offset = next_chunk + 8
+    return document, bin_offset
+
+
+def _primitive_triangles(document: Dict, primitive: Dict) -> int:
+    accessors = document.get('accessors', [])
+    if 'indices' in primitive:
+        count = accessors[primitive['indices']]['count']
+    elif 'POSITION' in primitive.get('attributes', {}):
+        count = accessors[primitive['attributes']['POSITION']]['count']
+    else:
+        return 0
+    mode = primitive.get('mode', TRIANGLES)
+    if mode == TRIANGLES:
+        return count // 3
+    if mode in (TRIANGLE_STRIP, TRIANGLE_FAN):
+        return max(count - 2, 0)
+    # Points and lines
+    return 0
+
+
+def count_triangles(document: Dict) -> int:
+    """Triangles drawn, counting a mesh once per node that instances it."""
+    meshes = document.get('meshes', [])
+    per_mesh = [sum(_primitive_triangles(document, p) for p in mesh.get('primitives', [])) for mesh in meshes]
+    instanced = [node['mesh'] for node in document.get('nodes', []) if 'mesh' in node]
+    if not instanced:
+        return sum(per_mesh)
+    return sum(per_mesh[index] for index in instanced)
+
+
+def bounding_box(document: Dict) -> Optional[Dict[str, List[float]]]:
+    """
+    Union of the POSITION accessor bounds, in mesh space.
+
+    Node transforms are not applied, so this is exact for the usual exported
+    asset with baked transforms and approximate otherwise.
+    """
+    accessors = document.get('accessors', [])
+    low = high = None
+    for mesh in document.get('meshes', []):
+        for primitive in mesh.get('primitives', []):
+            index = primitive.get('attributes', {}).get('POSITION')
+            if index is None:
+                continue
+            accessor = accessors[index]
+            if 'min' not in accessor or 'max' not in accessor:
+                continue
+            low = accessor['min'] if low is None else [min(a, b) for a, b in zip(low, accessor['min'])]
+            high = accessor['max'] if high is None else [max(a, b) for a, b in zip(high, accessor['max'])]
+    if low is None:
+        return None
+    return {'min': low, 'max': high}
+
+
+def _png_size(mm, offset: int, length: int) -> Optional[Tuple[int, int]]:
+    if length < 24 or mm[offset:offset + 8] != _PNG_SIGNATURE:
+        return None
+    return struct.unpack_from('>II', mm, offset + 16)
+
+
+def _jpeg_size(mm, offset: int, length: int) -> Optional[Tuple[int, int]]:
+    end = offset + length
+    if mm[offset:offset + 2] != b'\xff\xd8':
+        return None
+    position = offset + 2
+    while position + 9 <= end:
+        if mm[position] != 0xFF:
+            return None
+        marker = mm[position + 1]
+        if marker in _JPEG_SOF_MARKERS:
+            height, width = struct.unpack_from('>HH', mm, position + 5)
+            return width, height
+        segment_length = struct.unpack_from('>H', mm, position + 2)[0]
+        position += 2 + segment_length
+    return None
+
+
+def texture_sizes(document: Dict, mm, bin_offset: Optional[int]) -> List[Dict]:
+    """Size of each embedded image, read from its header bytes only."""
+    views = document.get('bufferViews', [])
+    textures = []
+    for image in document.get('images', []):
+        entry = {'mime_type': image.get('mimeType'), 'width': None, 'height': None}
+        if 'bufferView' in image and bin_offset is not None:
+            view = views[image['bufferView']]
+            offset = bin_offset + view.get('byteOffset', 0)
+            length = view['byteLength']
+            size = _png_size(mm, offset, length) or _jpeg_size(mm, offset, length)
+            if size:
+                entry['width'], entry['height'] = size
+            entry['bytes'] = length
+        else:
+            # External or data: URI images are not inspected
+            entry['uri'] = bool(image.get('uri'))
+        textures.append(entry)
+    return textures
+
+
+def read_glb_metadata(path) -> Dict:
+    """
+    Triangle count, bounding box and texture sizes of a GLB file.
+
+    Raises:
+        GLBError: if the file is not a valid GLB 2.0 file
+    """
+    with open(path, 'rb') as fh:
+        try:
+            mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            raise GLBError('Empty file')
+        with mm:
+            document, bin_offset = _read_header(mm)
+            try:
+                return {
+                    'bytes': len(mm),
+                    'triangles': count_triangles(document),
+                    'meshes': len(document.get('meshes', [])),
+                    'bounds': bounding_box(document),
+                    'textures': texture_sizes(document, mm, bin_offset),
+                    'generator': document.get('asset', {}).get('generator'),
+                }
+            except (KeyError, IndexError, TypeError, AttributeError, struct.error) as exc:
+                raise GLBError(f'Malformed glTF document: {exc!r}')
+
+
+def build_lod(gltfpack: str, source: str, output: str, simplify: float,
+              texture_limit: Optional[int] = None, extra_args: Tuple[str, ...] = (), timeout: int = 600) -> Dict:
+    """
+    Write a simplified copy of ``source`` to ``output`` and return its metadata.
+
+    ``simplify`` is the target triangle ratio (0-1); ``texture_limit`` caps
+    texture dimensions in pixels.
+
+    Raises:
+        subprocess.CalledProcessError: if gltfpack fails
+        GLBError: if the output cannot be read back
+    """
+    command = [gltfpack, '-i', source, '-o', output, '-si', str(simplify)]
+    if texture_limit:
+        command += ['-tl', str(texture_limit)]
+    command += list(extra_args)
+    subprocess.run(command, check=True, capture_output=True, timeout=timeout)
+    return read_glb_metadata(output)
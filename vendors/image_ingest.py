@@ -0,0 +1,354 @@
+"""
+Ingest stage for model gallery images.
+
+When a model's ``images`` list changes, a background thread mirrors it into
+``ModelImage`` rows, downloads the originals into local storage and renders
+the ``IMAGE_DERIVATIVE_SIZES`` in every ``IMAGE_DERIVATIVE_FORMATS`` in a
+process pool (``vendors.images``). Images uploaded in the admin go through
+the same rendering. The parent model is touched afterwards, so caches,
+snapshots and the change log pick up the new gallery.
+
+Serializers describe an image with ``picture()``: a fallback ``src`` at the
+size the view needs, a ``srcset`` per format, and blurhash/colour
+placeholders.
+
+Image URLs come from catalogue data, so downloads only follow http(s) URLs
+(redirects included) and only connect to public addresses: every address a
+host resolves to is checked, and the connection is made to the checked
+address, so a name that resolves to a private, loopback or link-local address
+cannot reach internal services.
+"""
+
+import ipaddress
+import logging
+import mimetypes
+import multiprocessing
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import urllib.request
+from http.client import HTTPConnection, HTTPSConnection
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.db import close_old_connections
+
+from . import images
+from .assets import get_model_image_storage
+from .models import ModelImage, ModelVendor
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL = 'thumbnail'
+CARD = 'card'
+HERO = 'hero'
+
+DEFAULT_SIZES = {THUMBNAIL: 160, CARD: 480, HERO: 1600}
+DEFAULT_FORMATS = ['avif', 'webp', 'jpeg']
+
+ALLOWED_SCHEMES = ('http', 'https')
+
+_background = None
+_pool = None
+_lock = threading.Lock()
+
+
+class DownloadError(Exception):
+    pass
+
+
+def is_enabled() -> bool:
+    return getattr(settings, 'IMAGE_INGEST_ON_SAVE', True)
+
+
+def get_sizes() -> Dict[str, int]:
+    return getattr(settings, 'IMAGE_DERIVATIVE_SIZES', DEFAULT_SIZES)
+
+
+def get_image_pool(workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """Shared process pool for rendering, started on first use."""
+    global _pool
+    with _lock:
+        if _pool is None:
+            # Spawned, not forked: the parent is a threaded server process
+            _pool = ProcessPoolExecutor(
+                max_workers=workers or getattr(settings, 'IMAGE_INGEST_WORKERS', 2),
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+    return _pool
+
+
+def _discard_pool(pool: ProcessPoolExecutor):
+    """Drop a pool whose worker died, so the next image starts a fresh one."""
+    global _pool
+    with _lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False)
+
+
+def sync_gallery(model: ModelVendor) -> List[ModelImage]:
+    """
+    Mirror ``model.images`` into ModelImage rows, in list order.
+
+    Rows of URLs no longer listed are deleted; uploaded images are kept after
+    the listed ones.
+    """
+    urls = [url for url in dict.fromkeys(model.images or []) if isinstance(url, str) and url]
+    existing = {image.source_url: image for image in model.gallery.exclude(source_url='')}
+    model.gallery.exclude(source_url='').exclude(source_url__in=urls).delete()
+
+    for position, url in enumerate(urls):
+        image = existing.get(url)
+        if image is None:
+            ModelImage.objects.create(model=model, source_url=url, position=position)
+        elif image.position != position:
+            image.position = position
+            image.save(update_fields=['position'])
+    for image in model.gallery.filter(source_url='', position__lt=len(urls)):
+        image.position = len(urls)
+        image.save(update_fields=['position'])
+    return list(model.gallery.all())
+
+
+def is_public_address(ip: str) -> bool:
+    """False for private, loopback, link-local, reserved, multicast and unspecified addresses."""
+    address = ipaddress.ip_address(ip.split('%', 1)[0])
+    if isinstance(address, ipaddress.IPv6Address) and address.ipv4_mapped:
+        address = address.ipv4_mapped
+    return address.is_global and not address.is_multicast
+
+
+def _public_connection(address, timeout=socket._GLOBAL_DEFAULT_TIMEOUT, source_address=None):
+    """``socket.create_connection`` that only connects to public addresses of the host."""
+    host, port = address
+    try:
+        infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except socket.gaierror as exc:
+        raise DownloadError(f'Cannot resolve {host}: {exc}')
+    ips = list(dict.fromkeys(info[4][0] for info in infos))
+    blocked = [ip for ip in ips if not is_public_address(ip)]
+    if blocked or not ips:
+        raise DownloadError(f'{host} resolves to a non-public address ({", ".join(blocked)})')
+    error = None
+    for ip in ips:
+        try:
+            # Connect to the address that was checked, not to the name again
+            return socket.create_connection((ip, port), timeout, source_address)
+        except OSError as exc:
+            error = exc
+    raise error
+
+
+class _PublicHTTPConnection(HTTPConnection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._create_connection = _public_connection
+
+
+class _PublicHTTPSConnection(HTTPSConnection):
+    # TLS still verifies the certificate against the host name
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._create_connection = _public_connection
+
+
+class _PublicHTTPHandler(urllib.request.HTTPHandler):
+    def http_open(self, req):
+        return self.do_open(_PublicHTTPConnection, req)
+
+
+class _PublicHTTPSHandler(urllib.request.HTTPSHandler):
+    def https_open(self, req):
+        return self.do_open(_PublicHTTPSConnection, req, context=self._context)
+
+
+class _HTTPRedirectHandler(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        if urlparse(newurl).scheme.lower() not in ALLOWED_SCHEMES:
+            raise DownloadError(f'Redirected to a non-http(s) URL: {newurl}')
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+
+# No ProxyHandler: a proxy would make the connection, bypassing the address check
+_opener = urllib.request.build_opener(
+    urllib.request.ProxyHandler({}), _PublicHTTPHandler, _PublicHTTPSHandler, _HTTPRedirectHandler,
+)
+
+
+def download(image: ModelImage):
+    """
+    Fetch ``image.source_url`` into local storage.
+
+    Raises:
+        DownloadError: on non-http(s) URLs or redirects, hosts resolving to
+            non-public addresses, network errors, non-image responses or files
+            over IMAGE_MAX_BYTES
+    """
+    max_bytes = getattr(settings, 'IMAGE_MAX_BYTES', 20 * 1024 * 1024)
+    if urlparse(image.source_url).scheme.lower() not in ALLOWED_SCHEMES:
+        raise DownloadError(f'Not an http(s) URL: {image.source_url}')
+    request = urllib.request.Request(image.source_url, headers={'User-Agent': 'gbsi-image-ingest'})
+    try:
+        with _opener.open(request, timeout=getattr(settings, 'IMAGE_DOWNLOAD_TIMEOUT', 20)) as response:
+            content_type = response.headers.get_content_type()
+            data = response.read(max_bytes + 1)
+    except OSError as exc:
+        raise DownloadError(str(exc))
+    if not content_type.startswith('image/'):
+        raise DownloadError(f'Not an image ({content_type})')
+    if len(data) > max_bytes:
+        raise DownloadError(f'Larger than {max_bytes} bytes')
+
+    extension = os.path.splitext(urlparse(image.source_url).path)[1] or mimetypes.guess_extension(content_type) or ''
+    image.original.save(f'original{extension.lower()}', ContentFile(data), save=False)
+
+
+def render(image: ModelImage, pool: Optional[ProcessPoolExecutor] = None):
+    """Render the derivatives of ``image.original`` and store them on the row (not saved)."""
+    storage = get_model_image_storage()
+    formats = images.available_formats(getattr(settings, 'IMAGE_DERIVATIVE_FORMATS', DEFAULT_FORMATS))
+    shared = pool is None
+    pool = pool or get_image_pool()
+    workdir = tempfile.mkdtemp(prefix='gbsi-images-')
+    try:
+        try:
+            result = pool.submit(
+                images.render_derivatives, storage.path(image.original.name), workdir,
+                get_sizes(), formats, getattr(settings, 'IMAGE_QUALITY', 75),
+            ).result()
+        except BrokenProcessPool:
+            if shared:
+                _discard_pool(pool)
+            raise
+        derivatives = {}
+        for size, files in result['derivatives'].items():
+            derivatives[size] = {}
+            for mime_type, rendered in files.items():
+                with open(rendered['path'], 'rb') as fh:
+                    name = storage.save(os.path.basename(rendered['path']), File(fh))
+                derivatives[size][mime_type] = {
+                    'name': name,
+                    'width': rendered['width'],
+                    'height': rendered['height'],
+                    'bytes': os.path.getsize(rendered['path']),
+                }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    image.width = result['width']
+    image.height = result['height']
+    image.blurhash = result['blurhash']
+    image.color = result['color']
+    image.derivatives = derivatives
+    image.error = ''
+
+
+def process(image: ModelImage, pool: Optional[ProcessPoolExecutor] = None, force: bool = False) -> bool:
+    """Download (if remote) and render one image; record failures on the row. True if it changed."""
+    if image.derivatives and not force:
+        return False
+    try:
+        if image.source_url and not image.original:
+            download(image)
+        if not image.original:
+            return False
+        render(image, pool)
+    except Exception as exc:
+        logger.warning('Could not process image %s of model %s: %s', image.pk, image.model_id, exc)
+        image.error = str(exc)[:255]
+    image.save()
+    return True
+
+
+def ingest_model_images(pk: int, pool: Optional[ProcessPoolExecutor] = None, force: bool = False) -> Optional[ModelVendor]:
+    model = ModelVendor.objects.filter(pk=pk).first()
+    if model is None:
+        return None
+    before = set(model.gallery.values_list('pk', flat=True))
+    gallery = sync_gallery(model)
+    changed = bool(before - {image.pk for image in gallery})
+    for image in gallery:
+        if force or not (image.derivatives or image.error):
+            changed = process(image, pool, force=force) or changed
+    if changed:
+        # Let caches, snapshots and the change log see the new gallery
+        model.save(update_fields=['updated_at'])
+    return model
+
+
+def _ingest_in_background(func: Callable, *args):
+    close_old_connections()
+    try:
+        func(*args)
+    except Exception:
+        logger.exception('Image ingest %s%s failed', func.__name__, args)
+    finally:
+        close_old_connections()
+
+
+def _submit(func: Callable, *args):
+    global _background
+    with _lock:
+        if _background is None:
+            _background = ThreadPoolExecutor(max_workers=1, thread_name_prefix='image-ingest')
+    _background.submit(_ingest_in_background, func, *args)
+
+
+def schedule_model_ingest(pk: int):
+    """Sync and process a model's gallery on the background thread."""
+    _submit(ingest_model_images, pk)
+
+
+def _process_uploaded(image_pk: int):
+    image = ModelImage.objects.filter(pk=image_pk).select_related('model').first()
+    if image is not None and process(image):
+        image.model.save(update_fields=['updated_at'])
+
+
+def schedule_image_ingest(image_pk: int):
+    """Render an uploaded image on the background thread."""
+    _submit(_process_uploaded, image_pk)
+
+
+def picture(image: ModelImage, size: str, build_url: Callable[[str], str] = lambda url: url) -> Optional[Dict]:
+    """
+    How a client should show ``image`` at ``size``: the fallback ``src`` at
+    that size, one ``srcset`` per format across all sizes (preferred format
+    first) and placeholders.
+    """
+    return picture_for(image.derivatives, image.blurhash, image.color, size, build_url)
+
+
+def picture_for(derivatives: Dict, blurhash: str, color: str, size: str,
+                build_url: Callable[[str], str] = lambda url: url) -> Optional[Dict]:
+    """``picture`` from the raw column values, for ``.values()`` rows."""
+    if not derivatives:
+        return None
+    storage = get_model_image_storage()
+    chosen = derivatives.get(size) or next(iter(derivatives.values()))
+    fallback_type = list(chosen)[-1]
+    sources = []
+    for mime_type in chosen:
+        # Small originals give several sizes the same width; one candidate per width
+        by_width = {
+            files[mime_type]['width']: storage.url(files[mime_type]['name'])
+            for files in derivatives.values() if mime_type in files
+        }
+        srcset = ', '.join(f'{build_url(url)} {width}w' for width, url in sorted(by_width.items()))
+        sources.append({'type': mime_type, 'srcset': srcset})
+    return {
+        'src': build_url(storage.url(chosen[fallback_type]['name'])),
+        'width': chosen[fallback_type]['width'],
+        'height': chosen[fallback_type]['height'],
+        'sources': sources,
+        'blurhash': blurhash,
+        'color': color,
+    }
@@ -0,0 +1,145 @@
+"""
+Responsive derivatives of model gallery images.
+
+``render_derivatives`` decodes an original once and writes every configured
+size in every configured format, plus the data needed for placeholders: the
+original dimensions, a blurhash (https://blurha.sh) and the average colour.
+It only depends on Pillow so it can run in a spawned worker process.
+"""
+
+import math
+import os
+from typing import Dict, Iterable, List, Tuple
+
+from PIL import Image, ImageOps
+
+# Preferred first; the last format is the fallback every browser can show
+FORMATS = {
+    'avif': ('AVIF', 'image/avif', '.avif'),
+    'webp': ('WEBP', 'image/webp', '.webp'),
+    'jpeg': ('JPEG', 'image/jpeg', '.jpg'),
+    'png': ('PNG', 'image/png', '.png'),
+}
+
+_BASE83 = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~'
+# Blurhash is computed on a small copy; the placeholder has no detail to lose
+_BLURHASH_SAMPLE = 32
+
+
+def available_formats(formats: Iterable[str]) -> List[str]:
+    """The requested formats this Pillow build can write (AVIF needs Pillow 11.3 or a plugin)."""
+    Image.init()
+    return [fmt for fmt in formats if fmt in FORMATS and FORMATS[fmt][0] in Image.SAVE]
+
+
+def _encode83(value: int, length: int) -> str:
+    return ''.join(_BASE83[(value // 83 ** (length - i - 1)) % 83] for i in range(length))
+
+
+def _srgb_to_linear(value: int) -> float:
+    v = value / 255
+    return v / 12.92 if v <= 0.04045 else ((v + 0.055) / 1.055) ** 2.4
+
+
+def _linear_to_srgb(value: float) -> int:
+    v = max(0.0, min(1.0, value))
+    if v <= 0.0031308:
+        return int(v * 12.92 * 255 + 0.5)
+    return int((1.055 * v ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+
+def _sign_pow(value: float, exponent: float) -> float:
+    return math.copysign(abs(value) ** exponent, value)
+
+
+def blurhash(image: Image.Image, components: Tuple[int, int] = (4, 3)) -> str:
+    """Blurhash of an RGB image."""
+    sample = image.copy()
+    sample.thumbnail((_BLURHASH_SAMPLE, _BLURHASH_SAMPLE))
+    width, height = sample.size
+    pixels = [tuple(_srgb_to_linear(c) for c in pixel) for pixel in sample.getdata()]
+
+    cx, cy = components
+    factors = []
+    for j in range(cy):
+        for i in range(cx):
+            normalisation = 1 if i == j == 0 else 2
+            r = g = b = 0.0
+            for y in range(height):
+                basis_y = math.cos(math.pi * j * y / height)
+                for x in range(width):
+                    basis = basis_y * math.cos(math.pi * i * x / width)
+                    pr, pg, pb = pixels[y * width + x]
+                    r += basis * pr
+                    g += basis * pg
+                    b += basis * pb
+            scale = normalisation / (width * height)
+            factors.append((r * scale, g * scale, b * scale))
+
+    dc, ac = factors[0], factors[1:]
+    result = _encode83((cx - 1) + (cy - 1) * 9, 1)
+    if ac:
+        actual_max = max(abs(c) for factor in ac for c in factor)
+        quantised_max = max(0, min(82, int(actual_max * 166 - 0.5)))
+        maximum = (quantised_max + 1) / 166
+        result += _encode83(quantised_max, 1)
+    else:
+        maximum = 1
+        result += _encode83(0, 1)
+    result += _encode83((_linear_to_srgb(dc[0]) << 16) + (_linear_to_srgb(dc[1]) << 8) + _linear_to_srgb(dc[2]), 4)
+    for factor in ac:
+        r, g, b = (max(0, min(18, int(_sign_pow(c / maximum, 0.5) * 9 + 9.5))) for c in factor)
+        result += _encode83(r * 19 * 19 + g * 19 + b, 2)
+    return result
+
+
+def average_colour(image: Image.Image) -> str:
+    r, g, b = image.resize((1, 1), Image.Resampling.BOX).getpixel((0, 0))[:3]
+    return f'#{r:02x}{g:02x}{b:02x}'
+
+
+def _has_alpha(image: Image.Image) -> bool:
+    return image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+
+
+def render_derivatives(source: str, output_dir: str, sizes: Dict[str, int], formats: List[str], quality: int = 75) -> Dict:
+    """
+    Write every size of ``source`` in every format to ``output_dir``.
+
+    ``sizes`` maps a size name to its maximum width; originals are never
+    upscaled. Images with transparency fall back to PNG instead of JPEG.
+    Returns the original's dimensions, blurhash, colour and, per size and
+    MIME type, the written file with its dimensions.
+    """
+    with Image.open(source) as opened:
+        image = ImageOps.exif_transpose(opened)
+        alpha = _has_alpha(image)
+        image = image.convert('RGBA' if alpha else 'RGB')
+    width, height = image.size
+    rgb = image.convert('RGB') if alpha else image
+
+    result = {
+        'width': width,
+        'height': height,
+        'blurhash': blurhash(rgb),
+        'color': average_colour(rgb),
+        'derivatives': {},
+    }
+    formats = ['png' if alpha and fmt == 'jpeg' else fmt for fmt in available_formats(formats)]
+    for size, max_width in sizes.items():
+        target_width = min(max_width, width)
+        target_height = max(1, round(height * target_width / width))
+        resized = image if target_width == width else image.resize(
+            (target_width, target_height), Image.Resampling.LANCZOS, reducing_gap=3.0,
+        )
+        files = {}
+        for fmt in formats:
+            pil_format, mime_type, extension = FORMATS[fmt]
+            path = os.path.join(output_dir, f'{size}{extension}')
+            options = {'optimize': True} if fmt in ('jpeg', 'png') else {'method': 6} if fmt == 'webp' else {}
+            if fmt != 'png':
+                options['quality'] = quality
+            resized.save(path, pil_format, **options)
+            files[mime_type] = {'path': path, 'width': target_width, 'height': target_height}
+        result['derivatives'][size] = files
+    return result
@@ -0,0 +1,102 @@
+"""
+Helpers for adding vendors and models to the catalogue.
+
+Every ingest path (seed commands, the suggest_models command and the admin
+suggestion view) goes through these so near-duplicates are caught the same
+way everywhere.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+from django.utils.text import slugify
+
+from .dedup import DuplicateIndex, build_model_index, find_vendor_matches, model_keys, vendor_keys
+from .models import BuildingSystemVendor, ModelVendor
+
+
+def find_duplicate_vendor(partner_name: str, website_url: Optional[str] = None,
+                          index: Optional[DuplicateIndex] = None) -> Optional[Tuple[BuildingSystemVendor, float]]:
+    """
+    Find an existing vendor that looks like the same company.
+
+    Without ``index``, the process-wide vendor index is queried.
+
+    Returns:
+        ``(vendor, similarity)`` for the closest match, or None
+    """
+    if index is not None:
+        matches = index.query(vendor_keys(partner_name, website_url))
+    else:
+        matches = find_vendor_matches(partner_name, website_url)
+    if not matches:
+        return None
+    vendor_id, score = matches[0]
+    vendor = BuildingSystemVendor.objects.filter(pk=vendor_id).first()
+    return (vendor, score) if vendor else None
+
+
+def create_vendor(vendor_data: Dict, index: Optional[DuplicateIndex] = None
+                  ) -> Tuple[Optional[BuildingSystemVendor], Optional[Tuple[int, float]]]:
+    """
+    Create a vendor unless it looks like one already in the catalogue.
+
+    With ``index`` (from ``build_vendor_index``) the new vendor is added to it,
+    so the rest of a batch is checked against it too; without, the
+    process-wide vendor index is queried.
+
+    Returns:
+        ``(vendor, None)`` when created, or ``(None, (existing_vendor_id, similarity))``
+    """
+    partner_name, website_url = vendor_data['partner_name'], vendor_data.get('website_url')
+    keys = vendor_keys(partner_name, website_url)
+    matches = index.query(keys) if index is not None else find_vendor_matches(partner_name, website_url)
+    if matches:
+        return None, matches[0]
+    vendor = BuildingSystemVendor.objects.create(**vendor_data)
+    if index is not None:
+        index.add(vendor.pk, keys, label=vendor.partner_name)
+    return vendor, None
+
+
+def create_suggested_models(vendor: BuildingSystemVendor, suggestions: List[Dict],
+                            index: Optional[DuplicateIndex] = None) -> Tuple[List[ModelVendor], List[Tuple[Dict, str]]]:
+    """
+    Create models from AI suggestions, skipping duplicates.
+
+    A suggestion is skipped when its slug is taken or when its name is a near
+    duplicate of one of the vendor's existing models.
+
+    Returns:
+        ``(created_models, skipped)`` where ``skipped`` holds ``(suggestion, reason)`` pairs
+    """
+    index = index if index is not None else build_model_index(vendor=vendor)
+    created = []
+    skipped = []
+
+    for model_data in suggestions:
+        slug = slugify(model_data['model_name'])
+        keys = model_keys(model_data['model_name'])
+
+        if ModelVendor.objects.filter(slug=slug).exists():
+            skipped.append((model_data, f"Model with slug '{slug}' already exists"))
+            continue
+
+        matches = index.query(keys, group=vendor.pk)
+        if matches:
+            match_id, score = matches[0]
+            skipped.append((model_data, f"Looks like a duplicate of '{index.label(match_id)}' ({score:.0%} similar)"))
+            continue
+
+        model = ModelVendor.objects.create(
+            vendor=vendor,
+            model_name=model_data['model_name'],
+            slug=slug,
+            description=model_data['description'],
+            price_range=model_data.get('price_range', ''),
+            specifications=model_data.get('specifications', {}),
+            is_featured=False
+        )
+        index.add(model.pk, keys, group=vendor.pk, label=model.model_name)
+        created.append(model)
+
+    return created, skipped
@@ -0,0 +1,213 @@
+"""
+Consultation request intake.
+
+Submissions are validated on the request path and deduplicated against
+recent identical submissions through the cache. By default they are then
+written inline (``submit_sync``); a failed write releases the dedup key so the
+client's retry goes through.
+
+With ``CONSULTATION_INTAKE_ASYNC`` they are instead handed to a bounded
+in-process queue and a background worker performs the database write (and
+anything hooked to the ``ConsultationRequest`` post_save signal), so
+submission latency does not depend on database load. When the queue is full
+the submission is rejected immediately instead of piling up request threads.
+The worker retries a failed write ``CONSULTATION_INTAKE_RETRIES`` times before
+releasing the dedup key and logging the whole lead. The queue lives in
+memory: submissions still queued when the process dies are lost.
+"""
+
+import atexit
+import hashlib
+import json
+import logging
+import queue
+import threading
+import time
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+
+from core import metrics
+from core.sqlite import run_write
+
+from .models import ConsultationRequest
+
+logger = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+DUPLICATE = 'duplicate'
+CREATED = 'created'
+
+
+class IntakeFull(Exception):
+    """Raised when the intake queue cannot accept more submissions."""
+
+
+def submission_fingerprint(data: Dict) -> str:
+    """Identify a submission by (email, vendor, model, message hash)."""
+    vendor = data.get('vendor')
+    model = data.get('model')
+    message = ' '.join((data.get('message') or '').split()).lower()
+    parts = [
+        (data.get('email') or '').strip().lower(),
+        str(vendor.pk if vendor else ''),
+        str(model.pk if model else ''),
+        hashlib.sha256(message.encode('utf-8')).hexdigest(),
+    ]
+    return hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest()
+
+
+class ConsultationIntake:
+    """Bounded queue of consultation writes drained by background worker threads."""
+
+    def __init__(self, maxsize: int = 1000, workers: int = 1, dedup_window: int = 600,
+                 retries: int = 3, retry_delay: float = 0.5):
+        self.dedup_window = dedup_window
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._workers = workers
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        if self._threads:
+            return
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self._workers):
+                thread = threading.Thread(target=self._run, name=f'consultation-intake-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                return
+            try:
+                self._store(item)
+            finally:
+                self._queue.task_done()
+
+    def _store(self, item):
+        """Write a queued submission, retrying; give up by releasing its key and logging the lead."""
+        data, user_id, key = item
+        for attempt in range(self.retries + 1):
+            try:
+                self._write(data, user_id)
+                return
+            except Exception as exc:
+                error = exc
+                if attempt < self.retries:
+                    logger.warning('Storing consultation request for %s failed, retrying', data.get('email'), exc_info=True)
+                    time.sleep(self.retry_delay * 2 ** attempt)
+        cache.delete(key)
+        metrics.CONSULTATIONS.inc(result='failed')
+        logger.error('Dropped consultation request after %d attempts: %s', self.retries + 1,
+                     _lead_json(data, user_id), exc_info=error)
+
+    def _write(self, data: Dict, user_id: Optional[int]) -> ConsultationRequest:
+        close_old_connections()
+        try:
+            return run_write(ConsultationRequest.objects.create, user_id=user_id, **data)
+        finally:
+            close_old_connections()
+
+    def _claim_fingerprint(self, data: Dict) -> Optional[str]:
+        """Return the dedup cache key, or None if an identical submission was seen recently."""
+        key = f'consultation-intake:{submission_fingerprint(data)}'
+        if not cache.add(key, 1, timeout=self.dedup_window):
+            metrics.record_cache('consultation_dedup', hit=True)
+            return None
+        metrics.record_cache('consultation_dedup', hit=False)
+        return key
+
+    def submit(self, data: Dict, user_id: Optional[int] = None) -> str:
+        """
+        Accept a validated submission.
+
+        Args:
+            data: Validated serializer data
+            user_id: ID of the authenticated user, if any
+
+        Returns:
+            QUEUED, or DUPLICATE if the same submission was accepted recently
+
+        Raises:
+            IntakeFull: if the queue is at capacity
+        """
+        key = self._claim_fingerprint(data)
+        if key is None:
+            return DUPLICATE
+
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((dict(data), user_id, key))
+        except queue.Full:
+            # Let the client's retry through instead of reporting it as a duplicate
+            cache.delete(key)
+            raise IntakeFull()
+        return QUEUED
+
+    def submit_sync(self, data: Dict, user_id: Optional[int] = None) -> Optional[ConsultationRequest]:
+        """
+        Deduplicate and write inline.
+
+        Returns:
+            The new consultation request, or None if the same submission was
+            accepted recently
+
+        Raises:
+            Whatever the write raised, after releasing the dedup key
+        """
+        key = self._claim_fingerprint(data)
+        if key is None:
+            return None
+        try:
+            return run_write(ConsultationRequest.objects.create, user_id=user_id, **data)
+        except Exception:
+            cache.delete(key)
+            raise
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+    def drain(self, timeout: Optional[float] = None):
+        """Stop the workers after they finish everything already queued."""
+        if not self._threads:
+            return
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+
+def _lead_json(data: Dict, user_id: Optional[int]) -> str:
+    lead = {name: getattr(value, 'pk', value) for name, value in data.items()}
+    lead['user'] = user_id
+    return json.dumps(lead, default=str)
+
+
+_intake = None
+_intake_lock = threading.Lock()
+
+
+def get_intake() -> ConsultationIntake:
+    global _intake
+    if _intake is None:
+        with _intake_lock:
+            if _intake is None:
+                _intake = ConsultationIntake(
+                    maxsize=getattr(settings, 'CONSULTATION_INTAKE_QUEUE_SIZE', 1000),
+                    workers=getattr(settings, 'CONSULTATION_INTAKE_WORKERS', 1),
+                    dedup_window=getattr(settings, 'CONSULTATION_DEDUP_WINDOW', 600),
+                    retries=getattr(settings, 'CONSULTATION_INTAKE_RETRIES', 3),
+                )
+                atexit.register(_intake.drain, 10)
+    return _intake
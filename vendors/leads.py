@@ -0,0 +1,84 @@
+"""
+Lead work queue for consultation requests.
+
+Staff claim the oldest PENDING requests in batches. A claim moves rows to
+CLAIMED and records who took them, so two people working the queue never get
+the same lead. On databases with ``SKIP LOCKED`` (PostgreSQL) concurrent
+claimers skip each other's locked rows instead of waiting; elsewhere (SQLite)
+the status transition is a compare-and-set, and rows lost to a concurrent
+claimer are replaced from the next candidates.
+"""
+
+from typing import Iterable, List
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import ConsultationRequest
+
+MAX_CLAIM = 100
+
+# Give up topping up a claim after this many rounds of losing races
+_CLAIM_ROUNDS = 3
+
+
+def _pending():
+    # Matches the (status, created_at) index, so picking the next leads stays
+    # an index range scan however many leads are already worked
+    return ConsultationRequest.objects.filter(status='PENDING').order_by('created_at')
+
+
+def claim_leads(user, count: int = 10) -> List[ConsultationRequest]:
+    """
+    Atomically claim up to ``count`` of the oldest PENDING leads for ``user``.
+
+    Returns:
+        The claimed leads, oldest first
+    """
+    count = max(0, min(count, MAX_CLAIM))
+    if not count:
+        return []
+
+    now = timezone.now()
+    claimed_ids = []
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(_pending().select_for_update(skip_locked=True).values_list('id', flat=True)[:count])
+            ConsultationRequest.objects.filter(id__in=ids).update(
+                status='CLAIMED', assigned_to=user, claimed_at=now, updated_at=now,
+            )
+            claimed_ids = ids
+    else:
+        for _ in range(_CLAIM_ROUNDS):
+            wanted = count - len(claimed_ids)
+            candidates = list(_pending().values_list('id', flat=True)[:wanted])
+            if not candidates:
+                break
+            # Only rows still PENDING flip, so a lead taken concurrently is not stolen
+            ConsultationRequest.objects.filter(id__in=candidates, status='PENDING').update(
+                status='CLAIMED', assigned_to=user, claimed_at=now, updated_at=now,
+            )
+            claimed_ids += ConsultationRequest.objects.filter(
+                id__in=candidates, status='CLAIMED', assigned_to=user, claimed_at=now,
+            ).values_list('id', flat=True)
+            if len(claimed_ids) >= count:
+                break
+
+    return list(
+        ConsultationRequest.objects.filter(id__in=claimed_ids)
+        .select_related('vendor', 'model')
+        .order_by('created_at')
+    )
+
+
+def release_leads(user, ids: Iterable[int]) -> int:
+    """
+    Put leads claimed by ``user`` back on the queue.
+
+    Returns:
+        Number of leads released
+    """
+    return ConsultationRequest.objects.filter(id__in=list(ids), status='CLAIMED', assigned_to=user).update(
+        status='PENDING', assigned_to=None, claimed_at=None, updated_at=timezone.now(),
+    )
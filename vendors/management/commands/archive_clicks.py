@@ -0,0 +1,74 @@
+"""
+Management command to archive old affiliate clicks.
+
+Clicks older than CLICK_RETENTION_DAYS are appended to monthly
+clicks-YYYY-MM.jsonl.gz files under CLICK_ARCHIVE_ROOT, added to the daily
+per-vendor rollups and deleted in batches. Run it daily from cron.
+
+Months brought back with restore_clicks are skipped until they are archived
+again with --month.
+
+Usage:
+    python manage.py archive_clicks
+    python manage.py archive_clicks --days 180 --batch-size 2000
+    python manage.py archive_clicks --dry-run
+    python manage.py archive_clicks --month 2025-03
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from vendors import click_archive
+
+
+class Command(BaseCommand):
+    help = 'Move old affiliate clicks into monthly archive files and daily rollups'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None, help='Keep this many days of clicks (default: CLICK_RETENTION_DAYS)')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Clicks archived and deleted per transaction (default: CLICK_ARCHIVE_BATCH_SIZE)',
+        )
+        parser.add_argument(
+            '--month',
+            action='append',
+            default=[],
+            help='Only archive this month (YYYY-MM), also when it was restored; may be repeated',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Only count the clicks that would be archived')
+
+    def handle(self, *args, **options):
+        if options['days'] is not None and options['days'] < 0:
+            raise CommandError('--days cannot be negative')
+        if options['batch_size'] is not None and options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+        try:
+            months = [click_archive.parse_month(month) for month in options['month']]
+        except ValueError as exc:
+            raise CommandError(f'Invalid --month, expected YYYY-MM: {exc}')
+
+        if options['dry_run']:
+            pending = click_archive.pending_counts(options['days'], months=months)
+            for month, count in pending.items():
+                self.stdout.write(f'  {month}: {count} click(s)')
+            self.stdout.write(self.style.SUCCESS(f'✓ {sum(pending.values())} click(s) would be archived'))
+            return
+
+        log = self.stdout.write if options['verbosity'] > 1 else (lambda msg: None)
+        started = time.perf_counter()
+        archived = click_archive.archive_clicks(
+            days=options['days'], batch_size=options['batch_size'], months=months, log=log,
+        )
+        for month, count in archived['months'].items():
+            self.stdout.write(f'  {month}: {count} click(s)')
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ Archived {archived['clicks']} click(s) to {click_archive.get_archive_root()} "
+            f"in {time.perf_counter() - started:.1f}s"
+        ))
+        for month in archived['skipped']:
+            self.stdout.write(self.style.WARNING(
+                f'⚠ {month} is restored and was skipped; archive it again with --month {month}'
+            ))
@@ -0,0 +1,103 @@
+"""
+Management command to benchmark API and admin latency.
+
+Builds a throwaway test database, fills it at each catalogue size and drives
+every endpoint through Django's test client. Your development database is
+never touched.
+
+Usage:
+    python manage.py benchmark_api
+    python manage.py benchmark_api --sizes 10,1000 --iterations 200
+    python manage.py benchmark_api --save-baseline
+"""
+
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from vendors import benchmarks
+from vendors.intake import get_intake
+
+
+class Command(BaseCommand):
+    help = 'Benchmark API endpoints and admin changelists at several catalogue sizes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            default=','.join(str(size) for size in benchmarks.DEFAULT_SIZES),
+            help='Comma-separated catalogue sizes (number of vendors)',
+        )
+        parser.add_argument('--iterations', type=int, default=100, help='Measured requests per scenario')
+        parser.add_argument('--warmup', type=int, default=10, help='Unmeasured requests per scenario')
+        parser.add_argument('--only', action='append', help='Only run this scenario (may be repeated)')
+        parser.add_argument(
+            '--output',
+            default=str(Path(settings.BASE_DIR) / 'benchmarks' / 'latest.json'),
+            help='Where to write the results',
+        )
+        parser.add_argument(
+            '--baseline',
+            default=str(Path(settings.BASE_DIR) / 'benchmarks' / 'baseline.json'),
+            help='Baseline results to compare against',
+        )
+        parser.add_argument('--save-baseline', action='store_true', help='Store these results as the new baseline')
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=benchmarks.DEFAULT_TOLERANCE,
+            help='Allowed relative p95 slowdown before a scenario counts as a regression',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options['sizes'].split(',') if size.strip()]
+        except ValueError:
+            raise CommandError('--sizes must be a comma-separated list of integers')
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            # Benchmark data must not leak into the published catalogue snapshots
+            with override_settings(CATALOGUE_SNAPSHOTS_ON_SAVE=False):
+                results = benchmarks.run_benchmarks(
+                    sizes=sizes,
+                    iterations=options['iterations'],
+                    warmup=options['warmup'],
+                    only=options['only'],
+                    log=self.stdout.write,
+                )
+        finally:
+            # Let queued consultation writes land before the database goes away
+            get_intake().drain(timeout=10)
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        output = Path(options['output'])
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(results, indent=2))
+        self.stdout.write(f'\nResults written to {output}')
+
+        baseline_path = Path(options['baseline'])
+        if options['save_baseline']:
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            baseline_path.write_text(json.dumps(results, indent=2))
+            self.stdout.write(self.style.SUCCESS(f'✓ Baseline saved to {baseline_path}'))
+            return
+
+        if not baseline_path.exists():
+            self.stdout.write(self.style.WARNING('No baseline found; run with --save-baseline to create one'))
+            return
+
+        regressions = benchmarks.compare_to_baseline(
+            results, json.loads(baseline_path.read_text()), tolerance=options['tolerance']
+        )
+        if regressions:
+            for regression in regressions:
+                self.stdout.write(self.style.ERROR(f'  ✗ {regression}'))
+            raise CommandError(f'{len(regressions)} performance regression(s) against {baseline_path}')
+        self.stdout.write(self.style.SUCCESS(f'✓ No regressions against {baseline_path}'))
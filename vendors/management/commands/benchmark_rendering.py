@@ -0,0 +1,46 @@
+"""
+Management command to compare serialization and rendering of the list endpoints.
+
+Builds a throwaway test database with a synthetic catalogue of ``--rows``
+vendors, one model each, and times the vendor and model lists through DRF's
+instance serializers and stock JSON renderer, the ``.values()`` fast path,
+orjson and MessagePack. Your development database is never touched.
+
+Usage:
+    python manage.py benchmark_rendering
+    python manage.py benchmark_rendering --rows 1000 --iterations 20
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from vendors import benchmarks, synthetic
+
+
+class Command(BaseCommand):
+    help = 'Benchmark list serialization and rendering with and without the .values() fast path'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000, help='Vendors (and models) in the catalogue')
+        parser.add_argument('--iterations', type=int, default=5, help='Measured runs per pipeline')
+        parser.add_argument(
+            '--pipeline',
+            action='append',
+            choices=list(benchmarks.RENDERING_PIPELINES),
+            help='Only run this pipeline (may be repeated). Defaults to all pipelines.',
+        )
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with override_settings(CATALOGUE_SNAPSHOTS_ON_SAVE=False):
+                self.stdout.write(f'Populating catalogue with {options["rows"]} vendors...')
+                synthetic.generate_catalogue(vendors=options['rows'], models_per_vendor=1, clicks=0, consultations=0)
+                benchmarks.run_list_rendering(
+                    iterations=options['iterations'], pipelines=options['pipeline'], log=self.stdout.write,
+                )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
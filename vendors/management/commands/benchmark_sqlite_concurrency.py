@@ -0,0 +1,80 @@
+"""
+Management command to compare SQLite write concurrency with and without production mode.
+
+Each mode gets a fresh SQLite file with a small synthetic catalogue, then many
+threads click, submit consultations and list vendors at the same time.
+Your development database is never touched.
+
+Usage:
+    python manage.py benchmark_sqlite_concurrency
+    python manage.py benchmark_sqlite_concurrency --threads 32 --requests 150
+"""
+
+import tempfile
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from core import sqlite
+from vendors import benchmarks, synthetic
+from vendors.models import BuildingSystemVendor
+
+MODES = {
+    'default': {'SQLITE_PRODUCTION_MODE': False},
+    'wal': {'SQLITE_PRODUCTION_MODE': True, 'SQLITE_WRITE_QUEUE': False},
+    'production': {'SQLITE_PRODUCTION_MODE': True, 'SQLITE_WRITE_QUEUE': True},
+}
+
+
+class Command(BaseCommand):
+    help = 'Benchmark concurrent click and consultation writes on SQLite in each deployment mode'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16, help='Concurrent request threads')
+        parser.add_argument('--requests', type=int, default=90, help='Requests per thread')
+        parser.add_argument('--vendors', type=int, default=100, help='Vendors in the synthetic catalogue')
+        parser.add_argument(
+            '--mode',
+            action='append',
+            choices=list(MODES),
+            help='Only run this mode (may be repeated). Defaults to all modes.',
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('The default database is not SQLite')
+
+        setup_test_environment()
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                results = {
+                    mode: self._run_mode(mode, Path(directory) / f'{mode}.sqlite3', options)
+                    for mode in options['mode'] or MODES
+                }
+        finally:
+            teardown_test_environment()
+
+        self.stdout.write(f'\n{"mode":<12} {"errors":>7} {"p50":>9} {"p95":>9} {"p99":>9} {"req/s":>8}')
+        for mode, stats in results.items():
+            line = (f"{mode:<12} {stats['errors']:>7} {stats['p50_ms']:>7.1f}ms {stats['p95_ms']:>7.1f}ms "
+                    f"{stats['p99_ms']:>7.1f}ms {stats['throughput_rps']:>8.1f}")
+            self.stdout.write(self.style.ERROR(line) if stats['errors'] else line)
+
+    def _run_mode(self, mode, path, options):
+        self.stdout.write(f'Running {mode} mode ({options["threads"]} threads)...')
+        # Consultations are written inline so they compete with clicks for the write lock
+        with override_settings(CATALOGUE_SNAPSHOTS_ON_SAVE=False, CONSULTATION_INTAKE_ASYNC=False, **MODES[mode]):
+            connection.settings_dict['TEST']['NAME'] = str(path)
+            old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            try:
+                synthetic.generate_catalogue(vendors=options['vendors'], models_per_vendor=2, clicks=0, consultations=0)
+                vendor_ids = list(BuildingSystemVendor.objects.values_list('pk', flat=True))
+                connection.close()
+                return benchmarks.run_write_concurrency(
+                    vendor_ids, options['threads'], options['requests'], label=mode
+                )
+            finally:
+                sqlite.reset_write_queue()
+                connection.creation.destroy_test_db(old_name, verbosity=0)
@@ -0,0 +1,45 @@
+"""
+Management command to build static catalogue snapshots.
+
+Usage:
+    python manage.py build_catalogue_snapshots
+    python manage.py build_catalogue_snapshots --slice vendors --slice models.category.DOMES
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from vendors import snapshots
+
+
+class Command(BaseCommand):
+    help = 'Build versioned, precompressed JSON snapshots of the vendor and model catalogue'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--slice',
+            action='append',
+            dest='slices',
+            help='Only rebuild this slice (may be repeated). Defaults to all slices.',
+        )
+        parser.add_argument(
+            '--keep',
+            type=int,
+            default=snapshots.VERSIONS_TO_KEEP,
+            help='Number of versions of each slice to keep on disk',
+        )
+
+    def handle(self, *args, **options):
+        slices = options['slices']
+        if slices:
+            unknown = set(slices) - set(snapshots.all_slices())
+            if unknown:
+                raise CommandError(f"Unknown slice(s): {', '.join(sorted(unknown))}")
+
+        manifest = snapshots.build_snapshots(slices, keep=options['keep'])
+
+        for slice_name in sorted(slices or snapshots.all_slices()):
+            entry = manifest[slice_name]
+            self.stdout.write(f"  {slice_name}: {entry['file']} ({entry['bytes']} bytes)")
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\n✓ Snapshots written to {snapshots.get_snapshot_root()}'
+        ))
@@ -0,0 +1,51 @@
+"""
+Management command to rebuild the "similar models" neighbour table.
+
+Saves keep the table current incrementally; a full rebuild also refreshes the
+IDF weights as the catalogue's vocabulary changes. Run it nightly from cron.
+
+Usage:
+    python manage.py build_similar_models
+    python manage.py build_similar_models --k 12 --block-size 256
+    python manage.py build_similar_models --model 42 --model 43
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from vendors import similarity
+
+
+class Command(BaseCommand):
+    help = 'Compute the most similar models of every model for /api/models/<id>/similar/'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--k', type=int, default=None, help='Neighbours per model (default: SIMILAR_MODELS_K)')
+        parser.add_argument(
+            '--block-size',
+            type=int,
+            default=None,
+            help='Rows compared at a time (default: SIMILAR_MODELS_BLOCK_SIZE)',
+        )
+        parser.add_argument(
+            '--model',
+            type=int,
+            action='append',
+            help='Only refresh this model and the lists it enters or leaves (may be repeated)',
+        )
+
+    def handle(self, *args, **options):
+        if options['k'] is not None and options['k'] < 1:
+            raise CommandError('--k must be at least 1')
+        if options['block_size'] is not None and options['block_size'] < 1:
+            raise CommandError('--block-size must be at least 1')
+
+        started = time.perf_counter()
+        if options['model']:
+            result = similarity.refresh_neighbors(options['model'], k=options['k'], block_size=options['block_size'])
+            summary = f"Refreshed {result['models']} model(s), {result['neighbors']} neighbour(s)"
+        else:
+            result = similarity.build_neighbors(k=options['k'], block_size=options['block_size'])
+            summary = (f"Stored {result['neighbors']} neighbour(s) for {result['models']} model(s) "
+                       f"over {result['features']} features")
+        self.stdout.write(self.style.SUCCESS(f'✓ {summary} in {time.perf_counter() - started:.1f}s'))
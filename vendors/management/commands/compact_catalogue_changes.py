@@ -0,0 +1,51 @@
+"""
+Management command to compact the catalogue change log.
+
+Removes delete tombstones older than CATALOGUE_CHANGES_TOMBSTONE_DAYS. Clients
+whose sync token predates a removed tombstone are told to reset on their next
+/api/changes/ request. Run it daily from cron.
+
+Usage:
+    python manage.py compact_catalogue_changes
+    python manage.py compact_catalogue_changes --days 7 --dry-run
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from vendors import changelog
+from vendors.models import CatalogueChange
+
+
+class Command(BaseCommand):
+    help = 'Remove old delete tombstones from the catalogue change log'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=None,
+            help='Keep tombstones younger than this many days (default: CATALOGUE_CHANGES_TOMBSTONE_DAYS)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report what would be removed without deleting anything',
+        )
+
+    def handle(self, *args, **options):
+        if options['days'] is not None and options['days'] < 0:
+            raise CommandError('--days must not be negative')
+
+        result = changelog.compact(days=options['days'], dry_run=options['dry_run'])
+        self.stdout.write(f"  Entries in log: {CatalogueChange.objects.count()}")
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(
+                f"\n⚠ Dry run: {result['removed']} tombstone(s) would be removed"
+            ))
+        elif result['removed']:
+            self.stdout.write(self.style.SUCCESS(
+                f"\n✓ Removed {result['removed']} tombstone(s); tokens below "
+                f"{result['compacted_through']} now reset"
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS('\n✓ Nothing to compact'))
@@ -0,0 +1,56 @@
+"""
+Management command to report near-duplicate vendors and models.
+
+Usage:
+    python manage.py find_duplicates
+    python manage.py find_duplicates --kind vendors --threshold 0.6
+"""
+
+from django.core.management.base import BaseCommand
+from vendors.dedup import MODEL_THRESHOLD, VENDOR_THRESHOLD, build_model_index, build_vendor_index
+from vendors.models import BuildingSystemVendor
+
+
+class Command(BaseCommand):
+    help = 'Report clusters of near-duplicate vendors and models across the catalogue'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--kind',
+            choices=['all', 'vendors', 'models'],
+            default='all',
+            help='Which part of the catalogue to check',
+        )
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            help=f'Similarity threshold between 0 and 1 (defaults: vendors {VENDOR_THRESHOLD}, models {MODEL_THRESHOLD})',
+        )
+
+    def handle(self, *args, **options):
+        kind = options['kind']
+        threshold = options['threshold']
+
+        if kind in ('all', 'vendors'):
+            index = build_vendor_index(threshold=threshold or VENDOR_THRESHOLD)
+            self._report('vendor', index, index.clusters())
+
+        if kind in ('all', 'models'):
+            index = build_model_index(threshold=threshold or MODEL_THRESHOLD)
+            clusters = index.clusters()
+            vendor_ids = {index.group(item_id) for cluster in clusters for item_id, _ in cluster}
+            vendor_names = dict(BuildingSystemVendor.objects.filter(pk__in=vendor_ids).values_list('pk', 'partner_name'))
+            self._report('model', index, clusters, lambda item_id: vendor_names.get(index.group(item_id), ''))
+
+    def _report(self, label, index, clusters, context=None):
+        if not clusters:
+            self.stdout.write(self.style.SUCCESS(f'✓ No duplicate {label}s found among {len(index)}'))
+            return
+
+        self.stdout.write(self.style.WARNING(f'Found {len(clusters)} duplicate {label} cluster(s) among {len(index)}:'))
+        for i, cluster in enumerate(clusters, 1):
+            suffix = f' ({context(cluster[0][0])})' if context else ''
+            self.stdout.write(f'\n{i}.{suffix}')
+            for item_id, score in cluster:
+                self.stdout.write(f'   [{item_id}] {index.label(item_id)} — {score:.0%} similar')
+        self.stdout.write('')
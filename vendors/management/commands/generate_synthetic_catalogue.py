@@ -0,0 +1,55 @@
+"""
+Management command to generate a large synthetic catalogue for load testing.
+
+Usage:
+    python manage.py generate_synthetic_catalogue --vendors 5000 --models-per-vendor 8 --clicks 10000000
+    python manage.py generate_synthetic_catalogue --delete
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from vendors import synthetic
+
+
+class Command(BaseCommand):
+    help = 'Generate synthetic vendors, models, affiliate clicks and consultation requests'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vendors', type=int, default=1000, help='Number of vendors')
+        parser.add_argument('--models-per-vendor', type=int, default=5, help='Models per vendor')
+        parser.add_argument('--clicks', type=int, default=100_000, help='Total affiliate clicks')
+        parser.add_argument('--consultations', type=int, default=10_000, help='Total consultation requests')
+        parser.add_argument('--days', type=int, default=365, help='Days of simulated history')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed')
+        parser.add_argument('--chunk-size', type=int, default=synthetic.CLICK_CHUNK_SIZE, help='Clicks per insert batch')
+        parser.add_argument(
+            '--delete',
+            action='store_true',
+            help='Delete previously generated synthetic data instead of generating more',
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+
+        if options['delete']:
+            removed = synthetic.delete_synthetic()
+            self.stdout.write(self.style.SUCCESS(f'✓ Removed {removed:,} synthetic vendors and their data'))
+            return
+
+        counts = synthetic.generate_catalogue(
+            vendors=options['vendors'],
+            models_per_vendor=options['models_per_vendor'],
+            clicks=options['clicks'],
+            consultations=options['consultations'],
+            days=options['days'],
+            seed=options['seed'],
+            chunk_size=options['chunk_size'],
+            log=self.stdout.write,
+        )
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f'\n✓ Synthetic catalogue generated in {elapsed:.1f}s'))
+        for name, count in counts.items():
+            self.stdout.write(self.style.SUCCESS(f'  Created {count:,} {name}'))
+        self.stdout.write('Bulk inserts skip model signals; run build_catalogue_snapshots to publish the new data.')
@@ -0,0 +1,65 @@
+"""
+Management command to mark affiliate clicks converted from partner postback files.
+
+Each file holds one click id per line, or is a CSV with a click_id (or id)
+column; "-" reads standard input. Files are streamed and applied in chunks,
+so they can be any size, and applying a file twice changes nothing.
+
+Usage:
+    python manage.py ingest_conversions conversions.csv
+    python manage.py ingest_conversions partner-a.txt partner-b.csv --chunk-size 900
+    zcat conversions.csv.gz | python manage.py ingest_conversions -
+"""
+
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from vendors import conversions
+
+
+class Command(BaseCommand):
+    help = 'Mark affiliate clicks converted from files of click ids'
+
+    def add_arguments(self, parser):
+        parser.add_argument('files', nargs='+', help='Conversion files, or - for standard input')
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=None,
+            help='Click ids updated per transaction (default: CLICK_CONVERSION_CHUNK_SIZE)',
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] is not None and options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1')
+
+        failed = False
+        for path in options['files']:
+            started = time.perf_counter()
+            try:
+                if path == '-':
+                    counts = self._apply(sys.stdin, options['chunk_size'])
+                else:
+                    with open(path, newline='', encoding='utf-8-sig') as fh:
+                        counts = self._apply(fh, options['chunk_size'])
+            except (OSError, UnicodeDecodeError, conversions.ConversionFileError) as exc:
+                self.stdout.write(self.style.ERROR(f'✗ {path}: {exc}'))
+                failed = True
+                continue
+
+            self.stdout.write(self.style.SUCCESS(
+                f"✓ {path}: {counts['matched']} matched ({counts['converted']} newly converted, "
+                f"{counts['already_converted']} already), {counts['unmatched']} unmatched "
+                f"in {time.perf_counter() - started:.1f}s"
+            ))
+            if counts['invalid'] or counts['duplicates']:
+                self.stdout.write(self.style.WARNING(
+                    f"⚠ {path}: skipped {counts['invalid']} unreadable row(s) and {counts['duplicates']} repeated id(s)"
+                ))
+
+        if failed:
+            raise CommandError('Some files could not be applied')
+
+    def _apply(self, fh, chunk_size):
+        return conversions.apply_conversions(conversions.read_click_ids(fh), chunk_size=chunk_size)
@@ -0,0 +1,59 @@
+"""
+Management command to (re)run the GLB ingest stage.
+
+Records metadata and builds LOD variants for models whose 3D file has not
+been ingested yet, or for every model with a file when --force is given.
+
+Usage:
+    python manage.py ingest_model_assets
+    python manage.py ingest_model_assets --model 12 --force
+    python manage.py ingest_model_assets --metadata-only --workers 4
+"""
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from vendors import asset_ingest
+from vendors.models import ModelVendor
+
+
+class Command(BaseCommand):
+    help = 'Read GLB metadata and build level-of-detail variants for model files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', type=int, action='append', dest='models', help='Only this model ID (may be repeated)')
+        parser.add_argument('--force', action='store_true', help='Re-ingest files that were already processed')
+        parser.add_argument('--metadata-only', action='store_true', help='Skip building LOD variants')
+        parser.add_argument('--workers', type=int, default=None, help='gltfpack processes (default: GLB_LOD_WORKERS)')
+
+    def handle(self, *args, **options):
+        models = ModelVendor.objects.exclude(glb_file='').exclude(glb_file__isnull=True).order_by('pk')
+        if options['models']:
+            models = models.filter(pk__in=options['models'])
+        if not options['force']:
+            models = [model for model in models if asset_ingest.needs_ingest(model)]
+
+        build_lods = not options['metadata_only']
+        if build_lods and not asset_ingest.gltfpack_path():
+            self.stdout.write(self.style.WARNING('⚠ gltfpack not found, recording metadata only'))
+            build_lods = False
+
+        ingested = failed = 0
+        with ProcessPoolExecutor(max_workers=options['workers'], mp_context=multiprocessing.get_context('spawn')) as pool:
+            for model in models:
+                model = asset_ingest.ingest_model(model.pk, lods=build_lods, pool=pool)
+                if model is None:
+                    continue
+                metadata = model.glb_metadata
+                if 'error' in metadata:
+                    failed += 1
+                    self.stdout.write(self.style.ERROR(f"  ✗ {model}: {metadata['error']}"))
+                    continue
+                ingested += 1
+                lods = ', '.join(f"{level} {lod['triangles']:,}" for level, lod in model.glb_lods.items()) or 'no LODs'
+                self.stdout.write(f"  {model}: {metadata['triangles']:,} triangles ({lods})")
+
+        self.stdout.write(self.style.SUCCESS(f'\n✓ Ingested {ingested} model file(s)'))
+        if failed:
+            self.stdout.write(self.style.WARNING(f'⚠ {failed} file(s) could not be read'))
@@ -0,0 +1,52 @@
+"""
+Management command to (re)run the gallery image ingest stage.
+
+Downloads the images listed on each model into local storage and renders
+their responsive derivatives. Images that were already processed (or failed)
+are skipped unless --force is given.
+
+Usage:
+    python manage.py ingest_model_images
+    python manage.py ingest_model_images --model 12 --force
+    python manage.py ingest_model_images --workers 8
+"""
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from vendors import image_ingest
+from vendors.models import ModelVendor
+
+
+class Command(BaseCommand):
+    help = 'Download model gallery images and render thumbnail, card and hero derivatives'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', type=int, action='append', dest='models', help='Only this model ID (may be repeated)')
+        parser.add_argument('--force', action='store_true', help='Re-render images that were already processed or failed')
+        parser.add_argument('--workers', type=int, default=None, help='Rendering processes (default: IMAGE_INGEST_WORKERS)')
+
+    def handle(self, *args, **options):
+        models = ModelVendor.objects.order_by('pk')
+        if options['models']:
+            models = models.filter(pk__in=options['models'])
+
+        processed = failed = 0
+        with ProcessPoolExecutor(max_workers=options['workers'], mp_context=multiprocessing.get_context('spawn')) as pool:
+            for pk in models.values_list('pk', flat=True):
+                model = image_ingest.ingest_model_images(pk, pool=pool, force=options['force'])
+                if model is None:
+                    continue
+                gallery = list(model.gallery.all())
+                errors = [image for image in gallery if image.error]
+                processed += len(gallery) - len(errors)
+                failed += len(errors)
+                for image in errors:
+                    self.stdout.write(self.style.ERROR(f'  ✗ {model.model_name}: {image.source_url or image.original.name}: {image.error}'))
+                if gallery:
+                    self.stdout.write(f'  {model.model_name}: {len(gallery) - len(errors)}/{len(gallery)} image(s)')
+
+        self.stdout.write(self.style.SUCCESS(f'\n✓ {processed} image(s) ready'))
+        if failed:
+            self.stdout.write(self.style.WARNING(f'⚠ {failed} image(s) could not be processed'))
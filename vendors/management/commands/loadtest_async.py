@@ -0,0 +1,92 @@
+"""
+Management command to load test the async read endpoints against the sync viewsets.
+
+By default requests go through the ASGI application in-process against a
+throwaway test database, so no server is needed and your development database
+is never touched. Pass --url to load a running ASGI server instead (e.g.
+``uvicorn gbsi.asgi:application``); it is assumed to serve the same database.
+
+Usage:
+    python manage.py loadtest_async
+    python manage.py loadtest_async --concurrency 10,100,1000 --client-delay 0.05
+    python manage.py loadtest_async --url http://127.0.0.1:8000 --only model-list
+"""
+
+import asyncio
+import random
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from vendors import benchmarks
+from vendors.models import ModelVendor
+
+
+def _scenarios(model_id):
+    return [
+        ('vendor-list', '/api/vendors/', '/api/async/vendors/'),
+        ('model-list', '/api/models/', '/api/async/models/'),
+        ('model-detail', f'/api/models/{model_id}/', f'/api/async/models/{model_id}/'),
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Compare the sync and async vendor/model endpoints under many concurrent (slow) clients'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', default='10,100,1000', help='Comma-separated numbers of concurrent clients')
+        parser.add_argument('--requests', type=int, default=2000, help='Requests per endpoint and concurrency level')
+        parser.add_argument(
+            '--client-delay',
+            type=float,
+            default=0.0,
+            help='Seconds each client takes to read a response chunk, to simulate slow networks',
+        )
+        parser.add_argument('--vendors', type=int, default=200, help='Vendors in the test catalogue (in-process only)')
+        parser.add_argument('--url', help='Base URL of a running ASGI server to load instead of the in-process app')
+        parser.add_argument('--no-cache', action='store_true', help='Disable the async endpoints\' response cache')
+        parser.add_argument('--only', action='append', help='Only run this scenario (may be repeated)')
+
+    def handle(self, *args, **options):
+        try:
+            levels = [int(level) for level in options['concurrency'].split(',') if level.strip()]
+        except ValueError:
+            raise CommandError('--concurrency must be a comma-separated list of integers')
+
+        overrides = {'ASYNC_API_CACHE_TIMEOUT': 0} if options['no_cache'] else {}
+        if options['url']:
+            model_id = ModelVendor.objects.values_list('pk', flat=True).first()
+            if model_id is None:
+                raise CommandError('The database has no models to request')
+            with override_settings(**overrides):
+                self._run(levels, _scenarios(model_id), options, app=None)
+            return
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with override_settings(CATALOGUE_SNAPSHOTS_ON_SAVE=False, ALLOWED_HOSTS=['localhost'], **overrides):
+                self.stdout.write(f'Populating catalogue with {options["vendors"]} vendors...')
+                _, model_ids = benchmarks.populate_catalogue(options['vendors'])
+                self._run(levels, _scenarios(random.Random(0).choice(model_ids)), options, app=ASGIHandler())
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    def _run(self, levels, scenarios, options, app):
+        self.stdout.write(f'\n{"scenario":<14} {"view":<6} {"clients":>7} {"errors":>7} '
+                          f'{"p50":>10} {"p95":>10} {"p99":>10} {"req/s":>9}')
+        for name, sync_url, async_url in scenarios:
+            if options['only'] and name not in options['only']:
+                continue
+            for level in levels:
+                for kind, url in (('sync', sync_url), ('async', async_url)):
+                    stats = asyncio.run(benchmarks.run_load(
+                        url, level, options['requests'], options['client_delay'],
+                        app=app, base_url=options['url'],
+                    ))
+                    line = (f"{name:<14} {kind:<6} {level:>7} {stats['errors']:>7} {stats['p50_ms']:>8.1f}ms "
+                            f"{stats['p95_ms']:>8.1f}ms {stats['p99_ms']:>8.1f}ms {stats['throughput_rps']:>9.1f}")
+                    self.stdout.write(self.style.ERROR(line) if stats['errors'] else line)
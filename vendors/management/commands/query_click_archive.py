@@ -0,0 +1,54 @@
+"""
+Management command to read an archived month of affiliate clicks without restoring it.
+
+Prints the clicks as JSON lines, or with --summary the clicks and
+conversions per vendor.
+
+Usage:
+    python manage.py query_click_archive 2025-03 > clicks-2025-03.jsonl
+    python manage.py query_click_archive 2025-03 --vendor 12 --converted
+    python manage.py query_click_archive 2025-03 --summary
+"""
+
+import json
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+from vendors import click_archive
+
+
+class Command(BaseCommand):
+    help = 'Print the archived affiliate clicks of a month'
+
+    def add_arguments(self, parser):
+        parser.add_argument('month', help='Archived month, YYYY-MM')
+        parser.add_argument('--vendor', type=int, default=None, help='Only clicks on this vendor ID')
+        parser.add_argument('--converted', action='store_true', help='Only converted clicks')
+        parser.add_argument('--summary', action='store_true', help='Print clicks and conversions per vendor instead of the clicks')
+
+    def handle(self, *args, **options):
+        try:
+            month = click_archive.parse_month(options['month'])
+        except ValueError:
+            raise CommandError(f"Invalid month '{options['month']}', expected YYYY-MM")
+        if click_archive.archived_file(month) is None:
+            raise CommandError(f'No archive for {month:%Y-%m}')
+
+        rows = click_archive.read_month(
+            month, vendor_id=options['vendor'], converted=True if options['converted'] else None,
+        )
+        if not options['summary']:
+            for row in rows:
+                self.stdout.write(json.dumps({**row, 'timestamp': row['timestamp'].isoformat()}))
+            return
+
+        totals = defaultdict(lambda: [0, 0])
+        for row in rows:
+            totals[row['vendor_id']][0] += 1
+            totals[row['vendor_id']][1] += row['converted']
+        self.stdout.write(f"{'vendor':>8}  {'clicks':>8}  {'conversions':>11}")
+        for vendor_id, (clicks, conversions) in sorted(totals.items()):
+            self.stdout.write(f'{vendor_id:>8}  {clicks:>8}  {conversions:>11}')
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {sum(t[0] for t in totals.values())} click(s) archived for {month:%Y-%m}'
+        ))
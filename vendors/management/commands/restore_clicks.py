@@ -0,0 +1,38 @@
+"""
+Management command to put an archived month of affiliate clicks back into the database.
+
+Restored clicks are taken out of the daily rollups again. archive_clicks
+skips a restored month until it is archived again explicitly with
+archive_clicks --month YYYY-MM.
+
+Usage:
+    python manage.py restore_clicks 2025-03
+    python manage.py restore_clicks 2025-03 --vendor 12
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from vendors import click_archive
+
+
+class Command(BaseCommand):
+    help = 'Restore an archived month of affiliate clicks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('month', help='Month to restore, YYYY-MM')
+        parser.add_argument('--vendor', type=int, default=None, help='Only restore clicks on this vendor ID')
+
+    def handle(self, *args, **options):
+        try:
+            month = click_archive.parse_month(options['month'])
+        except ValueError:
+            raise CommandError(f"Invalid month '{options['month']}', expected YYYY-MM")
+        if click_archive.archived_file(month) is None:
+            raise CommandError(f'No archive for {month:%Y-%m}')
+
+        counts = click_archive.restore_month(month, vendor_id=options['vendor'])
+        self.stdout.write(self.style.SUCCESS(f"✓ Restored {counts['restored']} click(s) of {month:%Y-%m}"))
+        self.stdout.write(f'  archive_clicks skips {month:%Y-%m} until run with --month {month:%Y-%m}')
+        if counts['present']:
+            self.stdout.write(f"  {counts['present']} click(s) were already in the database")
+        if counts['orphaned']:
+            self.stdout.write(self.style.WARNING(f"⚠ {counts['orphaned']} click(s) belong to deleted vendors and were skipped"))
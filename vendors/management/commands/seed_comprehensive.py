@@ -4,8 +4,9 @@ This script includes predefined models based on research for each vendor.
 """
 
 from django.core.management.base import BaseCommand
+from vendors.dedup import build_model_index, build_vendor_index
+from vendors.ingest import create_suggested_models, create_vendor
 from vendors.models import BuildingSystemVendor, ModelVendor
-from django.utils.text import slugify
 
 
 # Realistic model data for key vendors
@@ -531,33 +532,34 @@ class Command(BaseCommand):
         vendor_count = 0
         model_count = 0
         
+        vendor_index = build_vendor_index()
+        model_index = build_model_index()
         for vendor_data in vendors_data:
-            # Check if vendor exists
-            vendor, created = BuildingSystemVendor.objects.get_or_create(
-                partner_name=vendor_data['partner_name'],
-                defaults=vendor_data
-            )
-            
-            if created:
-                vendor_count += 1
-                self.stdout.write(self.style.SUCCESS(f"✓ Created vendor: {vendor.partner_name}"))
-                
-                # Add models if we have predefined data
-                if vendor.partner_name in VENDOR_MODELS:
-                    for model_data in VENDOR_MODELS[vendor.partner_name]:
-                        slug = slugify(model_data['model_name'])
-                        model, model_created = ModelVendor.objects.get_or_create(
-                            slug=slug,
-                            defaults={
-                                'vendor': vendor,
-                                **model_data
-                            }
-                        )
-                        if model_created:
-                            model_count += 1
-                            self.stdout.write(f"  ✓ Created model: {model.model_name}")
-            else:
-                self.stdout.write(self.style.WARNING(f"Vendor '{vendor.partner_name}' already exists"))
+            # Create vendor unless it (or a near-duplicate of it) already exists
+            vendor, match = create_vendor(vendor_data, index=vendor_index)
+            if match:
+                match_id, score = match
+                self.stdout.write(self.style.WARNING(
+                    f"Vendor '{vendor_data['partner_name']}' matches existing vendor "
+                    f"'{vendor_index.label(match_id)}' ({score:.0%} similar), skipping"
+                ))
+                continue
+
+            vendor_count += 1
+            self.stdout.write(self.style.SUCCESS(f"✓ Created vendor: {vendor.partner_name}"))
+
+            # Add models if we have predefined data, skipping near-duplicates
+            models_data = VENDOR_MODELS.get(vendor.partner_name, [])
+            created, skipped = create_suggested_models(vendor, models_data, index=model_index)
+            for model_data, reason in skipped:
+                self.stdout.write(self.style.WARNING(f"  ⚠ {model_data['model_name']}: {reason}, skipping"))
+            featured = {model_data['model_name'] for model_data in models_data if model_data.get('is_featured')}
+            for model in created:
+                if model.model_name in featured:
+                    model.is_featured = True
+                    model.save(update_fields=['is_featured'])
+                model_count += 1
+                self.stdout.write(f"  ✓ Created model: {model.model_name}")
         
         self.stdout.write(self.style.SUCCESS(f'\n✓ Seeding complete!'))
         self.stdout.write(self.style.SUCCESS(f'  Created {vendor_count} vendors'))
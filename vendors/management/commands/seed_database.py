@@ -4,10 +4,10 @@ Seeds vendors from the provided spreadsheet data and uses AI to generate models.
 """
 
 from django.core.management.base import BaseCommand
-from vendors.models import BuildingSystemVendor, ModelVendor
-from vendors.ai_service import ModelSuggestionService
-from django.utils.text import slugify
-import time
+from vendors import enrichment
+from vendors.models import BuildingSystemVendor, EnrichmentJob
+from vendors.dedup import build_model_index, build_vendor_index
+from vendors.ingest import create_vendor
 
 
 class Command(BaseCommand):
@@ -242,53 +242,50 @@ class Command(BaseCommand):
         
         # Process vendors
         created_count = 0
+        vendor_index = build_vendor_index()
+        model_index = build_model_index()
+        created_ids, matched_ids = [], []
         for i, vendor_data in enumerate(vendors_data):
             if limit and i >= limit:
                 break
                 
-            # Check if vendor already exists
-            if BuildingSystemVendor.objects.filter(partner_name=vendor_data['partner_name']).exists():
-                self.stdout.write(self.style.WARNING(f"Vendor '{vendor_data['partner_name']}' already exists, skipping"))
+            # Create vendor unless it (or a near-duplicate of it) already exists
+            vendor, match = create_vendor(vendor_data, index=vendor_index)
+            if match:
+                match_id, score = match
+                matched_ids.append(match_id)
+                self.stdout.write(self.style.WARNING(
+                    f"Vendor '{vendor_data['partner_name']}' matches existing vendor "
+                    f"'{vendor_index.label(match_id)}' ({score:.0%} similar), skipping"
+                ))
                 continue
             
-            # Create vendor
-            vendor = BuildingSystemVendor.objects.create(**vendor_data)
+            created_ids.append(vendor.pk)
             created_count += 1
             self.stdout.write(self.style.SUCCESS(f"✓ Created vendor: {vendor.partner_name}"))
             
-            # Generate models with AI (unless vendors-only flag is set)
-            if not vendors_only and vendor.website_url:
-                self.stdout.write(f"  Generating models for {vendor.partner_name}...")
-                try:
-                    service = ModelSuggestionService()
-                    suggestions = service.suggest_models(
-                        vendor_name=vendor.partner_name,
-                        website_url=vendor.website_url
-                    )
-                    
-                    model_count = 0
-                    for model_data in suggestions:
-                        slug = slugify(model_data['model_name'])
-                        
-                        # Check if model already exists
-                        if not ModelVendor.objects.filter(slug=slug).exists():
-                            ModelVendor.objects.create(
-                                vendor=vendor,
-                                model_name=model_data['model_name'],
-                                slug=slug,
-                                description=model_data['description'],
-                                price_range=model_data.get('price_range', ''),
-                                specifications=model_data.get('specifications', {}),
-                                is_featured=False
-                            )
-                            model_count += 1
-                    
-                    self.stdout.write(self.style.SUCCESS(f"  ✓ Created {model_count} models"))
-                    
-                    # Rate limiting to avoid API throttling
-                    time.sleep(2)
-                    
-                except Exception as e:
-                    self.stdout.write(self.style.ERROR(f"  ✗ Error generating models: {e}"))
+        
+        # Generate models with AI (unless vendors-only flag is set). Progress is
+        # kept in the enrichment journal, so a rerun resumes with the vendors
+        # whose models were not generated yet instead of skipping them
+        if not vendors_only:
+            enrichment.enqueue(BuildingSystemVendor.objects.filter(pk__in=created_ids, website_url__gt=''))
+            jobs = EnrichmentJob.objects.filter(vendor_id__in=created_ids + matched_ids)
+            counts = enrichment.run_jobs(jobs, index=model_index, report=self._report_models)
+            if counts['failed']:
+                self.stdout.write(self.style.WARNING(
+                    "⚠ Some vendors have no models yet; run 'python manage.py suggest_models --all --auto-create' to retry them"
+                ))
         
         self.stdout.write(self.style.SUCCESS(f'\n✓ Seeding complete! Created {created_count} vendors'))
+    
+    def _report_models(self, job, result):
+        vendor = job.vendor.partner_name
+        if job.status == enrichment.FAILED:
+            self.stdout.write(self.style.ERROR(
+                f"  ✗ Error generating models for {vendor} (attempt {job.attempts}): {job.last_error}"
+            ))
+            return
+        for model_data, reason in result['skipped']:
+            self.stdout.write(self.style.WARNING(f"  ⚠ {model_data['model_name']}: {reason}, skipping"))
+        self.stdout.write(self.style.SUCCESS(f"  ✓ Created {len(result['created'])} models for {vendor}"))
@@ -1,29 +1,65 @@
 """
 Management command to suggest models for a vendor using AI.
 
+With --all or --category, every vendor in scope that has no models yet is
+enriched through the enrichment journal (vendors.enrichment): vendors already
+done are skipped, so an interrupted run resumes where it stopped, and failed
+vendors are retried with backoff. Without --auto-create it only shows what
+would be done.
+
 Usage:
     python manage.py suggest_models <vendor_id>
     python manage.py suggest_models <vendor_id> --auto-create
+    python manage.py suggest_models --all --auto-create
+    python manage.py suggest_models --category DOMES --auto-create --no-wait
+    python manage.py suggest_models --all --auto-create --reset-failed
 """
 
-from django.core.management.base import BaseCommand
-from vendors.models import BuildingSystemVendor, ModelVendor
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from vendors import enrichment
+from vendors.models import BuildingSystemVendor, EnrichmentJob
 from vendors.ai_service import ModelSuggestionService
-from django.utils.text import slugify
+from vendors.dedup import build_model_index
+from vendors.ingest import create_suggested_models
 
 
 class Command(BaseCommand):
     help = 'Suggest building models for a vendor using AI'
 
     def add_arguments(self, parser):
-        parser.add_argument('vendor_id', type=int, help='ID of the vendor')
+        parser.add_argument('vendor_id', type=int, nargs='?', help='ID of the vendor')
+        parser.add_argument('--all', action='store_true', help='Every vendor without models, resuming from the journal')
+        parser.add_argument(
+            '--category',
+            choices=[category for category, _ in BuildingSystemVendor.CATEGORY_CHOICES],
+            help='Vendors of this category without models, resuming from the journal',
+        )
         parser.add_argument(
             '--auto-create',
             action='store_true',
             help='Automatically create the suggested models in the database',
         )
+        parser.add_argument(
+            '--no-wait',
+            action='store_true',
+            help='Leave failed vendors for the next run instead of waiting out their backoff',
+        )
+        parser.add_argument(
+            '--reset-failed',
+            action='store_true',
+            help='Give vendors that used up their attempts a fresh set',
+        )
 
     def handle(self, *args, **options):
+        batch = options['all'] or options['category']
+        if options['vendor_id'] is not None and batch:
+            raise CommandError('Give either a vendor ID or --all/--category, not both')
+        if options['vendor_id'] is None and not batch:
+            raise CommandError('Give a vendor ID, --all or --category')
+        if batch:
+            return self.handle_batch(options)
+
         vendor_id = options['vendor_id']
         auto_create = options['auto_create']
         
@@ -54,26 +90,56 @@ class Command(BaseCommand):
             self.stdout.write(f"   Description: {model_data['description']}")
             self.stdout.write(f"   Price Range: {model_data.get('price_range', 'N/A')}")
             self.stdout.write(f"   Specifications: {model_data.get('specifications', {})}")
-            
-            if auto_create:
-                # Create the model
-                slug = slugify(model_data['model_name'])
-                
-                # Check if model with this slug already exists
-                if ModelVendor.objects.filter(slug=slug).exists():
-                    self.stdout.write(self.style.WARNING(f"   ⚠ Model with slug '{slug}' already exists, skipping"))
-                    continue
-                
-                model = ModelVendor.objects.create(
-                    vendor=vendor,
-                    model_name=model_data['model_name'],
-                    slug=slug,
-                    description=model_data['description'],
-                    price_range=model_data.get('price_range', ''),
-                    specifications=model_data.get('specifications', {}),
-                    is_featured=False
-                )
-                self.stdout.write(self.style.SUCCESS(f"   ✓ Created model: {model.model_name}"))
         
-        if not auto_create:
+        if auto_create:
+            self.stdout.write('')
+            created, skipped = create_suggested_models(vendor, suggestions)
+            for model_data, reason in skipped:
+                self.stdout.write(self.style.WARNING(f"   ⚠ {model_data['model_name']}: {reason}, skipping"))
+            for model in created:
+                self.stdout.write(self.style.SUCCESS(f"   ✓ Created model: {model.model_name}"))
+        else:
             self.stdout.write(self.style.WARNING('\n\nTo automatically create these models, run with --auto-create flag'))
+
+    def handle_batch(self, options):
+        vendors = BuildingSystemVendor.objects.all()
+        if options['category']:
+            vendors = vendors.filter(primary_category=options['category'])
+        jobs = EnrichmentJob.objects.filter(vendor__in=vendors)
+
+        if not options['auto_create']:
+            new = enrichment.unjournaled_vendors(vendors).count()
+            by_status = dict(jobs.values_list('status').annotate(count=Count('id')).order_by())
+            self.stdout.write(f'Vendors without models and not yet journaled: {new}')
+            for status, label in EnrichmentJob.STATUS_CHOICES:
+                self.stdout.write(f'{label}: {by_status.get(status, 0)}')
+            self.stdout.write(f'Due now: {enrichment.due_jobs(jobs).count()}')
+            self.stdout.write(self.style.WARNING('\nTo generate and create the models, run with --auto-create flag'))
+            return
+
+        if options['reset_failed']:
+            self.stdout.write(f'Reset {enrichment.reset_failed(jobs)} failed vendor(s)')
+        added = enrichment.enqueue(enrichment.unjournaled_vendors(vendors))
+        self.stdout.write(f'Added {added} vendor(s) to the journal; {enrichment.due_jobs(jobs).count()} due now')
+
+        counts = enrichment.run_jobs(
+            jobs, wait=not options['no_wait'], index=build_model_index(), report=self._report,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"\n✓ {counts['done']} vendor(s) done, {counts['failed']} failed attempt(s)"
+        ))
+        waiting = enrichment.next_retry_at(jobs)
+        if waiting:
+            self.stdout.write(self.style.WARNING(f'⚠ Failed vendors are due again from {waiting:%Y-%m-%d %H:%M:%S}; rerun to retry them'))
+        exhausted = jobs.filter(status=enrichment.FAILED, attempts__gte=enrichment.max_attempts()).count()
+        if exhausted:
+            self.stdout.write(self.style.ERROR(f'✗ {exhausted} vendor(s) used up their attempts; rerun with --reset-failed to try again'))
+
+    def _report(self, job, result):
+        vendor = job.vendor.partner_name
+        if job.status == enrichment.FAILED:
+            self.stdout.write(self.style.ERROR(f'✗ {vendor} (attempt {job.attempts}): {job.last_error}'))
+            return
+        for model_data, reason in result['skipped']:
+            self.stdout.write(self.style.WARNING(f"   ⚠ {model_data['model_name']}: {reason}, skipping"))
+        self.stdout.write(self.style.SUCCESS(f"✓ {vendor}: created {len(result['created'])} model(s)"))
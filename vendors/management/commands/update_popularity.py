@@ -0,0 +1,50 @@
+"""
+Management command to update the popularity scores behind ?ordering=popular.
+
+By default only clicks and consultations recorded since the last run are
+added; run it from cron every few minutes. --rebuild recounts all history,
+e.g. after changing POPULARITY_HALF_LIFE_DAYS or the weights.
+
+Usage:
+    python manage.py update_popularity
+    python manage.py update_popularity --rebuild
+    python manage.py update_popularity --batch-size 50000 --verbosity 2
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from vendors import popularity
+
+
+class Command(BaseCommand):
+    help = 'Add new affiliate clicks and consultations to the time-decayed popularity scores'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help='Recount every click and consultation from scratch')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Events read per batch (default: POPULARITY_BATCH_SIZE)',
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] is not None and options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+        log = self.stdout.write if options['verbosity'] > 1 else (lambda msg: None)
+
+        started = time.perf_counter()
+        if options['rebuild']:
+            counted = popularity.rebuild_scores(batch_size=options['batch_size'], log=log)
+            action = 'Rebuilt scores from'
+        else:
+            try:
+                counted = popularity.update_scores(batch_size=options['batch_size'], log=log)
+            except popularity.HalfLifeChanged as exc:
+                raise CommandError(f'{exc}; run with --rebuild')
+            action = 'Added'
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ {action} {counted['clicks']} click(s) and {counted['consultations']} consultation(s) "
+            f"in {time.perf_counter() - started:.1f}s"
+        ))
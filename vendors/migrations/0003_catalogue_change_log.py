@@ -0,0 +1,55 @@
+# Generated by Django 4.2.26 on 2026-10-19 18:29
+
+from django.db import migrations, models
+
+
+def seed_change_log(apps, schema_editor):
+    # Existing rows get an entry each, so a sync from zero returns the whole catalogue
+    BuildingSystemVendor = apps.get_model('vendors', 'BuildingSystemVendor')
+    ModelVendor = apps.get_model('vendors', 'ModelVendor')
+    CatalogueChange = apps.get_model('vendors', 'CatalogueChange')
+    entries = [
+        CatalogueChange(object_type='vendor', object_id=pk, op='upsert')
+        for pk in BuildingSystemVendor.objects.order_by('pk').values_list('pk', flat=True)
+    ] + [
+        CatalogueChange(object_type='model', object_id=pk, op='upsert')
+        for pk in ModelVendor.objects.order_by('pk').values_list('pk', flat=True)
+    ]
+    CatalogueChange.objects.bulk_create(entries, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendors', '0002_consultation_lead_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogueChangeCompaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('compacted_through', models.BigIntegerField()),
+                ('tombstones_removed', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-compacted_through'],
+            },
+        ),
+        migrations.CreateModel(
+            name='CatalogueChange',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('object_type', models.CharField(choices=[('vendor', 'Vendor'), ('model', 'Model')], max_length=10)),
+                ('object_id', models.PositiveIntegerField()),
+                ('op', models.CharField(choices=[('upsert', 'Created or updated'), ('delete', 'Deleted')], max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['object_type', 'object_id'], name='catalogue_change_object'), models.Index(fields=['op', 'created_at'], name='catalogue_change_op_created')],
+            },
+        ),
+        migrations.RunPython(seed_change_log, migrations.RunPython.noop),
+    ]
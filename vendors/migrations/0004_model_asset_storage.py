@@ -0,0 +1,19 @@
+# Generated by Django 4.2.26 on 2026-10-19 18:31
+
+from django.db import migrations, models
+import vendors.assets
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendors', '0003_catalogue_change_log'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='modelvendor',
+            name='glb_file',
+            field=models.FileField(blank=True, null=True, storage=vendors.assets.get_model_asset_storage, upload_to='models_3d/'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.26 on 2026-10-19 18:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendors', '0004_model_asset_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='modelvendor',
+            name='glb_lods',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Simplified variants of the GLB file by detail level'),
+        ),
+        migrations.AddField(
+            model_name='modelvendor',
+            name='glb_metadata',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Triangle count, bounding box and texture sizes of the GLB file'),
+        ),
+    ]
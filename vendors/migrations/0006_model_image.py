@@ -0,0 +1,37 @@
+# Generated by Django 4.2.26 on 2026-10-19 18:37
+
+from django.db import migrations, models
+import django.db.models.deletion
+import vendors.assets
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendors', '0005_glb_metadata'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ModelImage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveSmallIntegerField(default=0)),
+                ('source_url', models.URLField(blank=True, help_text='Remote image this copy was downloaded from', max_length=500)),
+                ('original', models.FileField(blank=True, storage=vendors.assets.get_model_image_storage, upload_to='model_images/')),
+                ('width', models.PositiveIntegerField(blank=True, editable=False, null=True)),
+                ('height', models.PositiveIntegerField(blank=True, editable=False, null=True)),
+                ('blurhash', models.CharField(blank=True, editable=False, max_length=64)),
+                ('color', models.CharField(blank=True, editable=False, help_text='Average colour, for placeholders', max_length=7)),
+                ('derivatives', models.JSONField(blank=True, default=dict, editable=False, help_text='Resized files by size and MIME type')),
+                ('error', models.CharField(blank=True, editable=False, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('model', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='gallery', to='vendors.modelvendor')),
+            ],
+            options={
+                'verbose_name': 'Model Image',
+                'verbose_name_plural': 'Model Images',
+                'ordering': ['position', 'id'],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.26 on 2026-10-19 18:48
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendors', '0006_model_image'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimilarModel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField(help_text='Cosine similarity, 0-1')),
+                ('model', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_models', to='vendors.modelvendor')),
+                ('similar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='neighbor_of', to='vendors.modelvendor')),
+            ],
+            options={
+                'ordering': ['model', 'rank'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='similarmodel',
+            constraint=models.UniqueConstraint(fields=('model', 'rank'), name='unique_similar_model_rank'),
+        ),
+    ]
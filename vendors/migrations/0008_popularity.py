@@ -0,0 +1,42 @@
+# Generated by Django 4.2.26 on 2026-10-19 18:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendors', '0007_similar_models'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PopularityState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('landmark', models.DateTimeField()),
+                ('half_life_days', models.FloatField()),
+                ('last_click_id', models.BigIntegerField(default=0)),
+                ('last_consultation_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='buildingsystemvendor',
+            name='popularity',
+            field=models.FloatField(default=0, editable=False, help_text='Forward-decayed activity score, see vendors.popularity'),
+        ),
+        migrations.AddField(
+            model_name='modelvendor',
+            name='popularity',
+            field=models.FloatField(default=0, editable=False, help_text='Forward-decayed activity score, see vendors.popularity'),
+        ),
+        migrations.AddIndex(
+            model_name='buildingsystemvendor',
+            index=models.Index(fields=['-popularity', 'id'], name='vendor_popularity'),
+        ),
+        migrations.AddIndex(
+            model_name='modelvendor',
+            index=models.Index(fields=['-popularity', 'id'], name='model_popularity'),
+        ),
+    ]
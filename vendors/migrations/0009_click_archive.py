@@ -0,0 +1,44 @@
+# Generated by Django 4.2.26 on 2026-10-19 18:58
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendors', '0008_popularity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClickArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month', unique=True)),
+                ('path', models.CharField(max_length=255)),
+                ('clicks', models.PositiveIntegerField(default=0, help_text='Clicks archived, less those restored')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-month'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ClickDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('clicks', models.PositiveIntegerField(default=0)),
+                ('conversions', models.PositiveIntegerField(default=0)),
+                ('vendor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='click_rollups', to='vendors.buildingsystemvendor')),
+            ],
+            options={
+                'ordering': ['-date', 'vendor'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='clickdailyrollup',
+            constraint=models.UniqueConstraint(fields=('date', 'vendor'), name='unique_click_rollup_day'),
+        ),
+    ]
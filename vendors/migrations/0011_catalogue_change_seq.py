@@ -0,0 +1,36 @@
+# Generated by Django 4.2.26 on 2026-10-19 19:20
+
+from django.db import migrations, models
+from django.db.models import F, Max
+
+
+def sequence_existing(apps, schema_editor):
+    # Entries keep their id as sequence number, so existing sync tokens stay valid
+    CatalogueChange = apps.get_model('vendors', 'CatalogueChange')
+    CatalogueChangeSequence = apps.get_model('vendors', 'CatalogueChangeSequence')
+    CatalogueChange.objects.update(seq=F('id'))
+    last = CatalogueChange.objects.aggregate(last=Max('id'))['last'] or 0
+    CatalogueChangeSequence.objects.create(pk=1, last=last)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendors', '0010_enrichment_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogueChangeSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='cataloguechange',
+            name='seq',
+            field=models.BigIntegerField(blank=True, null=True, unique=True),
+        ),
+        migrations.RunPython(sequence_existing, migrations.RunPython.noop),
+    ]
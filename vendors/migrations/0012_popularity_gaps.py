@@ -0,0 +1,23 @@
+# Generated by Django 4.2.26 on 2026-10-19 19:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendors', '0011_catalogue_change_seq'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='popularitystate',
+            name='click_gaps',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='popularitystate',
+            name='consultation_gaps',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
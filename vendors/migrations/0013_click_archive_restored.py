@@ -0,0 +1,23 @@
+# Generated by Django 4.2.26 on 2026-10-19 19:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendors', '0012_popularity_gaps'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clickarchive',
+            name='restored_at',
+            field=models.DateTimeField(blank=True, help_text='Set while clicks are restored; archive_clicks skips the month until given --month', null=True),
+        ),
+        migrations.AddField(
+            model_name='clickarchive',
+            name='size',
+            field=models.BigIntegerField(blank=True, help_text='Bytes of the file written by committed batches; unknown for older archives', null=True),
+        ),
+    ]
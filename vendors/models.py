@@ -1,7 +1,46 @@
-from django.db import models
+from django.db import DatabaseError, models, router, transaction
 from django.contrib.postgres.fields import ArrayField
 
-class BuildingSystemVendor(models.Model):
+from .assets import get_model_asset_storage, get_model_image_storage
+
+class Popular(models.Model):
+    """
+    Adds the forward-decayed ``popularity`` score maintained by
+    ``vendors.popularity``.
+
+    The score is only ever changed with relative updates. A full save leaves
+    it out, so an admin edit cannot overwrite clicks counted since the row
+    was loaded.
+    """
+    popularity = models.FloatField(default=0, editable=False, help_text="Forward-decayed activity score, see vendors.popularity")
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        partial = (
+            not args and not self._state.adding and self.pk is not None
+            and kwargs.get('update_fields') is None
+            and not kwargs.get('force_insert') and not kwargs.get('force_update')
+        )
+        if not partial:
+            return super().save(*args, **kwargs)
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        try:
+            # In a savepoint, so a failed update leaves the caller's transaction usable
+            with transaction.atomic(using=using):
+                super().save(update_fields=[
+                    field.name for field in self._meta.concrete_fields
+                    if not field.primary_key and field.name != 'popularity'
+                ], **kwargs)
+        except DatabaseError as exc:
+            # The row is gone (deleted since it was loaded): save it in full,
+            # inserting it again as a plain save would
+            if 'did not affect any rows' not in str(exc):
+                raise
+            super().save(**kwargs)
+
+class BuildingSystemVendor(Popular):
     CATEGORY_CHOICES = [
         ('PREFAB', 'Prefab & Modular'),
         ('NATURAL', 'Natural & Earthen'),
@@ -38,6 +77,12 @@ class BuildingSystemVendor(models.Model):
     contact_info = models.JSONField(default=dict, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # ?ordering=popular
+            models.Index(fields=['-popularity', 'id'], name='vendor_popularity'),
+        ]
+
     def __str__(self):
         return self.partner_name
 
@@ -50,7 +95,45 @@ class AffiliateClick(models.Model):
     def __str__(self):
         return f"Click on {self.vendor.partner_name} at {self.timestamp}"
 
-class ModelVendor(models.Model):
+class ClickDailyRollup(models.Model):
+    """
+    Clicks and conversions per vendor and day (UTC), kept when the clicks
+    themselves are archived by ``vendors.click_archive``.
+    """
+    date = models.DateField()
+    vendor = models.ForeignKey(BuildingSystemVendor, on_delete=models.CASCADE, related_name='click_rollups')
+    clicks = models.PositiveIntegerField(default=0)
+    conversions = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-date', 'vendor']
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'vendor'], name='unique_click_rollup_day'),
+        ]
+
+    def __str__(self):
+        return f"{self.clicks} click(s) on {self.vendor_id} on {self.date}"
+
+class ClickArchive(models.Model):
+    """One month (UTC) of archived clicks, stored as ``path`` under CLICK_ARCHIVE_ROOT."""
+    month = models.DateField(unique=True, help_text="First day of the month")
+    path = models.CharField(max_length=255)
+    clicks = models.PositiveIntegerField(default=0, help_text="Clicks archived, less those restored")
+    size = models.BigIntegerField(
+        null=True, blank=True, help_text="Bytes of the file written by committed batches; unknown for older archives",
+    )
+    restored_at = models.DateTimeField(
+        null=True, blank=True, help_text="Set while clicks are restored; archive_clicks skips the month until given --month",
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-month']
+
+    def __str__(self):
+        return f"Clicks of {self.month:%Y-%m} ({self.clicks})"
+
+class ModelVendor(Popular):
     vendor = models.ForeignKey(BuildingSystemVendor, on_delete=models.CASCADE, related_name='models')
     model_name = models.CharField(max_length=255)
     slug = models.SlugField(max_length=255, unique=True, help_text="URL-friendly identifier")
@@ -59,7 +142,10 @@ class ModelVendor(models.Model):
     specifications = models.JSONField(default=dict, blank=True, help_text="Technical specifications")
     images = models.JSONField(default=list, blank=True, help_text="List of image URLs")
     is_featured = models.BooleanField(default=False, help_text="Highlight this model")
-    glb_file = models.FileField(upload_to='models_3d/', blank=True, null=True)
+    # Stored under the content's SHA-256 and served by the model-asset view
+    glb_file = models.FileField(upload_to='models_3d/', storage=get_model_asset_storage, blank=True, null=True)
+    glb_metadata = models.JSONField(default=dict, blank=True, editable=False, help_text="Triangle count, bounding box and texture sizes of the GLB file")
+    glb_lods = models.JSONField(default=dict, blank=True, editable=False, help_text="Simplified variants of the GLB file by detail level")
     relationship_type = models.CharField(max_length=50, default='Manufacturer')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -68,13 +154,66 @@ class ModelVendor(models.Model):
         ordering = ['-is_featured', '-created_at']
         verbose_name = 'Building Model'
         verbose_name_plural = 'Building Models'
+        indexes = [
+            # ?ordering=popular
+            models.Index(fields=['-popularity', 'id'], name='model_popularity'),
+        ]
 
     def __str__(self):
         return f"{self.vendor.partner_name} - {self.model_name}"
 
+class ModelImage(models.Model):
+    """
+    A gallery image of a model, stored locally with responsive derivatives.
+
+    Images listed in ``ModelVendor.images`` are downloaded into rows with a
+    ``source_url``; images uploaded in the admin have none. See
+    ``vendors.image_ingest``.
+    """
+    model = models.ForeignKey(ModelVendor, on_delete=models.CASCADE, related_name='gallery')
+    position = models.PositiveSmallIntegerField(default=0)
+    source_url = models.URLField(max_length=500, blank=True, help_text="Remote image this copy was downloaded from")
+    original = models.FileField(upload_to='model_images/', storage=get_model_image_storage, blank=True)
+    width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    blurhash = models.CharField(max_length=64, blank=True, editable=False)
+    color = models.CharField(max_length=7, blank=True, editable=False, help_text="Average colour, for placeholders")
+    derivatives = models.JSONField(default=dict, blank=True, editable=False, help_text="Resized files by size and MIME type")
+    error = models.CharField(max_length=255, blank=True, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['position', 'id']
+        verbose_name = 'Model Image'
+        verbose_name_plural = 'Model Images'
+
+    def __str__(self):
+        return f"{self.model.model_name} image {self.position}"
+
+class SimilarModel(models.Model):
+    """
+    One precomputed neighbour of a model, ``rank`` 0 being the most similar.
+    Rebuilt by ``vendors.similarity``; never edited by hand.
+    """
+    model = models.ForeignKey(ModelVendor, on_delete=models.CASCADE, related_name='similar_models')
+    similar = models.ForeignKey(ModelVendor, on_delete=models.CASCADE, related_name='neighbor_of')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField(help_text="Cosine similarity, 0-1")
+
+    class Meta:
+        ordering = ['model', 'rank']
+        constraints = [
+            # Also the index behind /api/models/<id>/similar/
+            models.UniqueConstraint(fields=['model', 'rank'], name='unique_similar_model_rank'),
+        ]
+
+    def __str__(self):
+        return f"{self.model_id} -> {self.similar_id} (#{self.rank}, {self.score:.2f})"
+
 class ConsultationRequest(models.Model):
     STATUS_CHOICES = [
         ('PENDING', 'Pending'),
+        ('CLAIMED', 'Claimed'),
         ('CONTACTED', 'Contacted'),
         ('COMPLETED', 'Completed'),
         ('CANCELLED', 'Cancelled'),
@@ -87,11 +226,17 @@ class ConsultationRequest(models.Model):
     model = models.ForeignKey(ModelVendor, on_delete=models.SET_NULL, null=True, blank=True, related_name='consultation_requests')
     message = models.TextField()
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    assigned_to = models.ForeignKey('core.User', on_delete=models.SET_NULL, null=True, blank=True, related_name='claimed_leads', help_text="Staff member working this lead")
+    claimed_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Serves the lead work queue: oldest PENDING rows first
+            models.Index(fields=['status', 'created_at'], name='consultation_status_created'),
+        ]
         verbose_name = 'Consultation Request'
         verbose_name_plural = 'Consultation Requests'
 
@@ -102,3 +247,118 @@ class ConsultationRequest(models.Model):
         elif self.model:
             context = f" (Model: {self.model.model_name})"
         return f"Consultation from {self.email}{context}"
+
+class CatalogueChange(models.Model):
+    """
+    Latest change to a vendor or model, in commit sequence.
+
+    Each object keeps a single row: recording a change replaces the previous
+    one, so the log holds one entry per live object plus the tombstones of
+    deleted ones. ``seq`` is assigned once the entry has committed and is the
+    sync token; it is null until then. See ``vendors.changelog``.
+    """
+    VENDOR = 'vendor'
+    MODEL = 'model'
+    OBJECT_TYPE_CHOICES = [
+        (VENDOR, 'Vendor'),
+        (MODEL, 'Model'),
+    ]
+
+    UPSERT = 'upsert'
+    DELETE = 'delete'
+    OP_CHOICES = [
+        (UPSERT, 'Created or updated'),
+        (DELETE, 'Deleted'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    object_type = models.CharField(max_length=10, choices=OBJECT_TYPE_CHOICES)
+    object_id = models.PositiveIntegerField()
+    op = models.CharField(max_length=10, choices=OP_CHOICES)
+    seq = models.BigIntegerField(null=True, blank=True, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['object_type', 'object_id'], name='catalogue_change_object'),
+            # Serves tombstone compaction
+            models.Index(fields=['op', 'created_at'], name='catalogue_change_op_created'),
+        ]
+
+    def __str__(self):
+        return f"#{self.id} {self.op} {self.object_type} {self.object_id}"
+
+
+class CatalogueChangeSequence(models.Model):
+    """The last ``CatalogueChange.seq`` handed out (a single row)."""
+    last = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"Catalogue changes sequenced through {self.last}"
+
+class CatalogueChangeCompaction(models.Model):
+    """A compaction run; sync tokens at or below ``compacted_through`` are too old to resume from."""
+    compacted_through = models.BigIntegerField()
+    tombstones_removed = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-compacted_through']
+
+    def __str__(self):
+        return f"Compacted through #{self.compacted_through}"
+
+class PopularityState(models.Model):
+    """
+    Progress of the incremental popularity update (a single row): the decay
+    landmark, the last click and consultation already counted, and the
+    ``[id, seen_at]`` of lower ids that were missing when their neighbours
+    were counted, which may still commit.
+    """
+    landmark = models.DateTimeField()
+    half_life_days = models.FloatField()
+    last_click_id = models.BigIntegerField(default=0)
+    last_consultation_id = models.BigIntegerField(default=0)
+    click_gaps = models.JSONField(default=list, blank=True)
+    consultation_gaps = models.JSONField(default=list, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Popularity through click #{self.last_click_id}, consultation #{self.last_consultation_id}"
+
+class EnrichmentJob(models.Model):
+    """
+    Journal of AI model generation, one row per vendor (``vendors.enrichment``).
+
+    A vendor is only sent to the AI service again when its last attempt
+    failed, after a backoff, or when a run died while it was RUNNING.
+    """
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('RUNNING', 'Running'),
+        ('DONE', 'Done'),
+        ('FAILED', 'Failed'),
+    ]
+
+    vendor = models.OneToOneField(BuildingSystemVendor, on_delete=models.CASCADE, related_name='enrichment_job')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    # Kept once received, so a failure while creating models does not pay for the AI call again
+    suggestions = models.JSONField(null=True, blank=True)
+    models_created = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(null=True, blank=True, help_text="Earliest retry of a failed job")
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['vendor']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='enrichment_status_next'),
+        ]
+
+    def __str__(self):
+        return f"Models for {self.vendor_id}: {self.status} after {self.attempts} attempt(s)"
+
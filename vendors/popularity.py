@@ -0,0 +1,332 @@
+"""
+Time-decayed popularity of vendors and models, for ``?ordering=popular``.
+
+Scores use forward decay. An event at time ``t`` adds
+``weight * exp(λ (t - L))`` to its object's ``popularity``, where ``L`` is a
+fixed landmark and ``λ = ln 2 / POPULARITY_HALF_LIFE_DAYS``. Decayed to now,
+a score is ``popularity * exp(-λ (now - L))``. That factor is the same for
+every row, so the stored column already sorts by decayed popularity, and
+stored scores never need rewriting as time passes.
+
+``update_scores`` adds only the clicks and consultations recorded since its
+last run. It works in id batches, and each batch's score deltas and
+watermarks commit together. Once the landmark is old enough that exp() would
+start to lose range, it moves forward with one multiplication of every score.
+``rebuild_scores`` recounts all history.
+
+Ids are assigned at insert, not at commit, so a row can become visible after
+higher ids were counted. An id missing below a row younger than
+``POPULARITY_GAP_SECONDS`` is remembered as a gap, and every run counts the
+gaps that have since committed. Gaps older than that are given up: their rows
+were rolled back or deleted.
+
+Vendors score affiliate clicks and consultations, including consultations
+about one of their models. Models score the consultations about them.
+"""
+
+import math
+from datetime import timedelta
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, FloatField, Max, Value, When
+from django.utils import timezone
+
+from .models import AffiliateClick, BuildingSystemVendor, ConsultationRequest, ModelVendor, PopularityState
+
+# Sort order of ?ordering=popular; matches the popularity indexes
+ORDER_BY = ('-popularity', 'id')
+
+# Move the landmark before exp(λ (now - L)) exceeds e^50; far from overflow,
+# and close enough that old scores keep full precision
+MAX_EXPONENT = 50
+# Objects per UPDATE statement (three parameters each, under SQLite's 999)
+_UPDATE_CHUNK = 300
+# Gaps remembered per event type; the oldest are given up beyond this
+MAX_GAPS = 10000
+
+_CLICK_FIELDS = ('id', 'vendor_id', 'timestamp')
+_CONSULTATION_FIELDS = ('id', 'vendor_id', 'model_id', 'model__vendor_id', 'created_at')
+
+
+class HalfLifeChanged(Exception):
+    """Stored scores were decayed with another half-life; they must be rebuilt."""
+
+
+def half_life_days() -> float:
+    return getattr(settings, 'POPULARITY_HALF_LIFE_DAYS', 14)
+
+
+def decay_rate(days: Optional[float] = None) -> float:
+    """λ per second."""
+    return math.log(2) / ((days or half_life_days()) * 86400)
+
+
+def _weights() -> Tuple[float, float]:
+    return (
+        getattr(settings, 'POPULARITY_CLICK_WEIGHT', 1.0),
+        getattr(settings, 'POPULARITY_CONSULTATION_WEIGHT', 5.0),
+    )
+
+
+def gap_seconds() -> float:
+    return getattr(settings, 'POPULARITY_GAP_SECONDS', 300)
+
+
+def _forward_weights(timestamps, landmark, rate: float, weight: float) -> np.ndarray:
+    seconds = np.array([(ts - landmark).total_seconds() for ts in timestamps], dtype=np.float64)
+    return weight * np.exp(rate * seconds)
+
+
+def _sum_by(keys, values: np.ndarray, deltas: Dict[int, float]):
+    for key, value in zip(keys, values.tolist()):
+        if key is not None:
+            deltas[key] = deltas.get(key, 0.0) + value
+
+
+def _click_deltas(rows, landmark, rate: float, weight: float) -> Dict[int, float]:
+    _, vendor_ids, timestamps = zip(*rows)
+    deltas = {}
+    _sum_by(vendor_ids, _forward_weights(timestamps, landmark, rate, weight), deltas)
+    return deltas
+
+
+def _consultation_deltas(rows, landmark, rate: float, weight: float) -> Tuple[Dict[int, float], Dict[int, float]]:
+    _, vendor_ids, model_ids, model_vendor_ids, timestamps = zip(*rows)
+    scores = _forward_weights(timestamps, landmark, rate, weight)
+    vendor_deltas, model_deltas = {}, {}
+    # A consultation about a model counts for its vendor too
+    _sum_by([vendor or model_vendor for vendor, model_vendor in zip(vendor_ids, model_vendor_ids)], scores, vendor_deltas)
+    _sum_by(model_ids, scores, model_deltas)
+    return vendor_deltas, model_deltas
+
+
+def _missing(after_id: int, rows, recent) -> List[int]:
+    """Ids skipped between ``after_id`` and ``rows`` just below rows created since ``recent``."""
+    missing = []
+    previous = after_id
+    for row in rows:
+        pk, created = row[0], row[-1]
+        if pk > previous + 1 and created >= recent:
+            missing.extend(range(max(previous + 1, pk - MAX_GAPS), pk))
+        previous = pk
+    return missing
+
+
+def _batches(model, fields, after_id: int, upto_id: int, batch_size: int, recent) -> Iterator[Tuple[list, List[int]]]:
+    """``(rows, missing_ids)`` per batch of rows in ``(after_id, upto_id]``."""
+    while after_id < upto_id:
+        rows = list(
+            model.objects.filter(id__gt=after_id, id__lte=upto_id).order_by('id').values_list(*fields)[:batch_size]
+        )
+        if not rows:
+            return
+        yield rows, _missing(after_id, rows, recent)
+        after_id = rows[-1][0]
+
+
+def _click_batches(after_id: int, upto_id: int, batch_size: int, landmark, rate: float,
+                   weight: float, recent) -> Iterator[Tuple[int, int, Dict[int, float], List[int]]]:
+    """``(last_id, count, vendor_deltas, missing_ids)`` per batch of clicks in ``(after_id, upto_id]``."""
+    for rows, missing in _batches(AffiliateClick, _CLICK_FIELDS, after_id, upto_id, batch_size, recent):
+        yield rows[-1][0], len(rows), _click_deltas(rows, landmark, rate, weight), missing
+
+
+def _consultation_batches(after_id: int, upto_id: int, batch_size: int, landmark, rate: float,
+                          weight: float, recent) -> Iterator[Tuple[int, int, Dict[int, float], Dict[int, float], List[int]]]:
+    """``(last_id, count, vendor_deltas, model_deltas, missing_ids)`` per batch of consultations in ``(after_id, upto_id]``."""
+    for rows, missing in _batches(ConsultationRequest, _CONSULTATION_FIELDS, after_id, upto_id, batch_size, recent):
+        vendor_deltas, model_deltas = _consultation_deltas(rows, landmark, rate, weight)
+        yield rows[-1][0], len(rows), vendor_deltas, model_deltas, missing
+
+
+def _add(model, deltas: Dict[int, float]):
+    """``popularity += delta`` for each row, one UPDATE per chunk."""
+    items = list(deltas.items())
+    for start in range(0, len(items), _UPDATE_CHUNK):
+        chunk = items[start:start + _UPDATE_CHUNK]
+        model.objects.filter(pk__in=[pk for pk, _ in chunk]).update(popularity=F('popularity') + Case(
+            *(When(pk=pk, then=Value(delta)) for pk, delta in chunk),
+            default=Value(0.0), output_field=FloatField(),
+        ))
+
+
+def _move_landmark(state: PopularityState, now):
+    """Rescale every score to a landmark at ``now``; ordering is unchanged."""
+    factor = math.exp(-decay_rate(state.half_life_days) * (now - state.landmark).total_seconds())
+    BuildingSystemVendor.objects.exclude(popularity=0).update(popularity=F('popularity') * factor)
+    ModelVendor.objects.exclude(popularity=0).update(popularity=F('popularity') * factor)
+    state.landmark = now
+    state.save(update_fields=['landmark', 'updated_at'])
+
+
+def _locked_state() -> PopularityState:
+    state = PopularityState.objects.select_for_update().first()
+    if state is None:
+        state = PopularityState.objects.create(landmark=timezone.now(), half_life_days=half_life_days())
+    return state
+
+
+def _upto(model, after_id: int) -> int:
+    return model.objects.filter(id__gt=after_id).aggregate(upto=Max('id'))['upto'] or after_id
+
+
+def _with_gaps(gaps: list, missing: List[int], now) -> list:
+    seen_at = now.timestamp()
+    return (gaps + [[pk, seen_at] for pk in missing])[-MAX_GAPS:]
+
+
+def _advance(state: PopularityState, field: str, last_id: int, gaps_field: str, missing: List[int], now) -> bool:
+    """
+    Move a watermark past a batch and remember the ids it found missing,
+    inside the batch's transaction. False when another run has counted events
+    or moved the landmark since ``state`` was read.
+    """
+    current = _locked_state()
+    if current.landmark != state.landmark or getattr(current, field) != getattr(state, field):
+        return False
+    setattr(current, field, last_id)
+    setattr(current, gaps_field, _with_gaps(getattr(current, gaps_field), missing, now))
+    current.save(update_fields=[field, gaps_field, 'updated_at'])
+    setattr(state, field, last_id)
+    return True
+
+
+def _fill_gaps(state: PopularityState, now, click_weight: float, consultation_weight: float) -> Dict[str, int]:
+    """
+    Count the gap rows that have committed since and forget them, along with
+    gaps older than ``POPULARITY_GAP_SECONDS``. Runs in the caller's
+    transaction, with ``state`` locked.
+    """
+    rate = decay_rate(state.half_life_days)
+    expired_before = now.timestamp() - gap_seconds()
+    filled = {}
+    for key, model, fields, gaps_field in (
+        ('clicks', AffiliateClick, _CLICK_FIELDS, 'click_gaps'),
+        ('consultations', ConsultationRequest, _CONSULTATION_FIELDS, 'consultation_gaps'),
+    ):
+        gaps = getattr(state, gaps_field)
+        found = set()
+        for start in range(0, len(gaps), _UPDATE_CHUNK):
+            ids = [pk for pk, _ in gaps[start:start + _UPDATE_CHUNK]]
+            rows = list(model.objects.filter(id__in=ids).values_list(*fields))
+            if not rows:
+                continue
+            found.update(row[0] for row in rows)
+            if model is AffiliateClick:
+                _add(BuildingSystemVendor, _click_deltas(rows, state.landmark, rate, click_weight))
+            else:
+                vendor_deltas, model_deltas = _consultation_deltas(rows, state.landmark, rate, consultation_weight)
+                _add(BuildingSystemVendor, vendor_deltas)
+                _add(ModelVendor, model_deltas)
+        remaining = [[pk, seen_at] for pk, seen_at in gaps if pk not in found and seen_at >= expired_before]
+        if remaining != gaps:
+            setattr(state, gaps_field, remaining)
+            state.save(update_fields=[gaps_field, 'updated_at'])
+        filled[key] = len(found)
+    return filled
+
+
+def update_scores(batch_size: Optional[int] = None, log: Callable[[str], None] = lambda msg: None) -> Dict:
+    """
+    Add the clicks and consultations recorded since the last run.
+
+    Stops early, without counting anything twice, if another run overlaps.
+
+    Raises:
+        HalfLifeChanged: if POPULARITY_HALF_LIFE_DAYS differs from the stored scores'
+    """
+    batch_size = batch_size or getattr(settings, 'POPULARITY_BATCH_SIZE', 10000)
+    click_weight, consultation_weight = _weights()
+    now = timezone.now()
+    recent = now - timedelta(seconds=gap_seconds())
+
+    with transaction.atomic():
+        state = _locked_state()
+        if state.half_life_days != half_life_days():
+            raise HalfLifeChanged(f'Scores use a {state.half_life_days:g} day half-life, settings say {half_life_days():g}')
+        rate = decay_rate(state.half_life_days)
+        if rate * (now - state.landmark).total_seconds() > MAX_EXPONENT:
+            log('Moving the decay landmark forward')
+            _move_landmark(state, now)
+        counted = _fill_gaps(state, now, click_weight, consultation_weight)
+        if counted['clicks'] or counted['consultations']:
+            log(f"  {counted['clicks']} click(s) and {counted['consultations']} consultation(s) committed late")
+        upto_click = _upto(AffiliateClick, state.last_click_id)
+        upto_consultation = _upto(ConsultationRequest, state.last_consultation_id)
+
+    for last_id, count, vendor_deltas, missing in _click_batches(
+        state.last_click_id, upto_click, batch_size, state.landmark, rate, click_weight, recent,
+    ):
+        with transaction.atomic():
+            if not _advance(state, 'last_click_id', last_id, 'click_gaps', missing, now):
+                log('Another update is running; stopping')
+                return counted
+            _add(BuildingSystemVendor, vendor_deltas)
+        counted['clicks'] += count
+        log(f'  clicks through #{last_id}')
+
+    for last_id, count, vendor_deltas, model_deltas, missing in _consultation_batches(
+        state.last_consultation_id, upto_consultation, batch_size, state.landmark, rate, consultation_weight, recent,
+    ):
+        with transaction.atomic():
+            if not _advance(state, 'last_consultation_id', last_id, 'consultation_gaps', missing, now):
+                log('Another update is running; stopping')
+                return counted
+            _add(BuildingSystemVendor, vendor_deltas)
+            _add(ModelVendor, model_deltas)
+        counted['consultations'] += count
+        log(f'  consultations through #{last_id}')
+    return counted
+
+
+def rebuild_scores(batch_size: Optional[int] = None, log: Callable[[str], None] = lambda msg: None) -> Dict:
+    """
+    Recount every click and consultation against a landmark at now.
+
+    Totals are accumulated in memory (one float per vendor and model) and
+    written in one transaction, so the API never sorts on half-built scores.
+    """
+    batch_size = batch_size or getattr(settings, 'POPULARITY_BATCH_SIZE', 10000)
+    click_weight, consultation_weight = _weights()
+    now = timezone.now()
+    recent = now - timedelta(seconds=gap_seconds())
+    rate = decay_rate()
+    upto_click = _upto(AffiliateClick, 0)
+    upto_consultation = _upto(ConsultationRequest, 0)
+
+    vendor_scores, model_scores = {}, {}
+    click_gaps, consultation_gaps = [], []
+    counted = {'clicks': 0, 'consultations': 0}
+    for last_id, count, deltas, missing in _click_batches(0, upto_click, batch_size, now, rate, click_weight, recent):
+        for pk, delta in deltas.items():
+            vendor_scores[pk] = vendor_scores.get(pk, 0.0) + delta
+        click_gaps = _with_gaps(click_gaps, missing, now)
+        counted['clicks'] += count
+        log(f'  clicks through #{last_id}')
+    for last_id, count, vendor_deltas, model_deltas, missing in _consultation_batches(
+        0, upto_consultation, batch_size, now, rate, consultation_weight, recent,
+    ):
+        for scores, deltas in ((vendor_scores, vendor_deltas), (model_scores, model_deltas)):
+            for pk, delta in deltas.items():
+                scores[pk] = scores.get(pk, 0.0) + delta
+        consultation_gaps = _with_gaps(consultation_gaps, missing, now)
+        counted['consultations'] += count
+        log(f'  consultations through #{last_id}')
+
+    with transaction.atomic():
+        state = _locked_state()
+        BuildingSystemVendor.objects.exclude(popularity=0).update(popularity=0)
+        ModelVendor.objects.exclude(popularity=0).update(popularity=0)
+        _add(BuildingSystemVendor, vendor_scores)
+        _add(ModelVendor, model_scores)
+        state.landmark = now
+        state.half_life_days = half_life_days()
+        state.last_click_id = upto_click
+        state.last_consultation_id = upto_consultation
+        state.click_gaps = click_gaps
+        state.consultation_gaps = consultation_gaps
+        state.save()
+    return counted
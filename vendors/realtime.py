@@ -0,0 +1,126 @@
+"""
+Catalogue change events for WebSocket subscribers.
+
+Vendor and model saves and deletes are published, once the transaction
+commits, to Channels groups that ``CatalogueConsumer`` clients join:
+
+* ``catalogue.all``
+* ``catalogue.category.<PRIMARY_CATEGORY>``
+* ``catalogue.vendor.<vendor id>``
+
+Each event is a compact diff::
+
+    {"event": "3f2c...", "type": "model", "op": "update", "id": 12,
+     "vendor": 4, "category": "DOMES", "changes": {"price_range": "$90k-$120k"}}
+
+``create`` events carry the object as the list endpoints serialize it in
+``data``, ``update`` events only the changed fields in ``changes``, and
+``delete`` events just the id.
+"""
+
+import json
+import logging
+import uuid
+from typing import Dict, Iterable, Optional
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import transaction
+from django.db.models.fields.files import FieldFile
+from rest_framework.utils.encoders import JSONEncoder
+
+logger = logging.getLogger(__name__)
+
+ALL_GROUP = 'catalogue.all'
+
+CREATE = 'create'
+UPDATE = 'update'
+DELETE = 'delete'
+
+
+def category_group(category: str) -> str:
+    return f'catalogue.category.{category}'
+
+
+def vendor_group(vendor_id) -> str:
+    return f'catalogue.vendor.{int(vendor_id)}'
+
+
+def is_enabled() -> bool:
+    return getattr(settings, 'CATALOGUE_REALTIME', True)
+
+
+def _field_value(instance, field):
+    value = getattr(instance, field.attname)
+    if isinstance(value, FieldFile):
+        # Files travel as their URL, as the API serializes them
+        return value.url if value else None
+    return value
+
+
+def field_values(instance) -> Dict:
+    """Concrete field values keyed by API field name (``vendor`` rather than ``vendor_id``)."""
+    # popularity is not saved with the row (see vendors.models.Popular) and not part of the API
+    return {
+        field.name: _field_value(instance, field)
+        for field in instance._meta.concrete_fields if field.name != 'popularity'
+    }
+
+
+def diff(previous: Optional[Dict], current: Dict) -> Dict:
+    if previous is None:
+        return current
+    return {name: value for name, value in current.items() if previous.get(name) != value}
+
+
+def _jsonable(data):
+    # Round-trip through DRF's encoder so dates and decimals go over the layer as strings
+    return json.loads(json.dumps(data, cls=JSONEncoder))
+
+
+def publish(event: Dict, groups: Iterable[str]):
+    """Send ``event`` to every group once the current transaction commits."""
+    layer = get_channel_layer()
+    if layer is None:
+        return
+    event = dict(_jsonable(event), event=uuid.uuid4().hex)
+    groups = sorted({group for group in groups if group})
+
+    def send():
+        try:
+            for group in groups:
+                async_to_sync(layer.group_send)(group, {'type': 'catalogue.change', 'change': event})
+        except Exception:
+            # Live updates are best-effort; clients resync on reconnect
+            logger.exception('Failed to publish catalogue change %s %s', event['type'], event['id'])
+
+    transaction.on_commit(send)
+
+
+def vendor_event(op: str, vendor, previous: Optional[Dict] = None) -> Optional[Dict]:
+    from .serializers import BuildingSystemVendorSerializer
+
+    event = {'type': 'vendor', 'op': op, 'id': vendor.pk, 'category': vendor.primary_category}
+    if op == CREATE:
+        event['data'] = BuildingSystemVendorSerializer(vendor).data
+    elif op == UPDATE:
+        changes = diff(previous, field_values(vendor))
+        if not changes:
+            return None
+        event['changes'] = changes
+    return event
+
+
+def model_event(op: str, model, category: Optional[str], previous: Optional[Dict] = None) -> Optional[Dict]:
+    from .serializers import ModelVendorListSerializer
+
+    event = {'type': 'model', 'op': op, 'id': model.pk, 'vendor': model.vendor_id, 'category': category}
+    if op == CREATE:
+        event['data'] = ModelVendorListSerializer(model).data
+    elif op == UPDATE:
+        changes = diff(previous, field_values(model))
+        if not changes:
+            return None
+        event['changes'] = changes
+    return event
@@ -0,0 +1,7 @@
+from django.urls import path
+
+from .consumers import CatalogueConsumer
+
+websocket_urlpatterns = [
+    path('ws/catalogue/', CatalogueConsumer.as_asgi()),
+]
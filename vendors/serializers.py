@@ -1,35 +1,170 @@
+from django.conf import settings
+from django.db.models import QuerySet
 from rest_framework import serializers
-from .models import BuildingSystemVendor, AffiliateClick, ModelVendor, ConsultationRequest
+from . import asset_ingest, image_ingest
+from .models import BuildingSystemVendor, AffiliateClick, ModelImage, ModelVendor, ConsultationRequest
 
-class BuildingSystemVendorSerializer(serializers.ModelSerializer):
+# Fields that represent a .values() column unchanged
+_PLAIN_FIELDS = (
+    serializers.CharField, serializers.IntegerField, serializers.BooleanField,
+    serializers.JSONField, serializers.ChoiceField, serializers.PrimaryKeyRelatedField,
+)
+# Models per gallery query, well under SQLite's bound parameter limit
+_VALUES_BATCH_SIZE = 500
+
+class ValuesListSerializer(serializers.ListSerializer):
+    """
+    Serializes querysets from ``.values()`` rows (``API_VALUES_LISTS``) through
+    the child's ``represent_values``; plain lists take the usual path.
+    """
+    def to_representation(self, data):
+        if isinstance(data, QuerySet) and getattr(settings, 'API_VALUES_LISTS', True):
+            return self.child.represent_values(data)
+        return super().to_representation(data)
+
+class ValuesMixin:
+    """
+    Builds list items from ``.values()`` rows without model or per-item
+    serializer work. Columns are only converted where DRF would change them
+    (dates, decimals); ``SerializerMethodField``s are filled in by
+    ``add_values_methods`` from rows that also carry ``values_columns``.
+    Output is identical to serializing instances.
+    """
+    values_columns = ()
+
+    def represent_values(self, queryset):
+        layout = []
+        for name, field in self.fields.items():
+            if field.write_only:
+                continue
+            if isinstance(field, serializers.SerializerMethodField):
+                layout.append((name, None, None))
+            else:
+                convert = None if isinstance(field, _PLAIN_FIELDS) else field.to_representation
+                layout.append((name, field.source.replace('.', '__'), convert))
+
+        columns = dict.fromkeys([column for _, column, _ in layout if column] + list(self.values_columns))
+        rows = list(queryset.prefetch_related(None).values(*columns))
+        items = []
+        for row in rows:
+            item = {}
+            for name, column, convert in layout:
+                value = row[column] if column else None
+                item[name] = convert(value) if convert and value is not None else value
+            items.append(item)
+        self.add_values_methods(items, rows)
+        return items
+
+    def add_values_methods(self, items, rows):
+        """Fill in method fields; ``rows`` are the ``.values()`` rows of ``items``."""
+
+class BuildingSystemVendorSerializer(ValuesMixin, serializers.ModelSerializer):
     class Meta:
         model = BuildingSystemVendor
-        fields = '__all__'
+        exclude = ['popularity']
+        list_serializer_class = ValuesListSerializer
 
 class AffiliateClickSerializer(serializers.ModelSerializer):
     class Meta:
         model = AffiliateClick
         fields = '__all__'
 
-class ModelVendorListSerializer(serializers.ModelSerializer):
+class GLBVariantMixin(serializers.Serializer):
+    """
+    Adds ``glb_variant``: the smallest 3D file meeting ``?detail=low|medium|high``,
+    or ``default_detail`` when the request does not ask.
+    """
+    default_detail = asset_ingest.HIGH
+    glb_variant = serializers.SerializerMethodField()
+
+    def get_detail(self):
+        request = self.context.get('request')
+        return request.query_params.get('detail', self.default_detail) if request else self.default_detail
+
+    def get_glb_variant(self, obj):
+        return self._absolute(asset_ingest.select_variant(obj, self.get_detail()))
+
+    def _absolute(self, variant):
+        request = self.context.get('request')
+        if variant and request:
+            variant['url'] = request.build_absolute_uri(variant['url'])
+        return variant
+
+def _url_builder(serializer):
+    request = serializer.context.get('request')
+    return request.build_absolute_uri if request else (lambda url: url)
+
+def _pictures(serializer, obj, size):
+    """Processed gallery images of ``obj`` at ``size``; prefetch ``gallery`` to avoid a query per model."""
+    build_url = _url_builder(serializer)
+    pictures = (image_ingest.picture(image, size, build_url) for image in obj.gallery.all())
+    return [picture for picture in pictures if picture]
+
+class ModelVendorListSerializer(ValuesMixin, GLBVariantMixin, serializers.ModelSerializer):
     """Lightweight serializer for model listings"""
     vendor_name = serializers.CharField(source='vendor.partner_name', read_only=True)
+    # Listings show previews
+    default_detail = asset_ingest.LOW
+    image = serializers.SerializerMethodField()
     
     class Meta:
         model = ModelVendor
-        fields = ['id', 'model_name', 'slug', 'vendor', 'vendor_name', 'price_range', 'is_featured', 'images']
+        fields = ['id', 'model_name', 'slug', 'vendor', 'vendor_name', 'price_range', 'is_featured', 'images', 'image', 'glb_variant']
+        list_serializer_class = ValuesListSerializer
+
+    values_columns = ('glb_file', 'glb_lods', 'glb_metadata')
 
-class ModelVendorSerializer(serializers.ModelSerializer):
+    def get_image(self, obj):
+        """Card-sized first image, or None until the gallery is processed (clients fall back to ``images``)"""
+        pictures = _pictures(self, obj, image_ingest.CARD)
+        return pictures[0] if pictures else None
+
+    def add_values_methods(self, items, rows):
+        build_url = _url_builder(self)
+        detail = self.get_detail()
+        ids = [row['id'] for row in rows]
+        pictures = {}
+        for start in range(0, len(ids), _VALUES_BATCH_SIZE):
+            gallery = ModelImage.objects.filter(model_id__in=ids[start:start + _VALUES_BATCH_SIZE]).values_list(
+                'model_id', 'derivatives', 'blurhash', 'color',
+            )
+            for model_id, derivatives, blurhash, color in gallery:
+                if model_id not in pictures and derivatives:
+                    pictures[model_id] = image_ingest.picture_for(derivatives, blurhash, color, image_ingest.CARD, build_url)
+        for item, row in zip(items, rows):
+            item['image'] = pictures.get(row['id'])
+            item['glb_variant'] = self._absolute(
+                asset_ingest.variant_for(row['glb_file'], row['glb_lods'], row['glb_metadata'], detail)
+            )
+
+class ModelVendorSerializer(GLBVariantMixin, serializers.ModelSerializer):
     """Full serializer for model details"""
     vendor_name = serializers.CharField(source='vendor.partner_name', read_only=True)
     vendor_data = BuildingSystemVendorSerializer(source='vendor', read_only=True)
+    gallery = serializers.SerializerMethodField()
+
+    def get_gallery(self, obj):
+        return _pictures(self, obj, image_ingest.HERO)
     
     class Meta:
         model = ModelVendor
-        fields = '__all__'
+        exclude = ['glb_lods', 'popularity']
 
 class ConsultationRequestSerializer(serializers.ModelSerializer):
     class Meta:
         model = ConsultationRequest
         fields = ['id', 'email', 'phone', 'vendor', 'model', 'message', 'created_at']
         read_only_fields = ['id', 'created_at']
+
+class LeadSerializer(serializers.ModelSerializer):
+    """Consultation request as seen by staff working the lead queue"""
+    vendor_name = serializers.CharField(source='vendor.partner_name', read_only=True, default=None)
+    model_name = serializers.CharField(source='model.model_name', read_only=True, default=None)
+
+    class Meta:
+        model = ConsultationRequest
+        fields = [
+            'id', 'email', 'phone', 'vendor', 'vendor_name', 'model', 'model_name', 'message',
+            'status', 'assigned_to', 'claimed_at', 'created_at', 'updated_at',
+        ]
+        read_only_fields = fields
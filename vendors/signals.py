@@ -0,0 +1,274 @@
+"""
+Model signal handlers for the vendors app.
+
+Handlers record what a save or delete touched and defer the follow-up work
+until the surrounding transaction commits.
+"""
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .async_views import bump_catalogue_version
+from .models import BuildingSystemVendor, CatalogueChange, ModelImage, ModelVendor, SimilarModel
+from . import asset_ingest, changelog, dedup, image_ingest, realtime, similarity, snapshots
+
+
+def _snapshots_enabled():
+    return getattr(settings, 'CATALOGUE_SNAPSHOTS_ON_SAVE', False)
+
+
+def _needs_previous():
+    return _snapshots_enabled() or realtime.is_enabled() or changelog.is_enabled() or similarity.is_enabled()
+
+
+def _vendor_category(vendor_id):
+    if vendor_id is None:
+        return None
+    return BuildingSystemVendor.objects.filter(pk=vendor_id).values_list('primary_category', flat=True).first()
+
+
+def _schedule_snapshot_rebuild(slices):
+    """
+    Queue slices for a rebuild once the current transaction commits.
+
+    Slices accumulate on the connection and the first commit callback hands
+    them to the snapshot worker, so a transaction touching many rows rebuilds
+    each slice once and the request does not wait for it.
+    """
+    connection = transaction.get_connection()
+    pending = getattr(connection, '_pending_snapshot_slices', None)
+    if pending is None:
+        pending = connection._pending_snapshot_slices = set()
+    pending.update(slices)
+
+    def rebuild():
+        to_build = set(pending)
+        pending.clear()
+        if to_build:
+            snapshots.schedule_build(to_build)
+
+    transaction.on_commit(rebuild)
+
+
+def _remember_previous(sender, instance):
+    """Load the row being overwritten, once, for the snapshot, realtime and change log handlers."""
+    previous = sender.objects.filter(pk=instance.pk).first() if instance.pk else None
+    instance._previous_values = realtime.field_values(previous) if previous else None
+    return previous
+
+
+@receiver(pre_save, sender=BuildingSystemVendor)
+def remember_previous_vendor(sender, instance, raw=False, **kwargs):
+    if raw or not _needs_previous():
+        return
+    previous = _remember_previous(sender, instance)
+    instance._previous_category = previous.primary_category if previous else None
+
+
+@receiver(pre_save, sender=ModelVendor)
+def remember_previous_model(sender, instance, raw=False, **kwargs):
+    if raw or not instance.pk or not _needs_previous():
+        return
+    previous = _remember_previous(sender, instance)
+    instance._previous_vendor_id = previous.vendor_id if previous else None
+
+
+@receiver(post_save, sender=BuildingSystemVendor)
+@receiver(post_delete, sender=BuildingSystemVendor)
+def vendor_changed(sender, instance, raw=False, **kwargs):
+    if raw or not _snapshots_enabled():
+        return
+    previous = getattr(instance, '_previous_category', None)
+    _schedule_snapshot_rebuild(snapshots.slices_for_vendor(instance.primary_category, previous))
+
+
+@receiver(post_save, sender=BuildingSystemVendor)
+def index_vendor_for_dedup(sender, instance, raw=False, **kwargs):
+    pk, name, url = instance.pk, instance.partner_name, instance.website_url
+    transaction.on_commit(lambda: dedup.index_vendor(pk, name, url))
+
+
+@receiver(post_delete, sender=BuildingSystemVendor)
+def unindex_vendor_for_dedup(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: dedup.unindex_vendor(pk))
+
+
+@receiver(post_save, sender=ModelVendor)
+@receiver(post_delete, sender=ModelVendor)
+def model_changed(sender, instance, raw=False, **kwargs):
+    if raw or not _snapshots_enabled():
+        return
+    categories = [_vendor_category(instance.vendor_id)]
+    previous_vendor_id = getattr(instance, '_previous_vendor_id', None)
+    if previous_vendor_id and previous_vendor_id != instance.vendor_id:
+        categories.append(_vendor_category(previous_vendor_id))
+    _schedule_snapshot_rebuild(snapshots.slices_for_model(*categories))
+
+
+@receiver(post_save, sender=BuildingSystemVendor)
+@receiver(post_delete, sender=BuildingSystemVendor)
+@receiver(post_save, sender=ModelVendor)
+@receiver(post_delete, sender=ModelVendor)
+def invalidate_async_api_cache(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    transaction.on_commit(bump_catalogue_version)
+
+
+@receiver(post_save, sender=ModelVendor)
+def ingest_glb_file(sender, instance, raw=False, **kwargs):
+    if raw or not asset_ingest.is_enabled() or not asset_ingest.needs_ingest(instance):
+        return
+    pk = instance.pk
+    transaction.on_commit(lambda: asset_ingest.schedule_ingest(pk))
+
+
+@receiver(post_save, sender=ModelVendor)
+def ingest_gallery(sender, instance, created=False, raw=False, **kwargs):
+    if raw or not image_ingest.is_enabled():
+        return
+    previous = getattr(instance, '_previous_values', None)
+    if created and not instance.images:
+        return
+    if previous is not None and previous.get('images') == instance.images:
+        return
+    pk = instance.pk
+    transaction.on_commit(lambda: image_ingest.schedule_model_ingest(pk))
+
+
+@receiver(post_save, sender=ModelImage)
+def ingest_uploaded_image(sender, instance, raw=False, **kwargs):
+    # Remote images are handled with their model's gallery
+    if raw or not image_ingest.is_enabled() or instance.source_url:
+        return
+    if instance.original and not (instance.derivatives or instance.error):
+        pk = instance.pk
+        transaction.on_commit(lambda: image_ingest.schedule_image_ingest(pk))
+
+
+@receiver(post_save, sender=ModelVendor)
+def refresh_similar_models(sender, instance, created=False, raw=False, **kwargs):
+    if raw or not similarity.is_enabled():
+        return
+    previous = getattr(instance, '_previous_values', None)
+    if not created and previous is not None:
+        current = realtime.field_values(instance)
+        if all(previous.get(name) == current[name] for name in similarity.SIMILARITY_FIELDS):
+            return
+    pk = instance.pk
+    transaction.on_commit(lambda: similarity.schedule_refresh([pk]))
+
+
+@receiver(post_save, sender=BuildingSystemVendor)
+def refresh_similar_models_of_vendor(sender, instance, created=False, raw=False, **kwargs):
+    # Category is one of the model features
+    if raw or created or not similarity.is_enabled():
+        return
+    previous = getattr(instance, '_previous_category', None)
+    if previous is None or previous == instance.primary_category:
+        return
+    pks = list(instance.models.values_list('pk', flat=True))
+    transaction.on_commit(lambda: similarity.schedule_refresh(pks))
+
+
+@receiver(pre_delete, sender=ModelVendor)
+def refresh_similar_models_on_delete(sender, instance, **kwargs):
+    # The rows pointing at this model go with it (cascade); their lists need a replacement
+    if not similarity.is_enabled():
+        return
+    pks = list(SimilarModel.objects.filter(similar_id=instance.pk).values_list('model_id', flat=True))
+    if pks:
+        transaction.on_commit(lambda: similarity.schedule_refresh(pks))
+
+
+@receiver(post_save, sender=BuildingSystemVendor)
+def log_vendor_saved(sender, instance, created=False, raw=False, **kwargs):
+    if raw or not changelog.is_enabled():
+        return
+    changelog.record(CatalogueChange.VENDOR, [instance.pk])
+    previous = getattr(instance, '_previous_values', None)
+    if previous and previous['partner_name'] != instance.partner_name:
+        # Model entries embed vendor_name
+        changelog.record(CatalogueChange.MODEL, instance.models.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=ModelVendor)
+def log_model_saved(sender, instance, raw=False, **kwargs):
+    if raw or not changelog.is_enabled():
+        return
+    changelog.record(CatalogueChange.MODEL, [instance.pk])
+
+
+@receiver(post_delete, sender=BuildingSystemVendor)
+@receiver(post_delete, sender=ModelVendor)
+def log_deleted(sender, instance, **kwargs):
+    # Also runs for models removed by a vendor's cascade delete
+    if not changelog.is_enabled():
+        return
+    object_type = CatalogueChange.VENDOR if sender is BuildingSystemVendor else CatalogueChange.MODEL
+    changelog.record(object_type, [instance.pk], op=CatalogueChange.DELETE)
+
+
+@receiver(post_save, sender=BuildingSystemVendor)
+def publish_vendor_saved(sender, instance, created=False, raw=False, **kwargs):
+    if raw or not realtime.is_enabled():
+        return
+    event = realtime.vendor_event(
+        realtime.CREATE if created else realtime.UPDATE, instance, getattr(instance, '_previous_values', None)
+    )
+    if event:
+        _publish_vendor(instance, event)
+
+
+@receiver(post_delete, sender=BuildingSystemVendor)
+def publish_vendor_deleted(sender, instance, **kwargs):
+    if realtime.is_enabled():
+        _publish_vendor(instance, realtime.vendor_event(realtime.DELETE, instance))
+
+
+def _publish_vendor(instance, event):
+    # A vendor moving category must disappear from pages filtered on the old one
+    categories = {instance.primary_category, getattr(instance, '_previous_category', None)}
+    realtime.publish(event, [
+        realtime.ALL_GROUP,
+        realtime.vendor_group(instance.pk),
+        *(realtime.category_group(category) for category in categories if category),
+    ])
+
+
+@receiver(post_save, sender=ModelVendor)
+def publish_model_saved(sender, instance, created=False, raw=False, **kwargs):
+    if raw or not realtime.is_enabled():
+        return
+    category = _vendor_category(instance.vendor_id)
+    event = realtime.model_event(
+        realtime.CREATE if created else realtime.UPDATE, instance, category,
+        getattr(instance, '_previous_values', None),
+    )
+    if event:
+        _publish_model(instance, event, category)
+
+
+@receiver(post_delete, sender=ModelVendor)
+def publish_model_deleted(sender, instance, **kwargs):
+    if not realtime.is_enabled():
+        return
+    category = _vendor_category(instance.vendor_id)
+    _publish_model(instance, realtime.model_event(realtime.DELETE, instance, category), category)
+
+
+def _publish_model(instance, event, category):
+    groups = [realtime.ALL_GROUP, realtime.vendor_group(instance.vendor_id)]
+    if category:
+        groups.append(realtime.category_group(category))
+    previous_vendor_id = getattr(instance, '_previous_vendor_id', None)
+    if previous_vendor_id and previous_vendor_id != instance.vendor_id:
+        # A model moving vendor must disappear from pages filtered on the old one
+        groups.append(realtime.vendor_group(previous_vendor_id))
+        previous_category = _vendor_category(previous_vendor_id)
+        if previous_category:
+            groups.append(realtime.category_group(previous_category))
+    realtime.publish(event, groups)
@@ -0,0 +1,324 @@
+"""
+Precomputed "similar models" recommendations.
+
+Each model becomes one sparse row:
+- TF-IDF weights of the words in its name, description and specifications
+- its vendor's category, one-hot
+- its log price and log floor area, spread over two adjacent bins so that
+  nearby prices and sizes overlap
+
+Rows are L2-normalised, so a sparse matrix product gives cosine similarity.
+``build_neighbors`` multiplies the catalogue against itself
+``SIMILAR_MODELS_BLOCK_SIZE`` rows at a time and keeps the top
+``SIMILAR_MODELS_K`` of each row in ``SimilarModel``. The API reads them
+back with one indexed lookup.
+
+``refresh_neighbors`` handles edits. The changed models get new lists, and
+so does any other model that a changed model now enters or leaves. IDF
+weights drift as the catalogue changes, so ``build_similar_models`` should
+run now and then for a full rebuild.
+"""
+
+import logging
+import math
+import re
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Count, Min
+from scipy import sparse
+
+from .dedup import normalize
+from .models import BuildingSystemVendor, ModelVendor, SimilarModel
+
+logger = logging.getLogger(__name__)
+
+# Fields whose change moves a model in the vector space
+SIMILARITY_FIELDS = ('model_name', 'description', 'specifications', 'price_range', 'vendor')
+
+DEFAULT_K = 8
+DEFAULT_BLOCK_SIZE = 512
+# Weight of each feature group before the final normalisation
+TEXT_WEIGHT = 1.0
+CATEGORY_WEIGHT = 0.6
+PRICE_WEIGHT = 0.4
+SIZE_WEIGHT = 0.4
+# Neighbours less similar than this are not worth showing
+MIN_SCORE = 0.05
+
+# Log-scale bins: $10k-$10M and 50-50,000 sq ft, anything outside is clamped
+PRICE_BINS = np.linspace(math.log(10_000), math.log(10_000_000), 16)
+SIZE_BINS = np.linspace(math.log(50), math.log(50_000), 16)
+
+STOPWORDS = {
+    'a', 'an', 'and', 'by', 'for', 'from', 'in', 'into', 'of', 'on', 'or', 'the', 'to', 'with',
+    'sq', 'ft', 'weeks', 'using', 'build',
+}
+
+_WORD_RE = re.compile(r'[a-z][a-z0-9]+')
+_MONEY_RE = re.compile(r'(\d+(?:[.,]\d+)*)\s*([km])?\b', re.IGNORECASE)
+_AREA_RE = re.compile(r'(\d[\d,]*(?:\.\d+)?)\s*(sq\.?\s*ft|sqft|square\s+feet|ft2|m2|m²|sq\.?\s*m|square\s+met)', re.IGNORECASE)
+_SQFT_PER_M2 = 10.7639
+
+_background = None
+_pending = set()
+_lock = threading.Lock()
+
+
+def is_enabled() -> bool:
+    return getattr(settings, 'SIMILAR_MODELS_ON_SAVE', True)
+
+
+def get_k() -> int:
+    return getattr(settings, 'SIMILAR_MODELS_K', DEFAULT_K)
+
+
+def tokenize(text: str) -> List[str]:
+    return [word for word in _WORD_RE.findall(normalize(text)) if word not in STOPWORDS]
+
+
+def _specification_text(specifications) -> str:
+    if not isinstance(specifications, dict):
+        return ''
+    return ' '.join(f'{key} {value}' for key, value in specifications.items() if isinstance(value, (str, int, float)))
+
+
+def parse_price(price_range: str) -> Optional[float]:
+    """Midpoint of a price range in dollars: ``'$50k-$100k'`` -> 75000.0"""
+    amounts = []
+    for number, suffix in _MONEY_RE.findall(price_range or ''):
+        value = float(number.replace(',', ''))
+        value *= {'k': 1_000, 'm': 1_000_000}.get(suffix.lower(), 1)
+        amounts.append(value)
+    amounts = [amount for amount in amounts if amount > 0]
+    if not amounts:
+        return None
+    return (min(amounts) + max(amounts)) / 2
+
+
+def parse_size(specifications) -> Optional[float]:
+    """Floor area in square feet from the first value that states one."""
+    match = _AREA_RE.search(_specification_text(specifications))
+    if not match:
+        return None
+    area = float(match.group(1).replace(',', ''))
+    if match.group(2).lower().rstrip('2²').endswith(('m', 'met')):
+        area *= _SQFT_PER_M2
+    return area or None
+
+
+def _soft_bins(values: List[Optional[float]], bins: np.ndarray) -> sparse.csr_matrix:
+    """
+    One row per value over ``len(bins)`` columns, with the weight split between
+    the two bins around its log. Unknown values get an empty row.
+    """
+    rows, cols, data = [], [], []
+    for row, value in enumerate(values):
+        if not value:
+            continue
+        position = float(np.interp(math.log(value), bins, np.arange(len(bins))))
+        low = int(position)
+        fraction = position - low
+        rows.append(row)
+        cols.append(low)
+        data.append(1 - fraction)
+        if fraction and low + 1 < len(bins):
+            rows.append(row)
+            cols.append(low + 1)
+            data.append(fraction)
+    return sparse.csr_matrix((data, (rows, cols)), shape=(len(values), len(bins)), dtype=np.float32)
+
+
+def _normalize_rows(matrix: sparse.csr_matrix) -> sparse.csr_matrix:
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sparse.csr_matrix(sparse.diags(1 / norms) @ matrix, dtype=np.float32)
+
+
+def _tfidf(documents: List[List[str]]) -> sparse.csr_matrix:
+    """Sublinear TF (1 + log tf) times smoothed IDF, rows L2-normalised."""
+    vocabulary: Dict[str, int] = {}
+    rows, cols, data = [], [], []
+    for row, words in enumerate(documents):
+        for word, count in Counter(words).items():
+            rows.append(row)
+            cols.append(vocabulary.setdefault(word, len(vocabulary)))
+            data.append(1 + math.log(count))
+    matrix = sparse.csr_matrix((data, (rows, cols)), shape=(len(documents), len(vocabulary)), dtype=np.float32)
+    document_frequency = np.bincount(cols, minlength=len(vocabulary))
+    idf = np.log((1 + len(documents)) / (1 + document_frequency)) + 1
+    return _normalize_rows(sparse.csr_matrix(matrix @ sparse.diags(idf.astype(np.float32))))
+
+
+def build_matrix(rows: List[Tuple]) -> sparse.csr_matrix:
+    """
+    Feature matrix of ``(name, description, specifications, price_range, category)``
+    rows, one L2-normalised row each.
+    """
+    documents = [
+        tokenize(f'{name} {description} {_specification_text(specifications)}')
+        for name, description, specifications, _, _ in rows
+    ]
+    categories = [code for code, _ in BuildingSystemVendor.CATEGORY_CHOICES]
+    category_rows = [(row, categories.index(category)) for row, (*_, category) in enumerate(rows) if category in categories]
+    category_matrix = sparse.csr_matrix(
+        (np.ones(len(category_rows), dtype=np.float32),
+         ([row for row, _ in category_rows], [col for _, col in category_rows])),
+        shape=(len(rows), len(categories)),
+    )
+    features = sparse.hstack([
+        _tfidf(documents) * TEXT_WEIGHT,
+        category_matrix * CATEGORY_WEIGHT,
+        _soft_bins([parse_price(price_range) for _, _, _, price_range, _ in rows], PRICE_BINS) * PRICE_WEIGHT,
+        _soft_bins([parse_size(specifications) for _, _, specifications, _, _ in rows], SIZE_BINS) * SIZE_WEIGHT,
+    ], format='csr')
+    return _normalize_rows(features)
+
+
+def load_catalogue() -> Tuple[np.ndarray, sparse.csr_matrix]:
+    """Model ids in primary key order and their feature matrix."""
+    rows = list(ModelVendor.objects.order_by('pk').values_list(
+        'pk', 'model_name', 'description', 'specifications', 'price_range', 'vendor__primary_category',
+    ))
+    ids = np.array([row[0] for row in rows], dtype=np.int64)
+    return ids, build_matrix([row[1:] for row in rows])
+
+
+def top_k(matrix: sparse.csr_matrix, positions: np.ndarray, k: int, block_size: int = DEFAULT_BLOCK_SIZE):
+    """
+    Yield ``(position, neighbor_positions, scores)`` for each row in
+    ``positions``, most similar first, excluding the row itself and scores
+    under ``MIN_SCORE``.
+
+    Similarities are computed for ``block_size`` rows at a time, so memory
+    stays at ``block_size`` x catalogue size floats.
+    """
+    count = matrix.shape[0]
+    k = min(k, count - 1)
+    if k <= 0:
+        for position in positions:
+            yield position, np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        return
+    transposed = matrix.T.tocsc()
+    for start in range(0, len(positions), block_size):
+        block = positions[start:start + block_size]
+        scores = (matrix[block] @ transposed).toarray()
+        scores[np.arange(len(block)), block] = -1
+        candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+        order = np.argsort(-candidate_scores, axis=1, kind='stable')
+        neighbors = np.take_along_axis(candidates, order, axis=1)
+        neighbor_scores = np.take_along_axis(candidate_scores, order, axis=1)
+        for position, row_neighbors, row_scores in zip(block, neighbors, neighbor_scores):
+            keep = row_scores >= MIN_SCORE
+            yield position, row_neighbors[keep], row_scores[keep]
+
+
+def _store(ids: np.ndarray, results: Iterable, batch_size: int = 500) -> int:
+    """Replace the neighbour lists of the models in ``results``; returns the rows written."""
+    written = 0
+    batch, model_ids = [], []
+
+    def flush():
+        with transaction.atomic():
+            SimilarModel.objects.filter(model_id__in=model_ids).delete()
+            SimilarModel.objects.bulk_create(batch)
+
+    for position, neighbors, scores in results:
+        model_ids.append(int(ids[position]))
+        batch.extend(
+            SimilarModel(model_id=int(ids[position]), similar_id=int(ids[neighbor]), rank=rank, score=round(float(score), 4))
+            for rank, (neighbor, score) in enumerate(zip(neighbors, scores))
+        )
+        if len(model_ids) >= batch_size:
+            flush()
+            written += len(batch)
+            batch, model_ids = [], []
+    if model_ids:
+        flush()
+        written += len(batch)
+    return written
+
+
+def build_neighbors(k: Optional[int] = None, block_size: Optional[int] = None) -> Dict:
+    """Recompute every model's neighbour list."""
+    k = k or get_k()
+    block_size = block_size or getattr(settings, 'SIMILAR_MODELS_BLOCK_SIZE', DEFAULT_BLOCK_SIZE)
+    ids, matrix = load_catalogue()
+    # Lists of models deleted since the last build go with them (cascade), the rest are replaced
+    written = _store(ids, top_k(matrix, np.arange(len(ids)), k, block_size))
+    return {'models': len(ids), 'neighbors': written, 'features': matrix.shape[1]}
+
+
+def refresh_neighbors(pks: Iterable[int], k: Optional[int] = None, block_size: Optional[int] = None) -> Dict:
+    """
+    Recompute the lists of the models in ``pks`` and of every model whose
+    list they now enter or leave.
+    """
+    k = k or get_k()
+    block_size = block_size or getattr(settings, 'SIMILAR_MODELS_BLOCK_SIZE', DEFAULT_BLOCK_SIZE)
+    pks = set(pks)
+    ids, matrix = load_catalogue()
+    position_of = {int(pk): position for position, pk in enumerate(ids)}
+    changed = np.array(sorted(position_of[pk] for pk in pks if pk in position_of), dtype=np.int64)
+    if not len(changed):
+        return {'models': 0, 'neighbors': 0}
+
+    affected = set(changed.tolist())
+    # Lists that hold a changed model may rank it differently now
+    holders = SimilarModel.objects.filter(similar_id__in=pks).values_list('model_id', flat=True)
+    affected.update(position_of[pk] for pk in holders if pk in position_of)
+    # Lists a changed model now beats the last entry of, or that still have room
+    floors = np.zeros(len(ids), dtype=np.float32)
+    full = np.zeros(len(ids), dtype=bool)
+    lists = SimilarModel.objects.values('model_id').annotate(floor=Min('score'), size=Count('id'))
+    for entry in lists.values_list('model_id', 'floor', 'size'):
+        position = position_of.get(entry[0])
+        if position is not None:
+            floors[position] = entry[1]
+            full[position] = entry[2] >= min(k, len(ids) - 1)
+    transposed = matrix.T.tocsc()
+    for start in range(0, len(changed), block_size):
+        scores = (matrix[changed[start:start + block_size]] @ transposed).toarray().max(axis=0)
+        entering = (scores >= MIN_SCORE) & (~full | (scores > floors))
+        affected.update(np.flatnonzero(entering).tolist())
+
+    positions = np.array(sorted(affected), dtype=np.int64)
+    written = _store(ids, top_k(matrix, positions, k, block_size))
+    return {'models': len(positions), 'neighbors': written}
+
+
+def _refresh_in_background():
+    close_old_connections()
+    try:
+        with _lock:
+            pks = set(_pending)
+            _pending.clear()
+        if pks:
+            refresh_neighbors(pks)
+    except Exception:
+        logger.exception('Refreshing similar models failed')
+    finally:
+        close_old_connections()
+
+
+def schedule_refresh(pks: Iterable[int]):
+    """
+    Refresh the neighbours of ``pks`` on the background thread.
+
+    Models changed while a refresh is queued join it, so a bulk edit costs one
+    refresh instead of one per model.
+    """
+    global _background
+    with _lock:
+        queued = bool(_pending)
+        _pending.update(pks)
+        if _background is None:
+            _background = ThreadPoolExecutor(max_workers=1, thread_name_prefix='similar-models')
+    if not queued:
+        _background.submit(_refresh_in_background)
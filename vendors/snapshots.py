@@ -0,0 +1,256 @@
+"""
+Static catalogue snapshots.
+
+Builds versioned, precompressed JSON snapshots of the vendor list, the model
+list and per-category slices of both. Each snapshot is written under
+``CATALOGUE_SNAPSHOT_ROOT`` with a content hash in its filename, so the files
+can be served with immutable caching by Django or directly by the web server.
+``manifest.json`` maps every slice name to its current file.
+
+Rebuilds triggered by saves run on a background thread (``schedule_build``),
+so a request that edits the catalogue does not wait for the rendering.
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from .models import BuildingSystemVendor, ModelVendor
+from .serializers import BuildingSystemVendorSerializer, ModelVendorListSerializer
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, snapshots fall back to gzip only
+    brotli = None
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'manifest.json'
+VERSIONS_TO_KEEP = 3
+
+# mkstemp creates files only the owner can read; published snapshots get the
+# mode a plain open() would give them, so the web server can serve them.
+# The umask can only be read by setting it, which is done once at import.
+_UMASK = os.umask(0o022)
+os.umask(_UMASK)
+FILE_MODE = 0o666 & ~_UMASK
+
+# Versioned snapshot filenames look like ``models.category.DOMES.3f2a9c1b0d4e.json``
+SNAPSHOT_FILENAME_RE = re.compile(r'^(?P<slice>[A-Za-z0-9_.]+)\.(?P<version>[0-9a-f]{12})\.json$')
+
+# Single worker for rebuilds triggered by saves, and the slices waiting for it
+_background = None
+_pending = set()
+_lock = threading.Lock()
+
+
+def get_snapshot_root() -> Path:
+    return Path(getattr(settings, 'CATALOGUE_SNAPSHOT_ROOT', settings.BASE_DIR / 'snapshots'))
+
+
+def all_slices() -> List[str]:
+    """Every slice name the catalogue publishes."""
+    slices = ['vendors', 'models']
+    for category, _ in BuildingSystemVendor.CATEGORY_CHOICES:
+        slices.append(f'vendors.category.{category}')
+        slices.append(f'models.category.{category}')
+    return slices
+
+
+def slices_for_vendor(*categories: Optional[str]) -> Set[str]:
+    """
+    Slices affected by a vendor change.
+
+    Model listings embed ``vendor_name``, so a vendor change touches the model
+    slices of its category as well.
+    """
+    touched = {'vendors', 'models'}
+    for category in categories:
+        if category:
+            touched.add(f'vendors.category.{category}')
+            touched.add(f'models.category.{category}')
+    return touched
+
+
+def slices_for_model(*categories: Optional[str]) -> Set[str]:
+    """Slices affected by a model change, given its vendor's category."""
+    touched = {'models'}
+    for category in categories:
+        if category:
+            touched.add(f'models.category.{category}')
+    return touched
+
+
+def _slice_data(slice_name: str):
+    parts = slice_name.split('.')
+    kind = parts[0]
+    category = parts[2] if len(parts) == 3 and parts[1] == 'category' else None
+
+    if kind == 'vendors':
+        queryset = BuildingSystemVendor.objects.order_by('id')
+        if category:
+            queryset = queryset.filter(primary_category=category)
+        return BuildingSystemVendorSerializer(queryset, many=True).data
+
+    if kind == 'models':
+        queryset = ModelVendor.objects.select_related('vendor').prefetch_related('gallery')
+        if category:
+            queryset = queryset.filter(vendor__primary_category=category)
+        return ModelVendorListSerializer(queryset, many=True).data
+
+    raise ValueError(f'Unknown snapshot slice: {slice_name}')
+
+
+def _atomic_write(path: Path, content: bytes):
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as fh:
+            fh.write(content)
+        os.chmod(tmp_path, FILE_MODE)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+@contextmanager
+def _manifest_lock(root: Path):
+    """Serialize manifest updates across processes where flock is available."""
+    with open(root / '.lock', 'a') as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def read_manifest(root: Optional[Path] = None) -> Dict:
+    root = root or get_snapshot_root()
+    try:
+        with open(root / MANIFEST_NAME, 'rb') as fh:
+            return json.load(fh)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _write_slice(root: Path, slice_name: str, content: bytes) -> Dict:
+    version = hashlib.sha256(content).hexdigest()[:12]
+    filename = f'{slice_name}.{version}.json'
+    path = root / filename
+
+    # Identical content hashes to the same file, so an unchanged slice costs
+    # one query and a hash but no disk writes.
+    if not path.exists():
+        _atomic_write(root / f'{filename}.gz', gzip.compress(content, compresslevel=9, mtime=0))
+        if brotli is not None:
+            _atomic_write(root / f'{filename}.br', brotli.compress(content))
+        _atomic_write(path, content)
+
+    return {
+        'file': filename,
+        'version': version,
+        'bytes': len(content),
+    }
+
+
+def _prune_slice(root: Path, slice_name: str, current_file: str, keep: int):
+    """Remove all but the current and ``keep - 1`` most recent older versions of a slice."""
+    versions = []
+    for path in root.glob(f'{slice_name}.*.json'):
+        match = SNAPSHOT_FILENAME_RE.match(path.name)
+        if match and match.group('slice') == slice_name and path.name != current_file:
+            versions.append(path)
+    versions.sort(key=lambda p: p.stat().st_mtime, reverse=True)
+    for path in versions[max(keep - 1, 0):]:
+        for suffix in ('', '.gz', '.br'):
+            try:
+                os.unlink(f'{path}{suffix}')
+            except FileNotFoundError:
+                pass
+
+
+def build_snapshots(slices: Optional[Iterable[str]] = None, keep: int = VERSIONS_TO_KEEP) -> Dict:
+    """
+    Build the given slices (all of them by default) and update the manifest.
+
+    Returns:
+        The updated manifest
+    """
+    root = get_snapshot_root()
+    root.mkdir(parents=True, exist_ok=True)
+    slices = sorted(set(slices) if slices is not None else all_slices())
+    renderer = JSONRenderer()
+
+    built = {}
+    for slice_name in slices:
+        content = renderer.render(_slice_data(slice_name))
+        built[slice_name] = _write_slice(root, slice_name, content)
+
+    with _manifest_lock(root):
+        manifest = read_manifest(root)
+        built_at = timezone.now().isoformat()
+        for slice_name, entry in built.items():
+            if manifest.get(slice_name, {}).get('version') != entry['version']:
+                entry['built_at'] = built_at
+            else:
+                entry['built_at'] = manifest[slice_name].get('built_at', built_at)
+            manifest[slice_name] = entry
+        _atomic_write(root / MANIFEST_NAME, json.dumps(manifest, indent=2, sort_keys=True).encode())
+
+    for slice_name, entry in built.items():
+        _prune_slice(root, slice_name, entry['file'], keep)
+
+    return manifest
+
+
+def _build_in_background():
+    close_old_connections()
+    try:
+        with _lock:
+            slices = set(_pending)
+            _pending.clear()
+        if slices:
+            build_snapshots(slices)
+    except Exception:
+        logger.exception('Failed to rebuild catalogue snapshots')
+    finally:
+        close_old_connections()
+
+
+def schedule_build(slices: Iterable[str]):
+    """
+    Rebuild ``slices`` on the background thread.
+
+    Slices requested while a rebuild is queued join it, so a burst of saves
+    rebuilds each touched slice once.
+    """
+    global _background
+    with _lock:
+        queued = bool(_pending)
+        _pending.update(slices)
+        if _background is None:
+            _background = ThreadPoolExecutor(max_workers=1, thread_name_prefix='catalogue-snapshots')
+    if not queued:
+        _background.submit(_build_in_background)
@@ -0,0 +1,414 @@
+"""
+Synthetic catalogue generation for load testing and hardware sizing.
+
+Produces vendors spread across every category with coordinates clustered
+around real building-industry hubs, models shaped like the curated
+``VENDOR_MODELS`` data, affiliate clicks with daily/weekly seasonality, growth
+and long-tail vendor popularity, and consultation requests. All randomness
+comes from one seeded NumPy generator, so the same arguments always produce
+the same catalogue. Every generated vendor carries ``metadata.synthetic`` so
+the data can be removed again.
+"""
+
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+from django.db import connection, transaction
+
+from .models import AffiliateClick, BuildingSystemVendor, ConsultationRequest, ModelVendor
+
+# (lat, lng, region) hubs vendors cluster around
+REGIONS = [
+    (30.2672, -97.7431, 'USA (TX)'),
+    (45.5152, -122.6784, 'USA (OR)'),
+    (37.7749, -122.4194, 'USA (CA)'),
+    (39.7392, -104.9903, 'USA (CO)'),
+    (35.5951, -82.5515, 'USA (NC)'),
+    (47.6062, -122.3321, 'USA (WA)'),
+    (25.7617, -80.1918, 'USA (FL)'),
+    (49.2827, -123.1207, 'Canada (BC)'),
+    (53.5511, 9.9937, 'Germany'),
+    (59.4370, 24.7536, 'Estonia'),
+    (51.5074, -0.1278, 'United Kingdom'),
+    (-33.8688, 151.2093, 'Australia'),
+    (35.6762, 139.6503, 'Japan'),
+    (-23.5505, -46.6333, 'Brazil'),
+]
+
+NAME_PREFIXES = [
+    'Terra', 'Verde', 'Pacific', 'Summit', 'Cedar', 'Solstice', 'Evergreen', 'Northwind', 'Harbor',
+    'Meadow', 'Granite', 'Aurora', 'Willow', 'Canyon', 'Horizon', 'Juniper', 'Lumen', 'Riverstone',
+    'Hearth', 'Alder', 'Basalt', 'Sequoia', 'Tidewater', 'Ember',
+]
+
+CATEGORY_PROFILES = {
+    'PREFAB': {
+        'weight': 0.30, 'suffixes': ['Modular', 'Prefab', 'Haus', 'Homes'],
+        'models': ['Studio', 'ADU', 'Family Home', 'Cabin', 'Duplex'],
+        'materials': ['FSC-certified timber', 'Cross-laminated timber', 'Steel frame, low-VOC finishes'],
+        'focus': 'Factory-built modular homes', 'price': (150, 0.5),
+    },
+    'NATURAL': {
+        'weight': 0.15, 'suffixes': ['Earthworks', 'Cob Co', 'Strawbale', 'Adobe'],
+        'models': ['Cob Cottage', 'Strawbale Home', 'Rammed Earth House', 'Earthbag Dome'],
+        'materials': ['Clay, sand and straw', 'Rammed earth', 'Strawbale with lime plaster'],
+        'focus': 'Natural and earthen construction', 'price': (80, 0.6),
+    },
+    'DOMES': {
+        'weight': 0.15, 'suffixes': ['Domes', 'Geodesics', 'Shells'],
+        'models': ['Geodesic Dome', 'Event Dome', 'Monolithic Dome', 'Glamping Dome'],
+        'materials': ['Douglas fir timber frame', 'Aluminum frame', 'Reinforced concrete shell'],
+        'focus': 'Geodesic and monolithic domes', 'price': (40, 0.7),
+    },
+    '3D_PRINT': {
+        'weight': 0.10, 'suffixes': ['Print', 'Additive', 'Robotics'],
+        'models': ['Printed Home', 'Community Print', 'Printed ADU'],
+        'materials': ['Printed concrete', 'Geopolymer mix', 'Printed earth'],
+        'focus': '3D-printed homes and structures', 'price': (180, 0.4),
+    },
+    'TREE': {
+        'weight': 0.05, 'suffixes': ['Treehouses', 'Canopy', 'Treetop'],
+        'models': ['Canopy Suite', 'Treehouse Retreat', 'Suspended Cabin'],
+        'materials': ['Larch and oak', 'Glulam timber', 'Steel suspension, timber deck'],
+        'focus': 'Tree-integrated architecture', 'price': (120, 0.6),
+    },
+    'HEALTHY': {
+        'weight': 0.15, 'suffixes': ['Living', 'Wellness Homes', 'Healthy Build'],
+        'models': ['Passive House', 'Wellness Cottage', 'Zero-VOC Residence'],
+        'materials': ['Zero-VOC finishes', 'Solid wood, natural oils', 'Mineral wool, lime plaster'],
+        'focus': 'Non-toxic, wellness-focused building systems', 'price': (300, 0.5),
+    },
+    'COMMUNITY': {
+        'weight': 0.10, 'suffixes': ['Villages', 'Commons', 'Collective'],
+        'models': ['Cluster Home', 'Co-housing Unit', 'Village Pod'],
+        'materials': ['Modular timber', 'Recycled steel', 'Hempcrete'],
+        'focus': 'Eco-villages and community developments', 'price': (100, 0.6),
+    },
+}
+
+# Relative click volume by hour of day (UTC) and by weekday (Monday first)
+HOURLY_WEIGHTS = np.array([
+    2, 1.5, 1, 1, 1, 1.5, 2.5, 4, 5.5, 6.5, 7, 7, 6.5, 6.5, 7, 7, 7, 6.5, 6, 6.5, 7, 6, 4.5, 3,
+])
+WEEKDAY_WEIGHTS = np.array([1.1, 1.1, 1.05, 1.0, 0.9, 0.75, 0.8])
+
+CONSULTATION_STATUS_WEIGHTS = {'PENDING': 0.35, 'CONTACTED': 0.3, 'COMPLETED': 0.25, 'CANCELLED': 0.1}
+CONVERSION_RATE = 0.02
+CLICK_CHUNK_SIZE = 50_000
+
+
+def _bulk_insert(model, objs: List, returning: bool = False) -> List:
+    """
+    INSERT ``objs`` with every field as set on the instances.
+
+    Unlike ``bulk_create``, generated ``created_at``/``updated_at`` values are
+    written as given instead of being replaced with now(). With ``returning``
+    the new primary keys are set on ``objs`` (``INSERT ... RETURNING``, SQLite
+    3.35+ and PostgreSQL).
+    """
+    if not objs:
+        return objs
+    meta = model._meta
+    fields = [field for field in meta.concrete_fields if not field.primary_key]
+    qn = connection.ops.quote_name
+    row = '(' + ', '.join(['%s'] * len(fields)) + ')'
+    prefix = f'INSERT INTO {qn(meta.db_table)} ({", ".join(qn(field.column) for field in fields)}) VALUES '
+    suffix = f' RETURNING {qn(meta.pk.column)}' if returning else ''
+    batch_size = max(1, connection.ops.bulk_batch_size(fields, objs))
+    with transaction.atomic(), connection.cursor() as cursor:
+        for i in range(0, len(objs), batch_size):
+            batch = objs[i:i + batch_size]
+            params = [field.get_db_prep_save(getattr(obj, field.attname), connection) for obj in batch for field in fields]
+            cursor.execute(prefix + ', '.join([row] * len(batch)) + suffix, params)
+            if returning:
+                for obj, (pk,) in zip(batch, cursor.fetchall()):
+                    obj.pk = pk
+                    obj._state.adding = False
+                    obj._state.db = connection.alias
+    return objs
+
+
+def _insert_rows(cursor, prefix: str, rows: List[tuple]):
+    """Insert many rows of parameters: ``execute_values`` on psycopg2, ``executemany`` elsewhere."""
+    if connection.vendor == 'postgresql' and connection.Database.__name__ == 'psycopg2':
+        from psycopg2.extras import execute_values
+
+        # psycopg2's executemany runs one INSERT per row
+        execute_values(cursor.cursor, f'{prefix} VALUES %s', rows, page_size=len(rows))
+    else:
+        # SQLite reuses the prepared statement; psycopg 3 pipelines the rows
+        cursor.executemany(f'{prefix} VALUES ({", ".join(["%s"] * len(rows[0]))})', rows)
+
+
+def _sample_timestamps(rng: np.random.Generator, count: int, start: datetime, days: int,
+                       growth: float = 1.5) -> np.ndarray:
+    """
+    Sample event times with weekly and daily seasonality and linear growth.
+
+    ``growth`` is the ratio of traffic on the last day to traffic on the first.
+
+    Returns:
+        ``datetime64[us]`` array in UTC
+    """
+    day_offsets = np.arange(days)
+    weekdays = (start.weekday() + day_offsets) % 7
+    day_weights = np.linspace(1.0, growth, days) * WEEKDAY_WEIGHTS[weekdays]
+    day = rng.choice(days, size=count, p=day_weights / day_weights.sum())
+    hour = rng.choice(24, size=count, p=HOURLY_WEIGHTS / HOURLY_WEIGHTS.sum())
+    micros = (day.astype(np.int64) * 86_400 + hour * 3_600) * 1_000_000 + rng.integers(0, 3_600_000_000, size=count)
+    base = np.datetime64(start.replace(tzinfo=None), 'us')
+    return base + micros.astype('timedelta64[us]')
+
+
+def _datetime_strings(values: np.ndarray) -> np.ndarray:
+    """Format datetime64 values the way the active database backend stores them."""
+    text = np.datetime_as_string(values, unit='us')
+    if connection.vendor == 'sqlite':
+        return np.char.replace(text, 'T', ' ')
+    return np.char.add(text, '+00:00')
+
+
+def _to_datetimes(values: np.ndarray) -> List[datetime]:
+    return [value.replace(tzinfo=dt_timezone.utc) for value in values.astype('datetime64[us]').tolist()]
+
+
+def _popularity(rng: np.random.Generator, count: int, exponent: float = 1.1) -> np.ndarray:
+    """Zipf-like share of traffic per vendor, in random vendor order."""
+    weights = 1.0 / np.arange(1, count + 1) ** exponent
+    rng.shuffle(weights)
+    return weights / weights.sum()
+
+
+def generate_vendors(rng: np.random.Generator, count: int, start: datetime, days: int) -> List[BuildingSystemVendor]:
+    categories = list(CATEGORY_PROFILES)
+    weights = np.array([CATEGORY_PROFILES[c]['weight'] for c in categories])
+    category_idx = rng.choice(len(categories), size=count, p=weights / weights.sum())
+    region_idx = rng.integers(0, len(REGIONS), size=count)
+    hubs = np.array([(lat, lng) for lat, lng, _ in REGIONS])
+    coords = hubs[region_idx] + rng.normal(0, 1.5, size=(count, 2))
+    coords[:, 0] = np.clip(coords[:, 0], -89.9, 89.9)
+    coords[:, 1] = (coords[:, 1] + 180) % 360 - 180
+    prefix_idx = rng.integers(0, len(NAME_PREFIXES), size=count)
+    suffix_pick = rng.integers(0, 4, size=count)
+    certified = rng.random(count) < 0.4
+    consultation = rng.random(count) < 0.7
+    status_draw = rng.random(count)
+    heal_draw = rng.random(count)
+    created = _to_datetimes(_sample_timestamps(rng, count, start, days, growth=1.0))
+
+    vendors = []
+    for i in range(count):
+        category = categories[category_idx[i]]
+        profile = CATEGORY_PROFILES[category]
+        suffix = profile['suffixes'][suffix_pick[i] % len(profile['suffixes'])]
+        name = f'{NAME_PREFIXES[prefix_idx[i]]} {suffix} {i + 1}'
+        slug = name.lower().replace(' ', '')
+        vendors.append(BuildingSystemVendor(
+            partner_name=name,
+            website_url=f'https://{slug}.example.com',
+            affiliate_link=f'https://{slug}.example.com/?ref=terralux',
+            is_certified=bool(certified[i]),
+            consultation_enabled=bool(consultation[i]),
+            coordinates=f'{coords[i, 0]:.4f},{coords[i, 1]:.4f}',
+            primary_category=category,
+            heal_alignment='HIGH' if heal_draw[i] < 0.5 else 'MEDIUM' if heal_draw[i] < 0.85 else 'LOW',
+            status='CORE_COUNCIL' if status_draw[i] < 0.02 else 'PRIORITY' if status_draw[i] < 0.3 else 'ACTIVE',
+            metadata={
+                'specialty_focus': profile['focus'],
+                'region_hq': REGIONS[region_idx[i]][2],
+                'synthetic': True,
+            },
+            contact_info={'email': f'hello@{slug}.example.com'},
+            created_at=created[i],
+        ))
+
+    return _bulk_insert(BuildingSystemVendor, vendors, returning=True)
+
+
+def generate_models(rng: np.random.Generator, vendors: List[BuildingSystemVendor], per_vendor: int) -> List[ModelVendor]:
+    count = len(vendors) * per_vendor
+    if not count:
+        return []
+    size_sqft = np.round(rng.lognormal(np.log(900), 0.6, size=count), -1).astype(int).clip(120, 6000)
+    bedrooms = np.clip(size_sqft // 450, 0, 6)
+    bathrooms = np.maximum(1, bedrooms // 2 + (size_sqft > 1500))
+    template_pick = rng.integers(0, 100, size=count)
+    material_pick = rng.integers(0, 3, size=count)
+    weeks = rng.integers(2, 26, size=count)
+    price_profiles = np.array([CATEGORY_PROFILES[v.primary_category]['price'] for v in vendors]).repeat(per_vendor, axis=0)
+    low_k = price_profiles[:, 0] * rng.lognormal(0, price_profiles[:, 1]) * (size_sqft / 900) ** 0.7
+    low_k = np.maximum(np.round(low_k), 5).astype(int)
+    high_k = (low_k * rng.uniform(1.3, 2.0, size=count)).astype(int)
+    featured = rng.random(count) < 0.1
+
+    models = []
+    i = 0
+    for vendor in vendors:
+        profile = CATEGORY_PROFILES[vendor.primary_category]
+        for j in range(per_vendor):
+            base = profile['models'][template_pick[i] % len(profile['models'])]
+            name = f'{base} {size_sqft[i]}'
+            models.append(ModelVendor(
+                vendor=vendor,
+                model_name=name,
+                slug=f'{name.lower().replace(" ", "-")}-{vendor.pk}-{j}',
+                description=(
+                    f'{base} by {vendor.partner_name}: a {size_sqft[i]:,} sq ft '
+                    f'{profile["focus"].lower()} build using {profile["materials"][material_pick[i]].lower()}.'
+                ),
+                price_range=f'${low_k[i]}k-${high_k[i]}k',
+                specifications={
+                    'size': f'{size_sqft[i]:,} sq ft',
+                    'bedrooms': 'Studio' if bedrooms[i] == 0 else str(bedrooms[i]),
+                    'bathrooms': str(bathrooms[i]),
+                    'materials': profile['materials'][material_pick[i]],
+                    'construction_time': f'{weeks[i]} weeks',
+                },
+                images=[f'https://images.example.com/models/{vendor.pk}/{j}.jpg'],
+                is_featured=bool(featured[i]),
+                created_at=vendor.created_at,
+                updated_at=vendor.created_at,
+            ))
+            i += 1
+
+    return _bulk_insert(ModelVendor, models, returning=True)
+
+
+def generate_clicks(rng: np.random.Generator, vendor_ids: np.ndarray, popularity: np.ndarray, count: int,
+                    start: datetime, days: int, chunk_size: int = CLICK_CHUNK_SIZE,
+                    progress: Optional[Callable[[int], None]] = None) -> int:
+    """
+    Insert ``count`` clicks in chunks.
+
+    Clicks skip the ORM entirely: arrays are generated per chunk and written
+    with one parameterized statement per chunk (``executemany`` on SQLite,
+    ``execute_values`` on PostgreSQL), which is what makes tens of millions of
+    rows feasible.
+    """
+    table = AffiliateClick._meta.db_table
+    qn = connection.ops.quote_name
+    prefix = f'INSERT INTO {qn(table)} ({qn("vendor_id")}, {qn("timestamp")}, {qn("converted")})'
+    written = 0
+    while written < count:
+        n = min(chunk_size, count - written)
+        vendors = vendor_ids[rng.choice(len(vendor_ids), size=n, p=popularity)]
+        timestamps = _datetime_strings(_sample_timestamps(rng, n, start, days))
+        converted = rng.random(n) < CONVERSION_RATE
+        with transaction.atomic(), connection.cursor() as cursor:
+            _insert_rows(cursor, prefix, list(zip(vendors.tolist(), timestamps.tolist(), converted.tolist())))
+        written += n
+        if progress:
+            progress(written)
+    return written
+
+
+def generate_consultations(rng: np.random.Generator, vendors: List[BuildingSystemVendor],
+                           models_by_vendor: Dict[int, List[int]], popularity: np.ndarray, count: int,
+                           start: datetime, days: int) -> int:
+    if not count or not vendors:
+        return 0
+    vendor_idx = rng.choice(len(vendors), size=count, p=popularity)
+    created = _to_datetimes(_sample_timestamps(rng, count, start, days))
+    statuses = list(CONSULTATION_STATUS_WEIGHTS)
+    weights = np.array(list(CONSULTATION_STATUS_WEIGHTS.values()))
+    status_idx = rng.choice(len(statuses), size=count, p=weights)
+    model_pick = rng.integers(0, 1 << 30, size=count)
+    with_model = rng.random(count) < 0.6
+    with_phone = rng.random(count) < 0.5
+
+    requests = []
+    for i in range(count):
+        vendor = vendors[vendor_idx[i]]
+        vendor_models = models_by_vendor.get(vendor.pk) or []
+        model_id = vendor_models[model_pick[i] % len(vendor_models)] if vendor_models and with_model[i] else None
+        requests.append(ConsultationRequest(
+            email=f'lead{i}@example.com',
+            phone=f'+1555{i % 10_000_000:07d}' if with_phone[i] else '',
+            vendor=vendor,
+            model_id=model_id,
+            message=f'Interested in building with {vendor.partner_name}. Please get in touch.',
+            status=statuses[status_idx[i]],
+            created_at=created[i],
+            updated_at=created[i],
+        ))
+
+    _bulk_insert(ConsultationRequest, requests)
+    return count
+
+
+def generate_catalogue(vendors: int, models_per_vendor: int = 5, clicks: int = 0, consultations: int = 0,
+                       days: int = 365, seed: int = 0, end: Optional[datetime] = None,
+                       chunk_size: int = CLICK_CHUNK_SIZE, log: Callable[[str], None] = lambda msg: None) -> Dict:
+    """
+    Generate a synthetic catalogue.
+
+    Args:
+        vendors: Number of vendors
+        models_per_vendor: Models created for each vendor
+        clicks: Total affiliate clicks, spread over the last ``days`` days
+        consultations: Total consultation requests
+        days: Length of the simulated history
+        seed: Random seed; the same arguments produce the same data
+        end: End of the simulated history (defaults to now)
+
+    Returns:
+        Counts of the rows created
+    """
+    rng = np.random.default_rng(seed)
+    end = end or datetime.now(dt_timezone.utc)
+    start = (end - timedelta(days=days)).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    log(f'Creating {vendors:,} vendors...')
+    vendor_objs = generate_vendors(rng, vendors, start, days)
+    log(f'Creating {vendors * models_per_vendor:,} models...')
+    model_objs = generate_models(rng, vendor_objs, models_per_vendor)
+    models_by_vendor = {}
+    for model in model_objs:
+        models_by_vendor.setdefault(model.vendor_id, []).append(model.pk)
+
+    popularity = _popularity(rng, len(vendor_objs)) if vendor_objs else None
+    click_count = 0
+    if clicks and vendor_objs:
+        log(f'Creating {clicks:,} clicks...')
+        vendor_ids = np.array([vendor.pk for vendor in vendor_objs], dtype=np.int64)
+        report_every = max(chunk_size, clicks // 10)
+        next_report = [report_every]
+
+        def progress(done):
+            if done >= next_report[0] or done == clicks:
+                log(f'  {done:,} / {clicks:,} clicks')
+                next_report[0] = done + report_every
+
+        click_count = generate_clicks(
+            rng, vendor_ids, popularity, clicks, start, days, chunk_size=chunk_size, progress=progress
+        )
+
+    log(f'Creating {consultations:,} consultation requests...')
+    consultation_count = generate_consultations(
+        rng, vendor_objs, models_by_vendor, popularity, consultations, start, days
+    )
+
+    return {
+        'vendors': len(vendor_objs),
+        'models': len(model_objs),
+        'clicks': click_count,
+        'consultations': consultation_count,
+    }
+
+
+def delete_synthetic(chunk_size: int = 500) -> int:
+    """
+    Remove every synthetic vendor and everything attached to it.
+
+    Returns:
+        Number of vendors removed
+    """
+    vendor_ids = list(BuildingSystemVendor.objects.filter(metadata__synthetic=True).values_list('pk', flat=True))
+    for i in range(0, len(vendor_ids), chunk_size):
+        chunk = vendor_ids[i:i + chunk_size]
+        # Clicks have no signals or dependents, so this is one DELETE per chunk
+        AffiliateClick.objects.filter(vendor_id__in=chunk).delete()
+        ConsultationRequest.objects.filter(vendor_id__in=chunk).delete()
+        BuildingSystemVendor.objects.filter(pk__in=chunk).delete()
+    return len(vendor_ids)
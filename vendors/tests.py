@@ -1,3 +1,685 @@
-from django.test import TestCase
+import math
+import socket
+import tempfile
+import urllib.request
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from . import changelog, click_archive, click_filter, conversions, enrichment, image_ingest, popularity, snapshots
+from .ai_service import SuggestionError
+from .benchmarks import BROWSER_USER_AGENT
+from .dedup import build_vendor_index
+from .ingest import create_vendor
+from .intake import ConsultationIntake
+from .leads import claim_leads, release_leads
+from .models import (
+    AffiliateClick, BuildingSystemVendor, CatalogueChange, ClickArchive, ClickDailyRollup, ConsultationRequest,
+    EnrichmentJob, ModelImage, ModelVendor, PopularityState,
+)
+
+# Keep saves from starting background threads, which would hold the test
+# database while the test case writes to it
+QUIET = dict(
+    CATALOGUE_SNAPSHOTS_ON_SAVE=False,
+    CATALOGUE_REALTIME=False,
+    SIMILAR_MODELS_ON_SAVE=False,
+    IMAGE_INGEST_ON_SAVE=False,
+    GLB_INGEST_ON_SAVE=False,
+)
+
+
+def make_vendor(name='ICON Build', category='DOMES', **fields):
+    return BuildingSystemVendor.objects.create(partner_name=name, primary_category=category, **fields)
+
+
+def make_staff(username='staff'):
+    return get_user_model().objects.create_superuser(username, f'{username}@example.com', 'password')
+
+
+@override_settings(**QUIET)
+class ConsultationIntakeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.vendor = make_vendor(consultation_enabled=True)
+        self.payload = {'email': 'lead@example.com', 'vendor': self.vendor.pk, 'message': 'Hello'}
+
+    def post(self, payload=None):
+        return self.client.post('/api/consultations/', payload or self.payload, content_type='application/json')
+
+    def test_created_inline_with_body(self):
+        response = self.post()
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['email'], 'lead@example.com')
+        self.assertEqual(response.json()['id'], ConsultationRequest.objects.get().pk)
+
+    def test_duplicate_submission_is_not_stored_twice(self):
+        self.assertEqual(self.post().status_code, 201)
+        response = self.post({**self.payload, 'email': 'LEAD@example.com', 'message': '  hello '})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'status': 'duplicate'})
+        self.assertEqual(ConsultationRequest.objects.count(), 1)
+
+    def test_failed_write_releases_dedup_key(self):
+        with mock.patch('vendors.intake.run_write', side_effect=RuntimeError('disk full')):
+            with self.assertRaises(RuntimeError):
+                self.post()
+        self.assertEqual(self.post().status_code, 201)
+        self.assertEqual(ConsultationRequest.objects.count(), 1)
+
+    @override_settings(CONSULTATION_INTAKE_ASYNC=True)
+    def test_queue_full_rejects_and_releases_key(self):
+        intake = ConsultationIntake(maxsize=1)
+        intake._ensure_started = lambda: None  # nothing drains the queue
+        with mock.patch('vendors.views.get_intake', return_value=intake):
+            self.assertEqual(self.post().status_code, 202)
+            response = self.post({**self.payload, 'email': 'other@example.com'})
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response['Retry-After'], '5')
+            intake._queue.get_nowait()
+            self.assertEqual(self.post({**self.payload, 'email': 'other@example.com'}).status_code, 202)
+
+    def test_worker_retries_then_releases_key(self):
+        intake = ConsultationIntake(retries=2, retry_delay=0)
+        data = {'email': 'lead@example.com', 'vendor': self.vendor, 'message': 'Hello'}
+        key = intake._claim_fingerprint(data)
+        with mock.patch.object(intake, '_write', side_effect=[RuntimeError('locked'), None]) as write:
+            with self.assertLogs('vendors.intake', 'WARNING'):
+                intake._store((data, None, key))
+        self.assertEqual(write.call_count, 2)
+        self.assertIsNone(intake._claim_fingerprint(data))
+
+        with mock.patch.object(intake, '_write', side_effect=RuntimeError('locked')) as write:
+            with self.assertLogs('vendors.intake', 'WARNING') as logs:
+                intake._store((data, None, key))
+        self.assertEqual(write.call_count, 3)
+        self.assertIn('Dropped', logs.output[-1])
+        self.assertIn('lead@example.com', logs.output[-1])
+        self.assertIsNotNone(intake._claim_fingerprint(data))
+
+
+@override_settings(**QUIET)
+class LeadQueueTests(TestCase):
+    def setUp(self):
+        self.alice = make_staff('alice')
+        self.bob = make_staff('bob')
+        vendor = make_vendor()
+        start = timezone.now() - timedelta(hours=1)
+        self.leads = []
+        for i in range(5):
+            lead = ConsultationRequest.objects.create(email=f'lead{i}@example.com', vendor=vendor, message='Hi')
+            ConsultationRequest.objects.filter(pk=lead.pk).update(created_at=start + timedelta(minutes=i))
+            self.leads.append(lead.pk)
+
+    def test_claims_oldest_pending_first(self):
+        claimed = claim_leads(self.alice, 2)
+        self.assertEqual([lead.pk for lead in claimed], self.leads[:2])
+        self.assertTrue(all(lead.status == 'CLAIMED' and lead.assigned_to == self.alice for lead in claimed))
+
+    def test_never_hands_out_a_claimed_lead(self):
+        first = {lead.pk for lead in claim_leads(self.alice, 3)}
+        second = {lead.pk for lead in claim_leads(self.bob, 10)}
+        self.assertEqual(first & second, set())
+        self.assertEqual(first | second, set(self.leads))
+        self.assertEqual(claim_leads(self.bob, 10), [])
+
+    def test_release_only_own_claims(self):
+        claimed = [lead.pk for lead in claim_leads(self.alice, 2)]
+        self.assertEqual(release_leads(self.bob, claimed), 0)
+        self.assertEqual(release_leads(self.alice, claimed), 2)
+        self.assertEqual([lead.pk for lead in claim_leads(self.bob, 2)], claimed)
+
+    def test_claim_endpoint(self):
+        self.client.force_login(self.alice)
+        self.assertEqual(self.client.post('/api/leads/claim/', {'count': 0}).status_code, 400)
+        response = self.client.post('/api/leads/claim/', {'count': 2})
+        self.assertEqual([lead['id'] for lead in response.json()], self.leads[:2])
+        self.assertEqual(len(self.client.get('/api/leads/').json()), 2)
+
+    def test_admin_changelist_queries_do_not_grow_with_leads(self):
+        model = ModelVendor.objects.create(vendor=make_vendor('Deltec Homes'), model_name='Dome 30', slug='dome-30')
+        ConsultationRequest.objects.update(model=model)
+        self.client.force_login(self.alice)
+        url = '/admin/vendors/consultationrequest/'
+
+        with CaptureQueriesContext(connection) as few:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        for i in range(5):
+            other = ModelVendor.objects.create(vendor=make_vendor(f'Vendor {i}'), model_name=f'Model {i}', slug=f'model-{i}')
+            ConsultationRequest.objects.create(email=f'more{i}@example.com', model=other, message='Hi')
+        with CaptureQueriesContext(connection) as many:
+            self.client.get(url)
+        self.assertEqual(len(many), len(few))
+
+
+@override_settings(**QUIET, CATALOGUE_CHANGE_LOG=True)
+class ChangeLogTests(TestCase):
+    def changes(self, since=0):
+        return changelog.changes_since(since, 100)
+
+    def save_vendor(self, vendor=None, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            if vendor is None:
+                return make_vendor(**fields)
+            vendor.save()
+            return vendor
+
+    def test_changes_after_token(self):
+        first = self.save_vendor(name='First')
+        token = self.changes()['next']
+        second = self.save_vendor(name='Second')
+        result = self.changes(int(token))
+        self.assertEqual([vendor['id'] for vendor in result['vendors']['updated']], [second.pk])
+        self.assertGreater(int(result['next']), int(token))
+        self.save_vendor(first)
+        self.assertEqual([vendor['id'] for vendor in self.changes(int(result['next']))['vendors']['updated']], [first.pk])
+
+    def test_unsequenced_entries_are_held_back(self):
+        vendor = make_vendor()  # the commit callback never runs
+        self.assertEqual(self.changes()['vendors']['updated'], [])
+        self.assertEqual(changelog.sequence_pending(), 1)
+        self.assertEqual([v['id'] for v in self.changes()['vendors']['updated']], [vendor.pk])
+
+    def test_late_commit_below_a_seen_id_is_not_skipped(self):
+        early, late = make_vendor(name='Early'), make_vendor(name='Late')
+        CatalogueChange.objects.all().delete()
+        # The entry with the higher id commits and is read first...
+        CatalogueChange.objects.create(id=1000, object_type=CatalogueChange.VENDOR, object_id=late.pk, op=CatalogueChange.UPSERT)
+        changelog.sequence_pending()
+        token = int(self.changes()['next'])
+        # ...then a slower transaction commits an entry with a lower id
+        CatalogueChange.objects.create(id=10, object_type=CatalogueChange.VENDOR, object_id=early.pk, op=CatalogueChange.UPSERT)
+        changelog.sequence_pending()
+        self.assertEqual([v['id'] for v in self.changes(token)['vendors']['updated']], [early.pk])
+
+    def test_deletes_and_compaction_reset(self):
+        vendor = self.save_vendor()
+        pk = vendor.pk
+        with self.captureOnCommitCallbacks(execute=True):
+            vendor.delete()
+        token = int(self.changes()['next'])
+        self.assertEqual(self.changes(token - 1)['vendors']['deleted'], [pk])
+        CatalogueChange.objects.filter(op=CatalogueChange.DELETE).update(created_at=timezone.now() - timedelta(days=60))
+        self.assertEqual(changelog.compact(days=30)['removed'], 1)
+        result = self.changes(1)
+        self.assertTrue(result['reset'])
+        self.assertEqual(result['since'], '0')
+
+
+class ImageDownloadGuardTests(TestCase):
+    def assertRefused(self, url, message):
+        with self.assertRaisesMessage(image_ingest.DownloadError, message):
+            image_ingest.download(ModelImage(source_url=url))
+
+    def test_only_http_urls(self):
+        self.assertRefused('file:///etc/passwd', 'Not an http(s) URL')
+        self.assertRefused('ftp://example.com/a.jpg', 'Not an http(s) URL')
+
+    def test_non_public_addresses(self):
+        self.assertRefused('http://127.0.0.1:8000/admin/', 'non-public address')
+        self.assertRefused('http://[::1]/a.jpg', 'non-public address')
+        metadata = [(socket.AF_INET, socket.SOCK_STREAM, 6, '', ('169.254.169.254', 80))]
+        with mock.patch('socket.getaddrinfo', return_value=metadata):
+            self.assertRefused('http://images.example.com/a.jpg', 'non-public address')
+
+    def test_address_classes(self):
+        for ip in ('10.0.0.1', '172.16.0.1', '192.168.1.1', '127.0.0.1', '169.254.169.254', '0.0.0.0',
+                   '224.0.0.1', 'fe80::1', 'fc00::1', '::ffff:127.0.0.1'):
+            self.assertFalse(image_ingest.is_public_address(ip), ip)
+        self.assertTrue(image_ingest.is_public_address('93.184.216.34'))
+
+    def test_redirects_stay_on_http(self):
+        handler = image_ingest._HTTPRedirectHandler()
+        request = urllib.request.Request('https://images.example.com/a.jpg')
+        with self.assertRaises(image_ingest.DownloadError):
+            handler.redirect_request(request, None, 302, 'Found', {}, 'file:///etc/passwd')
+        self.assertIsNotNone(handler.redirect_request(request, None, 302, 'Found', {}, 'https://cdn.example.com/a.jpg'))
+
+
+@override_settings(**QUIET)
+class PopularityTests(TestCase):
+    def click(self, vendor, days_ago=0, **fields):
+        click = AffiliateClick.objects.create(vendor=vendor, **fields)
+        if days_ago:
+            AffiliateClick.objects.filter(pk=click.pk).update(timestamp=timezone.now() - timedelta(days=days_ago))
+        return click
+
+    def setUp(self):
+        self.vendors = [make_vendor(f'Vendor {i}') for i in range(3)]
+        self.model = ModelVendor.objects.create(vendor=self.vendors[2], model_name='Dome', slug='dome')
+        self.at = timezone.now() + timedelta(days=1)
+
+    def decayed(self):
+        """Scores decayed to a common instant, comparable across landmarks."""
+        state = PopularityState.objects.get()
+        at = self.at
+        factor = math.exp(-popularity.decay_rate(state.half_life_days) * (at - state.landmark).total_seconds())
+        vendors = {v.pk: v.popularity * factor for v in BuildingSystemVendor.objects.all()}
+        models = {m.pk: m.popularity * factor for m in ModelVendor.objects.all()}
+        return vendors, models
+
+    def assertScoresEqual(self, first, second):
+        for a, b in zip(first, second):
+            self.assertEqual(a.keys(), b.keys())
+            for pk in a:
+                self.assertAlmostEqual(a[pk], b[pk], places=9)
+
+    def test_incremental_matches_rebuild(self):
+        for days, vendor in ((30, 0), (10, 1), (1, 1), (0, 2)):
+            self.click(self.vendors[vendor], days_ago=days)
+        popularity.update_scores(batch_size=2)
+        ConsultationRequest.objects.create(email='a@example.com', model=self.model, message='Hi')
+        ConsultationRequest.objects.create(email='b@example.com', vendor=self.vendors[0], message='Hi')
+        self.click(self.vendors[0])
+        counted = popularity.update_scores(batch_size=2)
+        self.assertEqual(counted, {'clicks': 1, 'consultations': 2})
+        incremental = self.decayed()
+
+        popularity.rebuild_scores(batch_size=3)
+        self.assertScoresEqual(incremental, self.decayed())
+        self.assertGreater(incremental[0][self.vendors[0].pk], incremental[0][self.vendors[1].pk])
+        self.assertGreater(incremental[1][self.model.pk], 0)
+
+    def test_late_commit_below_watermark_is_counted(self):
+        self.click(self.vendors[0])
+        late = self.click(self.vendors[1])
+        self.click(self.vendors[2])
+        # The middle click's transaction has not committed when the update runs
+        late_id, late_timestamp = late.pk, late.timestamp
+        late.delete()
+        self.assertEqual(popularity.update_scores(), {'clicks': 2, 'consultations': 0})
+        self.assertEqual([pk for pk, _ in PopularityState.objects.get().click_gaps], [late_id])
+
+        AffiliateClick.objects.create(id=late_id, vendor=self.vendors[1])
+        AffiliateClick.objects.filter(id=late_id).update(timestamp=late_timestamp)
+        self.assertEqual(popularity.update_scores(), {'clicks': 1, 'consultations': 0})
+        self.assertEqual(PopularityState.objects.get().click_gaps, [])
+        incremental = self.decayed()
+        popularity.rebuild_scores()
+        self.assertScoresEqual(incremental, self.decayed())
+
+    @override_settings(POPULARITY_GAP_SECONDS=60)
+    def test_gaps_expire(self):
+        self.click(self.vendors[0])
+        self.click(self.vendors[1]).delete()
+        self.click(self.vendors[2])
+        popularity.update_scores()
+        PopularityState.objects.update(click_gaps=[[pk, seen_at - 120] for pk, seen_at in PopularityState.objects.get().click_gaps])
+        popularity.update_scores()
+        self.assertEqual(PopularityState.objects.get().click_gaps, [])
+
+    def test_save_leaves_score_alone(self):
+        vendor = self.vendors[0]
+        BuildingSystemVendor.objects.filter(pk=vendor.pk).update(popularity=5)
+        vendor.partner_name = 'Renamed'
+        vendor.save()
+        vendor.refresh_from_db()
+        self.assertEqual((vendor.partner_name, vendor.popularity), ('Renamed', 5))
+
+    def test_save_copies_and_deleted_rows(self):
+        copy = BuildingSystemVendor.objects.get(pk=self.vendors[0].pk)
+        copy.pk = None
+        copy.save()
+        self.assertNotEqual(copy.pk, self.vendors[0].pk)
+        self.assertEqual(BuildingSystemVendor.objects.count(), 4)
+
+        model = ModelVendor.objects.get(pk=self.model.pk)
+        ModelVendor.objects.filter(pk=model.pk).delete()
+        model.save()
+        self.assertTrue(ModelVendor.objects.filter(pk=model.pk, slug='dome').exists())
+
+    def test_old_gaps_are_not_tracked(self):
+        self.click(self.vendors[0], days_ago=2)
+        self.click(self.vendors[1], days_ago=2).delete()
+        self.click(self.vendors[2], days_ago=2)
+        popularity.update_scores()
+        self.assertEqual(PopularityState.objects.get().click_gaps, [])
+
+
+@override_settings(**QUIET, CLICK_FILTER_ENABLED=True)
+class ClickFilterTests(TestCase):
+    def setUp(self):
+        self.vendor = make_vendor()
+        self.other = make_vendor('Deltec Homes')
+        self.factory = RequestFactory()
+        click_filter.get_click_filter().clear()
+
+    def request(self, user_agent=BROWSER_USER_AGENT, ip='203.0.113.5', **meta):
+        return self.factory.post('/', HTTP_USER_AGENT=user_agent, REMOTE_ADDR=ip, **meta)
+
+    def track(self, vendor, **headers):
+        return self.client.post(f'/api/vendors/{vendor.pk}/track_click/', HTTP_USER_AGENT=BROWSER_USER_AGENT, **headers)
+
+    def test_bots_and_missing_user_agents(self):
+        checker = click_filter.ClickFilter()
+        self.assertEqual(checker.check(self.request(''), 1), click_filter.BOT)
+        self.assertEqual(checker.check(self.request('Googlebot/2.1'), 1), click_filter.BOT)
+        self.assertEqual(checker.check(self.request('python-requests/2.32'), 1), click_filter.BOT)
+        self.assertIsNone(checker.check(self.request(), 1))
+
+    def test_duplicates_within_sliding_window(self):
+        checker = click_filter.ClickFilter(dedup_window=30)
+        self.assertIsNone(checker.check(self.request(), 1, now=0))
+        self.assertEqual(checker.check(self.request(), 1, now=20), click_filter.DUPLICATE)
+        # The repeat at 20 s restarted the window
+        self.assertEqual(checker.check(self.request(), 1, now=45), click_filter.DUPLICATE)
+        self.assertIsNone(checker.check(self.request(), 1, now=80))
+        self.assertIsNone(checker.check(self.request(), 2, now=80))
+        self.assertIsNone(checker.check(self.request(ip='203.0.113.6'), 1, now=80))
+
+    def test_rate_limit(self):
+        checker = click_filter.ClickFilter(rate_limit=3, rate_window=60)
+        results = [checker.check(self.request(), vendor, now=vendor) for vendor in range(5)]
+        self.assertEqual(results, [None, None, None, click_filter.RATE_LIMITED, click_filter.RATE_LIMITED])
+        self.assertIsNone(checker.check(self.request(), 99, now=200))
+
+    def test_forwarded_header_tells_proxied_visitors_apart(self):
+        shared = click_filter.ClickFilter()
+        forwarded = click_filter.ClickFilter(forwarded_header='HTTP_X_FORWARDED_FOR')
+        first = self.request(ip='10.0.0.1', HTTP_X_FORWARDED_FOR='198.51.100.1, 10.0.0.1')
+        second = self.request(ip='10.0.0.1', HTTP_X_FORWARDED_FOR='198.51.100.2')
+        self.assertIsNone(shared.check(first, 1, now=0))
+        self.assertEqual(shared.check(second, 1, now=1), click_filter.DUPLICATE)
+        self.assertIsNone(forwarded.check(first, 1, now=0))
+        self.assertIsNone(forwarded.check(second, 1, now=1))
+
+    def test_track_click_endpoint(self):
+        response = self.track(self.vendor)
+        self.assertEqual(response.status_code, 201)
+        repeat = self.track(self.vendor)
+        self.assertEqual(repeat.status_code, 200)
+        self.assertEqual(repeat.json()['reason'], click_filter.DUPLICATE)
+        self.assertEqual(self.track(self.other).status_code, 201)
+        bot = self.client.post(f'/api/vendors/{self.vendor.pk}/track_click/')
+        self.assertEqual(bot.json()['reason'], click_filter.BOT)
+        self.assertEqual(AffiliateClick.objects.count(), 2)
+
+    @override_settings(CLICK_FILTER_ENABLED=False)
+    def test_disabled(self):
+        self.assertEqual(self.client.post(f'/api/vendors/{self.vendor.pk}/track_click/').status_code, 201)
+        self.assertEqual(self.client.post(f'/api/vendors/{self.vendor.pk}/track_click/').status_code, 201)
+
+
+@override_settings(**QUIET)
+class ConversionTests(TestCase):
+    url = '/api/clicks/conversions/'
+
+    def setUp(self):
+        vendor = make_vendor()
+        self.clicks = [AffiliateClick.objects.create(vendor=vendor) for _ in range(4)]
+        self.ids = [click.pk for click in self.clicks]
+
+    def test_counts(self):
+        lines = [f'{self.ids[0]}\n', f'{self.ids[1]}\n', f'{self.ids[0]}\n', 'abc\n', '\n', '-3\n', '999999\n']
+        counts = conversions.apply_conversions(conversions.read_click_ids(lines), chunk_size=2)
+        self.assertEqual(counts, {
+            'received': 6, 'matched': 2, 'converted': 2, 'already_converted': 0,
+            'unmatched': 1, 'invalid': 2, 'duplicates': 1,
+        })
+        self.assertEqual(AffiliateClick.objects.filter(converted=True).count(), 2)
+
+    def test_applying_again_changes_nothing(self):
+        lines = [f'{click_id}\n'.encode() for click_id in self.ids[:3]]
+        first = conversions.apply_conversions(conversions.read_click_ids(lines))
+        again = conversions.apply_conversions(conversions.read_click_ids(lines))
+        self.assertEqual((first['converted'], first['already_converted']), (3, 0))
+        self.assertEqual((again['converted'], again['already_converted'], again['matched']), (0, 3, 3))
+        self.assertFalse(AffiliateClick.objects.get(pk=self.ids[3]).converted)
+
+    def test_csv_header(self):
+        lines = ['﻿Order,Click_ID\n', f'A1,{self.ids[0]}\n', 'A2\n']
+        self.assertEqual(list(conversions.read_click_ids(lines)), [self.ids[0], None])
+        with self.assertRaises(conversions.ConversionFileError):
+            list(conversions.read_click_ids(['order,amount\n', 'A1,10\n']))
+
+    def test_endpoint(self):
+        self.assertEqual(self.client.post(self.url, {'click_ids': self.ids}, content_type='application/json').status_code, 403)
+        self.client.force_login(make_staff())
+        response = self.client.post(self.url, {'click_ids': [self.ids[0], 'x']}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()['converted'], response.json()['invalid']), (1, 1))
+        body = f'click_id\n{self.ids[0]}\n{self.ids[1]}\n'.encode()
+        response = self.client.post(self.url, body, content_type='text/csv')
+        self.assertEqual((response.json()['converted'], response.json()['already_converted']), (1, 1))
+
+    def test_endpoint_rejects_bad_files(self):
+        self.client.force_login(make_staff())
+        response = self.client.post(self.url, b'\xff\xfe\x00\x31\n', content_type='text/plain')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(self.url, b'order,amount\nA1,10\n', content_type='text/csv')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(AffiliateClick.objects.filter(converted=True).exists())
+        body = f'99999999999999999999\n{2 ** 63}\n{self.ids[0]}\n'.encode()
+        response = self.client.post(self.url, body, content_type='text/plain')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()['invalid'], response.json()['converted']), (2, 1))
+
+
+@override_settings(**QUIET)
+class ClickArchiveTests(TestCase):
+    march, april = date(2024, 3, 1), date(2024, 4, 1)
+
+    def setUp(self):
+        self.root = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        self.enterContext(override_settings(CLICK_ARCHIVE_ROOT=self.root))
+        self.vendor = make_vendor()
+        self.old = [
+            self.click(datetime(2024, 3, 10, 12, tzinfo=dt_timezone.utc), converted=True),
+            self.click(datetime(2024, 3, 11, 12, tzinfo=dt_timezone.utc)),
+            self.click(datetime(2024, 3, 11, 13, tzinfo=dt_timezone.utc)),
+            self.click(datetime(2024, 4, 2, 12, tzinfo=dt_timezone.utc)),
+        ]
+        self.recent = self.click(timezone.now())
+
+    def click(self, at, **fields):
+        click = AffiliateClick.objects.create(vendor=self.vendor, **fields)
+        AffiliateClick.objects.filter(pk=click.pk).update(timestamp=at)
+        return click.pk
+
+    def archived_ids(self, month):
+        return [row['id'] for row in click_archive.read_month(month)]
+
+    def test_archive_and_restore(self):
+        archived = click_archive.archive_clicks(batch_size=2)
+        self.assertEqual(archived['months'], {'2024-03': 3, '2024-04': 1})
+        self.assertEqual(list(AffiliateClick.objects.values_list('id', flat=True)), [self.recent])
+        self.assertEqual(self.archived_ids(self.march), self.old[:3])
+        self.assertEqual(
+            list(ClickDailyRollup.objects.filter(date__month=3).order_by('date').values_list('clicks', 'conversions')),
+            [(1, 1), (2, 0)],
+        )
+
+        with mock.patch.object(click_archive, '_RESTORE_CHUNK', 2):
+            counts = click_archive.restore_month(self.march)
+        self.assertEqual(counts, {'restored': 3, 'present': 0, 'orphaned': 0})
+        restored = AffiliateClick.objects.get(pk=self.old[0])
+        self.assertEqual((restored.timestamp, restored.converted), (datetime(2024, 3, 10, 12, tzinfo=dt_timezone.utc), True))
+        self.assertFalse(ClickDailyRollup.objects.filter(date__month=3, clicks__gt=0).exists())
+        self.assertEqual(ClickArchive.objects.get(month=self.march).clicks, 0)
+
+    def test_restored_month_waits_for_explicit_archive(self):
+        click_archive.archive_clicks()
+        click_archive.restore_month(self.march)
+        AffiliateClick.objects.filter(pk=self.old[1]).update(converted=True)
+
+        again = click_archive.archive_clicks()
+        self.assertEqual((again['clicks'], again['skipped']), (0, ['2024-03']))
+        self.assertEqual(AffiliateClick.objects.count(), 4)
+        self.assertEqual(click_archive.pending_counts(), {})
+
+        again = click_archive.archive_clicks(months=[self.march])
+        self.assertEqual(again['months'], {'2024-03': 3})
+        self.assertEqual(sorted(self.archived_ids(self.march)), self.old[:3])
+        self.assertEqual(
+            [row['id'] for row in click_archive.read_month(self.march, converted=True)], [self.old[0], self.old[1]],
+        )
+        archive = ClickArchive.objects.get(month=self.march)
+        self.assertEqual((archive.clicks, archive.restored_at), (3, None))
+        self.assertEqual(self.archived_ids(self.april), [self.old[3]])
+
+    def test_failed_batch_is_not_read_or_repeated(self):
+        later = self.click(datetime(2024, 3, 20, tzinfo=dt_timezone.utc))
+        with mock.patch.object(click_archive, '_add_to_rollups', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                click_archive.archive_clicks()
+        self.assertTrue(AffiliateClick.objects.filter(pk=later).exists())
+        self.assertEqual(self.archived_ids(self.march), [])
+        self.assertFalse(ClickArchive.objects.filter(month=self.march).exists())
+
+        click_archive.archive_clicks()
+        self.assertEqual(self.archived_ids(self.march), self.old[:3] + [later])
+        self.click(datetime(2024, 3, 21, tzinfo=dt_timezone.utc))
+        with mock.patch.object(click_archive, '_add_to_rollups', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                click_archive.archive_clicks()
+        archive = ClickArchive.objects.get(month=self.march)
+        self.assertGreater((self.root / archive.path).stat().st_size, archive.size)
+        self.assertEqual(self.archived_ids(self.march), self.old[:3] + [later])
+
+
+class FakeSuggestions:
+    """Stands in for ModelSuggestionService: fails ``failures`` times per vendor, then suggests one model."""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.calls = []
+
+    def suggest_models(self, vendor_name, website_url, raise_on_error=False):
+        self.calls.append(vendor_name)
+        if self.calls.count(vendor_name) <= self.failures:
+            raise SuggestionError('quota exceeded')
+        return [{'model_name': f'{vendor_name} Studio', 'description': 'One room'}]
+
+
+@override_settings(**QUIET, ENRICHMENT_DELAY_SECONDS=0, ENRICHMENT_MAX_ATTEMPTS=3)
+class EnrichmentTests(TestCase):
+    def setUp(self):
+        self.vendors = [make_vendor('ICON Build'), make_vendor('Deltec Homes'), make_vendor('Boxabl')]
+        enrichment.enqueue(self.vendors)
+        self.sleeps = []
+
+    def run_jobs(self, service, wait=True):
+        return enrichment.run_jobs(service=service, wait=wait, sleep=self.sleeps.append)
+
+    def test_resumes_after_done_jobs(self):
+        EnrichmentJob.objects.filter(vendor=self.vendors[0]).update(status=enrichment.DONE, attempts=1)
+        self.assertEqual(enrichment.enqueue(self.vendors), 0)
+        service = FakeSuggestions()
+        self.assertEqual(self.run_jobs(service), {'done': 2, 'failed': 0})
+        self.assertEqual(service.calls, ['Deltec Homes', 'Boxabl'])
+        self.assertFalse(ModelVendor.objects.filter(vendor=self.vendors[0]).exists())
+        self.assertEqual(self.run_jobs(FakeSuggestions()), {'done': 0, 'failed': 0})
+
+    def test_failed_job_backs_off(self):
+        self.assertEqual(self.run_jobs(FakeSuggestions(failures=1), wait=False), {'done': 0, 'failed': 3})
+        job = EnrichmentJob.objects.get(vendor=self.vendors[0])
+        self.assertEqual((job.status, job.attempts, job.last_error), (enrichment.FAILED, 1, 'quota exceeded'))
+        self.assertAlmostEqual((job.next_attempt_at - job.finished_at).total_seconds(), 30, delta=1)
+        self.assertEqual(enrichment.due_jobs().count(), 0)
+        self.assertEqual(enrichment.next_retry_at(), EnrichmentJob.objects.order_by('next_attempt_at')[0].next_attempt_at)
+        self.assertEqual(
+            [enrichment.backoff(attempts).total_seconds() for attempts in (1, 2, 3, 6)], [30, 60, 120, 600],
+        )
+
+    @override_settings(ENRICHMENT_BACKOFF_SECONDS=0)
+    def test_retries_until_attempts_run_out(self):
+        self.assertEqual(self.run_jobs(FakeSuggestions(failures=1)), {'done': 3, 'failed': 3})
+        self.assertEqual(list(EnrichmentJob.objects.values_list('attempts', flat=True)), [2, 2, 2])
+
+        job = EnrichmentJob.objects.get(vendor=self.vendors[0])
+        EnrichmentJob.objects.update(status=enrichment.PENDING, attempts=0, suggestions=None)
+        ModelVendor.objects.all().delete()
+        self.assertEqual(self.run_jobs(FakeSuggestions(failures=5)), {'done': 0, 'failed': 9})
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (enrichment.FAILED, 3))
+        self.assertIsNone(enrichment.next_retry_at())
+        self.assertEqual(enrichment.reset_failed(), 3)
+        self.assertEqual(enrichment.due_jobs().count(), 3)
+
+    def test_stale_running_jobs(self):
+        long_ago = timezone.now() - timedelta(hours=1)
+        EnrichmentJob.objects.filter(vendor=self.vendors[0]).update(
+            status=enrichment.RUNNING, attempts=1, started_at=long_ago,
+        )
+        EnrichmentJob.objects.filter(vendor=self.vendors[1]).update(
+            status=enrichment.RUNNING, attempts=3, started_at=long_ago,
+        )
+        EnrichmentJob.objects.filter(vendor=self.vendors[2]).update(
+            status=enrichment.RUNNING, attempts=1, started_at=timezone.now(),
+        )
+        self.assertEqual(list(enrichment.due_jobs().values_list('vendor__partner_name', flat=True)), ['ICON Build'])
+
+        service = FakeSuggestions()
+        self.assertEqual(self.run_jobs(service), {'done': 1, 'failed': 0})
+        self.assertEqual(service.calls, ['ICON Build'])
+        abandoned = EnrichmentJob.objects.get(vendor=self.vendors[1])
+        self.assertEqual((abandoned.status, abandoned.attempts), (enrichment.FAILED, 3))
+        self.assertEqual(EnrichmentJob.objects.get(vendor=self.vendors[2]).status, enrichment.RUNNING)
+
+
+@override_settings(**QUIET)
+class SnapshotTests(TestCase):
+    def setUp(self):
+        self.root = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        self.enterContext(override_settings(CATALOGUE_SNAPSHOT_ROOT=self.root))
+        make_vendor()
+
+    def test_published_files_are_readable_by_the_web_server(self):
+        snapshots.build_snapshots(['vendors'])
+        published = [path for path in self.root.iterdir() if not path.name.startswith('.')]
+        self.assertGreaterEqual(len(published), 3)
+        for path in published:
+            self.assertEqual(path.stat().st_mode & 0o777, snapshots.FILE_MODE, path.name)
+
+    def test_content_encoding_follows_q_values(self):
+        manifest = snapshots.build_snapshots(['vendors'])
+        filename = manifest['vendors']['file']
+        (self.root / f'{filename}.br').write_bytes(b'brotli')
+        cases = {
+            'gzip, deflate, br': 'br',
+            'br;q=0, gzip': 'gzip',
+            'BR; Q=0.0, gzip;q=0.5': 'gzip',
+            'gzip;q=0.9, br;q=0.4': 'gzip',
+            'x-gzip, brotli': None,
+            '*': 'br',
+            '*;q=0.5, br;q=0': 'gzip',
+            'gzip;q=abc': None,
+            '': None,
+        }
+        for header, expected in cases.items():
+            response = self.client.get(f'/api/snapshots/{filename}', HTTP_ACCEPT_ENCODING=header)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.get('Content-Encoding'), expected, header)
+            response.close()
+
+
+@override_settings(**QUIET)
+class SeedTests(TestCase):
+    def test_create_vendor_skips_near_duplicates(self):
+        index = build_vendor_index()
+        vendor, match = create_vendor({'partner_name': 'Deltec Homes', 'primary_category': 'PREFAB'}, index=index)
+        self.assertIsNone(match)
+        again, match = create_vendor({'partner_name': 'Deltec Homes Inc.', 'primary_category': 'PREFAB'}, index=index)
+        self.assertIsNone(again)
+        self.assertEqual(match[0], vendor.pk)
+
+    def test_seed_comprehensive_skips_near_duplicates(self):
+        existing = make_vendor('Pacific Domes, Inc.', website_url='https://pacificdomes.com')
+        call_command('seed_comprehensive', stdout=StringIO())
+        self.assertFalse(BuildingSystemVendor.objects.filter(partner_name='Pacific Domes').exists())
+        self.assertFalse(existing.models.exists())
+        icon = BuildingSystemVendor.objects.get(partner_name='ICON Technology Inc.')
+        self.assertTrue(icon.models.filter(is_featured=True).exists())
+
+        vendors, models = BuildingSystemVendor.objects.count(), ModelVendor.objects.count()
+        call_command('seed_comprehensive', stdout=StringIO())
+        self.assertEqual((BuildingSystemVendor.objects.count(), ModelVendor.objects.count()), (vendors, models))
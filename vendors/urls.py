@@ -1,12 +1,23 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import VendorViewSet, ModelVendorViewSet, ConsultationRequestViewSet
+from . import async_views
+from .views import VendorViewSet, ModelVendorViewSet, ConsultationRequestViewSet, LeadViewSet, catalogue_changes, catalogue_snapshot, click_conversions, model_asset
 
 router = DefaultRouter()
 router.register(r'vendors', VendorViewSet)
 router.register(r'models', ModelVendorViewSet)
 router.register(r'consultations', ConsultationRequestViewSet)
+router.register(r'leads', LeadViewSet, basename='lead')
 
 urlpatterns = [
+    path('assets/models/<str:asset_name>', model_asset, name='model-asset'),
+    path('clicks/conversions/', click_conversions, name='click-conversions'),
+    path('changes/', catalogue_changes, name='catalogue-changes'),
+    path('snapshots/<str:filename>', catalogue_snapshot, name='catalogue-snapshot'),
+    path('async/vendors/', async_views.vendor_list, name='async-vendor-list'),
+    path('async/vendors/<int:pk>/', async_views.vendor_detail, name='async-vendor-detail'),
+    path('async/models/', async_views.model_list, name='async-model-list'),
+    path('async/models/<int:pk>/', async_views.model_detail, name='async-model-detail'),
+    path('async/search/', async_views.search, name='async-search'),
     path('', include(router.urls)),
 ]
@@ -1,33 +1,60 @@
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET, require_safe
 from rest_framework import viewsets, status
-from rest_framework.decorators import action
+from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
+from core import metrics
+from core.sqlite import run_write
+from . import assets, changelog, click_filter, conversions, popularity, snapshots
+from .intake import CREATED, DUPLICATE, QUEUED, IntakeFull, get_intake
+from .leads import MAX_CLAIM, claim_leads, release_leads
 from .models import BuildingSystemVendor, AffiliateClick, ModelVendor, ConsultationRequest
 from .serializers import (
     BuildingSystemVendorSerializer, 
     AffiliateClickSerializer,
     ModelVendorSerializer,
     ModelVendorListSerializer,
-    ConsultationRequestSerializer
+    ConsultationRequestSerializer,
+    LeadSerializer
 )
 
+def _ordered(request, queryset):
+    """``?ordering=popular``: most popular first (vendors.popularity)"""
+    if request.query_params.get('ordering') == 'popular':
+        return queryset.order_by(*popularity.ORDER_BY)
+    return queryset
+
 class VendorViewSet(viewsets.ModelViewSet):
     queryset = BuildingSystemVendor.objects.all()
     serializer_class = BuildingSystemVendorSerializer
 
+    def get_queryset(self):
+        return _ordered(self.request, super().get_queryset())
+
     @action(detail=True, methods=['post'])
     def track_click(self, request, pk=None):
+        # Filtered before get_object(), so dropped clicks cost no query
+        if click_filter.is_enabled():
+            reason = click_filter.get_click_filter().check(request, pk)
+            if reason:
+                return Response({'status': 'click ignored', 'reason': reason, 'click_id': None})
+
         vendor = self.get_object()
         user = request.user if request.user.is_authenticated else None
         
-        click = AffiliateClick.objects.create(
+        click = run_write(
+            AffiliateClick.objects.create,
             vendor=vendor,
             user=user
         )
+        metrics.AFFILIATE_CLICKS.inc(category=vendor.primary_category)
         
         return Response({'status': 'click tracked', 'click_id': click.id}, status=status.HTTP_201_CREATED)
 
 class ModelVendorViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = ModelVendor.objects.select_related('vendor').all()
+    queryset = ModelVendor.objects.select_related('vendor').prefetch_related('gallery')
     
     def get_serializer_class(self):
         if self.action == 'list':
@@ -39,7 +66,20 @@ class ModelVendorViewSet(viewsets.ReadOnlyModelViewSet):
         vendor_id = self.request.query_params.get('vendor', None)
         if vendor_id:
             queryset = queryset.filter(vendor_id=vendor_id)
-        return queryset
+        return _ordered(self.request, queryset)
+
+    @action(detail=True)
+    def similar(self, request, pk=None):
+        """Precomputed neighbours of a model (vendors.similarity), most similar first"""
+        try:
+            pk = int(pk)
+        except ValueError:
+            raise Http404
+        queryset = ModelVendor.objects.filter(neighbor_of__model_id=pk).order_by('neighbor_of__rank')
+        data = ModelVendorListSerializer(queryset, many=True, context=self.get_serializer_context()).data
+        if not data and not ModelVendor.objects.filter(pk=pk).exists():
+            raise Http404
+        return Response(data)
 
 class ConsultationRequestViewSet(viewsets.ModelViewSet):
     queryset = ConsultationRequest.objects.all()
@@ -47,7 +87,250 @@ class ConsultationRequestViewSet(viewsets.ModelViewSet):
     http_method_names = ['post']  # Only allow POST for visitors
     
     def create(self, request, *args, **kwargs):
-        # Attach authenticated user if available
-        if request.user.is_authenticated:
-            request.data['user'] = request.user.id
-        return super().create(request, *args, **kwargs)
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user_id = request.user.pk if request.user.is_authenticated else None
+        intake = get_intake()
+
+        if not getattr(settings, 'CONSULTATION_INTAKE_ASYNC', False):
+            consultation = intake.submit_sync(serializer.validated_data, user_id=user_id)
+            if consultation is None:
+                metrics.CONSULTATIONS.inc(result=DUPLICATE)
+                return Response({'status': DUPLICATE}, status=status.HTTP_200_OK)
+            metrics.CONSULTATIONS.inc(result=CREATED)
+            data = self.get_serializer(consultation).data
+            return Response(data, status=status.HTTP_201_CREATED, headers=self.get_success_headers(data))
+
+        try:
+            result = intake.submit(serializer.validated_data, user_id=user_id)
+        except IntakeFull:
+            metrics.CONSULTATIONS.inc(result='rejected')
+            response = Response(
+                {'status': 'busy', 'detail': 'Too many requests right now, please retry shortly.'},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+            response['Retry-After'] = '5'
+            return response
+        metrics.CONSULTATIONS.inc(result=result)
+
+        # The row is written by the intake worker, so there is no id to return yet
+        return Response({'status': result}, status=status.HTTP_202_ACCEPTED if result == QUEUED else status.HTTP_200_OK)
+
+
+class LeadViewSet(viewsets.GenericViewSet):
+    """Work queue of consultation requests for staff."""
+    serializer_class = LeadSerializer
+    permission_classes = [IsAdminUser]
+    # A lead claimed from another tab must never show up as still pending
+    use_primary = True
+
+    def get_queryset(self):
+        return ConsultationRequest.objects.filter(
+            status='CLAIMED', assigned_to=self.request.user
+        ).select_related('vendor', 'model')
+
+    def list(self, request):
+        """Leads currently claimed by the requesting user."""
+        return Response(self.get_serializer(self.get_queryset(), many=True).data)
+
+    @action(detail=False, methods=['post'])
+    def claim(self, request):
+        try:
+            count = int(request.data.get('count', 10))
+        except (TypeError, ValueError):
+            return Response({'count': ['A valid integer is required.']}, status=status.HTTP_400_BAD_REQUEST)
+        if not 1 <= count <= MAX_CLAIM:
+            return Response({'count': [f'Must be between 1 and {MAX_CLAIM}.']}, status=status.HTTP_400_BAD_REQUEST)
+
+        leads = claim_leads(request.user, count)
+        return Response(self.get_serializer(leads, many=True).data)
+
+    @action(detail=False, methods=['post'])
+    def release(self, request):
+        ids = request.data.get('ids', [])
+        if not isinstance(ids, list) or not all(isinstance(i, int) for i in ids):
+            return Response({'ids': ['A list of lead IDs is required.']}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'released': release_leads(request.user, ids)})
+
+
+def _accepted_encodings(header):
+    """``{coding: q}`` from an Accept-Encoding header; a malformed q-value counts as 0."""
+    accepted = {}
+    for item in header.split(','):
+        coding, _, params = item.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+@require_GET
+def catalogue_snapshot(request, filename):
+    """
+    Serve a prebuilt catalogue snapshot, precompressed when the client allows it.
+
+    Versioned snapshot files never change, so they are cached forever. The
+    manifest is revalidated on every request.
+    """
+    if filename == snapshots.MANIFEST_NAME:
+        cache_control = 'public, max-age=0, must-revalidate'
+    elif snapshots.SNAPSHOT_FILENAME_RE.match(filename):
+        cache_control = 'public, max-age=31536000, immutable'
+    else:
+        raise Http404
+
+    root = snapshots.get_snapshot_root()
+    path = root / filename
+    if not path.is_file():
+        raise Http404
+
+    # The client's most preferred coding we have a file for; br wins ties
+    accepted = _accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    encoding, best = None, 0.0
+    for candidate, suffix in (('br', '.br'), ('gzip', '.gz')):
+        q = accepted.get(candidate, accepted.get('*', 0.0))
+        if q > best and (root / f'{filename}{suffix}').is_file():
+            encoded = root / f'{filename}{suffix}'
+            encoding, best = candidate, q
+    if encoding:
+        path = encoded
+
+    response = FileResponse(open(path, 'rb'), content_type='application/json', filename=filename)
+    if encoding:
+        response['Content-Encoding'] = encoding
+    response['Cache-Control'] = cache_control
+    response['Vary'] = 'Accept-Encoding'
+    return response
+
+
+@require_safe
+def model_asset(request, asset_name):
+    """
+    Serve a content-addressed 3D model file, whole or as a single byte range.
+
+    The name is the file's SHA-256, so the content behind a URL never changes:
+    responses are cached forever and the digest is a strong ETag.
+    """
+    match = assets.ASSET_NAME_RE.match(asset_name)
+    if not match:
+        raise Http404
+    storage = assets.get_model_asset_storage()
+    name = assets.asset_path(asset_name)
+    try:
+        size = storage.size(name)
+    except OSError:
+        raise Http404
+
+    etag = '"%s"' % match['digest']
+    headers = {
+        'Accept-Ranges': 'bytes',
+        'Cache-Control': assets.IMMUTABLE_CACHE_CONTROL,
+        'ETag': etag,
+    }
+    content_type = assets.GLB_CONTENT_TYPE if match['ext'] == '.glb' else 'application/octet-stream'
+
+    if etag in request.headers.get('If-None-Match', ''):
+        response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    offload = assets.sendfile_location(storage, name)
+    if offload:
+        # The web server handles Range and conditional headers itself
+        response = HttpResponse(content_type=content_type)
+        response[offload[0]] = offload[1]
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    byte_range = None
+    range_header = request.headers.get('Range')
+    # A Range whose If-Range validator no longer matches gets the whole file
+    if range_header and request.headers.get('If-Range', etag) == etag:
+        try:
+            byte_range = assets.parse_range(range_header, size)
+        except ValueError:
+            response = HttpResponse(status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    fh = storage.open(name, 'rb')
+    if byte_range is None:
+        response = FileResponse(fh, content_type=content_type)
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            assets.iter_range(fh, start, end - start + 1),
+            status=status.HTTP_206_PARTIAL_CONTENT,
+            content_type=content_type,
+        )
+        response['Content-Length'] = str(end - start + 1)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    for header, value in headers.items():
+        response[header] = value
+    return response
+
+
+@api_view(['GET'])
+def catalogue_changes(request):
+    """
+    Vendors and models created, updated or deleted since ``?since=<token>``.
+
+    Without a token the whole catalogue is returned. Clients store ``next`` and
+    keep requesting while ``has_more`` is true.
+    """
+    try:
+        since = changelog.parse_token(request.query_params.get('since'))
+    except changelog.InvalidToken:
+        return Response({'since': ['Invalid sync token.']}, status=status.HTTP_400_BAD_REQUEST)
+    page_size = getattr(settings, 'CATALOGUE_CHANGES_PAGE_SIZE', 500)
+    try:
+        limit = int(request.query_params.get('limit', page_size))
+    except ValueError:
+        return Response({'limit': ['A valid integer is required.']}, status=status.HTTP_400_BAD_REQUEST)
+    limit = max(1, min(limit, changelog.MAX_PAGE_SIZE))
+    return Response(changelog.changes_since(since, limit))
+
+
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def click_conversions(request):
+    """
+    Mark affiliate clicks converted from a partner's postback file.
+
+    Takes a ``text/plain`` or ``text/csv`` body (read as a stream), a
+    multipart upload in ``file``, or JSON ``{"click_ids": [...]}``, and
+    answers with the counts from ``conversions.apply_conversions``.
+    """
+    if request.content_type.startswith('application/json'):
+        click_ids = request.data.get('click_ids') if isinstance(request.data, dict) else None
+        if not isinstance(click_ids, list):
+            return Response({'click_ids': ['A list of click ids is required.']}, status=status.HTTP_400_BAD_REQUEST)
+        ids = (conversions.parse_id(str(click_id)) for click_id in click_ids)
+    else:
+        if request.content_type.startswith('multipart/'):
+            upload = request.FILES.get('file')
+            if upload is None:
+                return Response({'file': ['No file was submitted.']}, status=status.HTTP_400_BAD_REQUEST)
+            lines = upload
+        else:
+            stream = request.stream
+            lines = iter(stream.readline, b'') if stream is not None else ()
+        ids = conversions.read_click_ids(lines)
+    try:
+        return Response(conversions.apply_conversions(ids))
+    except conversions.ConversionFileError as exc:
+        return Response({'file': [str(exc)]}, status=status.HTTP_400_BAD_REQUEST)
+    except UnicodeDecodeError:
+        # Chunks before the bad line are committed; applying the file again is safe
+        return Response({'file': ['The file is not UTF-8 text.']}, status=status.HTTP_400_BAD_REQUEST)